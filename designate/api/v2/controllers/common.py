@@ -20,6 +20,7 @@ def retrieve_matched_rrsets(context, controller_obj, zone_id, **params):
     # Extract the pagination params
     marker, limit, sort_key, sort_dir = utils.get_paging_params(
             context, params, controller_obj.SORT_KEYS)
+    page_token = utils.get_page_token(params, marker)
 
     # Extract any filter params.
     accepted_filters = (
@@ -34,7 +35,8 @@ def retrieve_matched_rrsets(context, controller_obj, zone_id, **params):
         force_index = False
 
     recordsets = controller_obj.central_api.find_recordsets(
-            context, criterion, marker, limit, sort_key, sort_dir, force_index)
+            context, criterion, marker, limit, sort_key, sort_dir, force_index,
+            page_token=page_token)
 
     return recordsets
 
@@ -65,6 +65,7 @@ class ZonesController(rest.RestController):
 
         marker, limit, sort_key, sort_dir = utils.get_paging_params(
                 context, params, self.SORT_KEYS)
+        page_token = utils.get_page_token(params, marker)
 
         # Extract any filter params.
         accepted_filters = ('name', 'type', 'email', 'status',
@@ -74,7 +75,8 @@ class ZonesController(rest.RestController):
             params, accepted_filters, {})
 
         zones = self.central_api.find_zones(
-            context, criterion, marker, limit, sort_key, sort_dir)
+            context, criterion, marker, limit, sort_key, sort_dir,
+            page_token=page_token)
 
         LOG.info('Retrieved %(zones)s', {'zones': zones})
 
@@ -15,7 +15,8 @@
 # under the License.
 
 """
-Bind 9 backend. Create and delete zones by executing rndc
+Bind 9 backend. Create and delete zones by executing rndc, or by sending its
+commands over the control channel
 """
 
 import random
@@ -26,6 +27,7 @@ from oslo_log import log as logging
 from oslo_utils import strutils
 
 from designate.backend import base
+from designate.backend import rndc
 from designate.conf.mdns import DEFAULT_MDNS_PORT
 from designate import exceptions
 from designate import utils
@@ -55,6 +57,37 @@ class Bind9Backend(base.Backend):
         if self._rndc_timeout == 0 or self._rndc_timeout == '0':
             self._rndc_timeout = None
 
+        self._rndc_client = None
+        if strutils.bool_from_string(self.options.get('rndc_native',
+                                                      'false')):
+            self._rndc_client = self._create_rndc_client()
+
+    def _create_rndc_client(self):
+        """Create a client of the control channel, or None to execute rndc"""
+        rndc_key_file = (self.options.get('rndc_key_file') or
+                         self.options.get('rndc_config_file'))
+        if not rndc_key_file:
+            LOG.warning('rndc_native requires rndc_key_file or '
+                        'rndc_config_file, executing rndc instead')
+            return None
+
+        try:
+            algorithm, secret = rndc.load_key(
+                rndc_key_file, self.options.get('rndc_key_name')
+            )
+        except (OSError, ValueError, exceptions.ConfigurationError) as e:
+            LOG.warning('Unable to load the rndc key from %s, executing '
+                        'rndc instead: %s', rndc_key_file, e)
+            return None
+
+        return rndc.RndcClient(
+            self.options.get('rndc_host', '127.0.0.1'),
+            int(self.options.get('rndc_port', 953)),
+            algorithm, secret,
+            timeout=(float(self._rndc_timeout)
+                     if self._rndc_timeout else None),
+        )
+
     def _generate_rndc_base_call(self):
         """Generate argument list to execute rndc"""
         rndc_host = self.options.get('rndc_host', '127.0.0.1')
@@ -201,6 +234,15 @@ class Bind9Backend(base.Backend):
         :returns: None
         :raises: exceptions.Backend
         """
+        if self._rndc_client is not None:
+            try:
+                LOG.debug('Sending RNDC command: %r with timeout %s',
+                          rndc_op, self._rndc_timeout)
+                self._rndc_client.call(' '.join(rndc_op))
+            except OSError as e:
+                raise exceptions.Backend(e)
+            return
+
         try:
             rndc_call = self._rndc_call_base + rndc_op
             LOG.debug('Executing RNDC call: %r with timeout %s',
@@ -0,0 +1,398 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""
+Client of the control channel of Bind 9, which sends the commands of rndc
+without executing it
+"""
+
+import base64
+import hmac
+import itertools
+import random
+import re
+import socket
+import struct
+import threading
+import time
+
+from oslo_log import log as logging
+
+from designate import exceptions
+
+
+LOG = logging.getLogger(__name__)
+
+# Algorithm numbers of the HMACs, as in the hsha authenticator
+ALGORITHMS = {
+    'hmac-md5': 157,
+    'hmac-sha1': 161,
+    'hmac-sha224': 162,
+    'hmac-sha256': 163,
+    'hmac-sha384': 164,
+    'hmac-sha512': 165,
+}
+
+HMD5_LENGTH = 22
+HSHA_LENGTH = 88
+MESSAGE_VERSION = 1
+
+_BINARY = 1
+_TABLE = 2
+_LIST = 3
+
+_COMMENTS_RE = re.compile(r'/\*.*?\*/|//[^\n]*|#[^\n]*', re.DOTALL)
+_KEY_RE = re.compile(r'\bkey\s+"?([\w.-]+)"?\s*\{(.*?)\}\s*;', re.DOTALL)
+_ALGORITHM_RE = re.compile(r'\balgorithm\s+"?([\w-]+)"?\s*;')
+_SECRET_RE = re.compile(r'\bsecret\s+"([^"]+)"\s*;')
+_DEFAULT_KEY_RE = re.compile(r'\bdefault-key\s+"?([\w.-]+)"?\s*;')
+
+
+def load_key(path, key_name=None):
+    """
+    Read a key from a rndc key or config file.
+
+    :param key_name: name of the key to read, defaults to the default-key
+                     of the file, or its first key
+    :returns: the algorithm and the secret of the key
+    :raises: exceptions.ConfigurationError
+    """
+    with open(path) as f:
+        content = _COMMENTS_RE.sub('', f.read())
+
+    keys = {
+        name: body for name, body in _KEY_RE.findall(content)
+    }
+    if key_name is None:
+        default_key = _DEFAULT_KEY_RE.search(content)
+        if default_key:
+            key_name = default_key.group(1)
+        elif keys:
+            key_name = next(iter(keys))
+    if key_name not in keys:
+        raise exceptions.ConfigurationError(
+            'Key %s not found in %s' % (key_name, path)
+        )
+
+    algorithm = _ALGORITHM_RE.search(keys[key_name])
+    secret = _SECRET_RE.search(keys[key_name])
+    if not algorithm or not secret:
+        raise exceptions.ConfigurationError(
+            'Key %s in %s has no algorithm or secret' % (key_name, path)
+        )
+    algorithm = algorithm.group(1).lower()
+    if algorithm not in ALGORITHMS:
+        raise exceptions.ConfigurationError(
+            'Algorithm %s of key %s is not supported' % (algorithm, key_name)
+        )
+    return algorithm, base64.b64decode(secret.group(1))
+
+
+def _encode_value(value):
+    if isinstance(value, dict):
+        return _TABLE, encode_table(value)
+    if isinstance(value, str):
+        value = value.encode('ascii')
+    return _BINARY, value
+
+
+def encode_table(table):
+    """
+    Encode a table of a control message, its values are tables, strings or
+    bytes
+    """
+    data = bytearray()
+    for key, value in table.items():
+        value_type, value = _encode_value(value)
+        data += struct.pack('B', len(key)) + key.encode('ascii')
+        data += struct.pack('>BI', value_type, len(value)) + value
+    return bytes(data)
+
+
+def _decode_value(value_type, value):
+    if value_type == _BINARY:
+        return bytes(value)
+    if value_type == _TABLE:
+        return decode_table(value)
+    if value_type == _LIST:
+        items = []
+        pos = 0
+        while pos < len(value):
+            item_type, item_length = struct.unpack_from('>BI', value, pos)
+            pos += 5
+            items.append(
+                _decode_value(item_type, value[pos:pos + item_length])
+            )
+            pos += item_length
+        return items
+    raise ValueError('Unknown value type %d' % value_type)
+
+
+def decode_table(data):
+    """
+    Decode a table of a control message
+    """
+    table = {}
+    pos = 0
+    while pos < len(data):
+        key_length = data[pos]
+        key = bytes(data[pos + 1:pos + 1 + key_length]).decode('ascii')
+        pos += 1 + key_length
+        if pos + 5 > len(data):
+            raise ValueError('Truncated value of %s' % key)
+        value_type, value_length = struct.unpack_from('>BI', data, pos)
+        pos += 5
+        if pos + value_length > len(data):
+            raise ValueError('Truncated value of %s' % key)
+        table[key] = _decode_value(value_type, data[pos:pos + value_length])
+        pos += value_length
+    return table
+
+
+def _recv_exactly(sock, length, wait=False):
+    data = bytearray()
+    while len(data) < length:
+        try:
+            chunk = sock.recv(length - len(data))
+        except socket.timeout:
+            if not wait:
+                raise
+            continue
+        if not chunk:
+            raise ConnectionError('Control channel closed')
+        data += chunk
+    return data
+
+
+def read_message(sock, wait=False):
+    """
+    Read a control message from a socket, without authenticating it
+
+    :param wait: keep waiting for the message past the timeout of the socket
+    """
+    length, version = struct.unpack('>II', _recv_exactly(sock, 8, wait))
+    if version != MESSAGE_VERSION:
+        raise ConnectionError('Unknown message version %d' % version)
+    return decode_table(_recv_exactly(sock, length - 4, wait))
+
+
+class _Request:
+    def __init__(self):
+        self.event = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class _Connection:
+    def __init__(self, sock):
+        self.sock = sock
+        self.nonce = None
+        self.pending = {}
+        self.closed = False
+
+
+class RndcClient:
+    """
+    Send commands to the control channel of a Bind 9 server, as rndc does.
+
+    The connection to the server is kept open, and authenticated once with
+    the nonce it returns. The commands sent concurrently are pipelined over
+    it, their responses are received by a thread and matched to them by
+    serial.
+    """
+
+    def __init__(self, host, port, algorithm, secret, timeout=None):
+        self._address = (host, port)
+        self._algorithm = algorithm
+        self._digestmod = algorithm[len('hmac-'):]
+        self._secret = secret
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._connection = None
+        self._serials = itertools.count(random.randint(0, 1 << 24))
+
+    def call(self, command):
+        """
+        Send a command, e.g. 'showzone example.com', and wait for its result.
+
+        :returns: the text output of the command
+        :raises: exceptions.Backend when the command failed, OSError when
+                 the server could not be reached in time
+        """
+        for attempt in range(2):
+            request = _Request()
+            with self._lock:
+                connection = self._connection
+                reused = connection is not None
+                if not reused:
+                    connection = self._connect()
+                    self._connection = connection
+                serial = str(next(self._serials))
+                connection.pending[serial] = request
+                try:
+                    connection.sock.sendall(self._message(
+                        serial, {'type': command}, connection.nonce
+                    ))
+                except OSError as e:
+                    self._close(connection, e)
+
+            if not request.event.wait(self._timeout):
+                error = TimeoutError(
+                    'No response to %r within %ss' % (command, self._timeout)
+                )
+                with self._lock:
+                    self._close(connection, error)
+                raise error
+
+            # The server may have closed the connection while it was idle,
+            # then the command is sent again over a new one
+            if (request.error is not None and reused and
+                    isinstance(request.error, ConnectionError)):
+                LOG.debug(
+                    'Control channel to %(host)s:%(port)s was closed, '
+                    'reconnecting. Error=%(error)s',
+                    {
+                        'host': self._address[0],
+                        'port': self._address[1],
+                        'error': request.error,
+                    }
+                )
+                continue
+            break
+
+        if request.error is not None:
+            raise request.error
+
+        data = request.response.get('_data', {})
+        if data.get('result', b'0') != b'0':
+            error = data.get('err', b'').decode('utf-8', 'replace')
+            message = "'%s' failed: %s" % (command.split(' ', 1)[0], error)
+            text = data.get('text', b'').decode('utf-8', 'replace')
+            if text:
+                message += '\n' + text
+            raise exceptions.Backend(message)
+        return data.get('text', b'').decode('utf-8', 'replace')
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._close(
+                    self._connection, ConnectionError('Client closed')
+                )
+
+    def _connect(self):
+        """
+        Open a connection, and get its nonce. Called with the lock held.
+        """
+        sock = socket.create_connection(self._address, self._timeout)
+        try:
+            connection = _Connection(sock)
+            sock.sendall(self._message(
+                str(next(self._serials)), {'type': 'null'}
+            ))
+            response = read_message(sock)
+            self._verify(response)
+            connection.nonce = response['_ctrl']['_nonce']
+        except OSError:
+            sock.close()
+            raise
+        except Exception as e:
+            sock.close()
+            raise ConnectionError('Invalid response: %s' % e)
+
+        threading.Thread(
+            target=self._receive, args=(connection,),
+            name='bind9-rndc-receiver', daemon=True
+        ).start()
+        return connection
+
+    def _close(self, connection, error):
+        """
+        Close a connection, failing its pending commands. Called with the
+        lock held.
+        """
+        if connection.closed:
+            return
+        connection.closed = True
+        if self._connection is connection:
+            self._connection = None
+        try:
+            connection.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        connection.sock.close()
+        for request in connection.pending.values():
+            request.error = error
+            request.event.set()
+        connection.pending.clear()
+
+    def _receive(self, connection):
+        while True:
+            try:
+                # The timeout of the socket bounds the sends, the receiver
+                # waits for the responses however long the connection is idle
+                response = read_message(connection.sock, wait=True)
+                self._verify(response, connection.nonce)
+                serial = response['_ctrl']['_ser'].decode('ascii')
+            except Exception as e:
+                if not isinstance(e, OSError):
+                    e = ConnectionError('Invalid response: %s' % e)
+                with self._lock:
+                    self._close(connection, e)
+                return
+
+            with self._lock:
+                request = connection.pending.pop(serial, None)
+            if request is not None:
+                request.response = response
+                request.event.set()
+
+    def _digest(self, data):
+        return base64.b64encode(
+            hmac.new(self._secret, data, self._digestmod).digest()
+        )
+
+    def _message(self, serial, data, nonce=None):
+        now = int(time.time())
+        ctrl = {'_ser': serial, '_tim': str(now), '_exp': str(now + 60)}
+        if nonce is not None:
+            ctrl['_nonce'] = nonce
+
+        # The authenticator is first, and signs the rest of the message
+        signed = encode_table({'_ctrl': ctrl, '_data': data})
+        digest = self._digest(signed)
+        if self._algorithm == 'hmac-md5':
+            auth = {'hmd5': digest[:HMD5_LENGTH]}
+        else:
+            auth = {
+                'hsha': (
+                    struct.pack('B', ALGORITHMS[self._algorithm]) +
+                    digest.ljust(HSHA_LENGTH, b'\0')
+                )
+            }
+        message = encode_table({'_auth': auth}) + signed
+        return struct.pack('>II', len(message) + 4, MESSAGE_VERSION) + message
+
+    def _verify(self, response, nonce=None):
+        auth = response.get('_auth', {})
+        if self._algorithm == 'hmac-md5':
+            received = auth.get('hmd5', b'')
+        else:
+            received = auth.get('hsha', b'')[1:]
+        expected = self._digest(encode_table({
+            key: value for key, value in response.items() if key != '_auth'
+        }))
+        if not hmac.compare_digest(received.rstrip(b'\0').rstrip(b'='),
+                                   expected.rstrip(b'=')):
+            raise ConnectionError('Response authentication failed')
+        if nonce is not None and response['_ctrl'].get('_nonce') != nonce:
+            raise ConnectionError('Response nonce mismatch')
@@ -75,8 +75,11 @@ class CentralAPI:
         6.10 - Add Zone Pool Move method
         6.11 - Add zone attributes to zone import
         6.12 - Add delete service status method
+        6.13 - Add zone journal purging task
+        6.14 - Add page_token to 'find_zones' and 'find_recordsets'
+        6.15 - Add increment_zone_serials
     """
-    RPC_API_VERSION = '6.12'
+    RPC_API_VERSION = '6.15'
 
     # This allows us to mark some methods as not logged.
     # This can be for a few reasons - some methods my not actually call over
@@ -89,7 +92,7 @@ class CentralAPI:
 
         target = messaging.Target(topic=self.topic,
                                   version=self.RPC_API_VERSION)
-        self.client = rpc.get_client(target, version_cap='6.12')
+        self.client = rpc.get_client(target, version_cap='6.15')
 
     @classmethod
     def get_instance(cls):
@@ -151,6 +154,11 @@ class CentralAPI:
     def increment_zone_serial(self, context, zone):
         return self.client.call(context, 'increment_zone_serial', zone=zone)
 
+    def increment_zone_serials(self, context, zone_ids):
+        return self.client.call(
+            context, 'increment_zone_serials', zone_ids=zone_ids
+        )
+
     def create_zone(self, context, zone):
         return self.client.call(context, 'create_zone', zone=zone)
 
@@ -162,10 +170,10 @@ class CentralAPI:
                                 zone_id=zone_id)
 
     def find_zones(self, context, criterion=None, marker=None, limit=None,
-                   sort_key=None, sort_dir=None):
+                   sort_key=None, sort_dir=None, page_token=None):
         return self.client.call(context, 'find_zones', criterion=criterion,
                                 marker=marker, limit=limit, sort_key=sort_key,
-                                sort_dir=sort_dir)
+                                sort_dir=sort_dir, page_token=page_token)
 
     def update_zone(self, context, zone, increment_serial=True):
         return self.client.call(context, 'update_zone', zone=zone,
@@ -178,6 +186,10 @@ class CentralAPI:
         return self.client.call(context, 'purge_zones',
                                 criterion=criterion, limit=limit)
 
+    def purge_zone_journal(self, context, criterion, limit=None):
+        return self.client.call(context, 'purge_zone_journal',
+                                criterion=criterion, limit=limit)
+
     def pool_move_zone(self, context, zone_id, target_pool_id):
         return self.client.call(context, 'pool_move_zone',
                                 zone_id=zone_id,
@@ -233,11 +245,13 @@ class CentralAPI:
                                 recordset_id=recordset_id)
 
     def find_recordsets(self, context, criterion=None, marker=None, limit=None,
-                        sort_key=None, sort_dir=None, force_index=False):
+                        sort_key=None, sort_dir=None, force_index=False,
+                        page_token=None):
         return self.client.call(context, 'find_recordsets',
                                 criterion=criterion, marker=marker,
                                 limit=limit, sort_key=sort_key,
-                                sort_dir=sort_dir, force_index=force_index)
+                                sort_dir=sort_dir, force_index=force_index,
+                                page_token=page_token)
 
     def create_managed_records(self, context, zone_id, records_values,
                                recordset_values):
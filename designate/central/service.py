@@ -14,6 +14,7 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import collections
 from concurrent.futures import ThreadPoolExecutor
 from concurrent.futures import TimeoutError
 import copy
@@ -55,7 +56,7 @@ LOG = logging.getLogger(__name__)
 
 
 class Service(service.RPCService):
-    RPC_API_VERSION = '6.12'
+    RPC_API_VERSION = '6.15'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -217,7 +218,8 @@ class Service(service.RPCService):
 
     def _is_valid_recordset_placement_subzone(self, context, zone,
                                               recordset_name,
-                                              criterion=None):
+                                              criterion=None,
+                                              child_zones=None):
         """
         Check that the placement of the requested rrset belongs to any of the
         zones subzones..
@@ -232,8 +234,9 @@ class Service(service.RPCService):
         if zone.name == recordset_name:
             return
 
-        child_zones = self.storage.find_zones(
-            context, {"parent_zone_id": zone.id})
+        if child_zones is None:
+            child_zones = self.storage.find_zones(
+                context, {"parent_zone_id": zone.id})
         for child_zone in child_zones:
             try:
                 self._is_valid_recordset_name(
@@ -297,25 +300,13 @@ class Service(service.RPCService):
         """
         context = context.elevated(all_tenants=True)
 
-        # Break the name up into it's component labels
-        labels = zone_name.split(".")
-
-        criterion = {"pool_id": pool_id}
-
-        i = 1
+        zones = self.storage.find_closest_zones(
+            context, zone_name, {'pool_id': pool_id}, strict=True, unique=True
+        )
+        if not zones:
+            return False
 
-        # Starting with label #2, search for matching zone's in the database
-        while (i < len(labels)):
-            name = '.'.join(labels[i:])
-            criterion["name"] = name
-            try:
-                zone = self.storage.find_zone(context, criterion)
-            except exceptions.ZoneNotFound:
-                i += 1
-            else:
-                return zone
-
-        return False
+        return zones[0]
 
     def _is_superzone(self, context, zone_name, pool_id):
         """
@@ -342,7 +333,6 @@ class Service(service.RPCService):
         cross-tenant collisions are rejected here.
         """
         context = context.elevated(all_tenants=True)
-        labels = zone.name.split('.')
 
         # Exact-name duplicate owned by another tenant, in any pool.
         for existing in self.storage.find_zones(context, {'name': zone.name}):
@@ -351,19 +341,15 @@ class Service(service.RPCService):
                     'Zone already exists, owned by a different tenant')
 
         # This zone would be a subzone of a zone owned by another
-        # tenant, in any pool. Stop at the first (nearest) ancestor
-        # match, same as _is_subzone.
-        for i in range(1, len(labels)):
-            name = '.'.join(labels[i:])
-            ancestors = self.storage.find_zones(context, {'name': name})
-            if not ancestors:
-                continue
-            for ancestor in ancestors:
-                if ancestor.tenant_id != zone.tenant_id:
-                    raise exceptions.IllegalChildZone(
-                        'Unable to create subzone in another tenants '
-                        'zone')
-            break
+        # tenant, in any pool. Only the nearest ancestors matter, same as
+        # _is_subzone.
+        ancestors = self.storage.find_closest_zones(
+            context, zone.name, strict=True
+        )
+        for ancestor in ancestors:
+            if ancestor.tenant_id != zone.tenant_id:
+                raise exceptions.IllegalChildZone(
+                    'Unable to create subzone in another tenants zone')
 
         # This zone would be a superzone of a zone owned by another
         # tenant, in any pool.
@@ -466,7 +452,7 @@ class Service(service.RPCService):
         )
 
     # NS Recordset Methods
-    def _create_ns(self, context, zone, ns_records):
+    def _create_ns(self, context, zone, ns_records, journal=True):
         # NOTE: We should not be creating NS records when a zone is SECONDARY.
         if zone.type != 'PRIMARY':
             return
@@ -481,7 +467,7 @@ class Service(service.RPCService):
         }
         ns, zone = self._create_recordset_in_storage(
             context, zone, objects.RecordSet(**values),
-            increment_serial=False
+            increment_serial=False, journal=journal
         )
 
         return ns
@@ -537,33 +523,29 @@ class Service(service.RPCService):
 
     # Quota Enforcement Methods
     def _enforce_zone_quota(self, context, tenant_id):
-        criterion = {'tenant_id': tenant_id}
-        count = self.storage.count_zones(context, criterion)
+        count = self.storage.get_tenant_zone_count(context, tenant_id)
 
         # Check if adding one more zone would exceed the quota
         self.quota.limit_check(context, tenant_id, zones=count + 1)
 
-    def _enforce_recordset_quota(self, context, zone):
+    def _enforce_recordset_quota(self, context, zone, new_recordsets=1):
         # Ensure the recordsets per zone quota is OK
-        criterion = {'zone_id': zone.id}
-        count = self.storage.count_recordsets(context, criterion)
+        count = self.storage.get_zone_counters(
+            context, zone.id)['recordsets']
 
-        # Check if adding one more recordset would exceed the quota
+        # Check if adding the new recordsets would exceed the quota
         self.quota.limit_check(
-            context, zone.tenant_id, zone_recordsets=count + 1)
+            context, zone.tenant_id, zone_recordsets=count + new_recordsets)
 
     def _enforce_record_quota(self, context, zone, recordset):
         # Quotas don't apply to managed records.
         if recordset.managed:
             return
 
-        # Ensure the records per zone quota is OK
-        zone_criterion = {
-            'zone_id': zone.id,
-            'managed': False,  # only include non-managed records
-        }
-
-        zone_records = self.storage.count_records(context, zone_criterion)
+        # Ensure the records per zone quota is OK, only non-managed records
+        # are counted
+        zone_records = self.storage.get_zone_counters(
+            context, zone.id)['records']
 
         recordset_criterion = {
             'recordset_id': recordset.id,
@@ -585,6 +567,34 @@ class Service(service.RPCService):
         self.quota.limit_check(context, zone.tenant_id,
                                recordset_records=len(recordset.records))
 
+    def _enforce_new_records_quota(self, context, zone, recordsets):
+        # Quotas don't apply to managed records.
+        recordsets = [
+            recordset for recordset in recordsets
+            if recordset.obj_attr_is_set('records') and recordset.records and
+            not recordset.managed
+        ]
+        if not recordsets:
+            return
+
+        # Ensure the records per zone quota is OK
+        zone_records = self.storage.get_zone_counters(
+            context, zone.id)['records']
+        self.quota.limit_check(
+            context, zone.tenant_id,
+            zone_records=zone_records + sum(
+                len(recordset.records) for recordset in recordsets
+            )
+        )
+
+        # Ensure the records per recordset quota is OK
+        self.quota.limit_check(
+            context, zone.tenant_id,
+            recordset_records=max(
+                len(recordset.records) for recordset in recordsets
+            )
+        )
+
     # Misc Methods
     @rpc.expected_exceptions()
     def get_absolute_limits(self, context):
@@ -825,10 +835,72 @@ class Service(service.RPCService):
     @transaction
     @lock.synchronized_zone()
     def increment_zone_serial(self, context, zone):
+        serial = self.storage.get_zone(context, zone.id).serial
         zone.serial = self.storage.increment_serial(context, zone.id)
+
+        # The changes made since the last increment now make up the version
+        # of the zone with the new serial.
+        if (zone.type in (constants.ZONE_PRIMARY, constants.ZONE_CATALOG) and
+                dnsutils.serial_gt(zone.serial, serial)):
+            self.storage.publish_zone_journal(
+                context, zone.id, serial, zone.serial
+            )
+
         self._update_soa(context, zone)
         return zone.serial
 
+    @rpc.expected_exceptions()
+    @transaction
+    @lock.synchronized_zones()
+    def increment_zone_serials(self, context, zone_ids):
+        """Increment the serials of a batch of zones and rewrite their SOA
+        records, in a single transaction.
+
+        Only the zones which still need their serial incremented are, the
+        others were handled since they were found.
+
+        :returns: The new serials, by zone ID.
+        """
+        zones = self.storage.find_zones(
+            context, {'id': list(zone_ids), 'increment_serial': True}
+        )
+        if not zones:
+            return {}
+
+        serial = self.storage.increment_serials(
+            context, [zone.id for zone in zones]
+        )
+
+        # The changes made since the last increment now make up the version
+        # of the zones with the new serial.
+        versions = []
+        soas = {}
+        pool_ns_records = {}
+        for zone in zones:
+            if (zone.type in (constants.ZONE_PRIMARY,
+                              constants.ZONE_CATALOG) and
+                    dnsutils.serial_gt(serial, zone.serial)):
+                versions.append((zone.id, zone.serial, serial))
+            zone.serial = serial
+
+            # NOTE: We should not be updating SOA records when a zone is
+            # SECONDARY.
+            if zone.type == constants.ZONE_SECONDARY:
+                continue
+            if zone.pool_id not in pool_ns_records:
+                pool_ns_records[zone.pool_id] = self._get_pool_ns_records(
+                    context, zone.pool_id
+                )
+            soas[zone.id] = (
+                serial,
+                self._build_soa_record(zone, pool_ns_records[zone.pool_id])
+            )
+
+        self.storage.publish_zone_journals(context, versions)
+        self.storage.update_soa_records(context, soas)
+
+        return {zone.id: serial for zone in zones}
+
     @rpc.expected_exceptions()
     @notification.notify_type('dns.domain.create')
     @notification.notify_type('dns.zone.create')
@@ -947,16 +1019,18 @@ class Service(service.RPCService):
 
         # Create the SOA and NS recordsets for the new zone.  The SOA
         # record will always be the first 'created_at' record for a zone.
+        # Nothing is journaled, there is no earlier version of the zone to
+        # transfer incrementally from.
         self._create_soa(context, zone)
-        self._create_ns(context, zone, [n.hostname for n in pool_ns_records])
+        self._create_ns(context, zone, [n.hostname for n in pool_ns_records],
+                        journal=False)
 
         if zone.obj_attr_is_set('recordsets'):
-            for rrset in zone.recordsets:
-                self._create_recordset_in_storage(
-                    context, zone, rrset, increment_serial=False
-                )
+            self._create_zone_recordsets_in_storage(
+                context, zone, zone.recordsets
+            )
 
-        self._ensure_catalog_zone_serial_increment(context, zone)
+        self._ensure_catalog_zone_serial_increment(context, zone, 'ADD')
 
         return zone
 
@@ -1019,7 +1093,7 @@ class Service(service.RPCService):
 
     @rpc.expected_exceptions()
     def find_zones(self, context, criterion=None, marker=None, limit=None,
-                   sort_key=None, sort_dir=None):
+                   sort_key=None, sort_dir=None, page_token=None):
         """List existing zones including the ones flagged for deletion.
         """
         target = {constants.RBAC_PROJECT_ID: context.project_id,
@@ -1033,7 +1107,8 @@ class Service(service.RPCService):
             criterion['type'] = '!CATALOG'
 
         return self.storage.find_zones(context, criterion, marker, limit,
-                                       sort_key, sort_dir)
+                                       sort_key, sort_dir,
+                                       page_token=page_token)
 
     @rpc.expected_exceptions()
     @notification.notify_type('dns.domain.update')
@@ -1099,6 +1174,15 @@ class Service(service.RPCService):
         if set_delayed_notify:
             zone.delayed_notify = True
 
+        if ('ttl' in zone.obj_what_changed() and
+                zone.type == constants.ZONE_PRIMARY):
+            # Records without a TTL of their own follow the TTL of the zone,
+            # which the journal can't express. Make sure this version of
+            # the zone is only ever sent in full.
+            self.storage.create_zone_journal_entries(
+                context, zone.id, [('RESET', None, None, None, None)]
+            )
+
         zone = self.storage.update_zone(context, zone)
 
         return zone
@@ -1154,7 +1238,11 @@ class Service(service.RPCService):
 
         if hasattr(context, 'abandon') and context.abandon:
             LOG.info("Abandoning zone '%(zone)s'", {'zone': zone.name})
+            operation = None if zone.action == 'DELETE' else 'DELETE'
             zone = self.storage.delete_zone(context, zone.id)
+            self._ensure_catalog_zone_serial_increment(
+                context, zone, operation
+            )
         else:
             zone = self._delete_zone_in_storage(context, zone)
             delete_zonefile = False
@@ -1171,12 +1259,15 @@ class Service(service.RPCService):
         to have the zone soft-deleted later on
         """
 
+        # Zones that are already being deleted have left the catalog.
+        operation = None if zone.action == 'DELETE' else 'DELETE'
+
         zone.action = 'DELETE'
         zone.status = 'PENDING'
 
         zone = self.storage.update_zone(context, zone)
 
-        self._ensure_catalog_zone_serial_increment(context, zone)
+        self._ensure_catalog_zone_serial_increment(context, zone, operation)
 
         return zone
 
@@ -1193,6 +1284,19 @@ class Service(service.RPCService):
 
         return self.storage.purge_zones(context, criterion, limit)
 
+    @rpc.expected_exceptions()
+    def purge_zone_journal(self, context, criterion, limit=None):
+        """Purge versions of zones from the journal.
+        :returns: number of purged versions
+        """
+
+        policy.check('purge_zone_journal', context, criterion)
+
+        LOG.debug("Performing zone journal purge with limit of %r and "
+                  "criterion of %r", limit, criterion)
+
+        return self.storage.purge_zone_journal(context, criterion, limit)
+
     @rpc.expected_exceptions()
     def xfr_zone(self, context, zone_id):
         zone = self.storage.get_zone(context, zone_id)
@@ -1462,10 +1566,19 @@ class Service(service.RPCService):
 
         LOG.info("Moving zone '%(zone)s' to pool '%(pool)s'",
                  {'zone': zone.name, 'pool': target_pool_id})
+        # Zones that are being deleted are in no catalog.
+        operation = None if zone.action == 'DELETE' else 'DELETE'
+
         zone.pool_id = target_pool_id
         zone = self._update_zone_in_storage(
                 context, zone, increment_serial=False)
 
+        # Move the zone to the catalog zone of its new pool.
+        self._ensure_catalog_zone_serial_increment(
+            context, zone, operation, pool_id=orig_pool_id
+        )
+        self._ensure_catalog_zone_serial_increment(context, zone, 'ADD')
+
         zone.refresh = self._generate_soa_refresh_interval()
         zone.action = constants.UPDATE
         zone.status = constants.PENDING
@@ -1543,7 +1656,7 @@ class Service(service.RPCService):
 
     @transaction_shallow_copy
     def _create_recordset_in_storage(self, context, zone, recordset,
-                                     increment_serial=True):
+                                     increment_serial=True, journal=True):
         # Ensure the tenant has enough quota to continue
         self._enforce_recordset_quota(context, zone)
         self._validate_recordset(context, zone, recordset)
@@ -1563,6 +1676,11 @@ class Service(service.RPCService):
 
         new_recordset = self.storage.create_recordset(context, zone.id,
                                                       recordset)
+        if journal:
+            self._journal_recordset_changes(
+                context, zone, None, new_recordset
+            )
+
         if recordset.records and increment_serial:
             # update the zone's status and increment the serial
             zone = self._update_zone_in_storage(
@@ -1572,6 +1690,59 @@ class Service(service.RPCService):
         # Return the zone too in case it was updated
         return new_recordset, zone
 
+    def _validate_zone_recordsets(self, context, zone, recordsets):
+        """Validate recordsets created together, as _validate_recordset
+        does one by one, reading the recordsets and the child zones of the
+        zone only once.
+        """
+        child_zones = self.storage.find_zones(
+            context.elevated(all_tenants=True), {'parent_zone_id': zone.id}
+        )
+        types = collections.defaultdict(set)
+        for recordset in self.storage.find_recordsets(
+                context, {'zone_id': zone.id}):
+            types[recordset.name].add(recordset.type)
+
+        for recordset in recordsets:
+            self._is_valid_ttl(context, getattr(recordset, 'ttl', None))
+            self._is_valid_recordset_name(context, zone, recordset.name)
+
+            # CNAME's must not be created at the zone apex, nor share a name
+            # with other recordsets, including the ones created alongside.
+            if recordset.type == 'CNAME' and recordset.name == zone.name:
+                raise exceptions.InvalidRecordSetLocation(
+                    'CNAME recordsets may not be created at the zone apex')
+            name_types = types[recordset.name]
+            if name_types and (recordset.type == 'CNAME' or
+                               'CNAME' in name_types):
+                raise exceptions.InvalidRecordSetLocation(
+                    'CNAME recordsets may not share a name with any other '
+                    'records')
+            name_types.add(recordset.type)
+
+            self._is_valid_recordset_placement_subzone(
+                context, zone, recordset.name, child_zones=child_zones)
+            self._is_valid_recordset_records(recordset)
+
+    def _create_zone_recordsets_in_storage(self, context, zone, recordsets):
+        """Create the recordsets a zone is created or imported with.
+
+        The recordsets are created in bulk, with the serial of the zone,
+        and are not journaled.
+        """
+        self._enforce_recordset_quota(context, zone, len(recordsets))
+        self._enforce_new_records_quota(context, zone, recordsets)
+        self._validate_zone_recordsets(context, zone, recordsets)
+
+        for recordset in recordsets:
+            if recordset.obj_attr_is_set('records'):
+                for record in recordset.records:
+                    record.action = 'CREATE'
+                    record.status = 'PENDING'
+                    record.serial = zone.serial
+
+        return self.storage.create_recordsets(context, zone.id, recordsets)
+
     @rpc.expected_exceptions()
     def get_recordset(self, context, zone_id, recordset_id):
         # apply_tenant_criteria=False here as we will gate visibility
@@ -1617,7 +1788,8 @@ class Service(service.RPCService):
 
     @rpc.expected_exceptions()
     def find_recordsets(self, context, criterion=None, marker=None, limit=None,
-                        sort_key=None, sort_dir=None, force_index=False):
+                        sort_key=None, sort_dir=None, force_index=False,
+                        page_token=None):
         zone = None
         zone_shared = False
 
@@ -1644,7 +1816,8 @@ class Service(service.RPCService):
 
         recordsets = self.storage.find_recordsets(
             context, criterion, marker, limit, sort_key, sort_dir, force_index,
-            apply_tenant_criteria=apply_tenant_criteria)
+            apply_tenant_criteria=apply_tenant_criteria,
+            page_token=page_token)
 
         return recordsets
 
@@ -1769,9 +1942,24 @@ class Service(service.RPCService):
             # create new records
             self._enforce_record_quota(context, zone, recordset)
 
+        old_recordset = None
+        if self._is_journaled(zone, recordset):
+            old_recordset = self.storage.find_recordset(
+                context, {'id': recordset.id}, apply_tenant_criteria=False
+            )
+
         # Update the recordset
         new_recordset = self.storage.update_recordset(context, recordset)
 
+        if old_recordset is not None:
+            if not new_recordset.obj_attr_is_set('records'):
+                # The records were left untouched, but their TTL may not be.
+                new_recordset = new_recordset.obj_clone()
+                new_recordset.records = old_recordset.records
+            self._journal_recordset_changes(
+                context, zone, old_recordset, new_recordset
+            )
+
         if increment_serial:
             # update the zone's status and increment the serial
             zone = self._update_zone_in_storage(
@@ -1835,6 +2023,8 @@ class Service(service.RPCService):
     @transaction
     def _delete_recordset_in_storage(self, context, zone, recordset,
                                      increment_serial=True):
+        self._journal_recordset_changes(context, zone, recordset, None)
+
         if recordset.records:
             for record in recordset.records:
                 record.action = 'DELETE'
@@ -1856,6 +2046,46 @@ class Service(service.RPCService):
 
         return new_recordset, zone
 
+    @staticmethod
+    def _is_journaled(zone, recordset):
+        # The SOA is not journaled, it is rebuilt from the zone serial when
+        # answering an IXFR request.
+        return (
+            zone.type == constants.ZONE_PRIMARY and recordset.type != 'SOA'
+        )
+
+    def _journal_recordset_changes(self, context, zone, old_recordset,
+                                   new_recordset):
+        """Record the records that were removed from and added to a
+        recordset in the zone journal, for mDNS to answer IXFR requests.
+        """
+        recordset = new_recordset or old_recordset
+        if not self._is_journaled(zone, recordset):
+            return
+
+        old_records = self._get_journal_records(zone, old_recordset)
+        new_records = self._get_journal_records(zone, new_recordset)
+
+        entries = [
+            ('DELETE',) + rr for rr in sorted(old_records - new_records)
+        ]
+        entries.extend(
+            ('ADD',) + rr for rr in sorted(new_records - old_records)
+        )
+        self.storage.create_zone_journal_entries(context, zone.id, entries)
+
+    @staticmethod
+    def _get_journal_records(zone, recordset):
+        if recordset is None or not recordset.obj_attr_is_set('records'):
+            return set()
+
+        ttl = recordset.ttl if recordset.ttl is not None else zone.ttl
+        return {
+            (recordset.name, recordset.type, ttl, record.data)
+            for record in recordset.records
+            if record.action != 'DELETE'
+        }
+
     @rpc.expected_exceptions()
     def count_recordsets(self, context, criterion=None):
         if criterion is None:
@@ -2533,41 +2763,19 @@ class Service(service.RPCService):
 
     def _update_record_status(self, context, zone_id, status, serial):
         """Update status on every record in a zone based on `serial`
-        :returns: updated records
+        :returns: number of updated records, by their new status
         """
-        criterion = {
-            'zone_id': zone_id
-        }
-
-        if status == 'SUCCESS':
-            criterion.update({
-                'status': ['PENDING', 'ERROR'],
-                'serial': '<=%d' % serial,
-            })
-
-        elif status == 'ERROR' and serial == 0:
-            criterion.update({
-                'status': 'PENDING',
-            })
-
-        elif status == 'ERROR':
-            criterion.update({
-                'status': 'PENDING',
-                'serial': '<=%d' % serial,
-            })
-
-        records = self.storage.find_records(context, criterion=criterion)
-
-        for record in records:
-            record = self._update_zone_or_record_status(record, status, serial)
+        counts = self.storage.update_records_status(
+            context, zone_id, status, serial
+        )
 
-            if record.obj_what_changed():
-                LOG.debug('Setting record %s, serial %s: action %s, '
-                          'status %s', record.id, record.serial,
-                          record.action, record.status)
-                self.storage.update_record(context, record)
+        if counts:
+            LOG.debug('Updated the status of the records of zone %(zone_id)s '
+                      'to serial %(serial)s: %(counts)s',
+                      {'zone_id': zone_id, 'serial': serial,
+                       'counts': counts})
 
-        return records
+        return counts
 
     @staticmethod
     def _update_zone_or_record_status(zone_or_record, status, serial):
@@ -3098,19 +3306,39 @@ class Service(service.RPCService):
             return self.storage.create_service_status(
                 context, service_status)
 
-    def _ensure_catalog_zone_serial_increment(self, context, zone):
+    def _ensure_catalog_zone_serial_increment(self, context, zone,
+                                              operation=None, pool_id=None):
+        """Schedule the serial increment of the catalog zone of a pool.
+
+        :param zone: The member zone that was changed.
+        :param operation: 'ADD' or 'DELETE' when the zone joined or left the
+                          catalog, to journal the change of its PTR record.
+        :param pool_id: The pool of the catalog zone, defaults to the pool
+                        of the zone.
+        """
         if zone.type == constants.ZONE_CATALOG:
             return
 
-        pool = self.storage.find_pool(context, criterion={'id': zone.pool_id})
+        pool = self.storage.find_pool(
+            context, criterion={'id': pool_id or zone.pool_id}
+        )
 
         try:
             catalog_zone = self.storage.get_catalog_zone(context, pool)
-
-            # Schedule batched serial increment
-            self._update_zone_in_storage(context, catalog_zone)
         except exceptions.ZoneNotFound:
-            pass
+            return
+
+        if operation is not None:
+            name = self.storage.get_catalog_zone_member_name(
+                catalog_zone, zone.id
+            )
+            self.storage.create_zone_journal_entries(
+                context, catalog_zone.id,
+                [(operation, name, 'PTR', catalog_zone.ttl, zone.name)]
+            )
+
+        # Schedule batched serial increment
+        self._update_zone_in_storage(context, catalog_zone)
 
     def _enforce_catalog_zone_policy(self, context, zone):
         # Forbid for HTTP API, but allow for designate-manage
@@ -21,6 +21,7 @@ from oslo_reports import opts as gmr_opts
 
 import designate.conf
 from designate.mdns import service as mdns_service
+from designate.mdns import supervisor
 from designate import service
 from designate import utils
 from designate import version
@@ -38,4 +39,6 @@ def main():
 
     server = mdns_service.Service()
     service.serve(server, workers=CONF['service:mdns'].workers)
+    if server.worker_stats is not None:
+        service.add_service(supervisor.Supervisor(server.worker_stats))
     service.wait()
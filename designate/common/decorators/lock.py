@@ -10,6 +10,7 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import contextlib
 import functools
 import itertools
 import threading
@@ -103,3 +104,34 @@ def synchronized_zone(new_zone=False):
 
         return sync_wrapper
     return outer
+
+
+def synchronized_zones():
+    """Ensures only a single operation is in progress for each of the zones
+
+    Like synchronized_zone, for a batch of zones given by their IDs as the
+    first argument after the context. The locks are taken in the order of
+    the IDs, so that operations on batches sharing zones can not deadlock.
+    """
+    def outer(f):
+        @functools.wraps(f)
+        def sync_wrapper(cls, *args, **kwargs):
+            if 'zone_ids' in kwargs:
+                zone_ids = kwargs['zone_ids']
+            else:
+                zone_ids = args[1]
+
+            with contextlib.ExitStack() as stack:
+                for zone_id in sorted(set(zone_ids)):
+                    lock_name = f'zone-{zone_id}'.encode('ascii')
+                    if cls.zone_lock_local.has_lock(lock_name):
+                        continue
+
+                    stack.enter_context(cls.coordination.get_lock(lock_name))
+                    cls.zone_lock_local.hold(lock_name)
+                    stack.callback(cls.zone_lock_local.release, lock_name)
+
+                return f(cls, *args, **kwargs)
+
+        return sync_wrapper
+    return outer
@@ -244,6 +244,11 @@ rules = [
         scope_types=[constants.PROJECT],
         deprecated_rule=deprecated_purge_zones
     ),
+    policy.RuleDefault(
+        name="purge_zone_journal",
+        check_str=base.ADMIN,
+        scope_types=[constants.PROJECT]
+    ),
     policy.DocumentedRuleDefault(
         name="pool_move_zone",
         check_str=base.ADMIN,
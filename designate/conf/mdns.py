@@ -23,7 +23,13 @@ MDNS_GROUP = cfg.OptGroup(
 
 MDNS_OPTS = [
     cfg.IntOpt('workers',
-               help='Number of mDNS worker processes to spawn'),
+               help='Number of mDNS worker processes to spawn. Every worker '
+                    'listens on its own SO_REUSEPORT sockets, the kernel '
+                    'balances the packets between them'),
+    cfg.IntOpt('worker_stats_interval', default=60, min=0,
+               help='Interval in seconds at which the packet rates of every '
+                    'mDNS worker process are logged, when running more than '
+                    'one. Set to 0 to disable'),
     cfg.IntOpt('threads', default=1000,
                help='Number of mDNS threads to spawn'),
     cfg.ListOpt('listen',
@@ -35,11 +41,45 @@ MDNS_OPTS = [
                help='mDNS TCP Keepidle in seconds'),
     cfg.FloatOpt('tcp_recv_timeout', default=0.5,
                  help='mDNS TCP Receive Timeout in seconds'),
+    cfg.StrOpt('dns_frontend', default='threading',
+               choices=[
+                   ('threading', 'Handle every UDP packet and TCP '
+                                 'connection in its own thread'),
+                   ('asyncio', 'Serve all the sockets from an asyncio '
+                               'event loop, using uvloop when installed, '
+                               'and handle queries in a pool of '
+                               'dns_worker_threads threads'),
+               ],
+               help='mDNS DNS front end implementation'),
+    cfg.IntOpt('dns_worker_threads', default=64, min=1,
+               help='Number of threads handling queries when using the '
+                    'asyncio front end'),
+    cfg.IntOpt('dns_max_pending', default=1000, min=1,
+               help='Maximum number of queries waiting for or being handled '
+                    'by a worker thread when using the asyncio front end. '
+                    'UDP queries beyond it are dropped, TCP connections stop '
+                    'being read from'),
     cfg.BoolOpt('query_enforce_tsig', default=False,
                 help='Enforce all incoming queries (including AXFR) are TSIG '
                      'signed'),
     cfg.IntOpt('max_message_size', default=65535,
                help='Maximum message size to emit'),
+    cfg.IntOpt('axfr_chunk_size', default=1000, min=1,
+               help='Number of records to read from the database at a time '
+                    'while streaming an AXFR response'),
+    cfg.IntOpt('axfr_cache_size', default=64, min=0,
+               help='Maximum size in MiB of the rendered AXFR responses to '
+                    'keep in memory, keyed by zone and serial. Set to 0 to '
+                    'disable the cache'),
+    cfg.IntOpt('tsigkey_cache_size', default=1024, min=0,
+               help='Maximum number of TSIG keys to keep in memory. Set to 0 '
+                    'to disable the cache'),
+    cfg.IntOpt('tsigkey_cache_ttl', default=300, min=0,
+               help='Number of seconds a TSIG key is kept in memory before '
+                    'it is looked up again. Set to 0 to disable the cache'),
+    cfg.IntOpt('tsigkey_cache_check_interval', default=10, min=1,
+               help='Interval in seconds at which the TSIG keys kept in '
+                    'memory are checked for updates and deletions'),
 ]
 
 
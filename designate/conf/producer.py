@@ -50,6 +50,11 @@ PRODUCER_TASK_ZONE_PURGE_GROUP = cfg.OptGroup(
     title='Configuration for Producer Task: Zone Purge'
 )
 
+PRODUCER_TASK_ZONE_JOURNAL_PURGE_GROUP = cfg.OptGroup(
+    name='producer_task:zone_journal_purge',
+    title='Configuration for Producer Task: Zone Journal Purge'
+)
+
 PRODUCER_TASK_PERIODIC_CHECK_SERVICE_STATUS_GROUP = cfg.OptGroup(
     name='producer_task:periodic_check_service_status',
     title='Configuration for Producer Task: Check Service Status'
@@ -126,6 +131,19 @@ PRODUCER_TASK_ZONE_PURGE_OPTS = [
                help='How many zones to be purged on each run'),
 ]
 
+PRODUCER_TASK_ZONE_JOURNAL_PURGE_OPTS = [
+    cfg.IntOpt('interval', default=3600,
+               help='Run interval in seconds'),
+    cfg.IntOpt('per_page', default=100,
+               help='Default amount of results returned per page'),
+    cfg.IntOpt('time_threshold', default=86400,
+               help='How long versions of a zone are kept in the journal '
+                    'used to answer IXFR requests, in seconds. Secondaries '
+                    'with an older serial fall back to AXFR'),
+    cfg.IntOpt('batch_size', default=1000,
+               help='How many versions of zones to be purged on each run'),
+]
+
 PRODUCER_TASK_PERIODIC_CHECK_SERVICE_STATUS_OPTS = [
     cfg.IntOpt('interval', default=3600,
                help='Run interval in seconds'),
@@ -169,6 +187,9 @@ def register_opts(conf):
     conf.register_group(PRODUCER_TASK_ZONE_PURGE_GROUP)
     conf.register_opts(PRODUCER_TASK_ZONE_PURGE_OPTS,
                        group=PRODUCER_TASK_ZONE_PURGE_GROUP)
+    conf.register_group(PRODUCER_TASK_ZONE_JOURNAL_PURGE_GROUP)
+    conf.register_opts(PRODUCER_TASK_ZONE_JOURNAL_PURGE_OPTS,
+                       group=PRODUCER_TASK_ZONE_JOURNAL_PURGE_GROUP)
     conf.register_group(PRODUCER_TASK_PERIODIC_CHECK_SERVICE_STATUS_GROUP)
     conf.register_opts(PRODUCER_TASK_PERIODIC_CHECK_SERVICE_STATUS_OPTS,
                        group=PRODUCER_TASK_PERIODIC_CHECK_SERVICE_STATUS_GROUP)
@@ -191,6 +212,8 @@ def list_opts():
         PRODUCER_TASK_WORKER_PERIODIC_RECOVERY_GROUP:
             PRODUCER_TASK_WORKER_PERIODIC_RECOVERY_OPTS,
         PRODUCER_TASK_ZONE_PURGE_GROUP: PRODUCER_TASK_ZONE_PURGE_OPTS,
+        PRODUCER_TASK_ZONE_JOURNAL_PURGE_GROUP:
+            PRODUCER_TASK_ZONE_JOURNAL_PURGE_OPTS,
         PRODUCER_TASK_PERIODIC_CHECK_SERVICE_STATUS_GROUP:
             PRODUCER_TASK_PERIODIC_CHECK_SERVICE_STATUS_OPTS,
         PRODUCER_TASK_PERIODIC_CLEANUP_STOPPED_SERVICE_STATUS_GROUP:
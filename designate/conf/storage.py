@@ -22,12 +22,80 @@ STORAGE_GROUP = cfg.OptGroup(
 )
 
 
+STORAGE_CACHE_GROUP = cfg.OptGroup(
+    name='storage:cache',
+    title="Configuration for the Storage Cache"
+)
+
+STORAGE_CACHE_OPTS = [
+    cfg.StrOpt('backend', default='none',
+               choices=['none', 'memory', 'oslo.cache'],
+               help='Cache of zones, pools, TLDs and blacklists read from '
+                    'the storage. "memory" keeps the entries in every '
+                    'process, "oslo.cache" uses the cache region configured '
+                    'in the [cache] section, which requires the oslo.cache '
+                    'library. Set to "none" to disable'),
+    cfg.IntOpt('max_size', default=10000, min=1,
+               help='Maximum number of entries of the memory backend'),
+    cfg.IntOpt('zone_ttl', default=0, min=0,
+               help='Seconds a cached zone is used before its version is '
+                    'checked against the database again. Zones change '
+                    'with every serial increment, so the default is to '
+                    'always check it'),
+    cfg.IntOpt('pool_ttl', default=30, min=0,
+               help='Seconds a cached pool is used before its version is '
+                    'checked against the database again'),
+    cfg.IntOpt('tld_ttl', default=60, min=0,
+               help='Seconds the cached TLDs are used before they are '
+                    'checked against the database again'),
+    cfg.IntOpt('blacklist_ttl', default=60, min=0,
+               help='Seconds the cached blacklists are used before they are '
+                    'checked against the database again'),
+    cfg.IntOpt('stats_interval', default=300, min=0,
+               help='Interval in seconds at which the hit and miss counts '
+                    'of the cache are logged. Set to 0 to disable'),
+]
+
+
+STORAGE_COUNT_GROUP = cfg.OptGroup(
+    name='storage:count',
+    title="Configuration for the total counts of the zone and recordset lists"
+)
+
+STORAGE_COUNT_OPTS = [
+    cfg.StrOpt('strategy', default='exact', choices=['exact', 'auto'],
+               help='How the total_count of the zone and recordset lists is '
+                    'computed. "exact" counts the matching rows of every '
+                    'list. "auto" counts them while the query planner '
+                    'expects at most estimate_threshold rows, and returns '
+                    'the estimate of the planner above it. Estimates are '
+                    'only available with MySQL and PostgreSQL, the lists '
+                    'are always counted with other databases'),
+    cfg.IntOpt('estimate_threshold', default=10000, min=0,
+               help='Number of rows expected by the query planner above '
+                    'which the "auto" strategy returns the estimate of the '
+                    'planner instead of counting the rows'),
+    cfg.IntOpt('cache_ttl', default=0, min=0,
+               help='Seconds the total_count of a list is cached for, keyed '
+                    'by its criteria and project. The counts are kept in '
+                    'the storage cache backend when it is enabled, and in '
+                    'the memory of every process otherwise. Set to 0 to '
+                    'disable'),
+]
+
+
 def register_opts(conf):
     conf.register_group(STORAGE_GROUP)
     conf.register_opts(options.database_opts, group=STORAGE_GROUP)
+    conf.register_group(STORAGE_CACHE_GROUP)
+    conf.register_opts(STORAGE_CACHE_OPTS, group=STORAGE_CACHE_GROUP)
+    conf.register_group(STORAGE_COUNT_GROUP)
+    conf.register_opts(STORAGE_COUNT_OPTS, group=STORAGE_COUNT_GROUP)
 
 
 def list_opts():
     return {
         STORAGE_GROUP: options.database_opts,
+        STORAGE_CACHE_GROUP: STORAGE_CACHE_OPTS,
+        STORAGE_COUNT_GROUP: STORAGE_COUNT_OPTS,
     }
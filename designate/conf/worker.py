@@ -57,6 +57,24 @@ WORKER_OPTS = [
                default=1),
     cfg.BoolOpt('all_tcp', default=False,
                 help='Send all traffic over TCP'),
+    cfg.IntOpt('poll_udp_sockets', default=4, min=1,
+               help='The number of UDP sockets, per address family, shared '
+                    'by the SOA queries polling the nameservers for zone '
+                    'serials and by the NOTIFYs'),
+    cfg.FloatOpt('notify_rate', default=100.0, min=0.1,
+                 help='The maximum number of NOTIFYs sent per second to '
+                      'each nameserver or also-notify target'),
+    cfg.IntOpt('notify_burst', default=100, min=1,
+               help='The number of NOTIFYs which may be sent at once to a '
+                    'target, above its notify_rate'),
+    cfg.IntOpt('notify_timeout', default=10, min=1,
+               help='The time to wait for a target to acknowledge a NOTIFY'),
+    cfg.IntOpt('notify_max_retries', default=3, min=0,
+               help='The maximum number of times to resend a NOTIFY which '
+                    'was not acknowledged'),
+    cfg.FloatOpt('notify_retry_interval', default=1.0, min=0,
+                 help='The time to wait before resending a NOTIFY, doubled '
+                      'on every retry'),
 ]
 
 
@@ -226,25 +226,47 @@ def prepare_dns_message(zone_name, rdatatype, opcode):
     return dns_message
 
 
-def notify(zone_name, host, port=53, timeout=10, tsig_key=None):
+def prepare_notify(zone_name, tsig_key=None, message_id=None):
     """
-    Create a NOTIFY message and send it
+    Create a NOTIFY message, with the given id if any
     """
     dns_message = prepare_dns_message(
         zone_name, rdatatype=dns.rdatatype.SOA, opcode=dns.opcode.NOTIFY
     )
+    if message_id is not None:
+        # Set before signing, the TSIG records the original id
+        dns_message.id = message_id
     _apply_tsig_to_message(dns_message, tsig_key)
+    return dns_message
+
+
+def notify(zone_name, host, port=53, timeout=10, tsig_key=None):
+    """
+    Create a NOTIFY message and send it
+    """
+    dns_message = prepare_notify(zone_name, tsig_key=tsig_key)
     return send_dns_message(dns_message, host, port=port, timeout=timeout)
 
 
-def soa_query(zone_name, host, port=53, timeout=10, tsig_key=None):
+def prepare_soa_query(zone_name, tsig_key=None, message_id=None):
     """
-    Create a SOA Query message and send it
+    Create a SOA Query message, with the given id if any
     """
     dns_message = prepare_dns_message(
         zone_name, rdatatype=dns.rdatatype.SOA, opcode=dns.opcode.QUERY
     )
+    if message_id is not None:
+        # Set before signing, the TSIG records the original id
+        dns_message.id = message_id
     _apply_tsig_to_message(dns_message, tsig_key)
+    return dns_message
+
+
+def soa_query(zone_name, host, port=53, timeout=10, tsig_key=None):
+    """
+    Create a SOA Query message and send it
+    """
+    dns_message = prepare_soa_query(zone_name, tsig_key=tsig_key)
     return send_dns_message(dns_message, host, port=port, timeout=timeout)
 
 
@@ -273,6 +295,13 @@ def get_serial(zone_name, host, port=53, tsig_key=None):
     Possibly returns 0 if, e.g., the answer section is empty.
     """
     resp = soa_query(zone_name, host, port=port, tsig_key=tsig_key)
+    return get_serial_from_response(resp)
+
+
+def get_serial_from_response(resp):
+    """
+    Return the serial of the response to a SOA query, 0 if it has none
+    """
     if not resp.answer:
         return 0
     rdataset = resp.answer[0].to_rdataset()
@@ -281,6 +310,14 @@ def get_serial(zone_name, host, port=53, tsig_key=None):
     return rdataset[0].serial
 
 
+def serial_gt(serial, other):
+    """
+    Whether a zone serial is after another one, in the serial number
+    arithmetic of RFC 1982, in which the serials wrap around at 2**32
+    """
+    return serial != other and (serial - other) % 2 ** 32 < 2 ** 31
+
+
 def get_ip_address(ip_address_or_hostname):
     """
     Provide an ip or hostname and return a valid ip4 or ipv6 address.
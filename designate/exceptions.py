@@ -174,6 +174,10 @@ class InvalidMarker(BadRequest):
     error_type = 'invalid_marker'
 
 
+class InvalidPageToken(BadRequest):
+    error_type = 'invalid_page_token'
+
+
 class InvalidSortDir(BadRequest):
     error_type = 'invalid_sort_dir'
 
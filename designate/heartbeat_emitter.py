@@ -40,11 +40,13 @@ class HeartbeatEmitter(plugin.DriverPlugin):
     __plugin_ns__ = 'designate.heartbeat_emitter'
     __plugin_type__ = 'heartbeat_emitter'
 
-    def __init__(self, service_name, **kwargs):
+    def __init__(self, service_name, stats=None, **kwargs):
         super().__init__()
 
         self._status = constants.SERVICE_UP
-        self._stats = {}
+        # The service may keep updating its stats, or give a function
+        # returning them, they are read on every heartbeat
+        self._stats = stats if stats is not None else {}
         self._capabilities = {}
 
         self._service_name = service_name
@@ -82,7 +84,10 @@ class HeartbeatEmitter(plugin.DriverPlugin):
                         self._service_name, self._hostname)
 
     def get_stats_and_capabilities(self):
-        return self._stats, self._capabilities
+        stats = self._stats
+        if callable(stats):
+            stats = stats()
+        return stats, self._capabilities
 
     @abc.abstractmethod
     def transmit(self, status):
@@ -0,0 +1,39 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from oslo_log import log as logging
+
+import designate.conf
+from designate.manage import base
+from designate import storage
+
+
+CONF = designate.conf.CONF
+LOG = logging.getLogger(__name__)
+
+
+class QuotaCommands(base.Commands):
+    def __init__(self):
+        super().__init__()
+        self.storage = storage.get_storage()
+
+    def rebuild_counters(self):
+        """
+        Recount the recordsets and records of every zone, and the zones of
+        every project, which the quotas are enforced with.
+
+        designate-manage quota rebuild_counters
+        """
+        counts = self.storage.rebuild_counters(self.context)
+        print(
+            'Rebuilt the counters of %(zones)d zones and %(tenants)d '
+            'projects' % counts
+        )
@@ -0,0 +1,162 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import collections
+import threading
+import time
+
+from oslo_log import log as logging
+
+from designate import context
+
+
+LOG = logging.getLogger(__name__)
+
+
+class AXFRCache:
+    """Size bounded LRU cache of rendered AXFR responses.
+
+    Every entry holds the packets rendered for one serial of a zone. An
+    entry is only returned for the serial it was rendered for, and is
+    dropped as soon as it is looked up with any other serial.
+
+    The packets are stored without their TSIG record, which is specific to
+    each request, as a list of (wire, counts) tuples.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, key, serial):
+        """Return the cached packets for key at serial, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            cached_serial, packets, _ = entry
+            if cached_serial != serial:
+                LOG.debug('Dropping cached AXFR of %(key)s at serial '
+                          '%(serial)s', {'key': key, 'serial': cached_serial})
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return packets
+
+    def set(self, key, serial, packets):
+        """Cache the packets for key at serial, evicting the LRU entries."""
+        size = sum(len(wire) for wire, _ in packets)
+        if size > self.max_size:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (serial, packets, size)
+            self.size += size
+
+            while self.size > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self.size -= size
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TsigKeyCache:
+    """Size and TTL bounded LRU cache of TSIG keys, keyed by name.
+
+    Provides the find_tsigkey lookup of the storage driver, so it can be
+    used by the TsigKeyring and the TsigInfoMiddleware in place of the
+    storage. Keys that were updated or deleted are dropped from the cache
+    by check_versions, which is run periodically by the mdns service.
+    """
+
+    def __init__(self, storage, max_size, ttl):
+        self.storage = storage
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0 and self.ttl > 0
+
+    def find_tsigkey(self, context, criterion):
+        if not self.enabled or set(criterion) != {'name'}:
+            return self.storage.find_tsigkey(context, criterion)
+
+        name = criterion['name']
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                tsigkey, expires = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(name)
+                    return tsigkey
+                del self._entries[name]
+
+        tsigkey = self.storage.find_tsigkey(context, criterion)
+
+        with self._lock:
+            self._entries[name] = (tsigkey, time.monotonic() + self.ttl)
+            self._entries.move_to_end(name)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        return tsigkey
+
+    def check_versions(self):
+        """Drop the cached keys that were updated or deleted."""
+        with self._lock:
+            if not self._entries:
+                return
+            cached = {
+                name: tsigkey for name, (tsigkey, _) in self._entries.items()
+            }
+
+        ctxt = context.DesignateContext.get_admin_context(all_tenants=True)
+        current = {
+            tsigkey.name: tsigkey
+            for tsigkey in self.storage.find_tsigkeys(ctxt)
+        }
+
+        with self._lock:
+            for name, tsigkey in cached.items():
+                entry = self._entries.get(name)
+                if entry is None or entry[0] is not tsigkey:
+                    # Replaced since we took our copy, it is up to date.
+                    continue
+                new_tsigkey = current.get(name)
+                if (new_tsigkey is None or new_tsigkey.id != tsigkey.id or
+                        new_tsigkey.version != tsigkey.version):
+                    LOG.debug('Dropping cached TSIG key %s', name)
+                    del self._entries[name]
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
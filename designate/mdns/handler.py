@@ -13,11 +13,14 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import io
+
 import dns.exception
 import dns.flags
 import dns.message
 import dns.opcode
 import dns.rcode
+import dns.rdata
 import dns.rdataclass
 import dns.rdatatype
 import dns.renderer
@@ -27,7 +30,9 @@ from oslo_log import log as logging
 
 from designate.common import constants
 import designate.conf
+from designate import dnsutils
 from designate import exceptions
+from designate.mdns import cache
 from designate.worker import rpcapi as worker_api
 
 
@@ -45,6 +50,9 @@ class RequestHandler:
 
         self.storage = storage
         self.tg = tg
+        self.axfr_cache = cache.AXFRCache(
+            CONF['service:mdns'].axfr_cache_size * 1024 * 1024
+        )
 
     @property
     def worker_api(self):
@@ -67,9 +75,8 @@ class RequestHandler:
                 return
 
             q_rrset = request.question[0]
-            # Handle AXFR and IXFR requests with an AXFR responses for now.
-            # It is permissible for a server to send an AXFR response when
-            # receiving an IXFR request.
+            # IXFR requests are answered with an AXFR response when the
+            # journal can't be used, which is permitted by RFC 1995.
             if q_rrset.rdtype in (dns.rdatatype.AXFR, dns.rdatatype.IXFR):
                 yield from self._handle_axfr(request)
                 return
@@ -211,32 +218,28 @@ class RequestHandler:
                 )
         return criterion
 
-    def _find_zone_by_ancestor_walk(self, context, request, name):
+    def _find_closest_zone(self, context, request, name):
         """Find the zone that would be authoritative for `name`.
 
-        Walks from the full query name up through each ancestor label
-        - e.g. for 'www.example.com.': tries 'www.example.com.' itself
-        (the record may be a zone apex), then 'example.com.', then
-        'com.' - stopping at the first level that matches an existing
-        zone. Every candidate is scoped by the same pool/zone identity
-        derived from the request's TSIG key (or the default pool if
-        unsigned, via `_zone_criterion_from_request`), which is what
-        stops a same-named zone in a different pool from being
-        matched instead. Returns None if no ancestor at any level
-        matches within that scope.
+        Looks up the full query name and all of its ancestors - e.g. for
+        'www.example.com.': 'www.example.com.' itself (the record may be
+        a zone apex), 'example.com.' and 'com.' - in a single query, and
+        returns the zone with the longest name matching only it. An
+        ancestor matching several zones is skipped, as in a walk up the
+        labels of the name. Every candidate is scoped by the same pool/zone
+        identity derived from the request's TSIG key (or the default pool
+        if unsigned, via `_zone_criterion_from_request`), which is what
+        stops a same-named zone in a different pool from being matched
+        instead. Returns None if no ancestor at any level matches within
+        that scope.
         """
-        pool_criterion = self._zone_criterion_from_request(request)
-        labels = name.split('.')
-
-        for i in range(len(labels) - 1):
-            ancestor_name = '.'.join(labels[i:])
-            criterion = dict(pool_criterion, name=ancestor_name)
-            try:
-                return self.storage.find_zone(context, criterion)
-            except exceptions.ZoneNotFound:
-                continue
-
-        return None
+        criterion = self._zone_criterion_from_request(request)
+        zones = self.storage.find_closest_zones(
+            context, name, criterion, unique=True
+        )
+        if not zones:
+            return None
+        return zones[0]
 
     def _handle_axfr(self, request):
         context = request.environ['context']
@@ -263,25 +266,31 @@ class RequestHandler:
             yield self._handle_query_error(request, dns.rcode.REFUSED)
             return
 
-        if zone.type != constants.ZONE_CATALOG:
-            # The AXFR response needs to have a SOA at the beginning and end.
-            criterion = {'zone_id': zone.id, 'type': 'SOA'}
-            soa_records = self.storage.find_recordsets_axfr(context, criterion)
+        records = None
+        if q_rrset.rdtype == dns.rdatatype.IXFR:
+            records = self._get_ixfr_records(context, request, zone)
+
+        # Every target of a pool asks for the same zone at the same serial,
+        # so serve the packets rendered for the first one to the others.
+        # Zones that have not been persisted have no stable identity.
+        cache_key = None
+        if (records is None and self.axfr_cache.enabled and
+                zone.id is not None and zone.serial is not None):
+            cache_key = (
+                zone.id, request.had_tsig, q_rrset.name.to_text(),
+                q_rrset.rdtype,
+            )
+            packets = self.axfr_cache.get(cache_key, zone.serial)
+            if packets is not None:
+                yield from self._replay_axfr_packets(request, packets)
+                return
 
-            # Get all the records other than SOA
-            criterion = {'zone_id': zone.id, 'type': '!SOA'}
-            records = self.storage.find_recordsets_axfr(context, criterion)
+        # The packets rendered so far, before any TSIG is applied to them.
+        rendered_packets = [] if cache_key else None
+        rendered_size = 0
 
-            # Place the SOA RRSet at the front and end of the RRSet list
-            records.insert(0, soa_records[0])
-            records.append(soa_records[0])
-        else:
-            catalog_zone_pool = self.storage.find_pool(
-                context, criterion={'id': zone.pool_id}
-            )
-            records = self.storage.get_catalog_zone_records(
-                context, catalog_zone_pool
-            )
+        if records is None:
+            records = self._iter_axfr_records(context, zone)
 
         # Handle multi message response with tsig
         multi_messages = False
@@ -289,24 +298,7 @@ class RequestHandler:
 
         # Render the results, yielding a packet after each TooBig exception.
         renderer = None
-        while records:
-            record = records.pop(0)
-
-            if zone.type != constants.ZONE_CATALOG:
-                rrname = str(record[3])
-                ttl = int(record[2]) if record[2] is not None else zone.ttl
-                rrtype = str(record[1])
-                rdata = [str(record[4])]
-                recordset_id = record[0]
-            else:
-                rrname = record.name
-                ttl = zone.ttl
-                rrtype = record.type
-                rdata = [record.records[0].data]
-                # Catalog zone recordsets are generated in-memory and have
-                # no persisted recordset id, so use the name instead.
-                recordset_id = rrname
-
+        for recordset_id, rrname, ttl, rrtype, rdata in records:
             try:
                 rrset = dns.rrset.from_text_list(
                     rrname, ttl, dns.rdataclass.IN, rrtype, rdata,
@@ -356,6 +348,14 @@ class RequestHandler:
                         )
                         return
 
+                    if rendered_packets is not None:
+                        rendered_size += self._capture_packet(
+                            rendered_packets, renderer)
+                        if rendered_size > self.axfr_cache.max_size:
+                            # Too large to ever be cached, don't hold on
+                            # to the rendered zone.
+                            rendered_packets = None
+
                     renderer, multi_messages_context = self._finalize_packet(
                         renderer, request, multi_messages,
                         multi_messages_context)
@@ -363,11 +363,187 @@ class RequestHandler:
                     renderer = None
 
         if renderer:
+            if rendered_packets is not None:
+                self._capture_packet(rendered_packets, renderer)
+
             renderer, multi_messages_context = self._finalize_packet(
                 renderer, request, multi_messages, multi_messages_context)
             yield renderer
+
+        if rendered_packets:
+            self.axfr_cache.set(cache_key, zone.serial, rendered_packets)
         return
 
+    @staticmethod
+    def _capture_packet(packets, renderer):
+        wire = renderer.get_wire()
+        packets.append((wire, tuple(renderer.counts)))
+        return len(wire)
+
+    def _replay_axfr_packets(self, request, packets):
+        multi_messages = len(packets) > 1
+        multi_messages_context = None
+
+        for wire, counts in packets:
+            renderer = self._create_axfr_renderer(request)
+
+            # Swap in the pre-rendered packet, the header is rewritten with
+            # the id and flags of this request when the packet is finalized.
+            renderer.output = io.BytesIO(wire)
+            renderer.output.seek(0, io.SEEK_END)
+            renderer.counts = list(counts)
+            renderer.section = dns.renderer.ANSWER
+
+            renderer, multi_messages_context = self._finalize_packet(
+                renderer, request, multi_messages, multi_messages_context)
+            yield renderer
+
+    def _iter_axfr_records(self, context, zone):
+        """Yield the records of an AXFR response in the order to send them.
+
+        Each item is a (recordset_id, name, ttl, type, rdata) tuple. The
+        body of the zone, or the member zones of a catalog zone, is read
+        from storage in chunks of `axfr_chunk_size` rows, so the zone is
+        never held in memory as a whole and the first packet can go out
+        before the last row is read.
+        """
+        chunk_size = CONF['service:mdns'].axfr_chunk_size
+        if zone.type == constants.ZONE_CATALOG:
+            rows = self.storage.iter_catalog_zone_records(
+                context, zone, chunk_size=chunk_size
+            )
+        else:
+            rows = self.storage.iter_zone_axfr(
+                context, zone.id, chunk_size=chunk_size
+            )
+
+        # The SOA comes first, followed by the rest of the zone. The AXFR
+        # response needs to have a SOA at the beginning and end, so it is
+        # sent again after the last row.
+        rows = iter(rows)
+        soa_row = next(rows, None)
+        if soa_row is None or str(soa_row[1]) != 'SOA':
+            raise exceptions.RecordSetNotFound('Zone %s has no SOA' % zone.id)
+        soa_record = self._axfr_record_from_row(zone, soa_row)
+
+        yield soa_record
+
+        for row in rows:
+            yield self._axfr_record_from_row(zone, row)
+
+        yield soa_record
+
+    def _get_ixfr_records(self, context, request, zone):
+        """Return the records of an incremental IXFR response (RFC 1995).
+
+        Returns None when the request has to be answered with the full zone
+        instead, because the request has no SOA to start from or the journal
+        doesn't cover every version of the zone since the serial of the
+        client.
+        """
+        if zone.type not in (constants.ZONE_PRIMARY, constants.ZONE_CATALOG):
+            return None
+
+        serial = None
+        for rrset in request.authority:
+            if rrset.rdtype == dns.rdatatype.SOA and len(rrset):
+                serial = rrset[0].serial
+        if serial is None:
+            return None
+
+        criterion = {'zone_id': zone.id, 'type': 'SOA'}
+        soa_records = self.storage.find_recordsets_axfr(context, criterion)
+        soa_record = self._axfr_record_from_row(zone, soa_records[0])
+
+        if not dnsutils.serial_gt(zone.serial, serial):
+            # The client is up to date, answer with the current SOA only.
+            return [soa_record]
+
+        versions = self._get_journal_versions(context, zone, serial)
+        if versions is None:
+            return None
+
+        records = [soa_record]
+        for serial_from, serial_to, deleted, added in versions:
+            records.append(self._soa_record_at_serial(soa_record, serial_from))
+            records.extend(deleted)
+            records.append(self._soa_record_at_serial(soa_record, serial_to))
+            records.extend(added)
+        records.append(soa_record)
+
+        return records
+
+    def _get_journal_versions(self, context, zone, serial):
+        """Return the changes made to a zone since serial, one version at
+        a time, as (serial_from, serial_to, deleted, added) tuples.
+
+        Returns None if the versions in the journal don't lead from serial to
+        the current serial of the zone without a gap.
+        """
+        rows = self.storage.find_zone_journal(context, zone.id, serial)
+
+        versions = []
+        changes = None
+        for row in rows:
+            if changes is None:
+                if row.serial_from != serial:
+                    return None
+                changes = {}
+            if row.operation == 'RESET':
+                # This version can't be sent incrementally.
+                return None
+            if row.operation == 'SOA':
+                versions.append(
+                    (row.serial_from, row.serial_to) +
+                    self._condense_journal_changes(changes)
+                )
+                serial = row.serial_to
+                changes = None
+                continue
+
+            # A record may have changed more than once in a version, only
+            # whether it existed before and after that version matters.
+            key = (row.name, row.type, row.data)
+            exists = row.operation == 'ADD'
+            if key in changes:
+                existed, _, _ = changes[key]
+            else:
+                existed = not exists
+            changes[key] = (existed, exists, row.ttl)
+
+        if changes is not None or serial != zone.serial:
+            return None
+
+        return versions
+
+    @staticmethod
+    def _condense_journal_changes(changes):
+        deleted = []
+        added = []
+        for (name, rrtype, data), (existed, exists, ttl) in changes.items():
+            record = (name, name, ttl, rrtype, [data])
+            if existed:
+                deleted.append(record)
+            if exists:
+                added.append(record)
+        return deleted, added
+
+    @staticmethod
+    def _soa_record_at_serial(soa_record, serial):
+        recordset_id, name, ttl, rrtype, rdata = soa_record
+        rdata = dns.rdata.from_text(
+            dns.rdataclass.IN, dns.rdatatype.SOA, rdata[0]
+        )
+        return (
+            recordset_id, name, ttl, rrtype,
+            [rdata.replace(serial=serial).to_text()]
+        )
+
+    @staticmethod
+    def _axfr_record_from_row(zone, row):
+        ttl = int(row[2]) if row[2] is not None else zone.ttl
+        return row[0], str(row[3]), ttl, str(row[1]), [str(row[4])]
+
     def _handle_record_query(self, request):
         """Handle a DNS QUERY request for a record"""
         context = request.environ['context']
@@ -385,7 +561,7 @@ class RequestHandler:
             # pool-blind lookup that could collide with a matching
             # name+type in another pool, so split-horizon setups
             # (same zone name in multiple pools) resolve correctly.
-            zone = self._find_zone_by_ancestor_walk(context, request, name)
+            zone = self._find_closest_zone(context, request, name)
             if zone is None:
                 raise exceptions.ZoneNotFound()
 
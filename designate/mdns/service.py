@@ -20,7 +20,9 @@ from designate.conf.mdns import DEFAULT_MDNS_PORT
 from designate import dnsmiddleware
 from designate import dnsutils
 from designate import heartbeat_emitter
+from designate.mdns import cache
 from designate.mdns import handler
+from designate.mdns import supervisor
 from designate import service
 from designate import storage
 from designate import utils
@@ -35,23 +37,58 @@ class Service(service.Service):
 
     def __init__(self):
         self._storage = None
+        self._tsigkey_cache = None
+
+        # Allocated before the worker processes are forked, so that they
+        # can share their packet counts with the supervisor.
+        self.worker_stats = None
+        self._worker_slot = None
+        if ((CONF['service:mdns'].workers or 1) > 1 and
+                CONF['service:mdns'].worker_stats_interval):
+            self.worker_stats = supervisor.WorkerStats(
+                CONF['service:mdns'].workers
+            )
 
         super().__init__(
             self.service_name, threads=CONF['service:mdns'].threads,
         )
-        self.dns_service = service.DNSService(
-            self.dns_application, self.tg,
-            CONF['service:mdns'].listen,
-            CONF['service:mdns'].tcp_backlog,
-            CONF['service:mdns'].tcp_keepidle,
-            CONF['service:mdns'].tcp_recv_timeout,
-        )
+        if CONF['service:mdns'].dns_frontend == 'asyncio':
+            self.dns_service = service.AsyncDNSService(
+                self.dns_application, self.tg,
+                CONF['service:mdns'].listen,
+                CONF['service:mdns'].tcp_backlog,
+                CONF['service:mdns'].tcp_keepidle,
+                CONF['service:mdns'].tcp_recv_timeout,
+                CONF['service:mdns'].dns_worker_threads,
+                CONF['service:mdns'].dns_max_pending,
+            )
+        else:
+            self.dns_service = service.DNSService(
+                self.dns_application, self.tg,
+                CONF['service:mdns'].listen,
+                CONF['service:mdns'].tcp_backlog,
+                CONF['service:mdns'].tcp_keepidle,
+                CONF['service:mdns'].tcp_recv_timeout,
+            )
         self.heartbeat = heartbeat_emitter.get_heartbeat_emitter(
             self.service_name)
 
     def start(self):
         super().start()
         self.dns_service.start()
+        if self.tsigkey_cache.enabled:
+            self.tg.add_timer_args(
+                CONF['service:mdns'].tsigkey_cache_check_interval,
+                self.tsigkey_cache.check_versions,
+                stop_on_exception=False,
+            )
+        if self.worker_stats is not None:
+            self._worker_slot = self.worker_stats.claim()
+            self.tg.add_timer_args(
+                CONF['service:mdns'].worker_stats_interval,
+                self._publish_worker_stats,
+                stop_on_exception=False,
+            )
         self.heartbeat.start()
 
     def stop(self, graceful=True):
@@ -59,6 +96,12 @@ class Service(service.Service):
         self.dns_service.stop()
         super().stop(graceful)
 
+    def _publish_worker_stats(self):
+        if self._worker_slot is not None:
+            self.worker_stats.publish(
+                self._worker_slot, self.dns_service.packets
+            )
+
     @property
     def storage(self):
         if not self._storage:
@@ -69,17 +112,29 @@ class Service(service.Service):
     def service_name(self):
         return 'mdns'
 
+    @property
+    def tsigkey_cache(self):
+        if self._tsigkey_cache is None:
+            self._tsigkey_cache = cache.TsigKeyCache(
+                self.storage,
+                CONF['service:mdns'].tsigkey_cache_size,
+                CONF['service:mdns'].tsigkey_cache_ttl,
+            )
+        return self._tsigkey_cache
+
     @property
     @utils.cache_result
     def dns_application(self):
         # Create an instance of the RequestHandler class and wrap with
         # necessary middleware.
         application = handler.RequestHandler(self.storage, self.tg)
+        # The TSIG key is looked up twice for every signed request, both
+        # lookups are served from the same cache.
         application = dnsmiddleware.TsigInfoMiddleware(
-            application, self.storage
+            application, self.tsigkey_cache
         )
         application = dnsmiddleware.SerializationMiddleware(
-            application, dnsutils.TsigKeyring(self.storage)
+            application, dnsutils.TsigKeyring(self.tsigkey_cache)
         )
 
         return application
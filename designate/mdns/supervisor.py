@@ -0,0 +1,133 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import multiprocessing
+import os
+import time
+
+from oslo_log import log as logging
+
+import designate.conf
+from designate import service
+
+
+CONF = designate.conf.CONF
+LOG = logging.getLogger(__name__)
+
+
+class WorkerStats:
+    """Packet counts of the mdns worker processes.
+
+    Kept in shared memory, which must be allocated before the workers are
+    forked. Every worker claims a slot, in which it publishes the number of
+    packets it received so far, for the Supervisor to read.
+    """
+    _FIELDS = 3
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._slots = multiprocessing.RawArray('q', workers * self._FIELDS)
+        self._lock = multiprocessing.Lock()
+
+    def claim(self):
+        """Claim a slot for the current process, and return its index.
+
+        The slots of workers which are no longer running are reused, as
+        workers that die are replaced by new ones.
+        """
+        pid = os.getpid()
+        with self._lock:
+            for slot in range(self.workers):
+                slot_pid = self._slots[slot * self._FIELDS]
+                if slot_pid == pid:
+                    return slot
+                if slot_pid == 0 or not _is_running(slot_pid):
+                    self.publish(slot, {'tcp': 0, 'udp': 0}, pid=pid)
+                    return slot
+
+        return None
+
+    def publish(self, slot, packets, pid=None):
+        offset = slot * self._FIELDS
+        if pid is not None:
+            self._slots[offset] = pid
+        self._slots[offset + 1] = packets['udp']
+        self._slots[offset + 2] = packets['tcp']
+
+    def get(self):
+        """Return the (pid, udp packets, tcp packets) of every worker."""
+        stats = []
+        for slot in range(self.workers):
+            offset = slot * self._FIELDS
+            pid, udp, tcp = self._slots[offset:offset + self._FIELDS]
+            if pid:
+                stats.append((pid, udp, tcp))
+        return stats
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Supervisor(service.Service):
+    """Periodically reports the packet rates of the mdns worker processes"""
+
+    def __init__(self, worker_stats):
+        self.worker_stats = worker_stats
+        self._last = {}
+        self._last_time = None
+
+        super().__init__(self.service_name, threads=1)
+
+    @property
+    def service_name(self):
+        return 'mdns-supervisor'
+
+    def start(self):
+        super().start()
+        self._last_time = time.monotonic()
+        self.tg.add_timer_args(
+            CONF['service:mdns'].worker_stats_interval, self.report,
+            stop_on_exception=False,
+        )
+
+    def report(self):
+        now = time.monotonic()
+        elapsed = now - self._last_time
+        self._last_time = now
+
+        last = self._last
+        self._last = {}
+        total_udp = total_tcp = 0.0
+        for pid, udp, tcp in self.worker_stats.get():
+            self._last[pid] = (udp, tcp)
+            last_udp, last_tcp = last.get(pid, (0, 0))
+            udp_rate = (udp - last_udp) / elapsed
+            tcp_rate = (tcp - last_tcp) / elapsed
+            total_udp += udp_rate
+            total_tcp += tcp_rate
+
+            LOG.info(
+                'mdns worker %(pid)d: %(udp).1f UDP packets/s, '
+                '%(tcp).1f TCP queries/s',
+                {'pid': pid, 'udp': udp_rate, 'tcp': tcp_rate}
+            )
+
+        LOG.info(
+            'mdns workers: %(udp).1f UDP packets/s, %(tcp).1f TCP queries/s',
+            {'udp': total_udp, 'tcp': total_tcp}
+        )
@@ -45,6 +45,10 @@ class APIv2Adapter(base.DesignateAdapter):
             metadata = {}
             if list_objects.total_count is not None:
                 metadata['total_count'] = list_objects.total_count
+                if list_objects.total_count_type is not None:
+                    metadata['total_count_type'] = (
+                        list_objects.total_count_type
+                    )
             r_list['metadata'] = metadata
 
         return r_list
@@ -146,9 +150,15 @@ class APIv2Adapter(base.DesignateAdapter):
 
     @classmethod
     def _get_next_href(cls, request, items):
-        # Prepare the extra params
-        extra_params = {
-            'marker': items[-1]['id']
-        }
+        # Prepare the extra params, the lists paged with a page token carry
+        # the token of their next page
+        if 'page_token' in request.GET:
+            extra_params = {
+                'page_token': items.next_page_token
+            }
+        else:
+            extra_params = {
+                'marker': items[-1]['id']
+            }
 
         return cls._get_collection_href(request, extra_params)
@@ -457,7 +457,11 @@ class PagedListObjectMixin:
     This adds fields that would populate API metadata for collections.
     """
     fields = {
-        'total_count': fields.IntegerFields(nullable=True)
+        'total_count': fields.IntegerFields(nullable=True),
+        'total_count_type': fields.EnumField(
+            nullable=True, valid_values=['exact', 'cached', 'estimated']
+        ),
+        'next_page_token': fields.StringFields(nullable=True),
     }
 
 
@@ -15,6 +15,7 @@
 # under the License.
 import abc
 import datetime
+import time
 
 from oslo_log import log as logging
 from oslo_utils import timeutils
@@ -24,6 +25,7 @@ from designate.common import constants
 import designate.conf
 from designate import context
 from designate import exceptions
+from designate import objects
 from designate import plugin
 from designate import rpc
 from designate.worker import rpcapi as worker_rpcapi
@@ -124,7 +126,50 @@ class DeletedZonePurgeTask(PeriodicTask):
         ctxt = context.DesignateContext.get_admin_context()
         ctxt.all_tenants = True
 
-        self.central_api.purge_zones(
+        start_time = time.monotonic()
+        purged = self.central_api.purge_zones(
+            ctxt,
+            criterion,
+            limit=CONF[self.name].batch_size,
+        ) or 0
+        elapsed_time = time.monotonic() - start_time
+
+        LOG.info(
+            "Purged %(count)d deleted zones in %(time).3fs "
+            "(%(rate).1f zones/s)",
+            {
+                "count": purged,
+                "time": elapsed_time,
+                "rate": purged / elapsed_time if elapsed_time else 0.0,
+            })
+
+
+class ZoneJournalPurgeTask(PeriodicTask):
+    """Purge the versions of zones that are older than the retention period
+    from the journal used to answer IXFR requests.
+    """
+    __plugin_name__ = 'zone_journal_purge'
+
+    def __call__(self):
+        pstart, pend = self._my_range()
+        LOG.info(
+            "Performing zone journal purging for %(start)s to %(end)s",
+            {
+                "start": pstart,
+                "end": pend
+            })
+
+        delta = datetime.timedelta(seconds=CONF[self.name].time_threshold)
+        time_threshold = timeutils.utcnow() - delta
+        LOG.debug("Filtering zone journal versions before %s", time_threshold)
+
+        criterion = self._filter_between('zone_shard')
+        criterion['created_at'] = "<=%s" % time_threshold
+
+        ctxt = context.DesignateContext.get_admin_context()
+        ctxt.all_tenants = True
+
+        self.central_api.purge_zone_journal(
             ctxt,
             criterion,
             limit=CONF[self.name].batch_size,
@@ -297,6 +342,7 @@ class PeriodicIncrementSerialTask(PeriodicTask):
             sort_key='updated_at',
             sort_dir='asc',
         )
+        zone_ids = []
         for zone in zones:
             if zone.action == 'DELETE':
                 LOG.debug(
@@ -306,13 +352,24 @@ class PeriodicIncrementSerialTask(PeriodicTask):
                     }
                 )
                 continue
+            zone_ids.append(zone.id)
+
+        if not zone_ids:
+            return
+
+        serials = self.central_api.increment_zone_serials(ctxt, zone_ids)
+
+        updated_zones = objects.ZoneList()
+        for zone in zones:
+            if zone.id not in serials:
+                continue
 
-            serial = self.central_api.increment_zone_serial(ctxt, zone)
+            zone.serial = serials[zone.id]
             LOG.debug(
                 'Incremented serial for %(id)s to %(serial)d',
                 {
                     'id': zone.id,
-                    'serial': serial,
+                    'serial': zone.serial,
                 }
             )
             if not zone.delayed_notify:
@@ -320,7 +377,10 @@ class PeriodicIncrementSerialTask(PeriodicTask):
                 if zone.action == 'NONE':
                     zone.action = 'UPDATE'
                     zone.status = 'PENDING'
-                self.worker_api.update_zone(ctxt, zone)
+                updated_zones.append(zone)
+
+        if updated_zones:
+            self.worker_api.update_zones(ctxt, updated_zones)
 
 
 class WorkerPeriodicRecovery(PeriodicTask):
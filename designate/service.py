@@ -17,6 +17,8 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import asyncio
+from concurrent import futures
 import errno
 import socket
 import struct
@@ -25,6 +27,7 @@ import threading
 from oslo_log import log as logging
 import oslo_messaging as messaging
 from oslo_service import service
+from oslo_utils import importutils
 from oslo_utils import netutils
 
 from designate.common.decorators import rpc as rpc_decorator
@@ -39,6 +42,8 @@ from designate import version
 CONF = designate.conf.CONF
 LOG = logging.getLogger(__name__)
 
+uvloop = importutils.try_import('uvloop')
+
 
 class Service(service.Service):
     def __init__(self, name, threads=None):
@@ -140,6 +145,10 @@ class DNSService:
         self._dns_socks_tcp = []
         self._dns_socks_udp = []
 
+        # Number of queries received, by protocol.
+        self.packets = {'tcp': 0, 'udp': 0}
+        self._packets_lock = threading.Lock()
+
     def start(self):
         self._running.set()
 
@@ -174,6 +183,10 @@ class DNSService:
         for sock_udp in self._dns_socks_udp:
             sock_udp.close()
 
+    def _count_packet(self, protocol):
+        with self._packets_lock:
+            self.packets[protocol] += 1
+
     def _dns_handle_tcp(self, sock_tcp):
         LOG.info('_handle_tcp thread started')
 
@@ -276,6 +289,7 @@ class DNSService:
                     buf += data
 
                 query = buf
+                self._count_packet('tcp')
 
                 # Call into the DNS Application itself with payload and addr
                 for response in self.app({'payload': query, 'addr': addr}):
@@ -342,6 +356,7 @@ class DNSService:
                 # TODO(kiall): Determine the appropriate default value for
                 #              UDP recvfrom.
                 payload, addr = sock_udp.recvfrom(8192)
+                self._count_packet('udp')
 
                 LOG.debug(
                     'Handling UDP Request from: %(host)s:%(port)d',
@@ -406,6 +421,368 @@ class DNSService:
             )
 
 
+class _DNSDatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, dns_service):
+        self.dns_service = dns_service
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.dns_service._dns_dispatch_udp(self.transport, addr, data)
+
+    def error_received(self, exc):
+        LOG.warning('Socket error %(err)s on UDP socket', {'err': exc})
+
+
+class AsyncDNSService(DNSService):
+    """DNS front end serving all of its sockets from one asyncio event loop.
+
+    Unlike DNSService, no thread is started per packet or connection. The
+    application, which is mostly waiting on the database, is run in a
+    bounded pool of worker threads instead. Queries pipelined through a TCP
+    connection are handled concurrently, and their responses sent back as
+    soon as they are ready, in any order.
+
+    The event loop is provided by uvloop when it is installed.
+    """
+
+    def __init__(self, app, tg, listen, tcp_backlog, tcp_keepidle,
+                 tcp_recv_timeout, worker_threads=64, max_pending=1000):
+        super().__init__(app, tg, listen, tcp_backlog, tcp_keepidle,
+                         tcp_recv_timeout)
+        self.worker_threads = worker_threads
+        self.max_pending = max_pending
+
+        self._loop = None
+        self._executor = None
+        self._pending = 0
+        self._slot_released = None
+        self._servers = []
+        self._transports = []
+
+    def start(self):
+        self._running.set()
+
+        if uvloop:
+            self._loop = uvloop.new_event_loop()
+        else:
+            self._loop = asyncio.new_event_loop()
+        self._executor = futures.ThreadPoolExecutor(
+            max_workers=self.worker_threads
+        )
+
+        addresses = map(
+            netutils.parse_host_port,
+            set(self.listen)
+        )
+
+        for address in addresses:
+            self._start(address[0], address[1])
+
+        self.tg.add_thread(self._run_loop)
+
+    def _start(self, host, port):
+        sock_tcp = utils.bind_tcp(
+            host, port, self.tcp_backlog, self.tcp_keepidle
+        )
+        sock_udp = utils.bind_udp(
+            host, port
+        )
+
+        self._dns_socks_tcp.append(sock_tcp)
+        self._dns_socks_udp.append(sock_udp)
+
+    def stop(self):
+        self._running.clear()
+
+        if self._loop is not None and not self._loop.is_closed():
+            try:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+            except RuntimeError:
+                # The loop was closed in the meantime.
+                pass
+
+    def _run_loop(self):
+        LOG.info('DNS event loop started')
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._listen())
+            self._loop.run_forever()
+        except Exception:
+            LOG.exception('Unknown exception in the DNS event loop')
+        finally:
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(
+                asyncio.gather(*tasks, return_exceptions=True)
+            )
+            self._loop.run_until_complete(self._close())
+            self._loop.close()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            for sock in self._dns_socks_tcp + self._dns_socks_udp:
+                sock.close()
+            LOG.info('DNS event loop stopped')
+
+    async def _listen(self):
+        self._slot_released = asyncio.Event()
+
+        for sock_tcp in self._dns_socks_tcp:
+            server = await asyncio.start_server(
+                self._dns_handle_tcp_conn_async, sock=sock_tcp,
+                backlog=self.tcp_backlog,
+            )
+            self._servers.append(server)
+
+        for sock_udp in self._dns_socks_udp:
+            transport, _ = await self._loop.create_datagram_endpoint(
+                lambda: _DNSDatagramProtocol(self), sock=sock_udp
+            )
+            self._transports.append(transport)
+
+    async def _close(self):
+        for transport in self._transports:
+            transport.close()
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+
+    async def _acquire_slot(self):
+        while self._pending >= self.max_pending:
+            self._slot_released.clear()
+            await self._slot_released.wait()
+        self._pending += 1
+
+    def _release_slot(self, future):
+        self._pending -= 1
+        self._slot_released.set()
+
+    def _dns_dispatch_udp(self, transport, addr, payload):
+        self._count_packet('udp')
+        if self._pending >= self.max_pending:
+            # The client will retry, same as if the packet had been dropped
+            # because of a full socket buffer.
+            LOG.warning(
+                'Too many pending requests, dropping UDP request from: '
+                '%(host)s:%(port)d',
+                {
+                    'host': addr[0],
+                    'port': addr[1]
+                }
+            )
+            return
+
+        LOG.debug(
+            'Handling UDP Request from: %(host)s:%(port)d',
+            {
+                'host': addr[0],
+                'port': addr[1]
+            }
+        )
+
+        self._pending += 1
+        future = self._loop.run_in_executor(
+            self._executor, self._dns_handle_udp_query, transport, addr,
+            payload
+        )
+        future.add_done_callback(self._release_slot)
+
+    def _dns_handle_udp_query(self, transport, addr, payload):
+        """
+        Handle a DNS Query over UDP, in a worker thread
+
+        :param transport: UDP transport of the event loop
+        :type transport: asyncio.DatagramTransport
+        :param addr: Tuple of the client's (IP, Port)
+        :type addr: tuple
+        :param payload: Raw DNS query payload
+        :type payload: string
+        :raises: None
+        """
+        try:
+            # Call into the DNS Application itself with the payload and addr
+            for response in self.app({'payload': payload, 'addr': addr}):
+                if response is not None:
+                    self._loop.call_soon_threadsafe(
+                        transport.sendto, response, addr
+                    )
+        except Exception:
+            LOG.exception(
+                'Unhandled exception while processing request from '
+                '%(host)s:%(port)d',
+                {
+                    'host': addr[0],
+                    'port': addr[1]
+                }
+            )
+
+    async def _dns_handle_tcp_conn_async(self, reader, writer):
+        """
+        Handle a TCP connection. Pipelined queries are handled concurrently,
+        and the connection is only closed once all of them are answered.
+        """
+        addr = writer.get_extra_info('peername')
+        host, port = addr[:2]
+        timeout = self.tcp_recv_timeout or None
+        pending = set()
+
+        # Every write is a complete response, don't let Nagle's algorithm
+        # hold back the responses to pipelined queries.
+        writer.get_extra_info('socket').setsockopt(
+            socket.IPPROTO_TCP, socket.TCP_NODELAY, 1
+        )
+
+        LOG.debug(
+            'Handling TCP Request from: %(host)s:%(port)d',
+            {
+                'host': host,
+                'port': port
+            }
+        )
+
+        try:
+            while self._running.is_set():
+                try:
+                    # Decode the first 2 bytes containing the query length
+                    expected_length_raw = await asyncio.wait_for(
+                        reader.readexactly(2), timeout
+                    )
+                except asyncio.IncompleteReadError:
+                    break
+                (expected_length,) = struct.unpack('!H', expected_length_raw)
+                query = await asyncio.wait_for(
+                    reader.readexactly(expected_length), timeout
+                )
+                self._count_packet('tcp')
+
+                await self._acquire_slot()
+                future = self._loop.run_in_executor(
+                    self._executor, self._dns_handle_tcp_query, writer,
+                    addr, query
+                )
+                future.add_done_callback(self._release_slot)
+                future.add_done_callback(pending.discard)
+                pending.add(future)
+
+        except asyncio.TimeoutError:
+            LOG.info(
+                'TCP Timeout from: %(host)s:%(port)d',
+                {
+                    'host': host,
+                    'port': port
+                }
+            )
+        except asyncio.IncompleteReadError:
+            LOG.warning(
+                'Invalid packet from: %(host)s:%(port)d',
+                {
+                    'host': host,
+                    'port': port
+                }
+            )
+        except OSError as e:
+            LOG.warning(
+                'Socket error %(err)s from: %(host)s:%(port)d',
+                {
+                    'host': host,
+                    'port': port,
+                    'err': e
+                }
+            )
+        except Exception:
+            LOG.exception(
+                'Unknown exception handling TCP request from: '
+                '%(host)s:%(port)d',
+                {
+                    'host': host,
+                    'port': port
+                }
+            )
+        finally:
+            if pending:
+                await asyncio.wait(pending)
+            writer.close()
+
+    def _dns_handle_tcp_query(self, writer, addr, query):
+        """
+        Handle a DNS Query over TCP, in a worker thread
+
+        :param writer: Stream of the client connection
+        :type writer: asyncio.StreamWriter
+        :param addr: Tuple of the client's (IPv4 addr, Port) or
+                     (IPv6 addr, Port, Flow info, Scope ID)
+        :type addr: tuple
+        :param query: Raw DNS query payload
+        :type query: bytes
+        :raises: None
+        """
+        try:
+            # Call into the DNS Application itself with payload and addr
+            for response in self.app({'payload': query, 'addr': addr}):
+                # Send back a response only if present
+                if response is None:
+                    continue
+
+                # Wait for the response to be written, so that a large
+                # response like an AXFR is only rendered as fast as the
+                # client reads it.
+                self._wait_for_write(asyncio.run_coroutine_threadsafe(
+                    self._dns_write_tcp(writer, response), self._loop
+                ))
+        except OSError as e:
+            LOG.warning(
+                'Socket error %(err)s from: %(host)s:%(port)d',
+                {
+                    'host': addr[0],
+                    'port': addr[1],
+                    'err': e
+                }
+            )
+        except Exception:
+            LOG.exception(
+                'Unhandled exception while processing request from '
+                '%(host)s:%(port)d',
+                {
+                    'host': addr[0],
+                    'port': addr[1]
+                }
+            )
+
+    def _wait_for_write(self, future):
+        while True:
+            try:
+                return future.result(timeout=1)
+            except futures.TimeoutError:
+                # The event loop may have been stopped before running the
+                # write, in which case it never will.
+                if not self._running.is_set():
+                    future.cancel()
+                    raise
+
+    async def _dns_write_tcp(self, writer, response):
+        writer.write(struct.pack('!H', len(response)) + response)
+        try:
+            # A client which stops reading must not hold the worker thread
+            # waiting for the write, as the threaded front end's socket
+            # timeout also prevented.
+            await asyncio.wait_for(
+                writer.drain(), self.tcp_recv_timeout or None
+            )
+        except asyncio.TimeoutError:
+            host, port = writer.get_extra_info('peername')[:2]
+            LOG.info(
+                'TCP write timeout to: %(host)s:%(port)d',
+                {
+                    'host': host,
+                    'port': port
+                }
+            )
+            writer.transport.abort()
+            raise ConnectionAbortedError('Timed out writing the response')
+
+
 _launcher = None
 
 
@@ -418,6 +795,14 @@ def serve(server, workers=None):
                                restart_method='mutate')
 
 
+def add_service(server, workers=1):
+    """Run another service in its own workers, next to the served one"""
+    if not _launcher:
+        raise RuntimeError(_('serve() must be called first'))
+
+    _launcher.launch_service(server, workers=workers)
+
+
 def wait():
     try:
         _launcher.wait()
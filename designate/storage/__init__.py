@@ -15,6 +15,7 @@
 # under the License.
 
 import copy
+import datetime
 import functools
 import threading
 import time
@@ -23,6 +24,8 @@ from oslo_db import exception as db_exception
 from oslo_log import log as logging
 from oslo_utils import excutils
 
+from designate import objects
+from designate.storage import cache
 from designate.storage import sql
 from designate.storage import sqlalchemy
 
@@ -30,10 +33,23 @@ from designate.storage import sqlalchemy
 LOG = logging.getLogger(__name__)
 RETRY_STATE = threading.local()
 
+# Values which are never modified in place, so are not copied
+_IMMUTABLE_TYPES = (
+    str, bytes, int, float, bool, type(None), datetime.datetime
+)
+# Attributes of the objects which are not part of their state
+_SNAPSHOT_SKIPPED = frozenset(['FIELDS', 'VERSION', '_context'])
+
 
 def get_storage():
     """Return the engine class"""
-    return sqlalchemy.SQLAlchemyStorage()
+    storage = sqlalchemy.SQLAlchemyStorage()
+
+    storage_cache = cache.get_cache()
+    if storage_cache is not None:
+        return cache.CachingStorage(storage, storage_cache)
+
+    return storage
 
 
 def _retry_on_deadlock(exc):
@@ -46,8 +62,90 @@ def _retry_on_deadlock(exc):
     return False
 
 
+class ArgumentsSnapshot:
+    """Snapshot of the arguments of a call, to retry it with them.
+
+    The DesignateObjects, lists, dicts and sets reached from the arguments
+    are not copied. Only the references they hold are kept, and restoring
+    the snapshot puts them back in place, which costs a walk of the objects
+    instead of a deep copy. The other arguments, e.g. the context, are deep
+    copied for every attempt.
+    """
+
+    def __init__(self, args, kwargs):
+        self._args = args
+        self._kwargs = kwargs
+        self._states = {}
+        self._take(args)
+        self._take(kwargs)
+
+    def _take(self, value):
+        if isinstance(value, _IMMUTABLE_TYPES) or id(value) in self._states:
+            return
+
+        if isinstance(value, objects.DesignateObject):
+            state = {
+                name: attr for name, attr in vars(value).items()
+                if name not in _SNAPSHOT_SKIPPED
+            }
+            children = state.values()
+        elif isinstance(value, list):
+            state = children = list(value)
+        elif isinstance(value, dict):
+            state = dict(value)
+            children = state.values()
+        elif isinstance(value, set):
+            self._states[id(value)] = (value, set(value))
+            return
+        elif isinstance(value, tuple):
+            state, children = None, value
+        else:
+            return
+
+        if state is not None:
+            self._states[id(value)] = (value, state)
+        for child in children:
+            self._take(child)
+
+    @staticmethod
+    def _copy(value):
+        if isinstance(value, (_IMMUTABLE_TYPES, objects.DesignateObject,
+                              list, dict, set, tuple)):
+            return value
+        return copy.deepcopy(value)
+
+    def arguments(self):
+        """Return the arguments for an attempt at the call."""
+        return (
+            tuple(self._copy(arg) for arg in self._args),
+            {name: self._copy(arg) for name, arg in self._kwargs.items()},
+        )
+
+    def restore(self):
+        """Restore the arguments to the state of the snapshot."""
+        for value, state in self._states.values():
+            if isinstance(value, objects.DesignateObject):
+                attrs = vars(value)
+                for name in list(attrs):
+                    if name not in state and name not in _SNAPSHOT_SKIPPED:
+                        del attrs[name]
+                attrs.update(state)
+            elif isinstance(value, list):
+                value[:] = state
+            else:
+                value.clear()
+                value.update(state)
+
+
 def retry(cb=None, retries=150, delay=50, deep_copy=True):
-    """A retry decorator that ignores attempts at creating nested retries"""
+    """A retry decorator that ignores attempts at creating nested retries
+
+    With deep_copy, the arguments are restored to their original state before
+    every retry, and when the call fails, including a nested call whose
+    failure is caught by its caller. They are not copied, so the changes made
+    by a successful call are seen by its caller, unlike before where every
+    call, nested or not, was made with deep copies of them.
+    """
     def outer(f):
         @functools.wraps(f)
         def retry_wrapper(self, *args, **kwargs):
@@ -60,12 +158,16 @@ def retry(cb=None, retries=150, delay=50, deep_copy=True):
                 # We're the outermost retry decorator
                 RETRY_STATE.held = True
 
+                snapshot = None
+                if deep_copy:
+                    snapshot = ArgumentsSnapshot(args, kwargs)
+
                 try:
                     while True:
                         try:
                             if deep_copy:
-                                result = f(self, *copy.deepcopy(args),
-                                           **copy.deepcopy(kwargs))
+                                args, kwargs = snapshot.arguments()
+                                result = f(self, *args, **kwargs)
                             else:
                                 # perform shallow copy
                                 result = f(self, *copy.copy(args),
@@ -73,6 +175,8 @@ def retry(cb=None, retries=150, delay=50, deep_copy=True):
                             break
                         except Exception as exc:
                             RETRY_STATE.retries += 1
+                            if snapshot is not None:
+                                snapshot.restore()
                             if RETRY_STATE.retries >= retries:
                                 # Exceeded retry attempts, raise.
                                 raise
@@ -87,15 +191,20 @@ def retry(cb=None, retries=150, delay=50, deep_copy=True):
                     RETRY_STATE.held = False
                     RETRY_STATE.retries = 0
 
+            elif deep_copy:
+                # We're an inner retry decorator, just pass on through. The
+                # caller may catch the failure and carry on, so the arguments
+                # are restored when it fails.
+                snapshot = ArgumentsSnapshot(args, kwargs)
+                args, kwargs = snapshot.arguments()
+                try:
+                    result = f(self, *args, **kwargs)
+                except Exception:
+                    with excutils.save_and_reraise_exception():
+                        snapshot.restore()
             else:
                 # We're an inner retry decorator, just pass on through.
-                if deep_copy:
-                    result = f(self, *copy.deepcopy(args),
-                               **copy.deepcopy(kwargs))
-                else:
-                    # perform shallow copy
-                    result = f(self, *copy.copy(args),
-                               **copy.copy(kwargs))
+                result = f(self, *copy.copy(args), **copy.copy(kwargs))
 
             return result
         retry_wrapper.__wrapped_function = f
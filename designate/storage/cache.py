@@ -0,0 +1,467 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import collections
+import hashlib
+import threading
+import time
+
+from oslo_log import log as logging
+from oslo_serialization import jsonutils
+from oslo_utils import importutils
+
+import designate.conf
+from designate import exceptions
+from designate import objects
+
+
+CONF = designate.conf.CONF
+LOG = logging.getLogger(__name__)
+
+oslo_cache = importutils.try_import('oslo_cache.core')
+
+ENTITIES = ('zone', 'pool', 'tld', 'blacklist')
+
+_cache = None
+_count_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the StorageCache of this process, or None if it is disabled.
+
+    The cache is shared by all the storage drivers of a process, so it
+    survives the short lived drivers of worker tasks.
+    """
+    global _cache
+
+    backend_name = CONF['storage:cache'].backend
+    if backend_name == 'none':
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            if backend_name == 'memory':
+                backend = MemoryBackend(CONF['storage:cache'].max_size)
+            else:
+                backend = OsloCacheBackend(CONF)
+            _cache = StorageCache(backend)
+        return _cache
+
+
+def get_count_cache():
+    """Return the CountCache of this process, or None if it is disabled.
+
+    The counts are kept in the backend of the storage cache when it is
+    enabled, and in a backend private to the process otherwise.
+    """
+    global _count_cache
+
+    ttl = CONF['storage:count'].cache_ttl
+    if not ttl:
+        return None
+
+    storage_cache = get_cache()
+    with _cache_lock:
+        if _count_cache is None:
+            if storage_cache is not None:
+                backend = storage_cache.backend
+            else:
+                backend = MemoryBackend(CONF['storage:cache'].max_size)
+            _count_cache = CountCache(backend, ttl)
+        return _count_cache
+
+
+class MemoryBackend:
+    """Size bounded LRU cache, private to the process."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class OsloCacheBackend:
+    """Cache region configured in the [cache] section, e.g. memcached.
+
+    The region can be shared by every process using it, in which case the
+    entries dropped by the writes of one process are dropped for all.
+    """
+
+    def __init__(self, conf):
+        if oslo_cache is None:
+            raise exceptions.ConfigurationError(
+                'The oslo.cache storage cache backend requires the '
+                'oslo.cache library to be installed'
+            )
+        oslo_cache.configure(conf)
+        self._region = oslo_cache.create_region()
+        oslo_cache.configure_cache_region(conf, self._region)
+
+    def get(self, key):
+        value = self._region.get(key)
+        if value is oslo_cache.NO_VALUE:
+            return None
+        return value
+
+    def set(self, key, value):
+        self._region.set(key, value)
+
+    def delete(self, key):
+        self._region.delete(key)
+
+
+class StorageCache:
+    """Cache entries of storage objects, with the hit and miss counts.
+
+    Every entry holds the primitive of an object together with the version
+    of the rows it was built from, and the time that version was last
+    checked. Within the TTL of its entity an entry is used as is, after that
+    its version is checked against the database first.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.ttls = {
+            entity: CONF['storage:cache']['%s_ttl' % entity]
+            for entity in ENTITIES
+        }
+        self.stats = {
+            entity: {'hits': 0, 'misses': 0} for entity in ENTITIES
+        }
+        self._stats_lock = threading.Lock()
+        self._last_report = time.monotonic()
+
+    def get(self, entity, key, get_version):
+        """Return the cached object for key, or None.
+
+        :param get_version: Function returning the current version of the
+                            rows of the entry, called once its TTL passed.
+        """
+        entry = self.backend.get(key)
+        if entry is None:
+            return None
+
+        version, checked_at, primitive = entry
+        # The entries may be shared with other hosts, so the wall clock is
+        # used rather than a monotonic one.
+        now = time.time()
+        if now - checked_at >= self.ttls[entity]:
+            if get_version() != version:
+                return None
+            self.backend.set(key, (version, now, primitive))
+
+        return objects.DesignateObject.from_primitive(primitive)
+
+    def set(self, key, version, obj):
+        self.backend.set(key, (version, time.time(), obj.to_primitive()))
+
+    def delete(self, *keys):
+        for key in keys:
+            self.backend.delete(key)
+
+    def count(self, entity, hit):
+        with self._stats_lock:
+            self.stats[entity]['hits' if hit else 'misses'] += 1
+
+            interval = CONF['storage:cache'].stats_interval
+            now = time.monotonic()
+            if not interval or now - self._last_report < interval:
+                return
+            self._last_report = now
+            stats = {
+                entity: dict(counts) for entity, counts in self.stats.items()
+            }
+
+        for entity, counts in stats.items():
+            LOG.info(
+                'Storage cache %(entity)s lookups: %(hits)d hits, '
+                '%(misses)d misses',
+                {'entity': entity, 'hits': counts['hits'],
+                 'misses': counts['misses']}
+            )
+
+
+class CountCache:
+    """Total counts of lists, used until their TTL passes.
+
+    Unlike the entries of the StorageCache, the counts are not checked
+    against the database and no write drops them, so a count can be off by
+    the changes made within its TTL.
+    """
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def key(name, query):
+        """Return the key of the count of a query.
+
+        The query is normalized to its SQL and bound values, which include
+        the criteria of the list and the project it is counted for.
+        """
+        compiled = query.compile()
+        md5sum = hashlib.md5(usedforsecurity=False)
+        md5sum.update(str(compiled).encode('utf-8'))
+        md5sum.update(
+            jsonutils.dumps(compiled.params, sort_keys=True).encode('utf-8')
+        )
+        return 'count:%s:%s' % (name, md5sum.hexdigest())
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        if entry is None:
+            return None
+
+        counted_at, count = entry
+        if time.time() - counted_at >= self.ttl:
+            return None
+        return count
+
+    def set(self, key, count):
+        self.backend.set(key, (time.time(), count))
+
+
+class CachingStorage:
+    """Storage driver wrapper caching hot, rarely changing reads.
+
+    Zones, pools, and the full lists of TLDs and blacklists are cached. The
+    reads which depend on the project of the context are passed through, as
+    are all the other calls. The writes made through the wrapper drop the
+    entries they affect, the writes made elsewhere are noticed by the
+    version checks.
+    """
+
+    def __init__(self, storage, cache):
+        self.storage = storage
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.storage, name)
+
+    # Zone Methods
+    @staticmethod
+    def _zone_key(zone_id, show_deleted):
+        return 'zone:%s:%s' % (zone_id, bool(show_deleted))
+
+    def _drop_zone(self, zone_id):
+        self.cache.delete(
+            self._zone_key(zone_id, False), self._zone_key(zone_id, True)
+        )
+
+    def _get_cached_zone(self, context, zone_id):
+        key = self._zone_key(zone_id, context.show_deleted)
+        return self.cache.get(
+            'zone', key,
+            lambda: self.storage.get_version(context, 'zones', zone_id)
+        )
+
+    def get_zone(self, context, zone_id, apply_tenant_criteria=True):
+        if apply_tenant_criteria and not context.all_tenants:
+            return self.storage.get_zone(
+                context, zone_id, apply_tenant_criteria=apply_tenant_criteria
+            )
+
+        zone = self._get_cached_zone(context, zone_id)
+        self.cache.count('zone', zone is not None)
+        if zone is None:
+            zone = self.storage.get_zone(
+                context, zone_id, apply_tenant_criteria=False
+            )
+            self.cache.set(
+                self._zone_key(zone_id, context.show_deleted), zone.version,
+                zone
+            )
+        return zone
+
+    def find_zone(self, context, criterion):
+        # The name of a zone is only unique within its pool.
+        if not context.all_tenants or set(criterion) != {'name', 'pool_id'}:
+            return self.storage.find_zone(context, criterion)
+
+        # Only the ID of the zone is kept for its name, the zone itself is
+        # shared with get_zone.
+        name_key = 'zone-name:%s:%s:%s' % (
+            criterion['pool_id'], criterion['name'],
+            bool(context.show_deleted)
+        )
+        zone = None
+        entry = self.cache.backend.get(name_key)
+        if entry is not None:
+            zone = self._get_cached_zone(context, entry)
+            if zone is not None and (zone.name != criterion['name'] or
+                                     zone.pool_id != criterion['pool_id']):
+                zone = None
+
+        self.cache.count('zone', zone is not None)
+        if zone is None:
+            zone = self.storage.find_zone(context, criterion)
+            self.cache.backend.set(name_key, zone.id)
+            self.cache.set(
+                self._zone_key(zone.id, context.show_deleted), zone.version,
+                zone
+            )
+        return zone
+
+    def update_zone(self, context, zone):
+        result = self.storage.update_zone(context, zone)
+        self._drop_zone(zone.id)
+        return result
+
+    def increment_serial(self, context, zone_id):
+        result = self.storage.increment_serial(context, zone_id)
+        self._drop_zone(zone_id)
+        return result
+
+    def increment_serials(self, context, zone_ids):
+        result = self.storage.increment_serials(context, zone_ids)
+        for zone_id in zone_ids:
+            self._drop_zone(zone_id)
+        return result
+
+    def delete_zone(self, context, zone_id):
+        result = self.storage.delete_zone(context, zone_id)
+        self._drop_zone(zone_id)
+        return result
+
+    def purge_zone(self, context, zone):
+        result = self.storage.purge_zone(context, zone)
+        self._drop_zone(zone.id)
+        return result
+
+    def share_zone(self, context, shared_zone):
+        result = self.storage.share_zone(context, shared_zone)
+        self._drop_zone(shared_zone.zone_id)
+        return result
+
+    def unshare_zone(self, context, zone_id, shared_zone_id):
+        result = self.storage.unshare_zone(context, zone_id, shared_zone_id)
+        self._drop_zone(zone_id)
+        return result
+
+    def delete_zone_shares(self, zone_id):
+        result = self.storage.delete_zone_shares(zone_id)
+        self._drop_zone(zone_id)
+        return result
+
+    # Pool Methods
+    def get_pool(self, context, pool_id):
+        if not context.all_tenants:
+            return self.storage.get_pool(context, pool_id)
+
+        key = 'pool:%s' % pool_id
+        pool = self.cache.get(
+            'pool', key,
+            lambda: self.storage.get_version(context, 'pools', pool_id)
+        )
+        self.cache.count('pool', pool is not None)
+        if pool is None:
+            pool = self.storage.get_pool(context, pool_id)
+            self.cache.set(key, pool.version, pool)
+        return pool
+
+    def update_pool(self, context, pool):
+        result = self.storage.update_pool(context, pool)
+        self.cache.delete('pool:%s' % pool.id)
+        return result
+
+    def delete_pool(self, context, pool_id):
+        result = self.storage.delete_pool(context, pool_id)
+        self.cache.delete('pool:%s' % pool_id)
+        return result
+
+    # TLD and Blacklist Methods
+    def _find_all(self, entity, table_name, context, find):
+        key = '%ss' % entity
+        items = self.cache.get(
+            entity, key,
+            lambda: self.storage.get_table_version(context, table_name)
+        )
+        self.cache.count(entity, items is not None)
+        if items is None:
+            # Read the version first, so that changes made while the items
+            # are loaded are noticed by the next check.
+            version = self.storage.get_table_version(context, table_name)
+            items = find(context)
+            self.cache.set(key, version, items)
+        return items
+
+    def find_tlds(self, context, criterion=None, marker=None, limit=None,
+                  sort_key=None, sort_dir=None):
+        if criterion or marker or limit or sort_key or sort_dir:
+            return self.storage.find_tlds(
+                context, criterion, marker=marker, limit=limit,
+                sort_key=sort_key, sort_dir=sort_dir
+            )
+        return self._find_all('tld', 'tlds', context, self.storage.find_tlds)
+
+    def create_tld(self, context, tld):
+        result = self.storage.create_tld(context, tld)
+        self.cache.delete('tlds')
+        return result
+
+    def update_tld(self, context, tld):
+        result = self.storage.update_tld(context, tld)
+        self.cache.delete('tlds')
+        return result
+
+    def delete_tld(self, context, tld_id):
+        result = self.storage.delete_tld(context, tld_id)
+        self.cache.delete('tlds')
+        return result
+
+    def find_blacklists(self, context, criterion=None, marker=None,
+                        limit=None, sort_key=None, sort_dir=None):
+        if criterion or marker or limit or sort_key or sort_dir:
+            return self.storage.find_blacklists(
+                context, criterion, marker=marker, limit=limit,
+                sort_key=sort_key, sort_dir=sort_dir
+            )
+        return self._find_all(
+            'blacklist', 'blacklists', context, self.storage.find_blacklists
+        )
+
+    def create_blacklist(self, context, blacklist):
+        result = self.storage.create_blacklist(context, blacklist)
+        self.cache.delete('blacklists')
+        return result
+
+    def update_blacklist(self, context, blacklist):
+        result = self.storage.update_blacklist(context, blacklist)
+        self.cache.delete('blacklists')
+        return result
+
+    def delete_blacklist(self, context, blacklist_id):
+        result = self.storage.delete_blacklist(context, blacklist_id)
+        self.cache.delete('blacklists')
+        return result
@@ -13,12 +13,14 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import collections
 import hashlib
 
+from oslo_db import exception as oslo_db_exception
 from oslo_log import log as logging
 from oslo_utils import timeutils
-from sqlalchemy import case, select, distinct, func
-from sqlalchemy.sql.expression import or_, literal_column
+from sqlalchemy import bindparam, case, select, distinct, func, tuple_
+from sqlalchemy.sql.expression import and_, or_, literal, literal_column, not_
 
 from designate.common import constants
 from designate import exceptions
@@ -37,6 +39,19 @@ LOG = logging.getLogger(__name__)
 MAXIMUM_SUBZONE_DEPTH = 128
 
 
+def _count_unmanaged(records):
+    return sum(1 for record in records if record.managed is False)
+
+
+def _is_exact_match(value):
+    """Whether a criterion value matches a single value, see _apply_criterion
+    """
+    return (
+        isinstance(value, str) and '%' not in value and
+        not value.startswith(('!', '<', '>', 'BETWEEN'))
+    )
+
+
 class SQLAlchemyStorage(base.SQLAlchemy):
     """SQLAlchemy connection"""
     __plugin_name__ = 'sqlalchemy'
@@ -365,7 +380,8 @@ class SQLAlchemyStorage(base.SQLAlchemy):
     ##
     def _find_zones(self, context, criterion, one=False, marker=None,
                     limit=None, sort_key=None, sort_dir=None,
-                    apply_tenant_criteria=True, include_shared=False):
+                    apply_tenant_criteria=True, include_shared=False,
+                    page_token=None):
         # Check to see if the criterion can use the reverse_name column
         criterion = self._rname_check(criterion)
 
@@ -382,36 +398,39 @@ class SQLAlchemyStorage(base.SQLAlchemy):
             exceptions.ZoneNotFound, criterion, one, marker, limit,
             sort_key, sort_dir, query=query,
             apply_tenant_criteria=apply_tenant_criteria,
-            include_shared=include_shared)
-
-        def _load_relations(zone):
-            if zone.type == 'SECONDARY':
-                zone.masters = self._find_zone_masters(
-                    context, {'zone_id': zone.id})
-            else:
-                # This avoids an extra DB call per primary zone. This will
-                # always have 0 results for a PRIMARY zone.
-                zone.masters = objects.ZoneMasterList()
-
-            zone.attributes = self._find_zone_attributes(
-                context, {'zone_id': zone.id, 'key': '!master'})
-
-            zone.obj_reset_changes(['masters', 'attributes'])
+            include_shared=include_shared, page_token=page_token)
 
-        # TODO(Federico) refactor part of _find_zones into _find_zone, move
-        # _load_relations out
+        # TODO(Federico) refactor part of _find_zones into _find_zone
 
         if one:
-            _load_relations(zones)
+            self._load_zone_relations(context, zones)
         else:
-            zones.total_count = self.count_zones(context, criterion)
+            # The pages following a page token are not counted
+            if not page_token:
+                zones.total_count, zones.total_count_type = self._count_list(
+                    'zones', tables.zones,
+                    self._count_zones_query(context, criterion))
             for d in zones:
-                _load_relations(d)
+                self._load_zone_relations(context, d)
 
         if one:
             LOG.debug('Fetched zone %s', zones)
         return zones
 
+    def _load_zone_relations(self, context, zone):
+        if zone.type == 'SECONDARY':
+            zone.masters = self._find_zone_masters(
+                context, {'zone_id': zone.id})
+        else:
+            # This avoids an extra DB call per primary zone. This will
+            # always have 0 results for a PRIMARY zone.
+            zone.masters = objects.ZoneMasterList()
+
+        zone.attributes = self._find_zone_attributes(
+            context, {'zone_id': zone.id, 'key': '!master'})
+
+        zone.obj_reset_changes(['masters', 'attributes'])
+
     def create_zone(self, context, zone):
         """
         Create a new Zone.
@@ -427,6 +446,7 @@ class SQLAlchemyStorage(base.SQLAlchemy):
             tables.zones, zone, exceptions.DuplicateZone,
             ['attributes', 'recordsets', 'masters'],
             extra_values=extra_values)
+        self._adjust_tenant_zone_count(zone.tenant_id, 1)
 
         if zone.obj_attr_is_set('attributes'):
             for attrib in zone.attributes:
@@ -456,7 +476,7 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         return zone
 
     def find_zones(self, context, criterion=None, marker=None, limit=None,
-                   sort_key=None, sort_dir=None):
+                   sort_key=None, sort_dir=None, page_token=None):
         """
         Find zones
 
@@ -468,10 +488,14 @@ class SQLAlchemyStorage(base.SQLAlchemy):
                       marker
         :param sort_key: Key from which to sort after.
         :param sort_dir: Direction to sort after using sort_key.
+        :param page_token: Token of the requested page, returned as the
+                           next_page_token of the previous page. An empty
+                           token requests the first page.
         """
         zones = self._find_zones(context, criterion, marker=marker,
                                  limit=limit, sort_key=sort_key,
-                                 sort_dir=sort_dir, include_shared=True)
+                                 sort_dir=sort_dir, include_shared=True,
+                                 page_token=page_token)
         return zones
 
     def find_zone(self, context, criterion):
@@ -485,6 +509,67 @@ class SQLAlchemyStorage(base.SQLAlchemy):
                                 include_shared=True)
         return zone
 
+    def find_closest_zones(self, context, name, criterion=None,
+                           strict=False, unique=False):
+        """
+        Find the zones closest enclosing a name.
+
+        All the ancestors of the name are looked up in a single query, and
+        the zones with the longest matching name are returned. There can be
+        more than one when the same zone name exists in several pools.
+
+        :param context: RPC Context.
+        :param name: Name to find the enclosing zones of.
+        :param criterion: Criteria to filter by.
+        :param strict: Whether to leave out zones named name itself.
+        :param unique: Whether to skip the names matching several zones, and
+                       return the zone with the longest name matching only
+                       it, as find_zone would while walking up the labels.
+        """
+        labels = name.split('.')
+        ancestors = [
+            '.'.join(labels[i:])
+            for i in range(1 if strict else 0, len(labels) - 1)
+        ]
+
+        zones = objects.ZoneList()
+        if not ancestors:
+            return zones
+
+        shared_case = case((tables.shared_zones.c.target_project_id.is_(None),
+                            literal_column('False')),
+                           else_=literal_column('True')).label('shared')
+        query = select(
+            tables.zones,
+            shared_case).outerjoin(tables.shared_zones).distinct()
+        query = query.where(tables.zones.c.name.in_(ancestors))
+        query = self._apply_criterion(tables.zones, query, criterion)
+        query = self._apply_tenant_criteria(context, tables.zones, query,
+                                            include_shared=True)
+        query = self._apply_deleted_criteria(context, tables.zones, query)
+        query = query.order_by(
+            func.length(tables.zones.c.name).desc(),
+            tables.zones.c.created_at, tables.zones.c.id
+        )
+
+        with sql.get_read_session() as session:
+            results = session.execute(query).fetchall()
+
+        matches = {}
+        for result in results:
+            matches.setdefault(result.name, {})[result.id] = result
+
+        closest = []
+        for name_matches in matches.values():
+            if not unique or len(name_matches) == 1:
+                closest = list(name_matches.values())
+                break
+        zones = base._set_listobject_from_models(zones, closest)
+        for zone in zones:
+            self._load_zone_relations(context, zone)
+
+        return zones
+
     def update_zone(self, context, zone):
         """
         Update a Zone
@@ -495,6 +580,10 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         tenant_id_changed = False
         if 'tenant_id' in zone.obj_what_changed():
             tenant_id_changed = True
+            try:
+                old_tenant_id = zone.obj_get_original_value('tenant_id')
+            except KeyError:
+                old_tenant_id = None
 
         # Don't handle recordsets for now
         LOG.debug('Updating zone %s', zone)
@@ -584,27 +673,7 @@ class SQLAlchemyStorage(base.SQLAlchemy):
                 self.create_zone_master(context, zone.id, attr)
 
         if zone.obj_attr_is_set('recordsets'):
-            existing = {}
-            for rrset in self.find_recordsets(context, {'zone_id': zone.id}):
-                existing[rrset.name, rrset.type] = rrset
-
-            keep = set()
-            for rrset in zone.recordsets:
-                existing_recordset = existing.get((rrset.name, rrset.type))
-                if existing_recordset:
-                    existing_recordset.update(rrset)
-                    existing_recordset.records = rrset.records
-                    existing_recordset.obj_reset_changes(['zone_name'])
-                    self.update_recordset(context, existing_recordset)
-                    keep.add(existing_recordset.id)
-                else:
-                    self.create_recordset(context, zone.id, rrset)
-                    keep.add(rrset.id)
-
-            if zone.type == 'SECONDARY':
-                # Purge anything that shouldn't be there :P
-                for i in {i.id for i in existing.values()} - keep:
-                    self.delete_recordset(context, i)
+            self._sync_zone_recordsets(context, zone)
 
         if tenant_id_changed:
             with sql.get_write_session() as session:
@@ -620,21 +689,91 @@ class SQLAlchemyStorage(base.SQLAlchemy):
                     values({'tenant_id': zone.tenant_id})
                 )
 
+            if updated_zone.deleted == '0' and old_tenant_id != zone.tenant_id:
+                self._adjust_tenant_zone_count(old_tenant_id, -1)
+                self._adjust_tenant_zone_count(zone.tenant_id, 1)
+
         return updated_zone
 
     def increment_serial(self, context, zone_id):
         """Increment the zone's serial number.
         """
+        return self.increment_serials(context, [zone_id])
+
+    def increment_serials(self, context, zone_ids):
+        """
+        Increment the serial numbers of zones, with a single statement.
+
+        :param context: RPC Context.
+        :param zone_ids: IDs of the zones to increment the serial of.
+        :returns: The new serial of the zones.
+        """
         new_serial = timeutils.utcnow_ts()
         query = tables.zones.update().where(
-            tables.zones.c.id == zone_id).values(
+            tables.zones.c.id.in_(zone_ids)).values(
             {'serial': new_serial, 'increment_serial': False}
         )
+        query = self._apply_version_increment(context, tables.zones, query)
         with sql.get_write_session() as session:
             session.execute(query)
-        LOG.debug('Incremented zone serial for %s to %d', zone_id, new_serial)
+        LOG.debug('Incremented zone serial for %s to %d',
+                  ', '.join(zone_ids), new_serial)
         return new_serial
 
+    def update_soa_records(self, context, soas):
+        """
+        Rewrite the SOA records of zones, with one statement for all the
+        records and one for their recordsets.
+
+        :param context: RPC Context.
+        :param soas: Serial and SOA record data of each zone, by Zone ID.
+        :returns: Number of SOA records updated.
+        """
+        if not soas:
+            return 0
+
+        query = (
+            select(tables.recordsets.c.id, tables.recordsets.c.zone_id).
+            where(tables.recordsets.c.zone_id.in_(list(soas))).
+            where(tables.recordsets.c.type == 'SOA')
+        )
+        with sql.get_write_session() as session:
+            recordset_ids = dict(session.execute(query).fetchall())
+            if not recordset_ids:
+                return 0
+
+            query = tables.records.update().where(
+                tables.records.c.recordset_id == bindparam('soa_recordset_id')
+            ).values(
+                data=bindparam('soa_data'),
+                hash=bindparam('soa_hash'),
+                serial=bindparam('soa_serial'),
+                action='UPDATE',
+                status='PENDING',
+            )
+            query = self._apply_version_increment(
+                context, tables.records, query)
+            params = []
+            for recordset_id, zone_id in recordset_ids.items():
+                serial, data = soas[zone_id]
+                record = objects.Record(recordset_id=recordset_id, data=data)
+                params.append({
+                    'soa_recordset_id': recordset_id,
+                    'soa_data': data,
+                    'soa_hash': self._recalculate_record_hash(record),
+                    'soa_serial': serial,
+                })
+            session.execute(query, params)
+
+            query = tables.recordsets.update().where(
+                tables.recordsets.c.id.in_(list(recordset_ids))
+            )
+            query = self._apply_version_increment(
+                context, tables.recordsets, query)
+            session.execute(query)
+
+        return len(recordset_ids)
+
     def delete_zone(self, context, zone_id):
         """
         Delete a Zone
@@ -644,8 +783,10 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         """
         # Fetch the existing zone, we'll need to return it.
         zone = self._find_zones(context, {'id': zone_id}, one=True)
-        return self._delete(context, tables.zones, zone,
+        zone = self._delete(context, tables.zones, zone,
                             exceptions.ZoneNotFound)
+        self._adjust_tenant_zone_count(zone.tenant_id, -1)
+        return zone
 
     def purge_zone(self, context, zone):
         """
@@ -654,8 +795,12 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         :param context: RPC Context.
         :param zone: Zone to delete.
         """
-        return self._delete(context, tables.zones, zone,
+        zone = self._delete(context, tables.zones, zone,
                             exceptions.ZoneNotFound, hard_delete=True)
+        # Zones which were deleted first are no longer counted.
+        if not zone.obj_attr_is_set('deleted') or zone.deleted == '0':
+            self._adjust_tenant_zone_count(zone.tenant_id, -1)
+        return zone
 
     def _walk_up_zones(self, current, zones_by_id):
         """Walk upwards in a zone hierarchy until we find a parent zone
@@ -676,8 +821,8 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         """
         Purge Zones, effectively removing the zones database records.
 
-        Reparent orphan childrens, if any.
-        Transactions/locks are not needed.
+        Reparent orphan childrens, if any. The zones, and their recordsets,
+        records and journal, are removed with a statement for each table.
 
         :param context: RPC Context.
         :param criterion: Criteria to filter by.
@@ -687,36 +832,80 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         if 'deleted' in criterion:
             context.show_deleted = True
 
-        zones = self.find_zones(
-            context=context,
-            criterion=criterion,
-            limit=limit,
+        zones_table = tables.zones
+        query = select(
+            zones_table.c.id, zones_table.c.parent_zone_id,
+            zones_table.c.tenant_id, zones_table.c.deleted
         )
-        if not zones:
-            LOG.info('No zones to be purged')
-            return
+        query = self._apply_criterion(zones_table, query, criterion)
+        query = self._apply_tenant_criteria(context, zones_table, query)
+        query = self._apply_deleted_criteria(context, zones_table, query)
+        query = query.order_by(
+            zones_table.c.created_at, zones_table.c.id
+        ).limit(limit)
 
-        LOG.debug('Purging %d zones', len(zones))
+        with sql.get_write_session() as session:
+            zones = session.execute(query).fetchall()
+            if not zones:
+                LOG.info('No zones to be purged')
+                return
 
-        zones_by_id = {z.id: z for z in zones}
+            LOG.debug('Purging %d zones', len(zones))
 
-        for zone in zones:
+            zones_by_id = {z.id: z for z in zones}
+            zone_ids = list(zones_by_id)
 
             # Reparent child zones, if any.
-            surviving_parent_id = self._walk_up_zones(zone, zones_by_id)
+            parent_zone_id = zones_table.c.parent_zone_id
+            reparent = case(
+                *[
+                    (parent_zone_id == zone.id,
+                     literal(self._walk_up_zones(zone, zones_by_id),
+                             parent_zone_id.type))
+                    for zone in zones
+                ],
+                else_=parent_zone_id
+            )
             query = (
-                tables.zones.update().
-                where(tables.zones.c.parent_zone_id == zone.id).
-                values(parent_zone_id=surviving_parent_id)
+                zones_table.update().
+                where(parent_zone_id.in_(zone_ids)).
+                where(zones_table.c.id.not_in(zone_ids)).
+                values(parent_zone_id=reparent)
+            )
+            query = self._apply_version_increment(
+                context, zones_table, query)
+            resultproxy = session.execute(query)
+            LOG.debug('%d child zones updated', resultproxy.rowcount)
+
+            # The children are removed first, even when the database would
+            # cascade the deletes, so that they are removed in bulk.
+            counts = {}
+            for table in (tables.records, tables.recordsets,
+                          tables.zone_journal):
+                resultproxy = session.execute(
+                    table.delete().where(table.c.zone_id.in_(zone_ids))
+                )
+                counts[table.name] = resultproxy.rowcount
+            session.execute(
+                zones_table.delete().where(zones_table.c.id.in_(zone_ids))
             )
 
-            with sql.get_write_session() as session:
-                resultproxy = session.execute(query)
-                LOG.debug('%d child zones updated', resultproxy.rowcount)
-
-            self.purge_zone(context, zone)
-
-        LOG.info('Purged %d zones', len(zones))
+            # Zones which were deleted first are no longer counted.
+            live_zones = collections.Counter(
+                zone.tenant_id for zone in zones if zone.deleted == '0'
+            )
+            for tenant_id, count in live_zones.items():
+                self._adjust_tenant_zone_count(tenant_id, -count)
+
+        LOG.info(
+            'Purged %(zones)d zones, with %(recordsets)d recordsets and '
+            '%(records)d records',
+            {
+                'zones': len(zones),
+                'recordsets': counts['recordsets'],
+                'records': counts['records'],
+            }
+        )
         return len(zones)
 
     def count_zones(self, context, criterion=None):
@@ -726,10 +915,16 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         :param context: RPC Context.
         :param criterion: Criteria to filter by.
         """
-        query = select(func.count(tables.zones.c.id))
-        query = self._apply_criterion(tables.zones, query, criterion)
-        query = self._apply_tenant_criteria(context, tables.zones, query)
-        query = self._apply_deleted_criteria(context, tables.zones, query)
+        # The zones of a single tenant are counted as they change.
+        if (criterion is not None and list(criterion) == ['tenant_id'] and
+                _is_exact_match(criterion['tenant_id']) and
+                not context.show_deleted and
+                (context.all_tenants or
+                 context.project_id == criterion['tenant_id'])):
+            return self.get_tenant_zone_count(
+                context, criterion['tenant_id'])
+
+        query = self._count_zones_query(context, criterion)
 
         with sql.get_read_session() as session:
             resultproxy = session.execute(query)
@@ -740,6 +935,12 @@ class SQLAlchemyStorage(base.SQLAlchemy):
 
         return result[0]
 
+    def _count_zones_query(self, context, criterion):
+        query = select(func.count(tables.zones.c.id))
+        query = self._apply_criterion(tables.zones, query, criterion)
+        query = self._apply_tenant_criteria(context, tables.zones, query)
+        return self._apply_deleted_criteria(context, tables.zones, query)
+
     # Shared zones methods
     def _find_shared_zones(self, context, criterion, one=False, marker=None,
                            limit=None, sort_key=None, sort_dir=None):
@@ -862,6 +1063,156 @@ class SQLAlchemyStorage(base.SQLAlchemy):
                                           limit=limit, sort_key=sort_key,
                                           sort_dir=sort_dir)
 
+    @staticmethod
+    def _hash_records_data(data):
+        md5sum = hashlib.md5(usedforsecurity=False)
+        for item in sorted(data):
+            md5sum.update(item.encode('utf-8'))
+            md5sum.update(b'\0')
+        return md5sum.hexdigest()
+
+    def _get_recordset_hashes(self, context, zone_id):
+        """
+        Get the ID, TTL and hash of the records of every recordset of a zone,
+        by name and type.
+        """
+        query = select(
+            tables.recordsets.c.id, tables.recordsets.c.name,
+            tables.recordsets.c.type, tables.recordsets.c.ttl,
+            tables.records.c.data
+        ).select_from(
+            tables.recordsets.outerjoin(
+                tables.records,
+                tables.records.c.recordset_id == tables.recordsets.c.id)
+        ).order_by(tables.recordsets.c.id)
+        query = self._apply_tenant_criteria(context, tables.recordsets, query)
+
+        # The rows of a recordset are adjacent, only the hash of its records
+        # is kept once they were all read.
+        recordsets = {}
+        current = None
+        data = []
+        for recordset_id, name, rrtype, ttl, item in self._select_raw_iter(
+                context, tables.recordsets, {'zone_id': zone_id}, query):
+            if current is None or current[0] != recordset_id:
+                if current is not None:
+                    recordsets[current[1:3]] = (
+                        current[0], current[3], self._hash_records_data(data)
+                    )
+                current = (recordset_id, name, rrtype, ttl)
+                data = []
+            if item is not None:
+                data.append(item)
+        if current is not None:
+            recordsets[current[1:3]] = (
+                current[0], current[3], self._hash_records_data(data)
+            )
+
+        return recordsets
+
+    def _sync_zone_recordsets(self, context, zone):
+        """
+        Bring the stored recordsets of a zone in line with zone.recordsets.
+
+        The records of the stored recordsets are compared to the ones given
+        by their hashes, so only the recordsets which were added, changed or,
+        for secondary zones, removed are written, in bulk. The records of a
+        changed recordset are replaced, as update_recordset does.
+        """
+        existing = self._get_recordset_hashes(context, zone.id)
+
+        create = []
+        changed = {}
+        keep = set()
+        for rrset in zone.recordsets:
+            stored = existing.get((rrset.name, rrset.type))
+            if stored is None:
+                create.append(rrset)
+                continue
+
+            recordset_id, ttl, data_hash = stored
+            keep.add(recordset_id)
+            if rrset.obj_attr_is_set('ttl'):
+                ttl = rrset.ttl
+            records = (
+                rrset.records if rrset.obj_attr_is_set('records') else []
+            )
+            if (ttl != stored[1] or
+                    self._hash_records_data(r.data for r in records) !=
+                    data_hash):
+                changed[recordset_id] = (ttl, records)
+
+        remove = []
+        if zone.type == 'SECONDARY':
+            # Purge anything that shouldn't be there :P
+            remove = [
+                stored[0] for stored in existing.values()
+                if stored[0] not in keep
+            ]
+
+        LOG.debug(
+            'Syncing the recordsets of zone %(zone_id)s: %(create)d to '
+            'create, %(update)d to update, %(delete)d to delete, %(same)d '
+            'unchanged',
+            {'zone_id': zone.id, 'create': len(create),
+             'update': len(changed), 'delete': len(remove),
+             'same': len(keep) - len(changed)}
+        )
+
+        records_delta = 0
+        if changed:
+            query = tables.recordsets.update().where(
+                tables.recordsets.c.id == bindparam('recordset_id')
+            ).values(ttl=bindparam('new_ttl'))
+            query = self._apply_version_increment(
+                context, tables.recordsets, query)
+            with sql.get_write_session() as session:
+                session.execute(query, [
+                    {'recordset_id': recordset_id, 'new_ttl': ttl}
+                    for recordset_id, (ttl, _) in changed.items()
+                ])
+            records_delta -= self._delete_recordset_records(list(changed))
+
+            records = []
+            for recordset_id, (_, recordset_records) in changed.items():
+                for record in recordset_records:
+                    self._prepare_record(
+                        context, zone.id, recordset_id, record)
+                    records.append(record)
+            self._create_many(
+                tables.records, records, exceptions.DuplicateRecord)
+            records_delta += _count_unmanaged(records)
+
+        if remove:
+            records_delta -= self._delete_recordset_records(remove)
+            with sql.get_write_session() as session:
+                for start in range(0, len(remove), base.BULK_CHUNK_SIZE):
+                    session.execute(tables.recordsets.delete().where(
+                        tables.recordsets.c.id.in_(
+                            remove[start:start + base.BULK_CHUNK_SIZE])))
+
+        self._adjust_zone_counters(
+            zone.id, recordsets=-len(remove), records=records_delta)
+
+        if create:
+            self.create_recordsets(context, zone.id, create)
+
+    def _delete_recordset_records(self, recordset_ids):
+        """
+        Delete the records of recordsets, and return how many of them were
+        unmanaged.
+        """
+        unmanaged = 0
+        with sql.get_write_session() as session:
+            for start in range(0, len(recordset_ids), base.BULK_CHUNK_SIZE):
+                in_recordsets = tables.records.c.recordset_id.in_(
+                    recordset_ids[start:start + base.BULK_CHUNK_SIZE])
+                unmanaged += session.execute(tables.records.delete().where(
+                    in_recordsets,
+                    tables.records.c.managed == False)).rowcount  # noqa
+                session.execute(tables.records.delete().where(in_recordsets))
+        return unmanaged
+
     def update_zone_attribute(self, context, zone_attribute):
         return self._update(context, tables.zone_attributes,
                             zone_attribute,
@@ -910,7 +1261,8 @@ class SQLAlchemyStorage(base.SQLAlchemy):
     # RecordSet Methods
     def _find_recordsets(self, context, criterion, one=False, marker=None,
                          limit=None, sort_key=None, sort_dir=None,
-                         force_index=False, apply_tenant_criteria=True):
+                         force_index=False, apply_tenant_criteria=True,
+                         page_token=None):
 
         # Check to see if the criterion can use the reverse_name column
         criterion = self._rname_check(criterion)
@@ -949,6 +1301,7 @@ class SQLAlchemyStorage(base.SQLAlchemy):
                     sort_key=sort_key, sort_dir=sort_dir,
                     force_index=force_index,
                     apply_tenant_criteria=apply_tenant_criteria,
+                    page_token=page_token,
             )
 
             recordsets.total_count = tc
@@ -965,6 +1318,48 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         # Check to see if the criterion can use the reverse_name column
         criterion = self._rname_check(criterion)
 
+        raw_rows = self._select_raw(
+            context, tables.recordsets, criterion, self._axfr_query())
+
+        return raw_rows
+
+    def iter_recordsets_axfr(self, context, criterion=None, chunk_size=1000):
+        """
+        Iterate over the RecordSets of a zone transfer.
+
+        Returns the same rows as find_recordsets_axfr, but as a generator
+        reading chunk_size rows at a time from a server-side cursor.
+
+        :param context: RPC Context.
+        :param criterion: Criteria to filter by.
+        :param chunk_size: Number of rows to read from the cursor at a time.
+        """
+        # Check to see if the criterion can use the reverse_name column
+        criterion = self._rname_check(criterion)
+
+        return self._select_raw_iter(
+            context, tables.recordsets, criterion, self._axfr_query(),
+            chunk_size=chunk_size)
+
+    def iter_zone_axfr(self, context, zone_id, chunk_size=1000):
+        """
+        Iterate over the records of a full zone transfer.
+
+        Reads the SOA and the body of the zone from a single server-side
+        cursor, chunk_size rows at a time. The rows are in the format of
+        find_recordsets_axfr, with the SOA first and the rest of the zone
+        ordered by recordset, so they can be sent as they are read.
+
+        :param context: RPC Context.
+        :param zone_id: Zone ID to transfer.
+        :param chunk_size: Number of rows to read from the cursor at a time.
+        """
+        return self._select_raw_iter(
+            context, tables.recordsets, {'zone_id': zone_id},
+            self._axfr_query(soa_first=True), chunk_size=chunk_size)
+
+    @staticmethod
+    def _axfr_query(soa_first=False):
         rjoin = tables.records.join(
             tables.recordsets,
             tables.records.c.recordset_id == tables.recordsets.c.id)
@@ -976,12 +1371,12 @@ class SQLAlchemyStorage(base.SQLAlchemy):
             select_from(rjoin).where(tables.records.c.action != 'DELETE')
         )
 
-        query = query.order_by(tables.recordsets.c.id)
-
-        raw_rows = self._select_raw(
-            context, tables.recordsets, criterion, query)
+        if soa_first:
+            query = query.order_by(
+                case((tables.recordsets.c.type == 'SOA', 0), else_=1)
+            )
 
-        return raw_rows
+        return query.order_by(tables.recordsets.c.id)
 
     def create_recordset(self, context, zone_id, recordset):
         """
@@ -991,28 +1386,55 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         :param zone_id: Zone ID to create the recordset in.
         :param recordset: RecordSet object with the values to be created.
         """
-        recordset.tenant_id = context.project_id
-        recordset.zone_id = zone_id
+        return self.create_recordsets(context, zone_id, [recordset])[0]
+
+    def create_recordsets(self, context, zone_id, recordsets):
+        """
+        Create recordsets, and their records, on a given Zone ID
+
+        All the recordsets are inserted with a single statement, as are all
+        their records.
+
+        :param context: RPC Context.
+        :param zone_id: Zone ID to create the recordsets in.
+        :param recordsets: List of RecordSet objects with the values to be
+                           created.
+        """
+        for recordset in recordsets:
+            recordset.tenant_id = context.project_id
+            recordset.zone_id = zone_id
 
         # Patch in the reverse_name column
-        extra_values = {'reverse_name': recordset.name[::-1]}
+        extra_values = [
+            {'reverse_name': recordset.name[::-1]} for recordset in recordsets
+        ]
 
-        recordset = self._create(
-            tables.recordsets, recordset, exceptions.DuplicateRecordSet,
+        self._create_many(
+            tables.recordsets, recordsets, exceptions.DuplicateRecordSet,
             ['records'], extra_values=extra_values)
 
-        if recordset.obj_attr_is_set('records'):
-            for record in recordset.records:
-                # NOTE: Since we're dealing with a mutable object, the return
-                #       value is not needed. The original item will be mutated
-                #       in place on the input "recordset.records" list.
-                self.create_record(context, zone_id, recordset.id, record)
-        else:
-            recordset.records = objects.RecordList()
+        records = []
+        for recordset in recordsets:
+            if recordset.obj_attr_is_set('records'):
+                for record in recordset.records:
+                    self._prepare_record(
+                        context, zone_id, recordset.id, record)
+                    records.append(record)
+            else:
+                recordset.records = objects.RecordList()
 
-        recordset.obj_reset_changes(['records'])
+        # NOTE: Since we're dealing with mutable objects, the records are
+        #       updated in place on the "recordset.records" lists.
+        self._create_many(tables.records, records, exceptions.DuplicateRecord)
 
-        return recordset
+        self._adjust_zone_counters(
+            zone_id, recordsets=len(recordsets),
+            records=_count_unmanaged(records))
+
+        for recordset in recordsets:
+            recordset.obj_reset_changes(['records'])
+
+        return recordsets
 
     def find_recordsets_export(self, context, criterion=None):
         query = None
@@ -1036,7 +1458,7 @@ class SQLAlchemyStorage(base.SQLAlchemy):
 
     def find_recordsets(self, context, criterion=None, marker=None, limit=None,
                         sort_key=None, sort_dir=None, force_index=False,
-                        apply_tenant_criteria=True):
+                        apply_tenant_criteria=True, page_token=None):
         """
         Find RecordSets.
 
@@ -1049,11 +1471,15 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         :param sort_key: Key from which to sort after.
         :param sort_dir: Direction to sort after using sort_key.
         :param apply_tenant_criteria: Whether to filter results by project_id.
+        :param page_token: Token of the requested page, returned as the
+                           next_page_token of the previous page. An empty
+                           token requests the first page.
         """
         return self._find_recordsets(
             context, criterion, marker=marker, sort_dir=sort_dir,
             sort_key=sort_key, limit=limit, force_index=force_index,
-            apply_tenant_criteria=apply_tenant_criteria)
+            apply_tenant_criteria=apply_tenant_criteria,
+            page_token=page_token)
 
     def find_recordset(self, context, criterion, apply_tenant_criteria=True):
         """
@@ -1113,9 +1539,8 @@ class SQLAlchemyStorage(base.SQLAlchemy):
                 self.update_record(context, record)
 
             # Create Records
-            for record in create_records:
-                self.create_record(
-                    context, recordset.zone_id, recordset.id, record)
+            self.create_records(
+                context, recordset.zone_id, recordset.id, create_records)
 
         return recordset
 
@@ -1130,8 +1555,19 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         recordset = self._find_recordsets(
             context, {'id': recordset_id}, one=True)
 
-        return self._delete(context, tables.recordsets, recordset,
-                            exceptions.RecordSetNotFound)
+        # The records of the recordset are deleted along with it, including
+        # any that recordset.records leaves out.
+        query = select(func.count(tables.records.c.id)).where(
+            tables.records.c.recordset_id == recordset_id,
+            tables.records.c.managed == False)  # noqa
+        with sql.get_read_session() as session:
+            unmanaged = session.execute(query).scalar()
+
+        recordset = self._delete(context, tables.recordsets, recordset,
+                                 exceptions.RecordSetNotFound)
+        self._adjust_zone_counters(
+            recordset.zone_id, recordsets=-1, records=-unmanaged)
+        return recordset
 
     def count_recordsets(self, context, criterion=None):
         """
@@ -1140,6 +1576,13 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         :param context: RPC Context.
         :param criterion: Criteria to filter by.
         """
+        # The recordsets of a whole zone are counted as they change.
+        if (context.all_tenants and criterion is not None and
+                list(criterion) == ['zone_id'] and
+                _is_exact_match(criterion['zone_id'])):
+            return self._get_live_zone_counter(
+                tables.zones.c.recordset_count, criterion['zone_id'])
+
         # Ensure that we return only active recordsets
         rjoin = tables.recordsets.join(
             tables.zones,
@@ -1185,6 +1628,12 @@ class SQLAlchemyStorage(base.SQLAlchemy):
 
         return md5sum.hexdigest()
 
+    def _prepare_record(self, context, zone_id, recordset_id, record):
+        record.tenant_id = context.project_id
+        record.zone_id = zone_id
+        record.recordset_id = recordset_id
+        record.hash = self._recalculate_record_hash(record)
+
     def create_record(self, context, zone_id, recordset_id, record):
         """
         Create a record on a given Zone ID
@@ -1194,13 +1643,25 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         :param recordset_id: RecordSet ID to create the record in.
         :param record: Record object with the values to be created.
         """
-        record.tenant_id = context.project_id
-        record.zone_id = zone_id
-        record.recordset_id = recordset_id
-        record.hash = self._recalculate_record_hash(record)
+        return self.create_records(
+            context, zone_id, recordset_id, [record])[0]
 
-        return self._create(
-            tables.records, record, exceptions.DuplicateRecord)
+    def create_records(self, context, zone_id, recordset_id, records):
+        """
+        Create records on a given Zone ID, with a single statement
+
+        :param context: RPC Context.
+        :param zone_id: Zone ID to create the records in.
+        :param recordset_id: RecordSet ID to create the records in.
+        :param records: List of Record objects with the values to be created.
+        """
+        for record in records:
+            self._prepare_record(context, zone_id, recordset_id, record)
+
+        records = self._create_many(
+            tables.records, records, exceptions.DuplicateRecord)
+        self._adjust_zone_counters(zone_id, records=_count_unmanaged(records))
+        return records
 
     def get_record(self, context, record_id):
         """
@@ -1245,13 +1706,92 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         :param context: RPC Context.
         :param record: Record to update
         """
-        if record.obj_what_changed():
+        changes = record.obj_what_changed()
+        if changes:
             record.hash = self._recalculate_record_hash(record)
 
-        return self._update(
+        was_unmanaged = None
+        if 'managed' in changes:
+            try:
+                was_unmanaged = (
+                    record.obj_get_original_value('managed') is False
+                )
+            except KeyError:
+                pass
+
+        record = self._update(
             context, tables.records, record, exceptions.DuplicateRecord,
             exceptions.RecordNotFound)
 
+        is_unmanaged = record.managed is False
+        if was_unmanaged is not None and was_unmanaged != is_unmanaged:
+            self._adjust_zone_counters(
+                record.zone_id, records=1 if is_unmanaged else -1)
+
+        return record
+
+    def update_records_status(self, context, zone_id, status, serial):
+        """
+        Apply the outcome of an update of a zone on its nameservers to the
+        status of its records, with one UPDATE per state transition.
+
+        :param context: RPC Context.
+        :param zone_id: Zone ID of the records.
+        :param status: 'SUCCESS', 'ERROR', or 'NO_ZONE' when the zone was
+                       deleted from the nameservers.
+        :param serial: Serial of the zone on the nameservers, or 0 for any.
+        :returns: Number of records updated, by their new status.
+        """
+        records = tables.records
+        conditions = [records.c.zone_id == zone_id]
+        transitions = []
+
+        if status == 'SUCCESS':
+            conditions.extend([
+                records.c.status.in_(['PENDING', 'ERROR']),
+                records.c.serial <= serial,
+            ])
+            transitions = [
+                (records.c.action.in_(['CREATE', 'UPDATE']),
+                 {'action': 'NONE', 'status': 'ACTIVE'}),
+                (records.c.action == 'DELETE',
+                 {'action': 'NONE', 'status': 'DELETED'}),
+            ]
+        elif status == 'ERROR':
+            conditions.append(records.c.status == 'PENDING')
+            if serial != 0:
+                conditions.append(records.c.serial <= serial)
+            transitions = [
+                (None, {'status': 'ERROR'}),
+            ]
+        elif status == 'NO_ZONE':
+            transitions = [
+                (and_(records.c.action.in_(['CREATE', 'UPDATE']),
+                      not_(and_(records.c.action == 'CREATE',
+                                records.c.status == 'ERROR'))),
+                 {'action': 'CREATE', 'status': 'ERROR'}),
+                (records.c.action == 'DELETE',
+                 {'action': 'NONE', 'status': 'DELETED'}),
+            ]
+
+        counts = {}
+        with sql.get_write_session() as session:
+            for condition, values in transitions:
+                query = records.update().where(*conditions)
+                if condition is not None:
+                    query = query.where(condition)
+                query = query.values(**values)
+                query = self._apply_tenant_criteria(context, records, query)
+                query = self._apply_version_increment(context, records, query)
+
+                updated = session.execute(query).rowcount
+                if updated:
+                    counts[values['status']] = (
+                        counts.get(values['status'], 0) + updated
+                    )
+
+        return counts
+
     def delete_record(self, context, record_id):
         """
         Delete a record
@@ -1261,8 +1801,11 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         """
         # Fetch the existing record, we'll need to return it.
         record = self._find_records(context, {'id': record_id}, one=True)
-        return self._delete(context, tables.records, record,
-                            exceptions.RecordNotFound)
+        record = self._delete(context, tables.records, record,
+                              exceptions.RecordNotFound)
+        if record.managed is False:
+            self._adjust_zone_counters(record.zone_id, records=-1)
+        return record
 
     def count_records(self, context, criterion=None):
         """
@@ -1271,6 +1814,14 @@ class SQLAlchemyStorage(base.SQLAlchemy):
         :param context: RPC Context.
         :param criterion: Criteria to filter by.
         """
+        # The unmanaged records of a whole zone are counted as they change.
+        if (context.all_tenants and criterion is not None and
+                set(criterion) == {'zone_id', 'managed'} and
+                criterion['managed'] is False and
+                _is_exact_match(criterion['zone_id'])):
+            return self._get_live_zone_counter(
+                tables.zones.c.record_count, criterion['zone_id'])
+
         # Ensure that we return only active records
         rjoin = tables.records.join(
             tables.zones,
@@ -1295,6 +1846,335 @@ class SQLAlchemyStorage(base.SQLAlchemy):
 
         return result[0]
 
+    # Counter Methods
+    def _adjust_zone_counters(self, zone_id, recordsets=0, records=0):
+        if not recordsets and not records:
+            return
+
+        zones = tables.zones
+        # The counters are not part of the zone object, so neither its
+        # version nor its updated_at change with them.
+        query = zones.update().where(zones.c.id == zone_id).values(
+            recordset_count=zones.c.recordset_count + recordsets,
+            record_count=zones.c.record_count + records,
+            updated_at=zones.c.updated_at,
+        )
+        with sql.get_write_session() as session:
+            session.execute(query)
+
+    def _adjust_tenant_zone_count(self, tenant_id, delta):
+        if tenant_id is None:
+            return
+
+        counters = tables.tenant_counters
+        query = counters.update().where(
+            counters.c.tenant_id == tenant_id
+        ).values(zone_count=counters.c.zone_count + delta)
+        with sql.get_write_session() as session:
+            if session.execute(query).rowcount:
+                return
+
+            # The first change for this tenant, its zones are counted from
+            # scratch, the change included.
+            zone_count = select(func.count(tables.zones.c.id)).where(
+                tables.zones.c.tenant_id == tenant_id,
+                tables.zones.c.deleted == '0'
+            ).scalar_subquery()
+            try:
+                with session.begin_nested():
+                    session.execute(counters.insert().values(
+                        tenant_id=tenant_id, zone_count=zone_count))
+            except oslo_db_exception.DBDuplicateEntry:
+                # Counted concurrently, so it only needs the change.
+                session.execute(query)
+
+    def _get_live_zone_counter(self, column, zone_id):
+        # Like the queries they stand in for, deleted zones count nothing.
+        query = select(column).where(
+            tables.zones.c.id == zone_id, tables.zones.c.deleted == '0')
+
+        with sql.get_read_session() as session:
+            return session.execute(query).scalar() or 0
+
+    def get_zone_counters(self, context, zone_id):
+        """
+        Get the number of recordsets and of unmanaged records of a zone,
+        whatever their project.
+
+        :param context: RPC Context.
+        :param zone_id: Zone ID to get the counters of.
+        :returns: Dict with the 'recordsets' and 'records' counts.
+        """
+        query = select(
+            tables.zones.c.recordset_count, tables.zones.c.record_count
+        ).where(tables.zones.c.id == zone_id)
+
+        with sql.get_read_session() as session:
+            result = session.execute(query).fetchone()
+
+        if result is None:
+            raise exceptions.ZoneNotFound('Could not find Zone')
+
+        return {'recordsets': result[0], 'records': result[1]}
+
+    def get_tenant_zone_count(self, context, tenant_id):
+        """
+        Get the number of zones of a tenant, deleted zones excluded.
+
+        :param context: RPC Context.
+        :param tenant_id: Tenant ID to count the zones of.
+        """
+        query = select(tables.tenant_counters.c.zone_count).where(
+            tables.tenant_counters.c.tenant_id == tenant_id)
+
+        with sql.get_read_session() as session:
+            return session.execute(query).scalar() or 0
+
+    def rebuild_counters(self, context):
+        """
+        Recount the recordsets and records of every zone, and the zones of
+        every tenant.
+
+        :param context: RPC Context.
+        :returns: Dict with the number of 'zones' and 'tenants' counted.
+        """
+        zones = tables.zones
+        recordsets = tables.recordsets
+        records = tables.records
+        counters = tables.tenant_counters
+
+        with sql.get_write_session() as session:
+            zone_count = session.execute(zones.update().values(
+                recordset_count=select(func.count(recordsets.c.id)).where(
+                    recordsets.c.zone_id == zones.c.id
+                ).scalar_subquery(),
+                record_count=select(func.count(records.c.id)).where(
+                    records.c.zone_id == zones.c.id,
+                    records.c.managed == False  # noqa
+                ).scalar_subquery(),
+                updated_at=zones.c.updated_at,
+            )).rowcount
+
+            session.execute(counters.delete())
+            tenant_count = session.execute(counters.insert().from_select(
+                ['tenant_id', 'zone_count'],
+                select(zones.c.tenant_id, func.count(zones.c.id)).where(
+                    zones.c.deleted == '0',
+                    zones.c.tenant_id.is_not(None)
+                ).group_by(zones.c.tenant_id)
+            )).rowcount
+
+        LOG.info(
+            'Rebuilt the counters of %(zones)d zones and %(tenants)d tenants',
+            {'zones': zone_count, 'tenants': tenant_count}
+        )
+        return {'zones': zone_count, 'tenants': tenant_count}
+
+    # Version Methods
+    def get_version(self, context, table_name, row_id):
+        """
+        Get the version of a row, or None if there is no such row.
+
+        :param context: RPC Context.
+        :param table_name: Name of the table of the row.
+        :param row_id: ID of the row.
+        """
+        table = tables.metadata.tables[table_name]
+        query = select(table.c.version).where(table.c.id == row_id)
+
+        with sql.get_read_session() as session:
+            return session.execute(query).scalar()
+
+    def get_table_version(self, context, table_name):
+        """
+        Get a version of a whole table, which changes whenever any of its
+        rows is created, updated or deleted.
+
+        :param context: RPC Context.
+        :param table_name: Name of the table.
+        """
+        table = tables.metadata.tables[table_name]
+        query = select(
+            func.count(table.c.id), func.sum(table.c.version),
+            func.max(table.c.created_at), func.max(table.c.updated_at)
+        )
+
+        with sql.get_read_session() as session:
+            count, versions, created_at, updated_at = (
+                session.execute(query).one()
+            )
+
+        return [int(count), int(versions or 0), str(created_at),
+                str(updated_at)]
+
+    # Zone Journal Methods
+    def create_zone_journal_entries(self, context, zone_id, entries):
+        """
+        Record changes made to a zone that are yet to be published.
+
+        :param context: RPC Context.
+        :param zone_id: Zone ID the changes were made to.
+        :param entries: List of (operation, name, type, ttl, data) tuples,
+                        in the order the changes were made.
+        """
+        if not entries:
+            return
+
+        query = tables.zone_journal.insert()
+        values = [
+            {
+                'zone_id': zone_id,
+                'operation': operation,
+                'name': name,
+                'type': rrtype,
+                'ttl': ttl,
+                'data': data,
+            }
+            for operation, name, rrtype, ttl, data in entries
+        ]
+
+        with sql.get_write_session() as session:
+            session.execute(query, values)
+
+    def publish_zone_journal(self, context, zone_id, serial_from, serial_to):
+        """
+        Assign the pending changes of a zone to the serial they were
+        published in.
+
+        A SOA entry is always added to mark the end of the version, so that
+        versions without any change to the records are still in the journal.
+
+        :param context: RPC Context.
+        :param zone_id: Zone ID to publish the changes of.
+        :param serial_from: Serial of the previous version of the zone.
+        :param serial_to: Serial of the new version of the zone.
+        """
+        self.publish_zone_journals(
+            context, [(zone_id, serial_from, serial_to)]
+        )
+
+    def publish_zone_journals(self, context, versions):
+        """
+        Assign the pending changes of zones to the serials they were
+        published in, like publish_zone_journal, with one statement for the
+        changes and one for the SOA entries.
+
+        :param context: RPC Context.
+        :param versions: Zone ID, serial of the previous version and serial
+                         of the new version of each zone.
+        """
+        if not versions:
+            return
+
+        params = [
+            {
+                'journal_zone_id': zone_id,
+                'journal_serial_from': serial_from,
+                'journal_serial_to': serial_to,
+            }
+            for zone_id, serial_from, serial_to in versions
+        ]
+        query = (
+            tables.zone_journal.update().
+            where(tables.zone_journal.c.zone_id ==
+                  bindparam('journal_zone_id')).
+            where(tables.zone_journal.c.serial_to == None).  # NOQA
+            values(serial_from=bindparam('journal_serial_from'),
+                   serial_to=bindparam('journal_serial_to'))
+        )
+
+        with sql.get_write_session() as session:
+            session.execute(query, params)
+            session.execute(
+                tables.zone_journal.insert(),
+                [
+                    {
+                        'zone_id': zone_id,
+                        'serial_from': serial_from,
+                        'serial_to': serial_to,
+                        'operation': 'SOA',
+                    }
+                    for zone_id, serial_from, serial_to in versions
+                ]
+            )
+
+    def find_zone_journal(self, context, zone_id, serial):
+        """
+        Find the published changes of a zone since a serial, ordered by
+        version and then in the order they were made.
+
+        The serials are compared in serial number arithmetic, the versions
+        after the serial are the ones up to 2**31 ahead of it, even past
+        the wrap around at 2**32.
+
+        :param context: RPC Context.
+        :param zone_id: Zone ID to find the changes of.
+        :param serial: Serial to find the changes since.
+        """
+        table = tables.zone_journal
+        end = (serial + 2 ** 31) % 2 ** 32
+        if serial < end:
+            since = and_(table.c.serial_from >= serial,
+                         table.c.serial_from < end)
+        else:
+            since = or_(table.c.serial_from >= serial,
+                        table.c.serial_from < end)
+        query = (
+            select(
+                table.c.serial_from, table.c.serial_to, table.c.operation,
+                table.c.name, table.c.type, table.c.ttl, table.c.data
+            ).
+            where(table.c.zone_id == zone_id).
+            where(since).
+            order_by(table.c.serial_from, table.c.id)
+        )
+
+        with sql.get_read_session() as session:
+            rows = session.execute(query).fetchall()
+
+        # Versions from before the wrap around come first.
+        return sorted(
+            rows, key=lambda row: (row.serial_from - serial) % 2 ** 32
+        )
+
+    def purge_zone_journal(self, context, criterion, limit=None):
+        """
+        Purge versions of zones from the journal.
+
+        The criterion is matched against the SOA entry of each version, and
+        a version is always removed as a whole.
+
+        :param context: RPC Context.
+        :param criterion: Criteria to filter by.
+        :param limit: Maximum number of versions to purge.
+        :returns: number of purged versions
+        """
+        table = tables.zone_journal
+        query = (
+            select(table.c.zone_id, table.c.serial_to).
+            where(table.c.operation == 'SOA').
+            order_by(table.c.created_at)
+        )
+        query = self._apply_criterion(table, query, criterion)
+        if limit is not None:
+            query = query.limit(limit)
+
+        with sql.get_write_session() as session:
+            versions = [tuple(row) for row in session.execute(query)]
+            if not versions:
+                return 0
+
+            # MySQL does not allow deleting from a table using a subquery
+            # on the same table, so the versions are selected first.
+            session.execute(
+                table.delete().where(
+                    tuple_(table.c.zone_id, table.c.serial_to).in_(versions)
+                )
+            )
+
+        LOG.debug('Purged %d versions from the zone journal', len(versions))
+        return len(versions)
+
     # Blacklist Methods
     def _find_blacklists(self, context, criterion, one=False, marker=None,
                          limit=None, sort_key=None, sort_dir=None):
@@ -2647,60 +3527,55 @@ class SQLAlchemyStorage(base.SQLAlchemy):
             tsigkey.validate()
             self.create_tsigkey(context, tsigkey)
 
-    def get_catalog_zone_records(self, context, pool):
-        catalog_zone = self.get_catalog_zone(context, pool)
-        zones = self.find_zones(
-            context, criterion={'pool_id': pool.id, 'type': '!CATALOG'})
-        soa_record = self.find_recordset(
-            context, criterion={'zone_id': catalog_zone.id, 'type': 'SOA'})
-        records = []
+    def iter_catalog_zone_records(self, context, catalog_zone,
+                                  chunk_size=1000):
+        """
+        Iterate over the records of a catalog zone transfer.
+
+        The rows are in the format of iter_zone_axfr, starting with the SOA
+        of the catalog zone. The member zones are read from a server-side
+        cursor chunk_size rows at a time, and turned into their PTR rows as
+        they are read.
+
+        :param context: RPC Context.
+        :param catalog_zone: Catalog zone to transfer.
+        :param chunk_size: Number of rows to read from the cursor at a time.
+        """
+        yield from self._select_raw(
+            context, tables.recordsets,
+            {'zone_id': catalog_zone.id, 'type': 'SOA'}, self._axfr_query()
+        )
 
         # Catalog zones require one NS record using NSDNAME 'invalid.'
         # per RFC 9432
-        ns_record = objects.RecordList()
-        ns_record.append(objects.Record(data='invalid.'))
-        records.append(
-            objects.RecordSet(
-                name=pool.catalog_zone.catalog_zone_fqdn,
-                type='NS',
-                records=ns_record
-            )
+        yield (
+            catalog_zone.name, 'NS', None, catalog_zone.name, 'invalid.',
+            'NONE'
         )
 
         # Catalog zones require a TXT record with the schema version,
         # currently '2' per RFC 9432
-        txt_record = objects.RecordList()
-        txt_record.append(objects.Record(data='2'))
-        records.append(
-            objects.RecordSet(
-                name=f'version.{pool.catalog_zone.catalog_zone_fqdn}',
-                type='TXT',
-                records=txt_record
-            )
+        version_name = f'version.{catalog_zone.name}'
+        yield version_name, 'TXT', None, version_name, '2', 'NONE'
+
+        # If member zone is scheduled for deletion, do not include it in
+        # catalog. Otherwise, zone poller will wait for zone's deletion on
+        # secondary DNS servers, which will not happen since the zone is
+        # still in catalog (deadlock).
+        criterion = {
+            'pool_id': catalog_zone.pool_id,
+            'type': '!%s' % constants.ZONE_CATALOG,
+            'action': '!DELETE',
+        }
+        query = select(tables.zones.c.id, tables.zones.c.name)
+        members = self._select_raw_iter(
+            context, tables.zones, criterion, query, chunk_size=chunk_size
         )
-
-        for z in zones:
-            # If member zone is scheduled for deletion, do not include it in
-            # catalog. Otherwise, zone poller will wait for zone's deletion on
-            # secondary DNS servers, which will not happen since the zone is
-            # still in catalog (deadlock).
-            if z.action == 'DELETE':
-                continue
-
-            rs = objects.RecordList()
-            rs.append(
-                objects.Record(
-                    data=z.name
-                )
-            )
-            record = objects.RecordSet(
-                name=f'{z.id}.zones.{soa_record.name}',
-                type='PTR',
-                records=rs
-            )
-            records.append(record)
-
-        records.insert(0, soa_record)
-        records.append(soa_record)
-
-        return records
+        for zone_id, zone_name in members:
+            name = self.get_catalog_zone_member_name(catalog_zone, zone_id)
+            yield name, 'PTR', None, name, zone_name, 'NONE'
+
+    @staticmethod
+    def get_catalog_zone_member_name(catalog_zone, zone_id):
+        """Return the name of the PTR record of a member zone."""
+        return f'{zone_id}.zones.{catalog_zone.name}'
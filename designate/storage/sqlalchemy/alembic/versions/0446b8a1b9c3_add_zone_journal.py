@@ -0,0 +1,63 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add zone journal
+
+Revision ID: 0446b8a1b9c3
+Revises: f49c4409c8ba
+Create Date: 2026-10-18 09:12:44.201553
+
+"""
+from alembic import op
+from oslo_utils import timeutils
+import sqlalchemy as sa
+
+from designate.storage.sqlalchemy.types import UUID
+
+
+# revision identifiers, used by Alembic.
+revision = '0446b8a1b9c3'
+down_revision = 'f49c4409c8ba'
+branch_labels = None
+depends_on = None
+
+ZONE_JOURNAL_OPERATIONS = ['ADD', 'DELETE', 'SOA', 'RESET']
+
+
+def upgrade():
+    metadata = sa.MetaData()
+
+    op.create_table(
+        'zone_journal', metadata,
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('created_at', sa.DateTime,
+                  default=lambda: timeutils.utcnow()),
+        sa.Column('zone_shard', sa.SmallInteger, nullable=False),
+        sa.Column('zone_id', UUID, nullable=False),
+        sa.Column('serial_from', sa.Integer, default=None, nullable=True),
+        sa.Column('serial_to', sa.Integer, default=None, nullable=True),
+        sa.Column('operation', sa.Enum(name='zone_journal_operations',
+                                       *ZONE_JOURNAL_OPERATIONS),
+                  nullable=False),
+        sa.Column('name', sa.String(255), default=None, nullable=True),
+        sa.Column('type', sa.String(10), default=None, nullable=True),
+        sa.Column('ttl', sa.Integer, default=None, nullable=True),
+        sa.Column('data', sa.Text, default=None, nullable=True),
+        sa.ForeignKeyConstraint(['zone_id'], ['zones.id'], ondelete='CASCADE'),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8',
+    )
+
+    op.create_index('zone_journal_zone_id_serial_from', 'zone_journal',
+                    ['zone_id', 'serial_from'])
+    op.create_index('zone_journal_zone_shard_created_at', 'zone_journal',
+                    ['zone_shard', 'created_at'])
@@ -0,0 +1,32 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add zone pool index
+
+Revision ID: 38a06515225b
+Revises: 0446b8a1b9c3
+Create Date: 2026-10-18 14:03:19.518204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '38a06515225b'
+down_revision = '0446b8a1b9c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The member zones of a catalog zone are read by pool.
+    op.create_index('zone_pool_deleted', 'zones', ['pool_id', 'deleted'])
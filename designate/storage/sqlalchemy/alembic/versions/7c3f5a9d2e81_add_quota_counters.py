@@ -0,0 +1,78 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add quota counters
+
+Revision ID: 7c3f5a9d2e81
+Revises: 38a06515225b
+Create Date: 2026-10-18 16:41:07.392815
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3f5a9d2e81'
+down_revision = '38a06515225b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    metadata = sa.MetaData()
+
+    op.add_column(
+        'zones',
+        sa.Column('recordset_count', sa.Integer, nullable=False,
+                  server_default='0')
+    )
+    op.add_column(
+        'zones',
+        sa.Column('record_count', sa.Integer, nullable=False,
+                  server_default='0')
+    )
+
+    tenant_counters = op.create_table(
+        'tenant_counters', metadata,
+        sa.Column('tenant_id', sa.String(36), primary_key=True),
+        sa.Column('zone_count', sa.Integer, nullable=False,
+                  server_default='0'),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8',
+    )
+
+    # Count what is already there.
+    zones = sa.table(
+        'zones',
+        sa.column('id'), sa.column('tenant_id'), sa.column('deleted'),
+        sa.column('recordset_count'), sa.column('record_count'),
+    )
+    recordsets = sa.table('recordsets', sa.column('id'), sa.column('zone_id'))
+    records = sa.table(
+        'records', sa.column('id'), sa.column('zone_id'),
+        sa.column('managed', sa.Boolean),
+    )
+
+    op.execute(zones.update().values(
+        recordset_count=sa.select(sa.func.count(recordsets.c.id)).where(
+            recordsets.c.zone_id == zones.c.id).scalar_subquery(),
+        record_count=sa.select(sa.func.count(records.c.id)).where(
+            records.c.zone_id == zones.c.id,
+            records.c.managed == sa.false()).scalar_subquery(),
+    ))
+    op.execute(tenant_counters.insert().from_select(
+        ['tenant_id', 'zone_count'],
+        sa.select(zones.c.tenant_id, sa.func.count(zones.c.id)).where(
+            zones.c.deleted == '0',
+            zones.c.tenant_id.is_not(None)).group_by(zones.c.tenant_id)
+    ))
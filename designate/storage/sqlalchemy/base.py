@@ -16,6 +16,7 @@
 import abc
 import operator
 import threading
+import uuid
 
 from oslo_db import exception as oslo_db_exception
 from oslo_db.sqlalchemy import utils as oslodb_utils
@@ -23,15 +24,21 @@ from oslo_log import log as logging
 from oslo_utils import timeutils
 from sqlalchemy import select, or_, between, func, distinct
 
+import designate.conf
 from designate import exceptions
 from designate import objects
+from designate.storage import cache
 from designate.storage import sql
 from designate.storage.sqlalchemy import tables
 from designate.storage.sqlalchemy import utils
 
 
+CONF = designate.conf.CONF
 LOG = logging.getLogger(__name__)
 
+# The number of IDs given at once to the IN clauses of bulk statements.
+BULK_CHUNK_SIZE = 1000
+
 RECORDSET_QUERY_TABLES = (
     # RS Info
     tables.recordsets.c.id,                    # 0 - RS ID
@@ -111,6 +118,27 @@ def _set_object_from_model(obj, model):
     return obj
 
 
+class _DefaultContext:
+    """Execution context passed to the column defaults computed up front"""
+
+    def __init__(self, parameters):
+        self.current_parameters = parameters
+
+
+def _apply_column_defaults(table, values):
+    """Fill in the client side defaults of the columns missing from values"""
+    for column in table.columns:
+        default = column.default
+        if column.name in values or default is None:
+            continue
+        if default.is_scalar:
+            values[column.name] = default.arg
+        elif default.is_callable:
+            values[column.name] = default.arg(_DefaultContext(values))
+
+    return values
+
+
 def _set_listobject_from_models(obj, models):
     for model in models:
         obj.objects.append(_set_object_from_model(obj.LIST_ITEM_TYPE(), model))
@@ -237,22 +265,93 @@ class SQLAlchemy(metaclass=abc.ABCMeta):
         query = table.insert()
 
         with sql.get_write_session() as session:
+            returning = session.get_bind().dialect.insert_returning
+            if returning:
+                query = query.returning(*table.c)
+
             try:
-                resultproxy = session.execute(query, [values])
+                resultproxy = session.execute(query, values)
             except oslo_db_exception.DBDuplicateEntry:
                 raise exc_dup("Duplicate %s" % obj.obj_name())
 
-            # Refetch the row, for generated columns etc
-            query = select(table).where(
-                table.c.id == resultproxy.inserted_primary_key[0])
-            resultproxy = session.execute(query)
+            if not returning:
+                # Refetch the row, for generated columns etc
+                query = select(table).where(
+                    table.c.id == resultproxy.inserted_primary_key[0])
+                resultproxy = session.execute(query)
 
             return _set_object_from_model(obj, resultproxy.fetchone())
 
+    def _create_many(self, table, objs, exc_dup, skip_values=None,
+                     extra_values=None):
+        """
+        Create objects with a single, multi-row INSERT.
+
+        The defaults of the columns, the IDs included, are computed up front,
+        so the rows are read back in the same statement where the database
+        supports RETURNING them, and in batches otherwise, rather than one by
+        one.
+
+        :param extra_values: List with a dict of extra values for every
+                             object.
+        """
+        if not objs:
+            return objs
+
+        rows = []
+        for index, obj in enumerate(objs):
+            values = dict(obj)
+
+            if skip_values is not None:
+                for skip_value in skip_values:
+                    values.pop(skip_value, None)
+
+            if extra_values is not None:
+                values.update(extra_values[index])
+
+            rows.append(_apply_column_defaults(table, {
+                key: value for key, value in values.items() if key in table.c
+            }))
+
+        # A statement inserts the same columns for all its rows, the columns
+        # left to their server defaults can differ between the objects.
+        batches = {}
+        for row in rows:
+            batches.setdefault(frozenset(row), []).append(row)
+
+        with sql.get_write_session() as session:
+            returning = session.get_bind().dialect.insert_executemany_returning
+            fetched = {}
+            try:
+                for batch in batches.values():
+                    if returning:
+                        query = table.insert().returning(*table.c)
+                        for model in session.execute(query, batch):
+                            fetched[model.id] = model
+                    else:
+                        session.execute(table.insert(), batch)
+            except oslo_db_exception.DBDuplicateEntry:
+                raise exc_dup("Duplicate %s" % objs[0].obj_name())
+
+            if not returning:
+                # Refetch the rows, for the values normalized by the database,
+                # e.g. the precision of timestamps.
+                ids = [row['id'] for row in rows]
+                for start in range(0, len(ids), BULK_CHUNK_SIZE):
+                    query = select(table).where(
+                        table.c.id.in_(ids[start:start + BULK_CHUNK_SIZE]))
+                    for model in session.execute(query):
+                        fetched[model.id] = model
+
+        for obj, row in zip(objs, rows):
+            _set_object_from_model(obj, fetched[str(uuid.UUID(row['id']))])
+
+        return objs
+
     def _find(self, context, table, cls, list_cls, exc_notfound, criterion,
               one=False, marker=None, limit=None, sort_key=None,
               sort_dir=None, query=None, apply_tenant_criteria=True,
-              include_shared=False):
+              include_shared=False, page_token=None):
 
         sort_key = sort_key or 'created_at'
         sort_dir = sort_dir or 'asc'
@@ -281,20 +380,30 @@ class SQLAlchemy(metaclass=abc.ABCMeta):
             else:
                 return _set_object_from_model(cls(), results[0])
         else:
+            marker_values = None
             if marker is not None:
                 marker = utils.check_marker(table, marker)
+            elif page_token:
+                marker_values = utils.decode_page_token(
+                    table, page_token, sort_key, sort_dir)
 
             try:
                 query = utils.paginate_query(
                     query, table, limit,
                     [sort_key, 'id'], marker=marker,
-                    sort_dir=sort_dir)
+                    sort_dir=sort_dir, marker_values=marker_values)
 
                 with sql.get_read_session() as session:
                     resultproxy = session.execute(query)
                     results = resultproxy.fetchall()
 
-                return _set_listobject_from_models(list_cls(), results)
+                objs = _set_listobject_from_models(list_cls(), results)
+                if (page_token is not None and limit is not None and
+                        len(results) == int(limit)):
+                    objs.next_page_token = utils.encode_page_token(
+                        sort_key, sort_dir,
+                        [getattr(results[-1], sort_key), results[-1].id])
+                return objs
             except oslodb_utils.InvalidSortKey as sort_key_error:
                 raise exceptions.InvalidSortKey(str(sort_key_error))
             # Any ValueErrors are propagated back to the user as is.
@@ -308,7 +417,7 @@ class SQLAlchemy(metaclass=abc.ABCMeta):
                                       marker=None, limit=None,
                                       sort_key=None, sort_dir=None,
                                       apply_tenant_criteria=True,
-                                      force_index=False):
+                                      force_index=False, page_token=None):
         sort_key = sort_key or 'created_at'
         sort_dir = sort_dir or 'asc'
         data = criterion.pop('data', None)
@@ -346,14 +455,18 @@ class SQLAlchemy(metaclass=abc.ABCMeta):
             inner_q = inner_q.with_hint(tables.recordsets, index_hint,
                                         dialect_name='mysql')
 
+        marker_values = None
         if marker is not None:
             marker = utils.check_marker(tables.recordsets, marker)
+        elif page_token:
+            marker_values = utils.decode_page_token(
+                tables.recordsets, page_token, sort_key, sort_dir)
 
         try:
             inner_q = utils.paginate_query(
                 inner_q, tables.recordsets, limit,
                 [sort_key, 'id'], marker=marker,
-                sort_dir=sort_dir)
+                sort_dir=sort_dir, marker_values=marker_values)
 
         except oslodb_utils.InvalidSortKey as sort_key_error:
             raise exceptions.InvalidSortKey(str(sort_key_error))
@@ -403,14 +516,13 @@ class SQLAlchemy(metaclass=abc.ABCMeta):
         formatted_ids = map(operator.itemgetter(0), rows)
 
         # Count query does not scale well for large amount of recordsets,
-        # don't do it if the header 'OpenStack-DNS-Hide-Counts: True' exists
-        if context.hide_counts:
-            total_count = None
+        # don't do it if the header 'OpenStack-DNS-Hide-Counts: True' exists,
+        # nor for the pages following a page token
+        if context.hide_counts or page_token:
+            total_count = total_count_type = None
         else:
-            with sql.get_read_session() as session:
-                resultproxy = session.execute(count_q)
-                result = resultproxy.fetchone()
-            total_count = 0 if result is None else result[0]
+            total_count, total_count_type = self._count_list(
+                'recordsets', tables.recordsets, count_q)
 
         # Join the 2 required tables
         rjoin = tables.recordsets.outerjoin(
@@ -439,7 +551,7 @@ class SQLAlchemy(metaclass=abc.ABCMeta):
         except ValueError as value_error:
             raise exceptions.ValueError(str(value_error))
 
-        rrsets = objects.RecordSetList()
+        rrsets = objects.RecordSetList(total_count_type=total_count_type)
         rrset_id = None
         current_rrset = None
 
@@ -488,8 +600,50 @@ class SQLAlchemy(metaclass=abc.ABCMeta):
             if current_rrset is not None:
                 rrsets.append(current_rrset)
 
+        if (page_token is not None and limit is not None and
+                len(rows) == int(limit)):
+            rrsets.next_page_token = utils.encode_page_token(
+                sort_key, sort_dir, [rrsets[-1][sort_key], rrsets[-1].id])
+
         return total_count, rrsets
 
+    def _count_list(self, name, table, count_query):
+        """
+        Get the total count of a list, with the configured count strategy.
+
+        :param name: Name of the list, for the count cache.
+        :param table: Table the list is read from.
+        :param count_query: Query counting the rows of the list.
+        :returns: The count, and how it was obtained: 'exact', 'cached' or
+                  'estimated'.
+        """
+        count_cache = cache.get_count_cache()
+        if count_cache is not None:
+            key = count_cache.key(name, count_query)
+            count = count_cache.get(key)
+            if count is not None:
+                return count, 'cached'
+
+        count = None
+        count_type = 'exact'
+        with sql.get_read_session() as session:
+            if CONF['storage:count'].strategy == 'auto':
+                # The planner estimates the rows rather than their count.
+                estimate = utils.estimate_rows(
+                    session, count_query.with_only_columns(table.c.id))
+                if (estimate is not None and
+                        estimate > CONF['storage:count'].estimate_threshold):
+                    count = estimate
+                    count_type = 'estimated'
+
+            if count is None:
+                count = session.execute(count_query).scalar() or 0
+
+        if count_cache is not None:
+            count_cache.set(key, count)
+
+        return count, count_type
+
     def _update(self, context, table, obj, exc_dup, exc_notfound,
                 skip_values=None):
         # TODO(graham): Re Enable this
@@ -516,11 +670,21 @@ class SQLAlchemy(metaclass=abc.ABCMeta):
         query = self._apply_version_increment(context, table, query)
 
         with sql.get_write_session() as session:
+            returning = session.get_bind().dialect.update_returning
+            if returning:
+                query = query.returning(*table.c)
+
             try:
                 resultproxy = session.execute(query)
             except oslo_db_exception.DBDuplicateEntry:
                 raise exc_dup("Duplicate %s" % obj.obj_name())
 
+            if returning:
+                models = resultproxy.fetchall()
+                if len(models) != 1:
+                    raise exc_notfound("Could not find %s" % obj.obj_name())
+                return _set_object_from_model(obj, models[0])
+
             if resultproxy.rowcount != 1:
                 raise exc_notfound("Could not find %s" % obj.obj_name())
 
@@ -568,11 +732,10 @@ class SQLAlchemy(metaclass=abc.ABCMeta):
             if resultproxy.rowcount != 1:
                 raise exc_notfound("Could not find %s" % obj.obj_name())
 
-            # Refetch the row, for generated columns etc
-            query = select(table).where(table.c.id == obj.id)
-            resultproxy = session.execute(query)
-
-            return _set_object_from_model(obj, resultproxy.fetchone())
+        # NOTE: The row is gone, there is nothing to refetch. The object was
+        #       read right before it was deleted.
+        obj.obj_reset_changes()
+        return obj
 
     def _select_raw(self, context, table, criterion, query=None):
         # Build the query
@@ -591,3 +754,32 @@ class SQLAlchemy(metaclass=abc.ABCMeta):
         # show up as ValueError
         except ValueError as value_error:
             raise exceptions.ValueError(str(value_error))
+
+    def _select_raw_iter(self, context, table, criterion, query=None,
+                         chunk_size=1000):
+        """Like _select_raw, but stream the rows instead of fetching them all.
+
+        Rows are read from a server-side cursor (where the backend supports
+        one) chunk_size rows at a time, so the memory used is bounded by the
+        chunk size and not by the size of the result set.
+        """
+        # Build the query
+        if query is None:
+            query = select(table)
+
+        query = self._apply_criterion(table, query, criterion)
+        query = self._apply_deleted_criteria(context, table, query)
+        query = query.execution_options(
+            stream_results=True, max_row_buffer=chunk_size
+        )
+
+        try:
+            with sql.get_read_session() as session:
+                resultproxy = session.execute(query)
+                for rows in resultproxy.partitions(chunk_size):
+                    yield from rows
+        # Any ValueErrors are propagated back to the user as is.
+        # If however central or storage is called directly, invalid values
+        # show up as ValueError
+        except ValueError as value_error:
+            raise exceptions.ValueError(str(value_error))
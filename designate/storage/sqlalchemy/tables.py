@@ -40,6 +40,7 @@ POOL_PROVISIONERS = ['UNMANAGED']
 ACTIONS = ['CREATE', 'DELETE', 'UPDATE', 'NONE']
 
 ZONE_TYPES = ('PRIMARY', 'SECONDARY', 'CATALOG')
+ZONE_JOURNAL_OPERATIONS = ['ADD', 'DELETE', 'SOA', 'RESET']
 ZONE_TASK_TYPES = ['IMPORT', 'EXPORT']
 
 SERVICE_STATES = [
@@ -92,6 +93,16 @@ quotas = Table('quotas', metadata,
     mysql_charset='utf8',
 )
 
+# Number of live zones of every tenant, maintained by the storage driver
+tenant_counters = Table('tenant_counters', metadata,
+    Column('tenant_id', String(36), primary_key=True),
+    Column('zone_count', Integer, nullable=False, default=0,
+           server_default='0'),
+
+    mysql_engine='InnoDB',
+    mysql_charset='utf8',
+)
+
 tlds = Table('tlds', metadata,
     Column('id', UUID, default=uuidutils.generate_uuid, primary_key=True),
     Column('version', Integer, default=1, nullable=False),
@@ -143,6 +154,12 @@ zones = Table('zones', metadata,
     Column('reverse_name', String(255), nullable=False),
     Column('delayed_notify', Boolean, default=False),
     Column('increment_serial', Boolean, default=False),
+    # Number of recordsets and of unmanaged records of the zone, maintained
+    # by the storage driver
+    Column('recordset_count', Integer, nullable=False, default=0,
+           server_default='0'),
+    Column('record_count', Integer, nullable=False, default=0,
+           server_default='0'),
 
     UniqueConstraint('name', 'deleted', 'pool_id', name='unique_zone_name'),
     ForeignKeyConstraint(['parent_zone_id'],
@@ -266,6 +283,32 @@ records = Table('records', metadata,
     mysql_charset='utf8',
 )
 
+# The journal of the changes made to the records of a zone, used to answer
+# IXFR requests. Entries are recorded with no serial as changes are made, and
+# are assigned the serials they were published in when the zone serial is
+# incremented, together with a SOA entry marking the end of that version.
+zone_journal = Table('zone_journal', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('created_at', DateTime, default=lambda: timeutils.utcnow()),
+    Column('zone_shard', SmallInteger, nullable=False,
+           default=lambda ctxt: default_shard(ctxt, 'zone_id')),
+
+    Column('zone_id', UUID, nullable=False),
+    Column('serial_from', Integer, default=None, nullable=True),
+    Column('serial_to', Integer, default=None, nullable=True),
+    Column('operation', Enum(name='zone_journal_operations',
+                             *ZONE_JOURNAL_OPERATIONS), nullable=False),
+    Column('name', String(255), default=None, nullable=True),
+    Column('type', String(10), default=None, nullable=True),
+    Column('ttl', Integer, default=None, nullable=True),
+    Column('data', Text, default=None, nullable=True),
+
+    ForeignKeyConstraint(['zone_id'], ['zones.id'], ondelete='CASCADE'),
+
+    mysql_engine='InnoDB',
+    mysql_charset='utf8',
+)
+
 tsigkeys = Table('tsigkeys', metadata,
     Column('id', UUID, default=uuidutils.generate_uuid, primary_key=True),
     Column('version', Integer, default=1, nullable=False),
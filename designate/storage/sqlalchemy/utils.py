@@ -15,13 +15,18 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import base64
 
 from oslo_db import exception as oslo_db_exception
 from oslo_db.sqlalchemy import utils
 from oslo_log import log
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
 import sqlalchemy
 from sqlalchemy import exc as sqlalchemy_exc
+from sqlalchemy.ext import compiler
 from sqlalchemy import select
+from sqlalchemy.sql import expression
 
 
 from designate import exceptions
@@ -43,18 +48,20 @@ RRSET_FILTERING_INDEX = {
 
 # copy from olso/db/sqlalchemy/utils.py
 def paginate_query(query, table, limit, sort_keys, marker=None,
-                   sort_dir=None, sort_dirs=None):
+                   sort_dir=None, sort_dirs=None, marker_values=None):
 
     # Add sorting
     query, sort_dirs = sort_query(query, table, sort_keys, sort_dir=sort_dir)
 
-    # Add pagination
+    # Add pagination, either after a marker row or after the values of the
+    # sort keys of a page token
     if marker is not None:
         marker_values = []
         for sort_key in sort_keys:
             v = getattr(marker, sort_key)
             marker_values.append(v)
 
+    if marker_values is not None:
         # Build up an array of sort criteria as in the docstring
         criteria_list = []
         for i in range(len(sort_keys)):
@@ -141,6 +148,93 @@ def check_marker(table, marker):
     return marker
 
 
+def encode_page_token(sort_key, sort_dir, values):
+    """
+    Build the opaque token of the page following a row.
+
+    :param sort_key: Key the rows are sorted by.
+    :param sort_dir: Direction the rows are sorted in.
+    :param values: Values of the sort key and of the id of the last row.
+    """
+    token = jsonutils.dumps([sort_key, sort_dir, list(values)])
+    return base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii')
+
+
+def decode_page_token(table, page_token, sort_key, sort_dir):
+    """
+    Get the values of the sort keys a page token starts after.
+
+    :param table: Table the page is listed from.
+    :param page_token: Token returned with the previous page.
+    :param sort_key: Key the rows are sorted by.
+    :param sort_dir: Direction the rows are sorted in.
+    """
+    try:
+        token_sort_key, token_sort_dir, values = jsonutils.loads(
+            base64.urlsafe_b64decode(page_token.encode('ascii')))
+    except (TypeError, ValueError):
+        raise exceptions.InvalidPageToken('Invalid page token')
+
+    if (token_sort_key, token_sort_dir) != (sort_key, sort_dir):
+        raise exceptions.InvalidPageToken(
+            'The page token does not match the sort key and direction')
+    if not isinstance(values, list) or len(values) != 2:
+        raise exceptions.InvalidPageToken('Invalid page token')
+
+    # Timestamps are serialized as strings
+    column = getattr(table.c, sort_key, None)
+    if (values[0] is not None and column is not None and
+            isinstance(column.type, sqlalchemy.DateTime)):
+        try:
+            values[0] = timeutils.parse_strtime(values[0])
+        except (TypeError, ValueError):
+            raise exceptions.InvalidPageToken('Invalid page token')
+
+    return values
+
+
+class Explain(expression.Executable, expression.ClauseElement):
+    """EXPLAIN statement of a query, for the estimates of the planner"""
+    inherit_cache = False
+
+    def __init__(self, query):
+        self.query = query
+
+
+@compiler.compiles(Explain, 'postgresql')
+def _compile_explain_postgresql(element, compiler, **kw):
+    return 'EXPLAIN (FORMAT JSON) %s' % compiler.process(element.query, **kw)
+
+
+@compiler.compiles(Explain, 'mysql')
+def _compile_explain_mysql(element, compiler, **kw):
+    return 'EXPLAIN %s' % compiler.process(element.query, **kw)
+
+
+def estimate_rows(session, query):
+    """
+    Get the number of rows the query planner expects a query to return, or
+    None if the database gives no estimates.
+    """
+    dialect_name = session.get_bind().dialect.name
+
+    if dialect_name == 'postgresql':
+        plan = session.execute(Explain(query)).scalar()
+        if isinstance(plan, str):
+            plan = jsonutils.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    elif dialect_name == 'mysql':
+        # Every table of a join is read once per row of the previous ones,
+        # which only the filtered percentage of passes on.
+        estimate = 1.0
+        for row in session.execute(Explain(query)).mappings():
+            estimate *= (row['rows'] or 0) * (row['filtered'] or 100) / 100
+        return int(estimate)
+
+    return None
+
+
 def get_rrset_index(sort_key):
     rrset_index_hint = None
     index = RRSET_FILTERING_INDEX.get(sort_key)
@@ -978,6 +978,31 @@ class ApiV2RecordSetsTest(v2.ApiV2TestCase):
         # But there should be four in total (NS/SOA + the created)
         self.assertEqual(4, response.json['metadata']['total_count'])
 
+    def test_page_token_pagination(self):
+        # Create a recordset, there are three with the NS/SOA
+        fixture = self.get_recordset_fixture(self.zone['name'], fixture=0)
+        self.client.post_json(
+            '/zones/%s/recordsets' % self.zone['id'], fixture,
+            headers={'X-Test-Role': 'member'})
+
+        url = '/zones/%s/recordsets?limit=2&page_token=' % self.zone['id']
+        response = self.client.get(url, headers={'X-Test-Role': 'member'})
+
+        self.assertEqual(2, len(response.json['recordsets']))
+        self.assertEqual(3, response.json['metadata']['total_count'])
+        self.assertIn('page_token=', response.json['links']['next'])
+
+        names = [rs['name'] for rs in response.json['recordsets']]
+        response = self.client.get(response.json['links']['next'],
+                                   headers={'X-Test-Role': 'member'})
+        names.extend(rs['name'] for rs in response.json['recordsets'])
+
+        # The following pages are not counted
+        self.assertEqual(1, len(response.json['recordsets']))
+        self.assertNotIn('total_count', response.json['metadata'])
+        self.assertNotIn('next', response.json['links'])
+        self.assertIn(fixture['name'], names)
+
     # Secondary Zones specific tests
     def test_get_secondary_zone_recordset(self):
         fixture = self.get_zone_fixture('SECONDARY', 1)
@@ -771,6 +771,8 @@ class ApiV2ZonesTest(v2.ApiV2TestCase):
 
         # Make sure total_count picked it up
         self.assertEqual(1, response.json['metadata']['total_count'])
+        self.assertEqual(
+            'exact', response.json['metadata']['total_count_type'])
 
     def test_total_count_pagination(self):
         # Create two zones
@@ -791,6 +793,52 @@ class ApiV2ZonesTest(v2.ApiV2TestCase):
         # The total_count should know there are two
         self.assertEqual(2, response.json['metadata']['total_count'])
 
+    def test_page_token_pagination(self):
+        # Create three zones
+        for fixture in range(3):
+            self.client.post_json('/zones/',
+                                  self.get_zone_fixture(fixture=fixture),
+                                  headers={'X-Test-Role': 'member'})
+
+        # Page through the zones by following the next links
+        response = self.client.get('/zones?limit=2&page_token=',
+                                   headers={'X-Test-Role': 'member'})
+        self.assertEqual(2, len(response.json['zones']))
+        self.assertEqual(3, response.json['metadata']['total_count'])
+        self.assertIn('page_token=', response.json['links']['next'])
+        self.assertNotIn('marker=', response.json['links']['next'])
+
+        zones = response.json['zones']
+        response = self.client.get(response.json['links']['next'],
+                                   headers={'X-Test-Role': 'member'})
+        zones.extend(response.json['zones'])
+
+        # The following pages are not counted
+        self.assertEqual(1, len(response.json['zones']))
+        self.assertNotIn('total_count', response.json['metadata'])
+        self.assertNotIn('next', response.json['links'])
+        self.assertEqual(
+            sorted(self.get_zone_fixture(fixture=fixture)['name']
+                   for fixture in range(3)),
+            sorted(zone['name'] for zone in zones)
+        )
+
+    def test_page_token_with_marker(self):
+        zone = self.create_zone()
+
+        response = self.client.get(
+            '/zones?page_token=&marker=%s' % zone.id,
+            headers={'X-Test-Role': 'member'}, status=400)
+
+        self.assertEqual('bad_request', response.json['type'])
+
+    def test_invalid_page_token(self):
+        response = self.client.get('/zones?page_token=invalid',
+                                   headers={'X-Test-Role': 'member'},
+                                   status=400)
+
+        self.assertEqual('invalid_page_token', response.json['type'])
+
     def test_no_update_deleting(self):
         # Create a zone
         zone = self.create_zone()
@@ -291,6 +291,7 @@ class CentralServiceTestCase(CentralBasic):
 
         self.service.storage.create_recordset = mock.Mock(return_value='rs')
         self.service._update_zone_in_storage = mock.Mock()
+        self.service._journal_recordset_changes = mock.Mock()
 
         rs, zone = self.service._create_recordset_in_storage(
             self.context, MockZone(), MockRecordSet()
@@ -312,6 +313,7 @@ class CentralServiceTestCase(CentralBasic):
         central_service._update_zone_in_storage = mock.Mock(
             return_value=MockZone()
         )
+        central_service._journal_recordset_changes = mock.Mock()
         recordset = mock.Mock(spec=objects.RecordSet)
         recordset.obj_attr_is_set.return_value = True
         recordset.records = [MockRecord()]
@@ -336,6 +338,7 @@ class CentralServiceTestCase(CentralBasic):
         self.service._update_zone_in_storage = mock.Mock(
             return_value=MockZone()
         )
+        self.service._journal_recordset_changes = mock.Mock()
 
         # NOTE(thirose): Since this is a race condition we assume that
         #  we will hit it if we try to do the operations in a loop 100 times.
@@ -854,6 +857,7 @@ class CentralZoneTestCase(CentralBasic):
             id=CentralZoneTestCase.zone_id_2,
             shared=self.zone_shared,
             type='PRIMARY',
+            action='NONE',
         )
         self.context.abandon = True
         self.service.storage.count_zones.return_value = 0
@@ -861,6 +865,10 @@ class CentralZoneTestCase(CentralBasic):
                                  CentralZoneTestCase.zone_id)
         self.assertTrue(self.service.storage.delete_zone.called)
         self.assertFalse(self.service.worker_api.delete_zone.called)
+        mock_ensure_catalog_zone_serial_increment.assert_called_once_with(
+            self.context, self.service.storage.delete_zone.return_value,
+            'DELETE'
+        )
 
         self.mock_policy_check.assert_called_with(
             'abandon_zone', mock.ANY, {
@@ -1263,10 +1271,11 @@ class CentralZoneTestCase(CentralBasic):
         self.service._is_valid_recordset_placement_subzone = mock.Mock()
         self.service._is_valid_ttl = mock.Mock()
         self.service._update_zone_in_storage = mock.Mock()
+        self.service._journal_recordset_changes = mock.Mock()
 
         self.service._update_recordset_in_storage(
             self.context,
-            unit.RoObject(serial=3),
+            unit.RoObject(serial=3, type='PRIMARY'),
             recordset,
         )
 
@@ -1289,6 +1298,7 @@ class CentralZoneTestCase(CentralBasic):
         )
         self.assertTrue(self.service.storage.update_recordset.called)
         self.assertTrue(self.service._update_zone_in_storage.called)
+        self.assertTrue(self.service._journal_recordset_changes.called)
 
     def test_update_recordset_in_storage_2(self):
         recordset = mock.Mock()
@@ -1307,10 +1317,11 @@ class CentralZoneTestCase(CentralBasic):
         self.service._is_valid_recordset_placement_subzone = mock.Mock()
         self.service._update_zone_in_storage = mock.Mock()
         self.service._enforce_record_quota = mock.Mock()
+        self.service._journal_recordset_changes = mock.Mock()
 
         self.service._update_recordset_in_storage(
             self.context,
-            unit.RoObject(serial=3),
+            unit.RoObject(serial=3, type='PRIMARY'),
             recordset,
             increment_serial=False,
         )
@@ -1442,6 +1453,7 @@ class CentralZoneTestCase(CentralBasic):
             return zone
 
         self.service._update_zone_in_storage = mock_uds
+        self.service._journal_recordset_changes = mock.Mock()
         self.service._delete_recordset_in_storage(
             self.context,
             unit.RoObject(serial=1, shared=self.zone_shared),
@@ -1464,6 +1476,7 @@ class CentralZoneTestCase(CentralBasic):
 
     def test_delete_recordset_in_storage_no_increment_serial(self):
         self.service._update_zone_in_storage = mock.Mock()
+        self.service._journal_recordset_changes = mock.Mock()
         self.service._delete_recordset_in_storage(
             self.context,
             unit.RoObject(serial=1, shared=self.zone_shared),
@@ -1535,16 +1548,22 @@ class IsSubzoneTestCase(CentralBasic):
     def setUp(self):
         super().setUp()
 
-        def find_zone(ctx, criterion):
-            LOG.debug('Calling find_zone on %r' % criterion)
-            if criterion['name'] == 'example.com.':
-                LOG.debug('Returning %r' % criterion['name'])
-                return criterion['name']
+        def find_closest_zones(ctx, name, criterion=None, strict=False,
+                               unique=False):
+            LOG.debug('Calling find_closest_zones on %r' % name)
+            labels = name.split('.')
+            ancestors = [
+                '.'.join(labels[i:])
+                for i in range(1 if strict else 0, len(labels) - 1)
+            ]
+            if 'example.com.' in ancestors:
+                LOG.debug('Returning %r' % 'example.com.')
+                return ['example.com.']
 
             LOG.debug('Not found')
-            raise exceptions.ZoneNotFound
+            return []
 
-        self.service.storage.find_zone = find_zone
+        self.service.storage.find_closest_zones = find_closest_zones
 
     def test_is_subzone_false(self):
         r = self.service._is_subzone(self.context, 'com',
@@ -1772,6 +1791,7 @@ class CentralQuotaTest(designate.tests.functional.TestCase):
 
     def test_zone_record_quota_allows_lowering_value(self):
         self.service._quota = mock.Mock()
+        self.service.storage.get_zone_counters.return_value = {'records': 10}
         self.service.storage.count_records.return_value = 10
 
         recordset = mock.Mock(spec=objects.RecordSet)
@@ -1806,13 +1826,13 @@ class CentralQuotaTest(designate.tests.functional.TestCase):
         self.service.quota.get_quotas.return_value = self.quotas_of_one
 
         # Test creating one zone, 1 quota, no existing zones
-        self.service.storage.count_zones.return_value = 0
+        self.service.storage.get_tenant_zone_count.return_value = 0
         self.assertIsNone(
             self.service._enforce_zone_quota(self.context, 'fake_project_id')
         )
 
         # Test creating one zone, 1 quota, one existing zone
-        self.service.storage.count_zones.return_value = 1
+        self.service.storage.get_tenant_zone_count.return_value = 1
         self.assertRaisesRegex(
             exceptions.OverQuota,
             'Quota exceeded for zones',
@@ -1824,7 +1844,9 @@ class CentralQuotaTest(designate.tests.functional.TestCase):
         self.service.quota.get_quotas.return_value = self.quotas_of_one
 
         # Test creating one recordset, 1 quota, no existing recordsets
-        self.service.storage.count_recordsets.return_value = 0
+        self.service.storage.get_zone_counters.return_value = {
+            'recordsets': 0
+        }
         self.assertIsNone(
             self.service._enforce_recordset_quota(
                 self.context, self.zone
@@ -1832,7 +1854,9 @@ class CentralQuotaTest(designate.tests.functional.TestCase):
         )
 
         # Test creating one recordset, 1 quota, one existing recordset
-        self.service.storage.count_recordsets.return_value = 1
+        self.service.storage.get_zone_counters.return_value = {
+            'recordsets': 1
+        }
         self.assertRaisesRegex(
             exceptions.OverQuota,
             'Quota exceeded for zone_recordsets',
@@ -1843,14 +1867,14 @@ class CentralQuotaTest(designate.tests.functional.TestCase):
     def test_enforce_record_quota(self):
         self.service.quota.get_quotas.return_value = self.quotas_of_one
 
-        self.service.storage.count_records.side_effect = [
-            0, 0,
-            1, 0,
-            0, 1,
-            1, 1,
-            1, 1,
-            1, 1,
+        self.service.storage.get_zone_counters.side_effect = [
+            {'records': 0},
+            {'records': 1},
+            {'records': 0},
+            {'records': 1},
+            {'records': 1},
         ]
+        self.service.storage.count_records.side_effect = [0, 0, 1, 1, 1]
 
         managed_recordset = mock.Mock(spec=objects.RecordSet)
         managed_recordset.managed = True
@@ -1865,6 +1889,7 @@ class CentralQuotaTest(designate.tests.functional.TestCase):
                 self.context, self.zone, managed_recordset
             )
         )
+        self.service.storage.get_zone_counters.assert_not_called()
         self.service.storage.count_records.assert_not_called()
 
         # Test creating recordset with one record, no existing zone records,
@@ -1919,6 +1944,9 @@ class CentralQuotaTest(designate.tests.functional.TestCase):
         mock_zone = MockZone()
         mock_zone.shared = True
         self.service.quota.limit_check = mock.Mock()
+        self.service.storage.get_zone_counters = mock.Mock(
+            return_value={'records': 1}
+        )
         self.service.storage.count_records = mock.Mock(return_value=1)
         self.service._enforce_record_quota(
             self.context, mock_zone, recordset_one_record
@@ -32,6 +32,7 @@ from oslo_messaging.rpc import dispatcher as rpc_dispatcher
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
 from oslo_versionedobjects import exception as ovo_exc
+from sqlalchemy import select
 import testtools
 
 from designate.common import constants
@@ -658,6 +659,87 @@ class CentralServiceTest(designate.tests.functional.TestCase):
 
         self.assertEqual(exceptions.OverQuota, exc.exc_info[0])
 
+    def _get_zone_with_recordsets(self, recordsets):
+        zone = objects.Zone.from_dict(self.get_zone_fixture())
+        zone.tenant_id = self.admin_context.project_id
+        zone.recordsets = objects.RecordSetList(objects=[
+            objects.RecordSet(
+                name=name, type=rrtype,
+                records=objects.RecordList(objects=[
+                    objects.Record(data=data)
+                ])
+            )
+            for name, rrtype, data in recordsets
+        ])
+        return zone
+
+    def test_create_zone_with_recordsets(self):
+        zone = self.central_service.create_zone(
+            self.admin_context, self._get_zone_with_recordsets([
+                ('www.example.com.', 'A', '192.0.2.1'),
+                ('www.example.com.', 'AAAA', '2001:db8::1'),
+                ('ftp.example.com.', 'CNAME', 'www.example.com.'),
+            ])
+        )
+
+        recordsets = self.central_service.find_recordsets(
+            self.admin_context, {'zone_id': zone.id}
+        )
+        self.assertEqual(
+            [('example.com.', 'NS'), ('example.com.', 'SOA'),
+             ('ftp.example.com.', 'CNAME'), ('www.example.com.', 'A'),
+             ('www.example.com.', 'AAAA')],
+            sorted((rrset.name, rrset.type) for rrset in recordsets)
+        )
+        for recordset in recordsets:
+            for record in recordset.records:
+                self.assertEqual(zone.serial, record.serial)
+                self.assertEqual('CREATE', record.action)
+
+    def test_create_zone_with_recordsets_cname_conflict(self):
+        zone = self._get_zone_with_recordsets([
+            ('www.example.com.', 'A', '192.0.2.1'),
+            ('www.example.com.', 'CNAME', 'ftp.example.com.'),
+        ])
+
+        exc = self.assertRaises(
+            rpc_dispatcher.ExpectedException,
+            self.central_service.create_zone, self.admin_context, zone
+        )
+
+        self.assertEqual(exceptions.InvalidRecordSetLocation, exc.exc_info[0])
+        self.assertRaises(
+            exceptions.ZoneNotFound, self.storage.find_zone,
+            self.admin_context, {'name': 'example.com.'}
+        )
+
+    def test_create_zone_with_recordsets_cname_at_apex(self):
+        zone = self._get_zone_with_recordsets([
+            ('example.com.', 'CNAME', 'example.org.'),
+        ])
+
+        exc = self.assertRaises(
+            rpc_dispatcher.ExpectedException,
+            self.central_service.create_zone, self.admin_context, zone
+        )
+
+        self.assertEqual(exceptions.InvalidRecordSetLocation, exc.exc_info[0])
+
+    def test_create_zone_with_recordsets_over_quota(self):
+        self.config(quota_zone_records=2)
+        zone = self._get_zone_with_recordsets([
+            ('www.example.com.', 'A', '192.0.2.1'),
+            ('ftp.example.com.', 'A', '192.0.2.2'),
+            ('mail.example.com.', 'A', '192.0.2.3'),
+        ])
+
+        exc = self.assertRaises(
+            rpc_dispatcher.ExpectedException,
+            self.central_service.create_zone, self.admin_context, zone
+        )
+
+        self.assertEqual(exceptions.OverQuota, exc.exc_info[0])
+
     def test_create_zone_custom_ttl(self):
         self.config(default_ttl=30)
 
@@ -1581,6 +1663,46 @@ class CentralServiceTest(designate.tests.functional.TestCase):
         self._assert_count_all_zones(0)
         self.assertEqual(1, purge_cnt)
 
+    @mock.patch.object(notifier.Notifier, "info")
+    def test_purge_zones_removes_recordsets(self, mock_notifier):
+        zone = self.create_zone()
+        self.create_recordset(zone)
+        kept_zone = self.create_zone(fixture=1)
+        self.create_recordset(kept_zone)
+        self._delete_zone(zone, datetime.datetime(2015, 7, 20, 0, 0))
+
+        purge_cnt = self.central_service.purge_zones(
+            self.admin_context,
+            {
+                'deleted': '!0',
+            },
+            limit=100,
+        )
+
+        self.assertEqual(1, purge_cnt)
+        with sql.get_read_session() as session:
+            for table in (tables.recordsets, tables.records):
+                rows = session.execute(
+                    select(table.c.zone_id).distinct()
+                ).fetchall()
+                self.assertEqual([kept_zone.id], [row[0] for row in rows])
+
+    @mock.patch.object(notifier.Notifier, "info")
+    def test_purge_zones_adjusts_zone_count(self, mock_notifier):
+        zone = self.create_zone()
+        self.create_zone(fixture=1)
+
+        self.central_service.purge_zones(
+            self.admin_context,
+            {
+                'name': zone.name,
+            },
+            limit=100,
+        )
+
+        self.assertEqual(1, self.storage.get_tenant_zone_count(
+            self.admin_context, zone.tenant_id))
+
     @mock.patch.object(notifier.Notifier, "info")
     def test_purge_zones_without_any_criterion(self, mock_notifier):
         with testtools.ExpectedException(TypeError):
@@ -2174,6 +2296,141 @@ class CentralServiceTest(designate.tests.functional.TestCase):
         # Ensure the new value took
         self.assertEqual(1800, recordset.ttl)
 
+    def _increment_zone_serial(self, zone, serial):
+        with mock.patch.object(timeutils, 'utcnow_ts', return_value=serial):
+            return self.central_service.increment_zone_serial(
+                self.admin_context, zone
+            )
+
+    def _find_zone_journal(self, zone, serial):
+        return [
+            tuple(row)[2:] for row in self.storage.find_zone_journal(
+                self.admin_context, zone.id, serial
+            )
+        ]
+
+    def test_zone_journal(self):
+        zone = self.create_zone()
+        serial = zone.serial
+
+        recordset = self.create_recordset(zone)
+        recordset.ttl = 1800
+        recordset = self.central_service.update_recordset(
+            self.admin_context, recordset
+        )
+        self.central_service.delete_recordset(
+            self.admin_context, zone.id, recordset.id
+        )
+
+        self.assertEqual([], self._find_zone_journal(zone, serial))
+
+        self.assertEqual(
+            serial + 5, self._increment_zone_serial(zone, serial + 5)
+        )
+
+        name = recordset.name
+        self.assertEqual(
+            [
+                ('ADD', name, 'A', zone.ttl, '192.0.2.1'),
+                ('DELETE', name, 'A', zone.ttl, '192.0.2.1'),
+                ('ADD', name, 'A', 1800, '192.0.2.1'),
+                ('DELETE', name, 'A', 1800, '192.0.2.1'),
+                ('SOA', None, None, None, None),
+            ],
+            self._find_zone_journal(zone, serial)
+        )
+
+    def test_zone_journal_zone_ttl(self):
+        zone = self.create_zone()
+        serial = zone.serial
+
+        zone.ttl = 1800
+        self.central_service.update_zone(self.admin_context, zone)
+        self._increment_zone_serial(zone, serial + 5)
+
+        self.assertEqual(
+            [
+                ('RESET', None, None, None, None),
+                ('SOA', None, None, None, None),
+            ],
+            self._find_zone_journal(zone, serial)
+        )
+
+    def test_zone_journal_serial_wrap(self):
+        zone = self.create_zone()
+        self._increment_zone_serial(zone, 4294967295)
+
+        recordset = self.create_recordset(zone)
+
+        # The serial wraps around, it is still a new version of the zone
+        self.assertEqual(5, self._increment_zone_serial(zone, 5))
+
+        self.assertEqual(
+            [
+                ('ADD', recordset.name, 'A', zone.ttl, '192.0.2.1'),
+                ('SOA', None, None, None, None),
+            ],
+            self._find_zone_journal(zone, 4294967295)
+        )
+
+    def test_zone_journal_secondary_zone(self):
+        fixture = self.get_zone_fixture('SECONDARY', 0)
+        fixture['email'] = CONF['service:central'].managed_resource_email
+        fixture['masters'] = [{'host': '192.0.2.10', 'port': 53}]
+        zone = self.create_zone(**fixture)
+
+        self._increment_zone_serial(zone, zone.serial + 5)
+
+        self.assertEqual([], self._find_zone_journal(zone, 0))
+
+    def test_increment_zone_serials(self):
+        zones = [
+            self.create_zone(
+                name='example%d.org.' % index,
+                increment_serial=increment_serial
+            )
+            for index, increment_serial in enumerate((True, True, False))
+        ]
+        serial = max(zone.serial for zone in zones) + 5
+
+        with mock.patch.object(timeutils, 'utcnow_ts', return_value=serial):
+            serials = self.central_service.increment_zone_serials(
+                self.admin_context, [zone.id for zone in zones]
+            )
+
+        self.assertEqual({zones[0].id: serial, zones[1].id: serial}, serials)
+        for zone in zones[:2]:
+            self.assertEqual(
+                [('SOA', None, None, None, None)],
+                self._find_zone_journal(zone, zone.serial)
+            )
+            self.assertFalse(
+                self.storage.get_zone(
+                    self.admin_context, zone.id).increment_serial
+            )
+
+            soa = self.central_service.find_recordset(
+                self.admin_context, {'zone_id': zone.id, 'type': 'SOA'}
+            )
+            self.assertEqual(str(serial), soa.records[0].data.split()[2])
+            self.assertEqual(serial, soa.records[0].serial)
+            self.assertEqual('PENDING', soa.records[0].status)
+
+        self.assertEqual(
+            zones[2].serial,
+            self.storage.get_zone(self.admin_context, zones[2].id).serial
+        )
+
+    def test_increment_zone_serials_none_to_increment(self):
+        zone = self.create_zone()
+
+        self.assertEqual(
+            {},
+            self.central_service.increment_zone_serials(
+                self.admin_context, [zone.id]
+            )
+        )
+
     @unittest.expectedFailure  # FIXME
     def test_update_recordset_deadlock_retry(self):
         # Create a zone
@@ -4972,6 +5229,61 @@ class CentralServiceTest(designate.tests.functional.TestCase):
             self.admin_context, pool)
         self.assertTrue(updated_catalog_zone.increment_serial)
 
+    def test_catalog_member_zone_journal(self):
+        pool = self.create_pool(fixture=2)
+        self.create_tsigkey(scope='POOL', resource_id=pool.id)
+
+        self.storage._ensure_catalog_zone_config(self.admin_context, pool)
+        catalog_zone = self.storage.get_catalog_zone(self.admin_context, pool)
+        serial = catalog_zone.serial
+
+        member_zone = self.create_zone(
+            attributes=[{'key': 'pool_id', 'value': pool.id}])
+        self.central_service.delete_zone(self.admin_context, member_zone.id)
+        self._increment_zone_serial(catalog_zone, serial + 5)
+
+        name = f'{member_zone.id}.zones.{catalog_zone.name}'
+        self.assertEqual(
+            [
+                ('ADD', name, 'PTR', catalog_zone.ttl, member_zone.name),
+                ('DELETE', name, 'PTR', catalog_zone.ttl, member_zone.name),
+                ('SOA', None, None, None, None),
+            ],
+            self._find_zone_journal(catalog_zone, serial)
+        )
+
+    def test_pool_move_catalog_member_zone(self):
+        pool = self.create_pool(fixture=2)
+        self.create_tsigkey(scope='POOL', resource_id=pool.id)
+        self.storage._ensure_catalog_zone_config(self.admin_context, pool)
+        catalog_zone = self.storage.get_catalog_zone(self.admin_context, pool)
+        serial = catalog_zone.serial
+
+        member_zone = self.create_zone(
+            attributes=[{'key': 'pool_id', 'value': pool.id}])
+
+        second_pool = self.create_pool(fixture=1)
+        self.create_tsigkey(name='test-key-second-pool', scope='POOL',
+                            resource_id=second_pool.id)
+        self.storage.create_pool_ns_record(
+            self.admin_context, second_pool.id,
+            objects.PoolNsRecord(priority=1, hostname='ns-new.example.org.')
+        )
+
+        self.central_service.pool_move_zone(
+            self.admin_context, member_zone.id, second_pool.id)
+        self._increment_zone_serial(catalog_zone, serial + 5)
+
+        name = f'{member_zone.id}.zones.{catalog_zone.name}'
+        self.assertEqual(
+            [
+                ('ADD', name, 'PTR', catalog_zone.ttl, member_zone.name),
+                ('DELETE', name, 'PTR', catalog_zone.ttl, member_zone.name),
+                ('SOA', None, None, None, None),
+            ],
+            self._find_zone_journal(catalog_zone, serial)
+        )
+
     def test_enforce_catalog_zone_policy(self):
         pool = self.create_pool(fixture=2)
         catalog_zone = self.storage._create_catalog_zone(pool)
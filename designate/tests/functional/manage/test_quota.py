@@ -0,0 +1,48 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from io import StringIO
+from unittest import mock
+
+from sqlalchemy import text
+
+from designate.manage import quota
+from designate.storage import sql
+from designate.tests import base_fixtures
+import designate.tests.functional
+
+
+class ManageQuotaTestCase(designate.tests.functional.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.stdlog = base_fixtures.StandardLogging()
+        self.useFixture(self.stdlog)
+        self.command = quota.QuotaCommands()
+
+    def test_rebuild_counters(self):
+        zone = self.create_zone()
+        self.create_recordset(zone)
+
+        with sql.get_write_session() as session:
+            session.execute(text('UPDATE zones SET recordset_count = 0'))
+
+        with mock.patch('sys.stdout', new=StringIO()) as cmd_output:
+            self.command.rebuild_counters()
+
+        self.assertEqual(
+            'Rebuilt the counters of 1 zones and 1 projects\n',
+            cmd_output.getvalue()
+        )
+        self.assertEqual(
+            3,
+            self.storage.get_zone_counters(
+                self.admin_context, zone.id)['recordsets']
+        )
@@ -559,24 +559,21 @@ class MdnsRequestHandlerTest(designate.tests.functional.TestCase):
             'email': 'example@example.com',
         })
 
-        def _find_recordsets_axfr(context, criterion):
-            if criterion['type'] == 'SOA':
-                return [['UUID1', 'SOA', '3600', 'example.com.',
-                         'ns1.example.org. example.example.com. 1427899961 '
-                         '3600 600 86400 3600', 'ACTION']]
-
-            elif criterion['type'] == '!SOA':
-                return [
-                    ['UUID2', 'NS', '3600', 'example.com.', 'ns1.example.org.',
-                     'ACTION'],
-                    ['UUID3', 'A', '3600', 'mail.example.com.', '192.0.2.1',
-                     'ACTION'],
-                ]
+        def _iter_zone_axfr(context, zone_id, chunk_size=None):
+            return [
+                ['UUID1', 'SOA', '3600', 'example.com.',
+                 'ns1.example.org. example.example.com. 1427899961 '
+                 '3600 600 86400 3600', 'ACTION'],
+                ['UUID2', 'NS', '3600', 'example.com.', 'ns1.example.org.',
+                 'ACTION'],
+                ['UUID3', 'A', '3600', 'mail.example.com.', '192.0.2.1',
+                 'ACTION'],
+            ]
 
         with mock.patch.object(self.storage, 'find_zone',
                                return_value=zone):
-            with mock.patch.object(self.storage, 'find_recordsets_axfr',
-                                   side_effect=_find_recordsets_axfr):
+            with mock.patch.object(self.storage, 'iter_zone_axfr',
+                                   side_effect=_iter_zone_axfr):
                 request = dns.message.from_wire(binascii.a2b_hex(payload))
                 request.environ = {'addr': self.addr, 'context': self.context}
 
@@ -630,86 +627,33 @@ class MdnsRequestHandlerTest(designate.tests.functional.TestCase):
             'type': 'CATALOG'
         })
 
-        pool = objects.Pool.from_dict({
-            'name': 'POOL',
-
-        })
-
-        def _get_catalog_zone_records(context, pool):
-            records = []
-
-            soa_record = objects.RecordList()
-            soa_record.append(
-                objects.Record(
-                    data='invalid. '
-                         'example.example.com. '
-                         '1 '
-                         '600 '
-                         '86400 '
-                         '3600 '
-                         '3600'
-                )
-            )
-            soa = objects.RecordSet(
-                name='cat.example.com.',
-                type='SOA',
-                records=soa_record
-            )
-            records.append(soa)
-
-            ns_record = objects.RecordList()
-            ns_record.append(objects.Record(data='invalid.'))
-            records.append(
-                objects.RecordSet(
-                    name='cat.example.com.',
-                    type='NS',
-                    records=ns_record
-                )
-            )
-
-            txt_record = objects.RecordList()
-            txt_record.append(objects.Record(data='2'))
-            records.append(
-                objects.RecordSet(
-                    name='version.cat.example.com.',
-                    type='TXT',
-                    records=txt_record
-                )
-            )
-
-            ptr_record = objects.RecordList()
-            ptr_record.append(
-                objects.Record(
-                    data='a.example.com.'
-                )
-            )
-            records.append(
-                objects.RecordSet(
-                    name='18883.zones.cat.example.com.',
-                    type='PTR',
-                    records=ptr_record
-                )
-            )
-
-            records.append(soa)
-
-            return records
+        def _iter_catalog_zone_records(context, catalog_zone,
+                                       chunk_size=None):
+            return [
+                ['UUID1', 'SOA', None, 'cat.example.com.',
+                 'invalid. example.example.com. 1 600 86400 3600 3600',
+                 'NONE'],
+                ['cat.example.com.', 'NS', None, 'cat.example.com.',
+                 'invalid.', 'NONE'],
+                ['version.cat.example.com.', 'TXT', None,
+                 'version.cat.example.com.', '2', 'NONE'],
+                ['18883.zones.cat.example.com.', 'PTR', None,
+                 '18883.zones.cat.example.com.', 'a.example.com.', 'NONE'],
+            ]
 
         with mock.patch.object(self.storage, 'find_zone',
                                return_value=cat_zone):
-            with mock.patch.object(self.storage, 'find_pool',
-                                   return_value=pool):
-                with mock.patch.object(
-                        self.storage, 'get_catalog_zone_records',
-                        side_effect=_get_catalog_zone_records):
-                    request = dns.message.from_wire(binascii.a2b_hex(payload))
-                    request.environ = {'addr': self.addr,
-                                       'context': self.context}
+            with mock.patch.object(
+                    self.storage, 'iter_catalog_zone_records',
+                    side_effect=_iter_catalog_zone_records):
+                request = dns.message.from_wire(binascii.a2b_hex(payload))
+                request.environ = {'addr': self.addr,
+                                   'context': self.context}
 
-                    response = next(self.handler(request)).get_wire()
+                response = next(self.handler(request)).get_wire()
 
-                    self.assertEqual(
-                        expected_response, binascii.b2a_hex(response))
+                self.assertEqual(
+                    expected_response, binascii.b2a_hex(response))
 
     def test_dispatch_opcode_query_AXFR_multiple_messages(self):
         # Query is for example.com. IN AXFR
@@ -748,24 +692,21 @@ class MdnsRequestHandlerTest(designate.tests.functional.TestCase):
             'email': 'example@example.com',
         })
 
-        def _find_recordsets_axfr(context, criterion):
-            if criterion['type'] == 'SOA':
-                return [['UUID1', 'SOA', '3600', 'example.com.',
-                         'ns1.example.org. example.example.com. 1427899961 '
-                         '3600 600 86400 3600', 'ACTION']]
-
-            elif criterion['type'] == '!SOA':
-                return [
-                    ['UUID2', 'NS', '3600', 'example.com.', 'ns1.example.org.',
-                     'ACTION'],
-                    ['UUID3', 'A', '3600', 'mail.example.com.', '192.0.2.1',
-                     'ACTION'],
-                ]
+        def _iter_zone_axfr(context, zone_id, chunk_size=None):
+            return [
+                ['UUID1', 'SOA', '3600', 'example.com.',
+                 'ns1.example.org. example.example.com. 1427899961 '
+                 '3600 600 86400 3600', 'ACTION'],
+                ['UUID2', 'NS', '3600', 'example.com.', 'ns1.example.org.',
+                 'ACTION'],
+                ['UUID3', 'A', '3600', 'mail.example.com.', '192.0.2.1',
+                 'ACTION'],
+            ]
 
         with mock.patch.object(self.storage, 'find_zone',
                                return_value=zone):
-            with mock.patch.object(self.storage, 'find_recordsets_axfr',
-                                   side_effect=_find_recordsets_axfr):
+            with mock.patch.object(self.storage, 'iter_zone_axfr',
+                                   side_effect=_iter_zone_axfr):
                 request = dns.message.from_wire(binascii.a2b_hex(payload))
                 request.environ = {'addr': self.addr, 'context': self.context}
 
@@ -820,24 +761,21 @@ class MdnsRequestHandlerTest(designate.tests.functional.TestCase):
             'email': 'example@example.com',
         })
 
-        def _find_recordsets_axfr(context, criterion):
-            if criterion['type'] == 'SOA':
-                return [['UUID1', 'SOA', '3600', 'example.com.',
-                         'ns1.example.org. example.example.com. 1427899961 '
-                         '3600 600 86400 3600', 'ACTION']]
-
-            elif criterion['type'] == '!SOA':
-                return [
-                    ['UUID2', 'NS', '3600', 'example.com.', 'ns1.example.org.',
-                     'ACTION'],
-                    ['UUID3', 'A', '3600', 'mail.example.com.', '192.0.2.1',
-                     'ACTION'],
-                ]
+        def _iter_zone_axfr(context, zone_id, chunk_size=None):
+            return [
+                ['UUID1', 'SOA', '3600', 'example.com.',
+                 'ns1.example.org. example.example.com. 1427899961 '
+                 '3600 600 86400 3600', 'ACTION'],
+                ['UUID2', 'NS', '3600', 'example.com.', 'ns1.example.org.',
+                 'ACTION'],
+                ['UUID3', 'A', '3600', 'mail.example.com.', '192.0.2.1',
+                 'ACTION'],
+            ]
 
         with mock.patch.object(self.storage, 'find_zone',
                                return_value=zone):
-            with mock.patch.object(self.storage, 'find_recordsets_axfr',
-                                   side_effect=_find_recordsets_axfr):
+            with mock.patch.object(self.storage, 'iter_zone_axfr',
+                                   side_effect=_iter_zone_axfr):
                 request = dns.message.from_wire(binascii.a2b_hex(payload))
                 request.environ = {'addr': self.addr, 'context': self.context}
 
@@ -907,24 +845,21 @@ class MdnsRequestHandlerTest(designate.tests.functional.TestCase):
             'email': 'example@example.com',
         })
 
-        def _find_recordsets_axfr(context, criterion):
-            if criterion['type'] == 'SOA':
-                return [['UUID1', 'SOA', '3600', 'example.com.',
-                         'ns1.example.org. example.example.com. 1427899961 '
-                         '3600 600 86400 3600', 'ACTION']]
-
-            elif criterion['type'] == '!SOA':
-                return [
-                    ['UUID2', 'NS', '3600', 'example.com.', 'a' * 63 + '.',
-                     'ACTION'],
-                    ['UUID2', 'NS', '3600', 'example.com.', 'b' * 10 + '.',
-                     'ACTION'],
-                ]
+        def _iter_zone_axfr(context, zone_id, chunk_size=None):
+            return [
+                ['UUID1', 'SOA', '3600', 'example.com.',
+                 'ns1.example.org. example.example.com. 1427899961 '
+                 '3600 600 86400 3600', 'ACTION'],
+                ['UUID2', 'NS', '3600', 'example.com.', 'a' * 63 + '.',
+                 'ACTION'],
+                ['UUID2', 'NS', '3600', 'example.com.', 'b' * 10 + '.',
+                 'ACTION'],
+            ]
 
         with mock.patch.object(self.storage, 'find_zone',
                                return_value=zone):
-            with mock.patch.object(self.storage, 'find_recordsets_axfr',
-                                   side_effect=_find_recordsets_axfr):
+            with mock.patch.object(self.storage, 'iter_zone_axfr',
+                                   side_effect=_iter_zone_axfr):
                 request = dns.message.from_wire(binascii.a2b_hex(payload))
                 request.environ = {'addr': self.addr, 'context': self.context}
 
@@ -985,22 +920,19 @@ class MdnsRequestHandlerTest(designate.tests.functional.TestCase):
             'email': 'example@example.com',
         })
 
-        def _find_recordsets_axfr(context, criterion):
-            if criterion['type'] == 'SOA':
-                return [['UUID1', 'SOA', '3600', 'example.com.',
-                         'ns1.example.org. example.example.com. 1427899961 '
-                         '3600 600 86400 3600', 'ACTION']]
-
-            elif criterion['type'] == '!SOA':
-                return [
-                    ['UUID2', 'NS', '3600', 'example.com.',
-                     'a' * 63 + '.' + 'a' * 63 + '.', 'ACTION'],
-                ]
+        def _iter_zone_axfr(context, zone_id, chunk_size=None):
+            return [
+                ['UUID1', 'SOA', '3600', 'example.com.',
+                 'ns1.example.org. example.example.com. 1427899961 '
+                 '3600 600 86400 3600', 'ACTION'],
+                ['UUID2', 'NS', '3600', 'example.com.',
+                 'a' * 63 + '.' + 'a' * 63 + '.', 'ACTION'],
+            ]
 
         with mock.patch.object(self.storage, 'find_zone',
                                return_value=zone):
-            with mock.patch.object(self.storage, 'find_recordsets_axfr',
-                                   side_effect=_find_recordsets_axfr):
+            with mock.patch.object(self.storage, 'iter_zone_axfr',
+                                   side_effect=_iter_zone_axfr):
                 request = dns.message.from_wire(binascii.a2b_hex(payload))
                 request.environ = {'addr': self.addr, 'context': self.context}
 
@@ -100,6 +100,45 @@ class DeletedZonePurgeTest(designate.tests.functional.TestCase):
         self.assertEqual(len(remaning_zones), self.number_of_zones // 2)
 
 
+class ZoneJournalPurgeTest(designate.tests.functional.TestCase):
+    time_threshold = 24 * 60 * 60
+
+    def setUp(self):
+        super().setUp()
+        self.config(
+            time_threshold=self.time_threshold,
+            group='producer_task:zone_journal_purge'
+        )
+        self.purge_task_fixture = self.useFixture(
+            base_fixtures.ZoneManagerTaskFixture(tasks.ZoneJournalPurgeTask)
+        )
+
+    def test_purge_zone_journal(self):
+        zone = self.create_zone()
+
+        self.storage.create_zone_journal_entries(
+            self.admin_context, zone.id, [
+                ('ADD', 'www.example.com.', 'A', 3600, '192.0.2.1'),
+            ]
+        )
+        self.storage.publish_zone_journal(self.admin_context, zone.id, 1, 2)
+        self.storage.publish_zone_journal(self.admin_context, zone.id, 2, 3)
+
+        # Age the first version past the retention period.
+        delta = datetime.timedelta(seconds=self.time_threshold * 2)
+        query = tables.zone_journal.update().where(
+            tables.zone_journal.c.serial_to == 2).values(
+            created_at=timeutils.utcnow() - delta
+        )
+        with sql.get_write_session() as session:
+            session.execute(query)
+
+        self.purge_task_fixture.task()
+
+        rows = self.storage.find_zone_journal(self.admin_context, zone.id, 1)
+        self.assertEqual([(2, 3)], [tuple(row)[:2] for row in rows])
+
+
 class PeriodicGenerateDelayedNotifyTaskTest(
         designate.tests.functional.TestCase):
     number_of_zones = 20
@@ -194,8 +233,15 @@ class PeriodicIncrementSerialTaskTest(designate.tests.functional.TestCase):
 
         self.increment_serial_task_fixture.task()
 
-        self.worker_api.update_zone.assert_called()
-        self.assertEqual(5, self.worker_api.update_zone.call_count)
+        self.worker_api.update_zones.assert_called_once()
+        zones = self.worker_api.update_zones.call_args[0][1]
+        self.assertEqual(5, len(zones))
+        for zone in zones:
+            self.assertFalse(zone.delayed_notify)
+            self.assertEqual(
+                zone.serial,
+                self.storage.get_zone(self.admin_context, zone.id).serial
+            )
 
 
 class PeriodicSecondaryRefreshTaskTest(designate.tests.functional.TestCase):
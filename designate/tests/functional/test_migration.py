@@ -133,6 +133,15 @@ class DesignateMigrationsWalk(
     def _check_f49c4409c8ba(self, connection):
         pass
 
+    def _check_0446b8a1b9c3(self, connection):
+        pass
+
+    def _check_38a06515225b(self, connection):
+        pass
+
+    def _check_7c3f5a9d2e81(self, connection):
+        pass
+
     def test_single_base_revision(self):
         script = alembic_script.ScriptDirectory.from_config(self.config)
         self.assertEqual(1, len(script.get_bases()))
@@ -19,6 +19,7 @@ from unittest import mock
 
 from oslo_log import log as logging
 from oslo_messaging.rpc import dispatcher as rpc_dispatcher
+from oslo_utils import timeutils
 from oslo_utils import uuidutils
 
 import designate.conf
@@ -26,7 +27,9 @@ from designate.conf.mdns import DEFAULT_MDNS_PORT
 from designate import exceptions
 from designate import objects
 from designate import storage
+from designate.storage import cache
 from designate.storage import sql
+from designate.storage.sqlalchemy import utils as sqlalchemy_utils
 import designate.tests.functional
 
 
@@ -159,6 +162,51 @@ class SqlalchemyStorageTest(designate.tests.functional.TestCase):
 
                 item_number += 1
 
+    def _ensure_token_paging(self, data, method, criterion=None, **kwargs):
+        """
+        Given an array of created items we iterate through them making sure
+        they match up to the pages returned by following the page tokens.
+        """
+        criterion = criterion or {}
+
+        results = method(self.admin_context, limit=2, criterion=criterion,
+                         page_token='', **kwargs)
+        # The first page is still counted
+        self.assertEqual(len(data), results.total_count)
+
+        items = list(results)
+        while results.next_page_token is not None:
+            results = method(self.admin_context, limit=2,
+                             criterion=dict(criterion),
+                             page_token=results.next_page_token, **kwargs)
+            self.assertIsNone(results.total_count)
+            items.extend(results)
+
+        self.assertEqual(
+            [item['id'] for item in data], [item['id'] for item in items])
+
+    def test_paging_page_token_invalid(self):
+        self.assertRaisesRegex(
+            exceptions.InvalidPageToken,
+            'Invalid page token',
+            self.storage.find_zones, self.admin_context,
+            limit=5, page_token='invalid'
+        )
+
+    def test_paging_page_token_other_sort(self):
+        self.create_zone(fixture=0)
+        self.create_zone(fixture=1)
+
+        results = self.storage.find_zones(
+            self.admin_context, limit=1, page_token='')
+
+        self.assertRaisesRegex(
+            exceptions.InvalidPageToken,
+            'The page token does not match the sort key and direction',
+            self.storage.find_zones, self.admin_context,
+            limit=1, sort_key='name', page_token=results.next_page_token
+        )
+
     def test_paging_marker_not_found(self):
         self.assertRaisesRegex(
             exceptions.MarkerNotFound,
@@ -736,6 +784,77 @@ class SqlalchemyStorageTest(designate.tests.functional.TestCase):
         # Ensure we can page through the results.
         self._ensure_paging(created, self.storage.find_zones)
 
+    def test_find_zones_token_paging(self):
+        # Create 5 zones
+        created = [self.create_zone(name='example-%d.org.' % i)
+                   for i in range(5)]
+
+        # Ensure we can page through the results, in both directions.
+        self._ensure_token_paging(created, self.storage.find_zones)
+        self._ensure_token_paging(
+            created[::-1], self.storage.find_zones, sort_key='name',
+            sort_dir='desc')
+
+    def test_find_zones_total_count_exact(self):
+        self.create_zone()
+
+        zones = self.storage.find_zones(self.admin_context)
+
+        self.assertEqual(1, zones.total_count)
+        self.assertEqual('exact', zones.total_count_type)
+
+    @mock.patch.object(cache, '_count_cache', None)
+    def test_find_zones_total_count_cached(self):
+        self.config(cache_ttl=10, group='storage:count')
+        self.create_zone(fixture=0)
+
+        zones = self.storage.find_zones(self.admin_context)
+        self.assertEqual(1, zones.total_count)
+        self.assertEqual('exact', zones.total_count_type)
+
+        # The zones created within the TTL are not counted.
+        self.create_zone(fixture=1)
+        zones = self.storage.find_zones(self.admin_context)
+        self.assertEqual(2, len(zones))
+        self.assertEqual(1, zones.total_count)
+        self.assertEqual('cached', zones.total_count_type)
+
+        # Other criteria are counted on their own.
+        zones = self.storage.find_zones(
+            self.admin_context, {'type': 'PRIMARY'})
+        self.assertEqual(2, zones.total_count)
+        self.assertEqual('exact', zones.total_count_type)
+
+    @mock.patch.object(sqlalchemy_utils, 'estimate_rows')
+    def test_find_recordsets_total_count_estimated(self, mock_estimate_rows):
+        zone = self.create_zone()
+        self.config(strategy='auto', estimate_threshold=100,
+                    group='storage:count')
+
+        mock_estimate_rows.return_value = 500
+        recordsets = self.storage.find_recordsets(
+            self.admin_context, {'zone_id': zone.id})
+        self.assertEqual(500, recordsets.total_count)
+        self.assertEqual('estimated', recordsets.total_count_type)
+
+        # Below the threshold the recordsets are counted.
+        mock_estimate_rows.return_value = 100
+        recordsets = self.storage.find_recordsets(
+            self.admin_context, {'zone_id': zone.id})
+        self.assertEqual(2, recordsets.total_count)
+        self.assertEqual('exact', recordsets.total_count_type)
+
+    def test_find_recordsets_total_count_auto_without_estimates(self):
+        self.config(strategy='auto', estimate_threshold=0,
+                    group='storage:count')
+        zone = self.create_zone()
+
+        # SQLite gives no estimates, so the recordsets are always counted.
+        recordsets = self.storage.find_recordsets(
+            self.admin_context, {'zone_id': zone.id})
+        self.assertEqual(2, recordsets.total_count)
+        self.assertEqual('exact', recordsets.total_count_type)
+
     def test_find_zones_criterion(self):
         zone_one = self.create_zone()
         zone_two = self.create_zone(fixture=1)
@@ -822,6 +941,41 @@ class SqlalchemyStorageTest(designate.tests.functional.TestCase):
         self.assertEqual(expected['email'], actual['email'])
         self.assertIn('status', actual)
 
+    def test_get_version(self):
+        zone = self.create_zone()
+
+        self.assertEqual(
+            1, self.storage.get_version(self.admin_context, 'zones', zone.id)
+        )
+
+        self.storage.increment_serial(self.admin_context, zone.id)
+
+        self.assertEqual(
+            2, self.storage.get_version(self.admin_context, 'zones', zone.id)
+        )
+
+    def test_get_version_missing(self):
+        self.assertIsNone(self.storage.get_version(
+            self.admin_context, 'zones', 'caf771fc-6b05-4891-bee1-c2a48621f57b'
+        ))
+
+    def test_get_table_version(self):
+        empty = self.storage.get_table_version(self.admin_context, 'tlds')
+
+        tld = self.create_tld(fixture=0)
+        created = self.storage.get_table_version(self.admin_context, 'tlds')
+        self.assertNotEqual(empty, created)
+
+        tld.description = 'updated'
+        self.storage.update_tld(self.admin_context, tld)
+        updated = self.storage.get_table_version(self.admin_context, 'tlds')
+        self.assertNotEqual(created, updated)
+
+        self.storage.delete_tld(self.admin_context, tld.id)
+        self.assertEqual(
+            empty, self.storage.get_table_version(self.admin_context, 'tlds')
+        )
+
     def test_get_zone_missing(self):
         uuid = 'caf771fc-6b05-4891-bee1-c2a48621f57b'
 
@@ -924,6 +1078,95 @@ class SqlalchemyStorageTest(designate.tests.functional.TestCase):
 
         self.assertEqual(zone['name'], result['name'])
 
+    def test_find_closest_zones(self):
+        zone = self.create_zone(name='example.org.')
+        subzone = self.create_zone(name='sub.example.org.')
+
+        result = self.storage.find_closest_zones(
+            self.admin_context, 'www.a.sub.example.org.'
+        )
+        self.assertEqual([subzone.id], [z.id for z in result])
+
+        result = self.storage.find_closest_zones(
+            self.admin_context, 'sub.example.org.'
+        )
+        self.assertEqual([subzone.id], [z.id for z in result])
+
+        result = self.storage.find_closest_zones(
+            self.admin_context, 'sub.example.org.', strict=True
+        )
+        self.assertEqual([zone.id], [z.id for z in result])
+
+        result = self.storage.find_closest_zones(
+            self.admin_context, 'www.example.org.'
+        )
+        self.assertEqual([zone.id], [z.id for z in result])
+
+    def test_find_closest_zones_criterion(self):
+        zone = self.create_zone(name='example.org.')
+
+        result = self.storage.find_closest_zones(
+            self.admin_context, 'www.example.org.',
+            {'pool_id': zone.pool_id}
+        )
+        self.assertEqual([zone.id], [z.id for z in result])
+
+        result = self.storage.find_closest_zones(
+            self.admin_context, 'www.example.org.',
+            {'pool_id': '6d6d0e0b-1cc4-4e2c-9d6b-5cd05f6e0a4d'}
+        )
+        self.assertEqual(0, len(result))
+
+    def test_find_closest_zones_unique(self):
+        context = self.get_admin_context()
+        context.all_tenants = True
+        zone = self.create_zone(name='example.org.')
+        pool = self.create_pool(fixture=1)
+
+        # The same name in two tenants, in different pools
+        subzones = []
+        for tenant_id, pool_id in (('One', zone.pool_id), ('Two', pool.id)):
+            subzones.append(self.storage.create_zone(
+                context, objects.Zone.from_dict({
+                    'tenant_id': tenant_id,
+                    'name': 'sub.example.org.',
+                    'email': 'example@example.org',
+                    'pool_id': pool_id,
+                })
+            ))
+
+        result = self.storage.find_closest_zones(
+            context, 'www.sub.example.org.'
+        )
+        self.assertEqual(
+            sorted(z.id for z in subzones), sorted(z.id for z in result)
+        )
+
+        # The ambiguous name is skipped for its parent
+        result = self.storage.find_closest_zones(
+            context, 'www.sub.example.org.', unique=True
+        )
+        self.assertEqual([zone.id], [z.id for z in result])
+
+        result = self.storage.find_closest_zones(
+            context, 'www.sub.example.org.',
+            {'pool_id': pool.id}, unique=True
+        )
+        self.assertEqual([subzones[1].id], [z.id for z in result])
+
+    def test_find_closest_zones_missing(self):
+        self.create_zone(name='example.org.')
+
+        result = self.storage.find_closest_zones(
+            self.admin_context, 'www.example.net.'
+        )
+        self.assertEqual(0, len(result))
+
+        result = self.storage.find_closest_zones(
+            self.admin_context, 'example.org.', strict=True
+        )
+        self.assertEqual(0, len(result))
+
     def test_update_zone(self):
         # Create a zone
         zone = self.create_zone(name='example.org.')
@@ -1010,6 +1253,102 @@ class SqlalchemyStorageTest(designate.tests.functional.TestCase):
         )
         self.assertEqual(3, len(recordsets))
 
+    def _get_secondary_recordsets(self, rrsets):
+        return objects.RecordSetList(objects=[
+            objects.RecordSet(
+                name=name, type=rrtype, ttl=ttl,
+                records=objects.RecordList(objects=[
+                    objects.Record(data=data) for data in datas
+                ])
+            )
+            for name, rrtype, ttl, datas in rrsets
+        ])
+
+    def test_update_zone_secondary_sync_recordsets(self):
+        fixture = self.get_zone_fixture('SECONDARY', 1)
+        fixture['email'] = 'root@example.com'
+        zone = self.create_zone(**fixture)
+        name = zone.name
+
+        zone.recordsets = self._get_secondary_recordsets([
+            ('same.%s' % name, 'A', 300, ['192.0.2.1', '192.0.2.2']),
+            ('ttl.%s' % name, 'A', 300, ['192.0.2.3']),
+            ('data.%s' % name, 'A', 300, ['192.0.2.4']),
+            ('gone.%s' % name, 'A', 300, ['192.0.2.5']),
+        ])
+        zone = self.storage.update_zone(self.admin_context, zone)
+
+        before = {
+            rrset.name: rrset for rrset in self.storage.find_recordsets(
+                self.admin_context, {'zone_id': zone.id})
+        }
+
+        # The records of an unchanged recordset can come in any order.
+        zone.recordsets = self._get_secondary_recordsets([
+            ('same.%s' % name, 'A', 300, ['192.0.2.2', '192.0.2.1']),
+            ('ttl.%s' % name, 'A', 600, ['192.0.2.3']),
+            ('data.%s' % name, 'A', 300, ['192.0.2.4', '192.0.2.6']),
+            ('new.%s' % name, 'A', 300, ['192.0.2.7']),
+        ])
+        self.storage.update_zone(self.admin_context, zone)
+
+        after = {
+            rrset.name: rrset for rrset in self.storage.find_recordsets(
+                self.admin_context, {'zone_id': zone.id})
+        }
+
+        self.assertEqual(
+            ['data.%s' % name, 'new.%s' % name, 'same.%s' % name,
+             'ttl.%s' % name],
+            sorted(after)
+        )
+
+        same = 'same.%s' % name
+        self.assertEqual(before[same].version, after[same].version)
+        self.assertEqual(
+            sorted(r.id for r in before[same].records),
+            sorted(r.id for r in after[same].records)
+        )
+
+        ttl = 'ttl.%s' % name
+        self.assertEqual(before[ttl].id, after[ttl].id)
+        self.assertEqual(before[ttl].version + 1, after[ttl].version)
+        self.assertEqual(600, after[ttl].ttl)
+
+        data = 'data.%s' % name
+        self.assertEqual(before[data].version + 1, after[data].version)
+        self.assertEqual(
+            ['192.0.2.4', '192.0.2.6'],
+            sorted(r.data for r in after[data].records)
+        )
+
+        self.assertEqual(
+            0, self.storage.count_records(
+                self.admin_context,
+                {'recordset_id': before['gone.%s' % name].id}
+            )
+        )
+
+        self.assertEqual(
+            {'recordsets': 4, 'records': 6},
+            self.storage.get_zone_counters(self.admin_context, zone.id)
+        )
+
+    def test_update_zone_secondary_sync_unchanged(self):
+        fixture = self.get_zone_fixture('SECONDARY', 1)
+        fixture['email'] = 'root@example.com'
+        zone = self.create_zone(**fixture)
+
+        rrsets = [('www.%s' % zone.name, 'A', None, ['192.0.2.1'])]
+        zone.recordsets = self._get_secondary_recordsets(rrsets)
+        zone = self.storage.update_zone(self.admin_context, zone)
+
+        zone.recordsets = self._get_secondary_recordsets(rrsets)
+        with mock.patch.object(self.storage, '_create_many') as create_many:
+            self.storage.update_zone(self.admin_context, zone)
+
+        create_many.assert_not_called()
+
     def test_update_zone_duplicate(self):
         # Create two zones
         zone_one = self.create_zone(fixture=0)
@@ -1139,6 +1478,108 @@ class SqlalchemyStorageTest(designate.tests.functional.TestCase):
         self.assertIsNotNone(recordset.records[0].id)
         self.assertIsNotNone(recordset.records[1].id)
 
+    def test_create_recordsets(self):
+        zone = self.create_zone()
+
+        recordsets = [
+            objects.RecordSet(
+                name='www.%s' % zone['name'], type='A', ttl=300,
+                records=objects.RecordList(objects=[
+                    objects.Record(data='192.0.2.1'),
+                    objects.Record(data='192.0.2.2'),
+                ])
+            ),
+            objects.RecordSet(
+                name='mail.%s' % zone['name'], type='A',
+                records=objects.RecordList(objects=[
+                    objects.Record(data='192.0.2.3', serial=5),
+                ])
+            ),
+            objects.RecordSet(name='ftp.%s' % zone['name'], type='A'),
+        ]
+
+        result = self.storage.create_recordsets(
+            self.admin_context, zone['id'], recordsets)
+
+        self.assertEqual(recordsets, result)
+        for recordset in recordsets:
+            self.assertIsNotNone(recordset.id)
+            self.assertEqual(1, recordset.version)
+            self.assertIsNotNone(recordset.created_at)
+            self.assertEqual(zone['id'], recordset.zone_id)
+            for record in recordset.records:
+                self.assertIsNotNone(record.id)
+                self.assertEqual(recordset.id, record.recordset_id)
+                self.assertEqual('PENDING', record.status)
+                self.assertEqual(32, len(record.hash))
+
+        # The records which were created without a serial got the default of
+        # the column.
+        self.assertEqual(1, recordsets[0].records[0].serial)
+        self.assertEqual(5, recordsets[1].records[0].serial)
+        self.assertEqual(0, len(recordsets[2].records))
+
+        for recordset in recordsets:
+            actual = self.storage.find_recordset(
+                self.admin_context, {'id': recordset.id})
+            self.assertEqual(recordset.name, actual.name)
+            self.assertEqual(recordset.ttl, actual.ttl)
+            self.assertEqual(
+                sorted(r.data for r in recordset.records),
+                sorted(r.data for r in actual.records)
+            )
+
+        # Ensure the reverse names of the recordsets were saved
+        self.assertEqual(3, len(self.storage.find_recordsets(
+            self.admin_context, {
+                'zone_id': zone['id'],
+                'reverse_name': ('.%s' % zone['name'])[::-1] + '%',
+            }
+        )))
+
+    def test_create_recordsets_duplicate(self):
+        zone = self.create_zone()
+
+        recordsets = [
+            objects.RecordSet(name='www.%s' % zone['name'], type='A'),
+            objects.RecordSet(name='www.%s' % zone['name'], type='A'),
+        ]
+
+        self.assertRaises(
+            exceptions.DuplicateRecordSet,
+            self.storage.create_recordsets,
+            self.admin_context, zone['id'], recordsets
+        )
+
+    def test_create_records(self):
+        zone = self.create_zone()
+        recordset = self.create_recordset(zone, records=[])
+
+        records = self.storage.create_records(
+            self.admin_context, zone['id'], recordset['id'], [
+                objects.Record(data='192.0.2.1'),
+                objects.Record(data='192.0.2.2'),
+            ]
+        )
+
+        self.assertEqual(2, len(records))
+        self.assertEqual(2, self.storage.count_records(
+            self.admin_context, {'recordset_id': recordset['id']}
+        ))
+
+    def test_create_records_duplicate(self):
+        zone = self.create_zone()
+        recordset = self.create_recordset(zone, records=[])
+
+        self.assertRaises(
+            exceptions.DuplicateRecord,
+            self.storage.create_records,
+            self.admin_context, zone['id'], recordset['id'], [
+                objects.Record(data='192.0.2.1'),
+                objects.Record(data='192.0.2.1'),
+            ]
+        )
+
     def test_find_recordsets_axfr(self):
         zone = self.create_zone()
         self.create_recordset(zone)
@@ -1148,6 +1589,41 @@ class SqlalchemyStorageTest(designate.tests.functional.TestCase):
         )
         self.assertEqual(3, len(result))
 
+    def test_iter_recordsets_axfr(self):
+        zone = self.create_zone()
+        self.create_recordset(zone)
+
+        expected = self.storage.find_recordsets_axfr(
+            self.admin_context, {'zone_id': zone['id']}
+        )
+        result = list(self.storage.iter_recordsets_axfr(
+            self.admin_context, {'zone_id': zone['id']}, chunk_size=1
+        ))
+        self.assertEqual(3, len(result))
+        self.assertEqual(list(expected), result)
+
+    def test_iter_zone_axfr(self):
+        zone = self.create_zone()
+        self.create_recordset(zone)
+        self.create_recordset(self.create_zone(fixture=1))
+
+        result = list(self.storage.iter_zone_axfr(
+            self.admin_context, zone['id'], chunk_size=1
+        ))
+        body = self.storage.find_recordsets_axfr(
+            self.admin_context, {'zone_id': zone['id'], 'type': '!SOA'}
+        )
+
+        self.assertEqual(3, len(result))
+        self.assertEqual('SOA', result[0][1])
+        self.assertEqual(list(body), result[1:])
+
+    def test_iter_zone_axfr_missing(self):
+        result = list(self.storage.iter_zone_axfr(
+            self.admin_context, '8b1b1c5e-8a1e-4b0a-9d2b-2a8d5e6f9c01'
+        ))
+        self.assertEqual([], result)
+
     def test_find_recordsets(self):
         zone = self.create_zone()
 
@@ -1185,6 +1661,28 @@ class SqlalchemyStorageTest(designate.tests.functional.TestCase):
         # Ensure we can page through the results.
         self._ensure_paging(created, self.storage.find_recordsets)
 
+    def test_find_recordsets_token_paging(self):
+        zone = self.create_zone(name='example.org.')
+
+        # Create 5 RecordSets
+        created = [self.create_recordset(zone, name='r-%d.example.org.' % i)
+                   for i in range(5)]
+
+        # Add in the SOA and NS recordsets that are automatically created
+        soa = self.storage.find_recordset(self.admin_context,
+                                          criterion={'zone_id': zone['id'],
+                                                     'type': 'SOA'})
+        ns = self.storage.find_recordset(self.admin_context,
+                                         criterion={'zone_id': zone['id'],
+                                                    'type': 'NS'})
+        created.insert(0, ns)
+        created.insert(0, soa)
+
+        # Ensure we can page through the results.
+        self._ensure_token_paging(
+            created, self.storage.find_recordsets,
+            criterion={'zone_id': zone['id']})
+
     def test_find_recordsets_criterion(self):
         zone = self.create_zone()
 
@@ -1709,6 +2207,95 @@ class SqlalchemyStorageTest(designate.tests.functional.TestCase):
             self.storage.update_record, self.admin_context, record
         )
 
+    def _create_status_records(self, zone, records):
+        recordset = self.create_recordset(zone, records=[])
+        return self.storage.create_records(
+            self.admin_context, zone['id'], recordset['id'], [
+                objects.Record(
+                    data='192.0.2.%d' % index, action=action, status=status,
+                    serial=serial
+                )
+                for index, (action, status, serial) in enumerate(records)
+            ]
+        )
+
+    def _get_records_status(self, records):
+        return [
+            (record.action, record.status, record.version)
+            for record in (
+                self.storage.get_record(self.admin_context, record.id)
+                for record in records
+            )
+        ]
+
+    def test_update_records_status_success(self):
+        zone = self.create_zone()
+        records = self._create_status_records(zone, [
+            ('CREATE', 'PENDING', 100),
+            ('UPDATE', 'ERROR', 100),
+            ('DELETE', 'PENDING', 100),
+            ('CREATE', 'PENDING', 200),
+            ('NONE', 'ACTIVE', 100),
+        ])
+
+        counts = self.storage.update_records_status(
+            self.admin_context, zone['id'], 'SUCCESS', 150)
+
+        self.assertEqual({'ACTIVE': 2, 'DELETED': 1}, counts)
+        self.assertEqual([
+            ('NONE', 'ACTIVE', 2),
+            ('NONE', 'ACTIVE', 2),
+            ('NONE', 'DELETED', 2),
+            ('CREATE', 'PENDING', 1),
+            ('NONE', 'ACTIVE', 1),
+        ], self._get_records_status(records))
+
+    def test_update_records_status_error(self):
+        zone = self.create_zone()
+        records = self._create_status_records(zone, [
+            ('CREATE', 'PENDING', 100),
+            ('UPDATE', 'ACTIVE', 100),
+            ('CREATE', 'PENDING', 200),
+        ])
+
+        counts = self.storage.update_records_status(
+            self.admin_context, zone['id'], 'ERROR', 150)
+
+        self.assertEqual({'ERROR': 1}, counts)
+        self.assertEqual([
+            ('CREATE', 'ERROR', 2),
+            ('UPDATE', 'ACTIVE', 1),
+            ('CREATE', 'PENDING', 1),
+        ], self._get_records_status(records))
+
+        # A serial of 0 applies to the records of any serial, the SOA and NS
+        # records of the zone included.
+        counts = self.storage.update_records_status(
+            self.admin_context, zone['id'], 'ERROR', 0)
+
+        self.assertEqual({'ERROR': 3}, counts)
+
+    def test_update_records_status_no_zone(self):
+        zone = self.create_zone()
+        records = self._create_status_records(zone, [
+            ('UPDATE', 'PENDING', 100),
+            ('DELETE', 'PENDING', 100),
+            ('CREATE', 'ERROR', 100),
+            ('NONE', 'ACTIVE', 100),
+        ])
+
+        counts = self.storage.update_records_status(
+            self.admin_context, zone['id'], 'NO_ZONE', 100)
+
+        # The SOA and NS records of the zone are updated too.
+        self.assertEqual({'ERROR': 3, 'DELETED': 1}, counts)
+        self.assertEqual([
+            ('CREATE', 'ERROR', 2),
+            ('NONE', 'DELETED', 2),
+            ('CREATE', 'ERROR', 1),
+            ('NONE', 'ACTIVE', 1),
+        ], self._get_records_status(records))
+
     def test_delete_record(self):
         zone = self.create_zone()
         recordset = self.create_recordset(zone)
@@ -1762,6 +2349,303 @@ class SqlalchemyStorageTest(designate.tests.functional.TestCase):
 
         self.assertEqual(0, records)
 
+    # Counter Tests
+    def test_zone_counters(self):
+        zone = self.create_zone()
+
+        # The SOA and NS records are managed.
+        self.assertEqual(
+            {'recordsets': 2, 'records': 0},
+            self.storage.get_zone_counters(self.admin_context, zone.id)
+        )
+
+        records = [
+            objects.Record.from_dict(self.get_record_fixture('A', fixture=0)),
+            objects.Record.from_dict(self.get_record_fixture('A', fixture=1)),
+        ]
+        recordset = self.create_recordset(zone, records=records)
+
+        self.assertEqual(
+            {'recordsets': 3, 'records': 2},
+            self.storage.get_zone_counters(self.admin_context, zone.id)
+        )
+        self.assertEqual(3, self.storage.count_recordsets(
+            self.admin_context, {'zone_id': zone.id}))
+        self.assertEqual(2, self.storage.count_records(
+            self.admin_context, {'zone_id': zone.id, 'managed': False}))
+
+        self.storage.delete_record(
+            self.admin_context, recordset.records[0].id)
+        self.assertEqual(
+            {'recordsets': 3, 'records': 1},
+            self.storage.get_zone_counters(self.admin_context, zone.id)
+        )
+
+        self.storage.delete_recordset(self.admin_context, recordset.id)
+        self.assertEqual(
+            {'recordsets': 2, 'records': 0},
+            self.storage.get_zone_counters(self.admin_context, zone.id)
+        )
+
+    def test_zone_counters_keep_zone_version(self):
+        zone = self.create_zone()
+
+        self.create_recordset(zone, increment_serial=False)
+
+        zone_after = self.storage.get_zone(self.admin_context, zone.id)
+        self.assertEqual(zone.version, zone_after.version)
+        self.assertEqual(zone.updated_at, zone_after.updated_at)
+
+    def test_zone_counters_deleted_zone(self):
+        zone = self.create_zone()
+        self.create_recordset(zone)
+
+        self.storage.delete_zone(self.admin_context, zone.id)
+
+        self.assertEqual(0, self.storage.count_recordsets(
+            self.admin_context, {'zone_id': zone.id}))
+        self.assertEqual(0, self.storage.count_records(
+            self.admin_context, {'zone_id': zone.id, 'managed': False}))
+
+    def test_get_zone_counters_missing(self):
+        self.assertRaises(
+            exceptions.ZoneNotFound,
+            self.storage.get_zone_counters, self.admin_context,
+            uuidutils.generate_uuid()
+        )
+
+    def test_tenant_zone_count(self):
+        tenant_1_context = self.get_context(project_id='1',
+                                            roles=['member', 'reader'])
+        zone_1 = self.create_zone(context=tenant_1_context, fixture=0)
+        zone_2 = self.create_zone(context=tenant_1_context, fixture=1)
+
+        self.assertEqual(
+            2, self.storage.get_tenant_zone_count(self.admin_context, '1')
+        )
+        self.assertEqual(2, self.storage.count_zones(
+            tenant_1_context, {'tenant_id': '1'}))
+
+        admin_context = self.get_admin_context(show_deleted=True)
+        admin_context.all_tenants = True
+
+        # Deleted zones are not counted, and no longer once purged.
+        zone_1 = self.storage.delete_zone(admin_context, zone_1.id)
+        self.assertEqual(
+            1, self.storage.get_tenant_zone_count(self.admin_context, '1')
+        )
+        self.storage.purge_zone(admin_context, zone_1)
+        self.assertEqual(
+            1, self.storage.get_tenant_zone_count(self.admin_context, '1')
+        )
+
+        # The zones given to another tenant are moved to its count.
+        zone_2.tenant_id = '2'
+        self.storage.update_zone(admin_context, zone_2)
+        self.assertEqual(
+            0, self.storage.get_tenant_zone_count(self.admin_context, '1')
+        )
+        self.assertEqual(
+            1, self.storage.get_tenant_zone_count(self.admin_context, '2')
+        )
+
+    def test_tenant_zone_count_unknown_tenant(self):
+        self.assertEqual(
+            0, self.storage.get_tenant_zone_count(self.admin_context, '1')
+        )
+
+    def test_rebuild_counters(self):
+        zone = self.create_zone()
+        self.create_recordset(zone)
+
+        with sql.get_write_session() as session:
+            session.execute(text(
+                'UPDATE zones SET recordset_count = 0, record_count = 5'))
+            session.execute(text('DELETE FROM tenant_counters'))
+
+        self.assertEqual(
+            {'zones': 1, 'tenants': 1},
+            self.storage.rebuild_counters(self.admin_context)
+        )
+        self.assertEqual(
+            {'recordsets': 3, 'records': 1},
+            self.storage.get_zone_counters(self.admin_context, zone.id)
+        )
+        self.assertEqual(1, self.storage.get_tenant_zone_count(
+            self.admin_context, zone.tenant_id))
+
+    # Zone Journal Tests
+    def test_find_zone_journal(self):
+        zone = self.create_zone()
+
+        self.storage.create_zone_journal_entries(
+            self.admin_context, zone.id, [
+                ('DELETE', 'www.example.com.', 'A', 3600, '192.0.2.1'),
+                ('ADD', 'www.example.com.', 'A', 3600, '192.0.2.2'),
+            ]
+        )
+        self.storage.publish_zone_journal(self.admin_context, zone.id, 1, 2)
+        self.storage.publish_zone_journal(self.admin_context, zone.id, 2, 3)
+
+        # Changes that are not published yet are not returned.
+        self.storage.create_zone_journal_entries(
+            self.admin_context, zone.id, [
+                ('ADD', 'mail.example.com.', 'A', 3600, '192.0.2.3'),
+            ]
+        )
+
+        rows = self.storage.find_zone_journal(self.admin_context, zone.id, 1)
+        self.assertEqual(
+            [
+                (1, 2, 'DELETE', 'www.example.com.', 'A', 3600, '192.0.2.1'),
+                (1, 2, 'ADD', 'www.example.com.', 'A', 3600, '192.0.2.2'),
+                (1, 2, 'SOA', None, None, None, None),
+                (2, 3, 'SOA', None, None, None, None),
+            ],
+            [tuple(row) for row in rows]
+        )
+
+        rows = self.storage.find_zone_journal(self.admin_context, zone.id, 2)
+        self.assertEqual(
+            [(2, 3, 'SOA', None, None, None, None)],
+            [tuple(row) for row in rows]
+        )
+
+    def test_find_zone_journal_serial_wrap(self):
+        zone = self.create_zone()
+
+        self.storage.publish_zone_journal(
+            self.admin_context, zone.id, 4294967000, 4294967295
+        )
+        self.storage.publish_zone_journal(
+            self.admin_context, zone.id, 4294967295, 5
+        )
+        self.storage.publish_zone_journal(self.admin_context, zone.id, 5, 6)
+
+        # The versions past the wrap around follow the ones before it
+        rows = self.storage.find_zone_journal(
+            self.admin_context, zone.id, 4294967295
+        )
+        self.assertEqual(
+            [(4294967295, 5), (5, 6)],
+            [(row.serial_from, row.serial_to) for row in rows]
+        )
+
+        rows = self.storage.find_zone_journal(self.admin_context, zone.id, 5)
+        self.assertEqual(
+            [(5, 6)], [(row.serial_from, row.serial_to) for row in rows]
+        )
+
+    def test_publish_zone_journals(self):
+        zone_a = self.create_zone(fixture=0)
+        zone_b = self.create_zone(fixture=1)
+
+        self.storage.create_zone_journal_entries(
+            self.admin_context, zone_a.id, [
+                ('ADD', 'www.example.com.', 'A', 3600, '192.0.2.1'),
+            ]
+        )
+        self.storage.publish_zone_journals(
+            self.admin_context, [(zone_a.id, 1, 2), (zone_b.id, 5, 6)]
+        )
+
+        rows = self.storage.find_zone_journal(
+            self.admin_context, zone_a.id, 1)
+        self.assertEqual(
+            [
+                (1, 2, 'ADD', 'www.example.com.', 'A', 3600, '192.0.2.1'),
+                (1, 2, 'SOA', None, None, None, None),
+            ],
+            [tuple(row) for row in rows]
+        )
+        rows = self.storage.find_zone_journal(
+            self.admin_context, zone_b.id, 5)
+        self.assertEqual(
+            [(5, 6, 'SOA', None, None, None, None)],
+            [tuple(row) for row in rows]
+        )
+
+    def test_increment_serials(self):
+        zone_a = self.create_zone(fixture=0, increment_serial=True)
+        zone_b = self.create_zone(fixture=1, increment_serial=True)
+
+        with mock.patch.object(timeutils, 'utcnow_ts', return_value=1234):
+            serial = self.storage.increment_serials(
+                self.admin_context, [zone_a.id, zone_b.id]
+            )
+
+        self.assertEqual(1234, serial)
+        for zone in (zone_a, zone_b):
+            zone = self.storage.get_zone(self.admin_context, zone.id)
+            self.assertEqual(1234, zone.serial)
+            self.assertFalse(zone.increment_serial)
+
+    def test_update_soa_records(self):
+        zone = self.create_zone()
+        soa = self.storage.find_recordset(
+            self.admin_context, {'zone_id': zone.id, 'type': 'SOA'}
+        )
+        data = 'ns1.example.org. admin.example.org. 1234 3600 600 86400 3600'
+
+        self.assertEqual(
+            1,
+            self.storage.update_soa_records(
+                self.admin_context, {zone.id: (1234, data)}
+            )
+        )
+
+        updated = self.storage.find_recordset(
+            self.admin_context, {'zone_id': zone.id, 'type': 'SOA'}
+        )
+        record = updated.records[0]
+        self.assertEqual(data, record.data)
+        self.assertEqual(1234, record.serial)
+        self.assertEqual('UPDATE', record.action)
+        self.assertEqual('PENDING', record.status)
+        self.assertEqual(
+            self.storage._recalculate_record_hash(record), record.hash
+        )
+        self.assertEqual(soa.records[0].version + 1, record.version)
+        self.assertEqual(soa.version + 1, updated.version)
+
+    def test_purge_zone_journal(self):
+        zone = self.create_zone()
+
+        self.storage.create_zone_journal_entries(
+            self.admin_context, zone.id, [
+                ('ADD', 'www.example.com.', 'A', 3600, '192.0.2.1'),
+            ]
+        )
+        self.storage.publish_zone_journal(self.admin_context, zone.id, 1, 2)
+        self.storage.publish_zone_journal(self.admin_context, zone.id, 2, 3)
+        self.storage.create_zone_journal_entries(
+            self.admin_context, zone.id, [
+                ('ADD', 'mail.example.com.', 'A', 3600, '192.0.2.2'),
+            ]
+        )
+
+        purged = self.storage.purge_zone_journal(
+            self.admin_context, {'serial_to': 2}
+        )
+        self.assertEqual(1, purged)
+
+        # The version is removed as a whole, pending changes are kept.
+        rows = self.storage.find_zone_journal(self.admin_context, zone.id, 1)
+        self.assertEqual(
+            [(2, 3, 'SOA', None, None, None, None)],
+            [tuple(row) for row in rows]
+        )
+
+        purged = self.storage.purge_zone_journal(self.admin_context, {})
+        self.assertEqual(1, purged)
+        self.assertEqual(
+            0, self.storage.purge_zone_journal(self.admin_context, {})
+        )
+
+        self.storage.publish_zone_journal(self.admin_context, zone.id, 3, 4)
+        rows = self.storage.find_zone_journal(self.admin_context, zone.id, 3)
+        self.assertEqual(2, len(rows))
+
     # TLD Tests
     def test_create_tld(self):
         values = {
@@ -3924,9 +4808,11 @@ class SqlalchemyStorageTest(designate.tests.functional.TestCase):
             'recordsets',
             'service_statuses',
             'shared_zones',
+            'tenant_counters',
             'tlds',
             'tsigkeys',
             'zone_attributes',
+            'zone_journal',
             'zone_masters',
             'zone_tasks',
             'zone_transfer_accepts',
@@ -3989,12 +4875,17 @@ class SqlalchemyStorageTest(designate.tests.functional.TestCase):
                 "rrset_ttl": "CREATE INDEX rrset_ttl ON recordsets (ttl)",  # noqa
                 "rrset_tenant_id": "CREATE INDEX rrset_tenant_id ON recordsets (tenant_id)",  # noqa
             },
+            "zone_journal": {
+                "zone_journal_zone_id_serial_from": "CREATE INDEX zone_journal_zone_id_serial_from ON zone_journal (zone_id, serial_from)",  # noqa
+                "zone_journal_zone_shard_created_at": "CREATE INDEX zone_journal_zone_shard_created_at ON zone_journal (zone_shard, created_at)",  # noqa
+            },
             "zones": {
                 "delayed_notify": "CREATE INDEX delayed_notify ON zones (delayed_notify)",  # noqa
                 "increment_serial": "CREATE INDEX increment_serial ON zones (increment_serial)",  # noqa
                 "reverse_name_deleted": "CREATE INDEX reverse_name_deleted ON zones (reverse_name, deleted)",  # noqa
                 "zone_created_at": "CREATE INDEX zone_created_at ON zones (created_at)",  # noqa
                 "zone_deleted": "CREATE INDEX zone_deleted ON zones (deleted)",
+                "zone_pool_deleted": "CREATE INDEX zone_pool_deleted ON zones (pool_id, deleted)",  # noqa
                 "zone_tenant_deleted": "CREATE INDEX zone_tenant_deleted ON zones (tenant_id, deleted)",  # noqa
             }
         }
@@ -4021,27 +4912,38 @@ class SqlalchemyStorageTest(designate.tests.functional.TestCase):
         self.assertEqual(pool.id, catalog_zone.pool_id)
         self.assertEqual("CATALOG", catalog_zone.type)
 
-    def test_get_catalog_zone_records(self):
+    def test_iter_catalog_zone_records(self):
         pool = self.create_pool(fixture=2)
         self.create_tsigkey(scope='POOL', resource_id=pool.id)
         self.storage._ensure_catalog_zone_config(self.admin_context, pool)
+        catalog_zone = self.storage.get_catalog_zone(self.admin_context, pool)
         member_zone = self.create_zone(
             attributes=[{'key': 'pool_id', 'value': pool.id}])
-
-        catz_records = self.storage.get_catalog_zone_records(
-            self.admin_context, pool)
+        deleted_zone = self.create_zone(
+            fixture=1, attributes=[{'key': 'pool_id', 'value': pool.id}])
+        deleted_zone.action = 'DELETE'
+        self.storage.update_zone(self.admin_context, deleted_zone)
+        # A zone in another pool
+        self.create_zone(
+            name='example.info.',
+            pool_id=CONF['service:central'].default_pool_id)
+
+        catz_records = list(self.storage.iter_catalog_zone_records(
+            self.admin_context, catalog_zone, chunk_size=1))
         fqdn = pool.catalog_zone.catalog_zone_fqdn
 
-        self.assertEqual(5, len(catz_records))
-        self.assertEqual("SOA", catz_records[0].type)
-        self.assertEqual(fqdn, catz_records[0].name)
-        self.assertEqual("NS", catz_records[1].type)
-        self.assertEqual(fqdn, catz_records[1].name)
-        self.assertEqual("TXT", catz_records[2].type)
-        self.assertEqual(f"version.{fqdn}", catz_records[2].name)
+        self.assertEqual(4, len(catz_records))
+        self.assertEqual('SOA', catz_records[0][1])
+        self.assertEqual(fqdn, catz_records[0][3])
+        self.assertEqual(
+            ('NS', fqdn, 'invalid.'),
+            (catz_records[1][1], catz_records[1][3], catz_records[1][4]))
         self.assertEqual(
-            f"{member_zone.id}.zones.{fqdn}", catz_records[3].name)
-        self.assertEqual("SOA", catz_records[4].type)
+            ('TXT', f'version.{fqdn}', '2'),
+            (catz_records[2][1], catz_records[2][3], catz_records[2][4]))
+        self.assertEqual(
+            ('PTR', f'{member_zone.id}.zones.{fqdn}', member_zone.name),
+            (catz_records[3][1], catz_records[3][3], catz_records[3][4]))
 
     def test_ensure_catalog_zone_config_no_catalog_zone(self):
         pool = self.storage.find_pools(self.admin_context)[0]
@@ -4084,9 +4986,9 @@ class SqlalchemyStorageTest(designate.tests.functional.TestCase):
             pool.catalog_zone.catalog_zone_refresh)
 
         # Check SOA
-        catz_records = self.storage.get_catalog_zone_records(
-            self.admin_context, pool)
-        self.assertEqual(catz_records[-1].type, 'SOA')
+        catz_records = list(self.storage.iter_catalog_zone_records(
+            self.admin_context, catalog_zone))
+        self.assertEqual('SOA', catz_records[0][1])
         expected = (
             f'{pool.ns_records[0]["hostname"]} '
             f'{catalog_zone.attributes.get("catalog_zone_fqdn")} '
@@ -4096,7 +4998,7 @@ class SqlalchemyStorageTest(designate.tests.functional.TestCase):
             '2147483646 '
             f'{catalog_zone.minimum}'
         )
-        self.assertEqual(expected, catz_records[-1].records[0].data)
+        self.assertEqual(expected, catz_records[0][4])
 
         # Check TSIG
         tsigkey = self.storage.find_tsigkey(
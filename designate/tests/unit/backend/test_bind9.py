@@ -322,3 +322,71 @@ class Bind9BackendTestCase(oslotest.base.BaseTestCase):
             exceptions.Backend,
             self.backend._execute_rndc, rndc_op
         )
+
+    def _native_backend(self, key_file):
+        self.target['options'] = [
+            {'key': 'rndc_host', 'value': '192.0.2.4'},
+            {'key': 'rndc_port', 'value': '953'},
+            {'key': 'rndc_key_file', 'value': key_file},
+            {'key': 'rndc_timeout', 'value': '10'},
+            {'key': 'rndc_native', 'value': 'true'},
+        ]
+
+        return impl_bind9.Bind9Backend(
+            objects.PoolTarget.from_dict(self.target)
+        )
+
+    @mock.patch.object(impl_bind9.rndc, 'load_key')
+    def test_rndc_native(self, mock_load_key):
+        mock_load_key.return_value = ('hmac-sha256', b'secret')
+
+        backend = self._native_backend('/etc/rndc.key')
+
+        mock_load_key.assert_called_with('/etc/rndc.key', None)
+        self.assertIsInstance(backend._rndc_client, impl_bind9.rndc.RndcClient)
+        self.assertEqual(('192.0.2.4', 953), backend._rndc_client._address)
+        self.assertEqual(10.0, backend._rndc_client._timeout)
+
+    @mock.patch('designate.utils.execute')
+    @mock.patch.object(impl_bind9.rndc, 'load_key')
+    def test_execute_rndc_native(self, mock_load_key, mock_execute):
+        mock_load_key.return_value = ('hmac-sha256', b'secret')
+        backend = self._native_backend('/etc/rndc.key')
+        backend._rndc_client = mock.Mock()
+
+        backend._execute_rndc(['delzone', '-clean', 'example.com '])
+
+        backend._rndc_client.call.assert_called_with(
+            'delzone -clean example.com '
+        )
+        mock_execute.assert_not_called()
+
+    @mock.patch.object(impl_bind9.rndc, 'load_key')
+    def test_execute_rndc_native_raises_on_exception(self, mock_load_key):
+        mock_load_key.return_value = ('hmac-sha256', b'secret')
+        backend = self._native_backend('/etc/rndc.key')
+        backend._rndc_client = mock.Mock()
+        backend._rndc_client.call.side_effect = TimeoutError()
+
+        self.assertRaises(
+            exceptions.Backend,
+            backend._execute_rndc, ['delzone', 'example.com ']
+        )
+
+    def test_rndc_native_without_key_file(self):
+        self.target['options'] = [
+            {'key': 'rndc_native', 'value': 'true'},
+        ]
+
+        backend = impl_bind9.Bind9Backend(
+            objects.PoolTarget.from_dict(self.target)
+        )
+
+        self.assertIsNone(backend._rndc_client)
+        self.assertIn('executing rndc instead', self.stdlog.logger.output)
+
+    def test_rndc_native_key_file_not_found(self):
+        backend = self._native_backend('/nonexistent/rndc.key')
+
+        self.assertIsNone(backend._rndc_client)
+        self.assertIn('Unable to load the rndc key', self.stdlog.logger.output)
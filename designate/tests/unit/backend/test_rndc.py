@@ -0,0 +1,408 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import base64
+import hashlib
+import hmac
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+
+import oslotest.base
+
+from designate.backend import rndc
+from designate import exceptions
+
+
+SECRET = b'0123456789abcdef0123456789abcdef'
+
+
+class FakeRndcServer:
+    """
+    Control channel of a Bind 9 server, with a hmac-sha256 key, which adds,
+    shows and deletes zones
+    """
+
+    def __init__(self, secret=SECRET, batch=1, close_after=None):
+        self.secret = secret
+        # Number of commands read before responding to them, in the
+        # reverse order
+        self.batch = batch
+        # Number of commands after which the connections are closed
+        self.close_after = close_after
+        self.hang = False
+        # Stops reading the commands after the handshake, until closed
+        self.stall = False
+        self.closed = threading.Event()
+        # Replaces the response to the handshake when set
+        self.handshake = None
+        self.zones = set()
+        self.connections = 0
+        self.commands = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self):
+        self.closed.set()
+        self.sock.close()
+
+    def _accept(self):
+        while True:
+            try:
+                connection, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(
+                target=self._serve, args=(connection,), daemon=True
+            ).start()
+
+    def _recv(self, connection, length):
+        data = b''
+        while len(data) < length:
+            chunk = connection.recv(length - len(data))
+            if not chunk:
+                raise ConnectionError()
+            data += chunk
+        return data
+
+    def _read(self, connection):
+        length, version = struct.unpack('>II', self._recv(connection, 8))
+        assert version == 1
+        wire = self._recv(connection, length - 4)
+
+        # The _auth element is first, the HMAC is of the rest of the message
+        key_length = wire[0]
+        assert wire[1:1 + key_length] == b'_auth'
+        pos = 1 + key_length
+        _, auth_length = struct.unpack_from('>BI', wire, pos)
+        signed = wire[pos + 5 + auth_length:]
+        message = rndc.decode_table(wire)
+        hsha = message['_auth']['hsha']
+        assert hsha[0] == 163
+        assert len(hsha) == 89
+        digest = base64.b64encode(
+            hmac.new(self.secret, signed, hashlib.sha256).digest()
+        )
+        if hsha[1:].rstrip(b'\0') != digest:
+            raise ConnectionError('Authentication failed')
+        return message
+
+    def _sign(self, ctrl, data):
+        signed = rndc.encode_table({'_ctrl': ctrl, '_data': data})
+        digest = base64.b64encode(
+            hmac.new(self.secret, signed, hashlib.sha256).digest()
+        )
+        message = rndc.encode_table({
+            '_auth': {'hsha': bytes([163]) + digest.ljust(88, b'\0')}
+        }) + signed
+        return struct.pack('>II', len(message) + 4, 1) + message
+
+    def _write(self, connection, serial, nonce, data):
+        connection.sendall(self._sign(
+            {'_ser': serial, '_rpl': '1', '_nonce': nonce}, data
+        ))
+
+    def _run(self, command):
+        op, *args = command.split()
+        name = [arg for arg in args if not arg.startswith('-')][0]
+        self.commands.append(command)
+        if op == 'addzone':
+            if name in self.zones:
+                return {'result': '18', 'err': 'already exists'}
+            self.zones.add(name)
+        elif op == 'showzone':
+            if name not in self.zones:
+                return {'result': '23', 'err': 'not found'}
+            return {'result': '0', 'text': 'zone "%s" {};' % name}
+        elif op == 'delzone':
+            if name not in self.zones:
+                return {'result': '23', 'err': 'not found'}
+            self.zones.discard(name)
+        return {'result': '0'}
+
+    def _serve(self, connection):
+        nonce = os.urandom(4).hex()
+        handled = 0
+        try:
+            message = self._read(connection)
+            assert message['_data']['type'] == b'null'
+            if self.handshake is not None:
+                connection.sendall(self.handshake)
+                return
+            self._write(
+                connection, message['_ctrl']['_ser'], nonce, {'result': '0'}
+            )
+
+            while True:
+                if self.stall:
+                    self.closed.wait()
+                    return
+                messages = [
+                    self._read(connection) for _ in range(self.batch)
+                ]
+                if self.hang:
+                    continue
+                for message in reversed(messages):
+                    assert message['_ctrl']['_nonce'] == nonce.encode()
+                    data = self._run(
+                        message['_data']['type'].decode('ascii')
+                    )
+                    self._write(
+                        connection, message['_ctrl']['_ser'], nonce, data
+                    )
+                    handled += 1
+                if self.close_after and handled >= self.close_after:
+                    break
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            connection.close()
+
+
+class RndcTableTestCase(oslotest.base.BaseTestCase):
+    def test_encode_table(self):
+        self.assertEqual(
+            b'\x05_data\x02\x00\x00\x00\x0e'
+            b'\x04type\x01\x00\x00\x00\x04null',
+            rndc.encode_table({'_data': {'type': 'null'}})
+        )
+
+    def test_decode_table(self):
+        self.assertEqual(
+            {'_data': {'type': b'null'}, 'list': [b'a', {'b': b''}]},
+            rndc.decode_table(
+                b'\x05_data\x02\x00\x00\x00\x0e'
+                b'\x04type\x01\x00\x00\x00\x04null'
+                b'\x04list\x03\x00\x00\x00\x12'
+                b'\x01\x00\x00\x00\x01a'
+                b'\x02\x00\x00\x00\x07\x01b\x01\x00\x00\x00\x00'
+            )
+        )
+
+    def test_decode_table_truncated(self):
+        self.assertRaises(
+            ValueError,
+            rndc.decode_table, b'\x04type\x01\x00\x00\x00\x04nu'
+        )
+
+
+class RndcLoadKeyTestCase(oslotest.base.BaseTestCase):
+    def _write(self, content):
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.unlink, path)
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_load_key(self):
+        path = self._write(
+            'key "rndc-key" {\n'
+            '    algorithm hmac-md5;\n'
+            '    secret "c2VjcmV0";\n'
+            '};\n'
+        )
+
+        self.assertEqual(('hmac-md5', b'secret'), rndc.load_key(path))
+
+    def test_load_key_default_key(self):
+        path = self._write(
+            '# Generated by rndc-confgen\n'
+            'key "other-key" { algorithm hmac-sha1; secret "b3RoZXI="; };\n'
+            '/* key "commented-key" { algorithm hmac-sha1; }; */\n'
+            'key "rndc-key" {\n'
+            '    algorithm HMAC-SHA256; // the default\n'
+            '    secret "c2VjcmV0";\n'
+            '};\n'
+            'options {\n'
+            '    default-key "rndc-key";\n'
+            '    default-server 127.0.0.1;\n'
+            '};\n'
+        )
+
+        self.assertEqual(('hmac-sha256', b'secret'), rndc.load_key(path))
+        self.assertEqual(
+            ('hmac-sha1', b'other'), rndc.load_key(path, 'other-key')
+        )
+
+    def test_load_key_not_found(self):
+        path = self._write('options { default-key "rndc-key"; };\n')
+
+        self.assertRaises(
+            exceptions.ConfigurationError, rndc.load_key, path
+        )
+
+    def test_load_key_unsupported_algorithm(self):
+        path = self._write(
+            'key "rndc-key" { algorithm hmac-sha3; secret "c2VjcmV0"; };\n'
+        )
+
+        self.assertRaises(
+            exceptions.ConfigurationError, rndc.load_key, path
+        )
+
+
+class RndcClientTestCase(oslotest.base.BaseTestCase):
+    def _client(self, server, secret=SECRET, timeout=5):
+        self.addCleanup(server.close)
+        client = rndc.RndcClient(
+            '127.0.0.1', server.port, 'hmac-sha256', secret, timeout=timeout
+        )
+        self.addCleanup(client.close)
+        return client
+
+    def test_call(self):
+        server = FakeRndcServer()
+        client = self._client(server)
+
+        self.assertEqual('', client.call('addzone example.com {};'))
+        self.assertEqual(
+            'zone "example.com" {};', client.call('showzone example.com ')
+        )
+        self.assertEqual('', client.call('delzone -clean example.com '))
+
+        self.assertEqual(1, server.connections)
+        self.assertEqual(set(), server.zones)
+
+    def test_call_failed(self):
+        server = FakeRndcServer()
+        client = self._client(server)
+        client.call('addzone example.com {};')
+
+        self.assertRaisesRegex(
+            exceptions.Backend, "'addzone' failed: already exists",
+            client.call, 'addzone example.com {};'
+        )
+        self.assertRaisesRegex(
+            exceptions.Backend, 'not found',
+            client.call, 'showzone example.org '
+        )
+
+    def test_call_pipelined(self):
+        server = FakeRndcServer(batch=10)
+        client = self._client(server)
+        results = {}
+
+        def call(name):
+            results[name] = client.call('showzone %s' % name)
+
+        server.zones = {'zone%d.example.com' % i for i in range(10)}
+        threads = [
+            threading.Thread(target=call, args=(name,))
+            for name in server.zones
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # The responses, in the reverse order, were matched to their command
+        self.assertEqual(
+            {name: 'zone "%s" {};' % name for name in server.zones}, results
+        )
+        self.assertEqual(1, server.connections)
+
+    def test_call_reconnect(self):
+        server = FakeRndcServer(close_after=1)
+        client = self._client(server)
+
+        client.call('addzone example.com {};')
+        client.call('showzone example.com ')
+
+        self.assertEqual(2, server.connections)
+        self.assertEqual(
+            ['addzone example.com {};', 'showzone example.com '],
+            server.commands
+        )
+
+    def test_call_timeout(self):
+        server = FakeRndcServer()
+        client = self._client(server, timeout=0.1)
+        server.hang = True
+
+        self.assertRaises(
+            TimeoutError, client.call, 'showzone example.com '
+        )
+
+        # The connection is opened again for the next command
+        server.hang = False
+        client.call('addzone example.com {};')
+        self.assertEqual(2, server.connections)
+
+    def test_call_send_timeout(self):
+        server = FakeRndcServer()
+        client = self._client(server, timeout=0.5)
+        client.call('addzone example.com {};')
+        server.stall = True
+        client.call('showzone example.com ')
+
+        # The server no longer reads, the command fills the buffers of the
+        # connection and its send times out
+        self.assertRaises(
+            TimeoutError,
+            client.call, 'addzone example.org { %s };' % ('x' * (1 << 25))
+        )
+        self.assertIsNone(client._connection)
+
+    def test_call_idle_connection(self):
+        server = FakeRndcServer()
+        client = self._client(server, timeout=0.1)
+        client.call('addzone example.com {};')
+
+        # The receiver keeps waiting past the timeout of the socket
+        time.sleep(0.3)
+        client.call('showzone example.com ')
+
+        self.assertEqual(1, server.connections)
+
+    def test_call_invalid_handshake(self):
+        server = FakeRndcServer()
+        client = self._client(server)
+
+        # Truncated
+        server.handshake = struct.pack('>II', 11, 1) + b'\x04type\x01\x00'
+        self.assertRaisesRegex(
+            ConnectionError, 'Invalid response',
+            client.call, 'showzone example.com '
+        )
+
+        # Authenticated, without a nonce
+        server.handshake = server._sign({'_ser': '1'}, {'result': '0'})
+        self.assertRaisesRegex(
+            ConnectionError, 'Invalid response',
+            client.call, 'showzone example.com '
+        )
+        self.assertIsNone(client._connection)
+
+    def test_call_authentication_failed(self):
+        server = FakeRndcServer()
+        client = self._client(server, secret=b'wrong')
+
+        self.assertRaises(
+            ConnectionError, client.call, 'showzone example.com '
+        )
+
+    def test_call_connection_refused(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        client = rndc.RndcClient(
+            '127.0.0.1', port, 'hmac-sha256', SECRET, timeout=5
+        )
+
+        self.assertRaises(OSError, client.call, 'showzone example.com ')
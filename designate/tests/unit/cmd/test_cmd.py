@@ -65,6 +65,7 @@ class CmdTestCase(oslotest.base.BaseTestCase):
     def test_mdns(self, mock_service, mock_read_config, mock_log_setup,
                   mock_serve, mock_wait):
         CONF.set_override('workers', 1, 'service:mdns')
+        mock_service.return_value.worker_stats = None
 
         mdns.main()
 
@@ -74,6 +75,23 @@ class CmdTestCase(oslotest.base.BaseTestCase):
         mock_serve.assert_called_with(mock.ANY, workers=1)
         mock_wait.assert_called_with()
 
+    @mock.patch('designate.service.add_service')
+    @mock.patch('designate.mdns.supervisor.Supervisor')
+    @mock.patch('designate.mdns.service.Service')
+    def test_mdns_workers(self, mock_service, mock_supervisor,
+                          mock_add_service, mock_read_config, mock_log_setup,
+                          mock_serve, mock_wait):
+        CONF.set_override('workers', 4, 'service:mdns')
+
+        mdns.main()
+
+        mock_serve.assert_called_with(mock.ANY, workers=4)
+        mock_supervisor.assert_called_with(
+            mock_service.return_value.worker_stats
+        )
+        mock_add_service.assert_called_with(mock_supervisor.return_value)
+        mock_wait.assert_called_with()
+
     @mock.patch('designate.producer.service.Service')
     def test_producer(self, mock_service, mock_read_config, mock_log_setup,
                       mock_serve, mock_wait):
@@ -185,6 +203,7 @@ class CmdTestCase(oslotest.base.BaseTestCase):
             self, mock_service, mock_read_config, mock_log_setup,
             mock_serve, mock_wait):
         CONF.set_override('workers', 1, 'service:mdns')
+        mock_service.return_value.worker_stats = None
 
         mdns.main()
 
@@ -108,3 +108,44 @@ class TestExtractZoneId(oslotest.base.BaseTestCase):
         self.assertEqual(
             '456', lock.extract_zone_id(['123', objects.Zone(id=456)], {})
         )
+
+
+class TestSynchronizedZones(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.service = mock.Mock()
+        self.service.zone_lock_local = lock.ZoneLockLocal()
+        self.locked = []
+
+        def get_lock(name):
+            self.locked.append(name)
+            return mock.MagicMock()
+
+        self.service.coordination.get_lock.side_effect = get_lock
+
+    def test_synchronized_zones(self):
+        @lock.synchronized_zones()
+        def increment(service, context, zone_ids):
+            for zone_id in zone_ids:
+                self.assertTrue(service.zone_lock_local.has_lock(
+                    f'zone-{zone_id}'.encode('ascii')))
+            return len(zone_ids)
+
+        self.assertEqual(
+            3, increment(self.service, 'ctxt', ['b', 'a', 'b'])
+        )
+        self.assertEqual([b'zone-a', b'zone-b'], self.locked)
+        self.assertFalse(self.service.zone_lock_local.has_lock(b'zone-a'))
+        self.assertFalse(self.service.zone_lock_local.has_lock(b'zone-b'))
+
+    def test_synchronized_zones_already_held(self):
+        @lock.synchronized_zones()
+        def increment(service, context, zone_ids):
+            return zone_ids
+
+        self.service.zone_lock_local.hold(b'zone-a')
+
+        increment(self.service, 'ctxt', zone_ids=['a', 'b'])
+
+        self.assertEqual([b'zone-b'], self.locked)
+        self.assertTrue(self.service.zone_lock_local.has_lock(b'zone-a'))
@@ -0,0 +1,182 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from unittest import mock
+
+import oslotest.base
+
+from designate import exceptions
+from designate.mdns import cache
+from designate import objects
+
+
+class AXFRCacheTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = cache.AXFRCache(max_size=10)
+
+    def test_get_missing(self):
+        self.assertIsNone(self.cache.get('zone1', 1))
+
+    def test_get(self):
+        packets = [(b'abcd', (1, 2, 0, 0))]
+        self.cache.set('zone1', 1, packets)
+
+        self.assertEqual(packets, self.cache.get('zone1', 1))
+        self.assertEqual(4, self.cache.size)
+
+    def test_get_different_serial(self):
+        self.cache.set('zone1', 1, [(b'abcd', (1, 2, 0, 0))])
+
+        self.assertIsNone(self.cache.get('zone1', 2))
+        self.assertEqual(0, len(self.cache))
+        self.assertEqual(0, self.cache.size)
+
+    def test_set_replaces_entry(self):
+        self.cache.set('zone1', 1, [(b'abcd', (1, 2, 0, 0))])
+        self.cache.set('zone1', 2, [(b'abcdef', (1, 3, 0, 0))])
+
+        self.assertEqual(1, len(self.cache))
+        self.assertEqual(6, self.cache.size)
+        self.assertEqual(
+            [(b'abcdef', (1, 3, 0, 0))], self.cache.get('zone1', 2)
+        )
+
+    def test_set_evicts_least_recently_used(self):
+        self.cache.set('zone1', 1, [(b'abcd', ())])
+        self.cache.set('zone2', 1, [(b'abcd', ())])
+        self.cache.get('zone1', 1)
+        self.cache.set('zone3', 1, [(b'abcd', ())])
+
+        self.assertEqual(2, len(self.cache))
+        self.assertEqual(8, self.cache.size)
+        self.assertIsNotNone(self.cache.get('zone1', 1))
+        self.assertIsNone(self.cache.get('zone2', 1))
+        self.assertIsNotNone(self.cache.get('zone3', 1))
+
+    def test_set_too_large(self):
+        self.cache.set('zone1', 1, [(b'abcdef', ()), (b'abcdef', ())])
+
+        self.assertEqual(0, len(self.cache))
+        self.assertIsNone(self.cache.get('zone1', 1))
+
+    def test_disabled(self):
+        self.assertTrue(self.cache.enabled)
+        self.assertFalse(cache.AXFRCache(max_size=0).enabled)
+
+
+@mock.patch('designate.context.DesignateContext.get_admin_context',
+            mock.Mock())
+class TsigKeyCacheTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = mock.Mock()
+        self.storage.find_tsigkey.side_effect = self._find_tsigkey
+        self.storage.find_tsigkeys.side_effect = lambda context: list(
+            self.tsigkeys.values()
+        )
+        self.tsigkeys = {
+            'key1': objects.TsigKey(id='1', name='key1', version=1),
+            'key2': objects.TsigKey(id='2', name='key2', version=1),
+        }
+        self.cache = cache.TsigKeyCache(self.storage, max_size=10, ttl=300)
+
+    def _find_tsigkey(self, context, criterion):
+        try:
+            return self.tsigkeys[criterion['name']]
+        except KeyError:
+            raise exceptions.TsigKeyNotFound()
+
+    def test_find_tsigkey(self):
+        tsigkey = self.cache.find_tsigkey(mock.Mock(), {'name': 'key1'})
+        self.assertEqual('1', tsigkey.id)
+
+        self.assertEqual(
+            tsigkey, self.cache.find_tsigkey(mock.Mock(), {'name': 'key1'})
+        )
+        self.storage.find_tsigkey.assert_called_once_with(
+            mock.ANY, {'name': 'key1'}
+        )
+
+    def test_find_tsigkey_not_found(self):
+        self.assertRaises(
+            exceptions.TsigKeyNotFound,
+            self.cache.find_tsigkey, mock.Mock(), {'name': 'key3'}
+        )
+        self.assertEqual(0, len(self.cache))
+
+    def test_find_tsigkey_other_criterion(self):
+        self.storage.find_tsigkey.side_effect = None
+        self.cache.find_tsigkey(mock.Mock(), {'id': '1'})
+        self.cache.find_tsigkey(mock.Mock(), {'id': '1'})
+
+        self.assertEqual(2, self.storage.find_tsigkey.call_count)
+        self.assertEqual(0, len(self.cache))
+
+    def test_find_tsigkey_disabled(self):
+        self.cache = cache.TsigKeyCache(self.storage, max_size=10, ttl=0)
+
+        self.cache.find_tsigkey(mock.Mock(), {'name': 'key1'})
+        self.cache.find_tsigkey(mock.Mock(), {'name': 'key1'})
+
+        self.assertEqual(2, self.storage.find_tsigkey.call_count)
+
+    @mock.patch('time.monotonic')
+    def test_find_tsigkey_expired(self, mock_monotonic):
+        mock_monotonic.return_value = 1000
+        self.cache.find_tsigkey(mock.Mock(), {'name': 'key1'})
+
+        mock_monotonic.return_value = 1299
+        self.cache.find_tsigkey(mock.Mock(), {'name': 'key1'})
+        self.assertEqual(1, self.storage.find_tsigkey.call_count)
+
+        mock_monotonic.return_value = 1300
+        self.cache.find_tsigkey(mock.Mock(), {'name': 'key1'})
+        self.assertEqual(2, self.storage.find_tsigkey.call_count)
+
+    def test_find_tsigkey_evicts_least_recently_used(self):
+        self.cache = cache.TsigKeyCache(self.storage, max_size=1, ttl=300)
+
+        self.cache.find_tsigkey(mock.Mock(), {'name': 'key1'})
+        self.cache.find_tsigkey(mock.Mock(), {'name': 'key2'})
+        self.assertEqual(1, len(self.cache))
+
+        self.cache.find_tsigkey(mock.Mock(), {'name': 'key1'})
+        self.assertEqual(3, self.storage.find_tsigkey.call_count)
+
+    def test_check_versions(self):
+        self.cache.find_tsigkey(mock.Mock(), {'name': 'key1'})
+        self.cache.find_tsigkey(mock.Mock(), {'name': 'key2'})
+
+        self.cache.check_versions()
+        self.assertEqual(2, len(self.cache))
+
+        self.tsigkeys['key1'] = objects.TsigKey(id='1', name='key1', version=2)
+        del self.tsigkeys['key2']
+
+        self.cache.check_versions()
+        self.assertEqual(0, len(self.cache))
+
+        tsigkey = self.cache.find_tsigkey(mock.Mock(), {'name': 'key1'})
+        self.assertEqual(2, tsigkey.version)
+
+    def test_check_versions_recreated(self):
+        self.cache.find_tsigkey(mock.Mock(), {'name': 'key1'})
+
+        self.tsigkeys['key1'] = objects.TsigKey(id='3', name='key1', version=1)
+
+        self.cache.check_versions()
+        self.assertEqual(0, len(self.cache))
+
+    def test_check_versions_empty(self):
+        self.cache.check_versions()
+
+        self.storage.find_tsigkeys.assert_not_called()
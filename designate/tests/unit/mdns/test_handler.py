@@ -14,10 +14,11 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-
+import collections
 from unittest import mock
 
 import dns
+import dns.tsigkeyring
 from oslo_config import fixture as cfg_fixture
 import oslotest.base
 
@@ -32,6 +33,11 @@ from designate.worker import rpcapi as worker_rpcapi
 
 CONF = designate.conf.CONF
 
+JournalRow = collections.namedtuple(
+    'JournalRow',
+    ['serial_from', 'serial_to', 'operation', 'name', 'type', 'ttl', 'data']
+)
+
 
 class MdnsHandleTest(oslotest.base.BaseTestCase):
     def setUp(self):
@@ -220,12 +226,9 @@ class MdnsHandleTest(oslotest.base.BaseTestCase):
              '192.0.2.1', 'NONE'),
         ]
 
-        def _find_recordsets_axfr(context, criterion):
-            if criterion['type'] == 'SOA':
-                return list(soa_records)
-            return list(other_records)
-
-        self.storage.find_recordsets_axfr.side_effect = _find_recordsets_axfr
+        self.storage.iter_zone_axfr.return_value = iter(
+            soa_records + other_records
+        )
 
         request = dns.message.make_query('example.test.', dns.rdatatype.AXFR)
         request.environ = dict(context=self.context)
@@ -251,39 +254,354 @@ class MdnsHandleTest(oslotest.base.BaseTestCase):
             self.stdlog.logger.output
         )
 
-    def test_axfr_catalog_zone_skips_unparsable_record(self):
+    def test_axfr_streams_records(self):
+        CONF.set_override('axfr_chunk_size', 2, 'service:mdns')
         zone = objects.Zone(
             id='e2bed4dc-9d01-11e4-89d3-123b93f75cba',
-            name='catalog.example.test.',
-            type='CATALOG',
-            pool_id='794ccc2c-d751-44fe-b57f-8894c9f5c842',
+            name='example.test.',
+            type='PRIMARY',
             ttl=3600,
         )
         self.storage.find_zone.return_value = zone
-        self.storage.find_pool.return_value = objects.Pool(
-            id=zone.pool_id
+        self.storage.iter_zone_axfr.return_value = iter([
+            ('soa-id', 'SOA', None, 'example.test.',
+             'ns1.example.test. hostmaster.example.test. '
+             '1 3600 600 86400 3600', 'NONE'),
+            ('a-id', 'A', 300, 'a.example.test.', '192.0.2.1', 'NONE'),
+            ('b-id', 'A', None, 'b.example.test.', '192.0.2.2', 'NONE'),
+        ])
+
+        request = dns.message.make_query('example.test.', dns.rdatatype.AXFR)
+        request.environ = dict(context=self.context)
+
+        responses = list(self.handler._handle_axfr(request))
+
+        self.storage.iter_zone_axfr.assert_called_once_with(
+            self.context, zone.id, chunk_size=2
+        )
+        self.storage.find_recordsets_axfr.assert_not_called()
+        self.assertEqual(1, len(responses))
+        # The SOA is sent both first and last
+        self.assertEqual(4, responses[0].counts[dns.renderer.ANSWER])
+        answer = dns.message.from_wire(responses[0].get_wire()).answer
+        self.assertEqual(
+            ['example.test.', 'a.example.test.', 'b.example.test.'],
+            [str(rrset.name) for rrset in answer]
+        )
+        self.assertEqual(
+            [3600, 300, 3600], [rrset.ttl for rrset in answer]
         )
 
-        # Catalog zone recordsets are generated in-memory and have no
-        # persisted recordset id, unlike regular zone recordsets.
-        bad_recordset = objects.RecordSet(
-            name='version.catalog.example.test.',
-            type='TXT',
-            records=objects.RecordList(objects=[
-                objects.Record(data='"line1\nline2"'),
-            ])
+    def test_axfr_without_soa(self):
+        zone = objects.Zone(
+            id='e2bed4dc-9d01-11e4-89d3-123b93f75cba',
+            name='example.test.',
+            type='PRIMARY',
+            ttl=3600,
         )
-        good_recordset = objects.RecordSet(
-            name='member.zones.catalog.example.test.',
-            type='PTR',
-            records=objects.RecordList(objects=[
-                objects.Record(data='member.example.test.'),
+        self.storage.find_zone.return_value = zone
+        self.storage.iter_zone_axfr.return_value = iter([
+            ('a-id', 'A', 300, 'a.example.test.', '192.0.2.1', 'NONE'),
+        ])
+
+        request = dns.message.make_query('example.test.', dns.rdatatype.AXFR)
+        request.environ = dict(context=self.context)
+
+        self.assertRaises(
+            exceptions.RecordSetNotFound,
+            list, self.handler._handle_axfr(request)
+        )
+
+    def _setup_axfr_zone(self, serial=1):
+        zone = objects.Zone(
+            id='e2bed4dc-9d01-11e4-89d3-123b93f75cba',
+            name='example.test.',
+            type='PRIMARY',
+            ttl=3600,
+            serial=serial,
+        )
+        self.storage.find_zone.return_value = zone
+        soa_row = (
+            'soa-id', 'SOA', None, 'example.test.',
+            'ns1.example.test. hostmaster.example.test. '
+            '%d 3600 600 86400 3600' % serial, 'NONE',
+        )
+        self.storage.find_recordsets_axfr.return_value = [soa_row]
+
+        def _iter_zone_axfr(context, zone_id, chunk_size=None):
+            return iter([
+                soa_row,
+                ('a-id', 'A', 300, 'a.example.test.', '192.0.2.1', 'NONE'),
             ])
+
+        self.storage.iter_zone_axfr.side_effect = _iter_zone_axfr
+        return zone
+
+    def _axfr_request(self):
+        request = dns.message.make_query('example.test.', dns.rdatatype.AXFR)
+        request.environ = dict(context=self.context)
+        return request
+
+    def test_axfr_cached(self):
+        self._setup_axfr_zone()
+
+        first_request = self._axfr_request()
+        first = list(self.handler._handle_axfr(first_request))
+        second_request = self._axfr_request()
+        second = list(self.handler._handle_axfr(second_request))
+
+        self.assertEqual(1, len(self.handler.axfr_cache))
+        self.assertEqual(1, self.storage.iter_zone_axfr.call_count)
+        self.assertEqual(1, len(second))
+        self.assertEqual(
+            first[0].counts, second[0].counts
         )
-        self.storage.get_catalog_zone_records.return_value = [
-            bad_recordset, good_recordset,
+
+        first_response = dns.message.from_wire(first[0].get_wire())
+        second_response = dns.message.from_wire(second[0].get_wire())
+        self.assertEqual(first_request.id, first_response.id)
+        self.assertEqual(second_request.id, second_response.id)
+        self.assertEqual(first_response.answer, second_response.answer)
+
+    def test_axfr_cache_invalidated_by_serial(self):
+        self._setup_axfr_zone(serial=1)
+        list(self.handler._handle_axfr(self._axfr_request()))
+
+        self._setup_axfr_zone(serial=2)
+        responses = list(self.handler._handle_axfr(self._axfr_request()))
+
+        self.assertEqual(2, self.storage.iter_zone_axfr.call_count)
+        answer = dns.message.from_wire(responses[0].get_wire()).answer
+        self.assertEqual(2, answer[0][0].serial)
+
+    def test_axfr_cache_disabled(self):
+        CONF.set_override('axfr_cache_size', 0, 'service:mdns')
+        self.handler = handler.RequestHandler(self.storage, self.tg)
+        self._setup_axfr_zone()
+
+        list(self.handler._handle_axfr(self._axfr_request()))
+        list(self.handler._handle_axfr(self._axfr_request()))
+
+        self.assertEqual(0, len(self.handler.axfr_cache))
+        self.assertEqual(2, self.storage.iter_zone_axfr.call_count)
+
+    @mock.patch.object(dns.renderer.Renderer, 'add_tsig')
+    def test_axfr_cached_with_tsig(self, mock_add_tsig):
+        self._setup_axfr_zone()
+
+        for _ in range(2):
+            request = self._axfr_request()
+            request.use_tsig(dns.tsigkeyring.from_text(
+                {'test-key': 'SomeOldSecretKey'}
+            ))
+            list(self.handler._handle_axfr(request))
+
+        self.assertEqual(1, self.storage.iter_zone_axfr.call_count)
+        self.assertEqual(2, mock_add_tsig.call_count)
+
+    def _ixfr_request(self, serial):
+        request = dns.message.make_query('example.test.', dns.rdatatype.IXFR)
+        request.authority.append(dns.rrset.from_text(
+            'example.test.', 3600, 'IN', 'SOA',
+            'ns1.example.test. hostmaster.example.test. '
+            '%d 3600 600 86400 3600' % serial
+        ))
+        request.environ = dict(context=self.context)
+        return request
+
+    @staticmethod
+    def _answer(responses):
+        answer = []
+        for response in responses:
+            message = dns.message.from_wire(
+                response.get_wire(), one_rr_per_rrset=True
+            )
+            for rrset in message.answer:
+                if rrset.rdtype == dns.rdatatype.SOA:
+                    answer.append(('SOA', rrset[0].serial))
+                else:
+                    answer.append(
+                        (str(rrset.name), rrset.ttl, rrset[0].to_text())
+                    )
+        return answer
+
+    def test_ixfr(self):
+        self._setup_axfr_zone(serial=3)
+        self.storage.find_zone_journal.return_value = [
+            JournalRow(1, 2, 'DELETE', 'a.example.test.', 'A', 300,
+                       '192.0.2.1'),
+            JournalRow(1, 2, 'ADD', 'a.example.test.', 'A', 300,
+                       '192.0.2.2'),
+            JournalRow(1, 2, 'SOA', None, None, None, None),
+            JournalRow(2, 3, 'ADD', 'b.example.test.', 'A', 60,
+                       '192.0.2.3'),
+            JournalRow(2, 3, 'ADD', 'c.example.test.', 'A', 60,
+                       '192.0.2.4'),
+            JournalRow(2, 3, 'DELETE', 'c.example.test.', 'A', 60,
+                       '192.0.2.4'),
+            JournalRow(2, 3, 'SOA', None, None, None, None),
         ]
 
+        responses = list(self.handler._handle_axfr(self._ixfr_request(1)))
+
+        self.storage.find_zone_journal.assert_called_once_with(
+            self.context, 'e2bed4dc-9d01-11e4-89d3-123b93f75cba', 1
+        )
+        self.storage.iter_zone_axfr.assert_not_called()
+        self.assertEqual(
+            [
+                ('SOA', 3),
+                ('SOA', 1),
+                ('a.example.test.', 300, '192.0.2.1'),
+                ('SOA', 2),
+                ('a.example.test.', 300, '192.0.2.2'),
+                ('SOA', 2),
+                ('SOA', 3),
+                ('b.example.test.', 60, '192.0.2.3'),
+                ('SOA', 3),
+            ],
+            self._answer(responses)
+        )
+        self.assertEqual(0, len(self.handler.axfr_cache))
+
+    def test_ixfr_up_to_date(self):
+        self._setup_axfr_zone(serial=3)
+
+        responses = list(self.handler._handle_axfr(self._ixfr_request(3)))
+
+        self.storage.find_zone_journal.assert_not_called()
+        self.assertEqual([('SOA', 3)], self._answer(responses))
+
+    def test_ixfr_serial_wrap(self):
+        self._setup_axfr_zone(serial=1)
+        self.storage.find_zone_journal.return_value = [
+            JournalRow(4294967295, 0, 'ADD', 'b.example.test.', 'A', 60,
+                       '192.0.2.3'),
+            JournalRow(4294967295, 0, 'SOA', None, None, None, None),
+            JournalRow(0, 1, 'SOA', None, None, None, None),
+        ]
+
+        responses = list(
+            self.handler._handle_axfr(self._ixfr_request(4294967295))
+        )
+
+        self.storage.iter_zone_axfr.assert_not_called()
+        self.assertEqual(
+            [
+                ('SOA', 1),
+                ('SOA', 4294967295),
+                ('SOA', 0),
+                ('b.example.test.', 60, '192.0.2.3'),
+                ('SOA', 0),
+                ('SOA', 1),
+                ('SOA', 1),
+            ],
+            self._answer(responses)
+        )
+
+    def test_ixfr_up_to_date_serial_wrap(self):
+        self._setup_axfr_zone(serial=4294967295)
+
+        # The serial of the client is ahead, past the wrap around
+        responses = list(self.handler._handle_axfr(self._ixfr_request(1)))
+
+        self.storage.find_zone_journal.assert_not_called()
+        self.assertEqual([('SOA', 4294967295)], self._answer(responses))
+
+    def test_ixfr_journal_gap(self):
+        self._setup_axfr_zone(serial=3)
+        self.storage.find_zone_journal.return_value = [
+            JournalRow(2, 3, 'SOA', None, None, None, None),
+        ]
+
+        responses = list(self.handler._handle_axfr(self._ixfr_request(1)))
+
+        self.storage.iter_zone_axfr.assert_called_once()
+        self.assertEqual(
+            [('SOA', 3), ('a.example.test.', 300, '192.0.2.1'), ('SOA', 3)],
+            self._answer(responses)
+        )
+
+    def test_ixfr_journal_not_up_to_date(self):
+        self._setup_axfr_zone(serial=3)
+        self.storage.find_zone_journal.return_value = [
+            JournalRow(1, 2, 'SOA', None, None, None, None),
+        ]
+
+        list(self.handler._handle_axfr(self._ixfr_request(1)))
+
+        self.storage.iter_zone_axfr.assert_called_once()
+
+    def test_ixfr_journal_reset(self):
+        self._setup_axfr_zone(serial=3)
+        self.storage.find_zone_journal.return_value = [
+            JournalRow(1, 3, 'RESET', None, None, None, None),
+            JournalRow(1, 3, 'SOA', None, None, None, None),
+        ]
+
+        list(self.handler._handle_axfr(self._ixfr_request(1)))
+
+        self.storage.iter_zone_axfr.assert_called_once()
+
+    def test_ixfr_catalog_zone(self):
+        zone = self._setup_axfr_zone(serial=2)
+        zone.type = 'CATALOG'
+        self.storage.find_zone_journal.return_value = [
+            JournalRow(1, 2, 'DELETE', 'a.zones.example.test.', 'PTR', 3600,
+                       'a.example.test.'),
+            JournalRow(1, 2, 'ADD', 'b.zones.example.test.', 'PTR', 3600,
+                       'b.example.test.'),
+            JournalRow(1, 2, 'SOA', None, None, None, None),
+        ]
+
+        responses = list(self.handler._handle_axfr(self._ixfr_request(1)))
+
+        self.storage.iter_catalog_zone_records.assert_not_called()
+        self.assertEqual(
+            [
+                ('SOA', 2),
+                ('SOA', 1),
+                ('a.zones.example.test.', 3600, 'a.example.test.'),
+                ('SOA', 2),
+                ('b.zones.example.test.', 3600, 'b.example.test.'),
+                ('SOA', 2),
+            ],
+            self._answer(responses)
+        )
+
+    def test_ixfr_without_soa(self):
+        self._setup_axfr_zone(serial=3)
+        request = dns.message.make_query('example.test.', dns.rdatatype.IXFR)
+        request.environ = dict(context=self.context)
+
+        list(self.handler._handle_axfr(request))
+
+        self.storage.find_zone_journal.assert_not_called()
+        self.storage.iter_zone_axfr.assert_called_once()
+
+    def test_axfr_catalog_zone_skips_unparsable_record(self):
+        zone = objects.Zone(
+            id='e2bed4dc-9d01-11e4-89d3-123b93f75cba',
+            name='catalog.example.test.',
+            type='CATALOG',
+            pool_id='794ccc2c-d751-44fe-b57f-8894c9f5c842',
+            ttl=3600,
+        )
+        self.storage.find_zone.return_value = zone
+
+        # Catalog zone records are generated from the member zones and have
+        # no persisted recordset id, unlike regular zone recordsets.
+        self.storage.iter_catalog_zone_records.return_value = iter([
+            ('soa-id', 'SOA', None, 'catalog.example.test.',
+             'ns1.example.test. hostmaster.example.test. '
+             '1 3600 600 86400 3600', 'NONE'),
+            ('version.catalog.example.test.', 'TXT', None,
+             'version.catalog.example.test.', '"line1\nline2"', 'NONE'),
+            ('member.zones.catalog.example.test.', 'PTR', None,
+             'member.zones.catalog.example.test.', 'member.example.test.',
+             'NONE'),
+        ])
+
         request = dns.message.make_query(
             'catalog.example.test.', dns.rdatatype.AXFR)
         request.environ = dict(context=self.context)
@@ -486,6 +804,7 @@ class HandleRecordQueryTest(oslotest.base.BaseTestCase):
 
     def test_handle_record_query_empty_recordlist(self):
         # bug #1550441
+        self.storage.find_closest_zones.return_value = [mock.Mock()]
         self.storage.find_recordset.return_value = objects.RecordSet(
             name='www.example.org.',
             type='A',
@@ -508,7 +827,7 @@ class HandleRecordQueryTest(oslotest.base.BaseTestCase):
             name='bad.example.org.',
             ttl=3600,
         )
-        self.storage.find_zone.return_value = zone
+        self.storage.find_closest_zones.return_value = [zone]
         self.storage.find_recordset.return_value = objects.RecordSet(
             id='71624188-8261-4f57-8ae4-2780fc31ff25',
             name='bad.example.org.',
@@ -534,7 +853,7 @@ class HandleRecordQueryTest(oslotest.base.BaseTestCase):
                 objects.Record(data='192.0.2.2'),
             ])
         )
-        self.storage.find_zone.side_effect = exceptions.ZoneNotFound
+        self.storage.find_closest_zones.return_value = []
 
         request = dns.message.make_query('www.example.org.', dns.rdatatype.A)
         request.environ = dict(context=self.context)
@@ -551,7 +870,7 @@ class HandleRecordQueryTest(oslotest.base.BaseTestCase):
                 objects.Record(data='192.0.2.2'),
             ])
         )
-        self.storage.find_zone.side_effect = exceptions.Forbidden
+        self.storage.find_closest_zones.side_effect = exceptions.Forbidden
 
         request = dns.message.make_query('www.example.org.', dns.rdatatype.A)
         request.environ = dict(context=self.context)
@@ -561,6 +880,7 @@ class HandleRecordQueryTest(oslotest.base.BaseTestCase):
         self.assertEqual(dns.rcode.REFUSED, response[0].rcode())
 
     def test_handle_record_query_find_recordsed_forbidden(self):
+        self.storage.find_closest_zones.return_value = [mock.Mock()]
         self.storage.find_recordset.side_effect = exceptions.Forbidden
 
         request = dns.message.make_query('www.example.org.', dns.rdatatype.A)
@@ -571,6 +891,7 @@ class HandleRecordQueryTest(oslotest.base.BaseTestCase):
         self.assertEqual(dns.rcode.REFUSED, response[0].rcode())
 
     def test_handle_record_query_find_recordsed_not_found(self):
+        self.storage.find_closest_zones.return_value = [mock.Mock()]
         self.storage.find_recordset.side_effect = exceptions.NotFound
 
         request = dns.message.make_query('www.example.org.', dns.rdatatype.A)
@@ -602,7 +923,7 @@ class HandleRecordQueryTest(oslotest.base.BaseTestCase):
                          '2024010100 3600 600 86400 3600'),
             ])
         )
-        self.storage.find_zone.return_value = zone
+        self.storage.find_closest_zones.return_value = [zone]
         self.storage.find_recordset.return_value = recordset
 
         tsigkey = mock.Mock(scope='POOL', resource_id=pool_id)
@@ -616,9 +937,9 @@ class HandleRecordQueryTest(oslotest.base.BaseTestCase):
         self.assertEqual(dns.rcode.NOERROR, response[0].rcode())
 
         # Zone looked up by name + pool_id (zone-first path)
-        self.storage.find_zone.assert_called_once_with(
-            self.context,
-            {'name': 'example.org.', 'pool_id': pool_id}
+        self.storage.find_closest_zones.assert_called_once_with(
+            self.context, 'example.org.', {'pool_id': pool_id},
+            unique=True
         )
         # Recordset scoped to zone_id
         self.storage.find_recordset.assert_called_once_with(
@@ -627,15 +948,15 @@ class HandleRecordQueryTest(oslotest.base.BaseTestCase):
         )
 
     def test_handle_record_query_subdomain_with_tsig(self):
-        """Test the ancestor walk-up for subdomain queries with TSIG.
+        """Test the closest zone lookup for subdomain queries with TSIG.
 
         When the query is for a subdomain (www.example.org.) rather than
-        a zone apex, the first candidate lookup (name='www.example.org.')
-        raises ZoneNotFound because no zone is named that. The handler
-        walks up to the parent name (example.org.), scoped by the same
-        TSIG-derived pool_id, and finds the containing zone there. The
-        recordset lookup is then scoped to that zone's zone_id, never
-        falling back to an unscoped, cross-pool lookup.
+        a zone apex, no zone is named after the query name. The handler
+        looks up the query name and all of its ancestors in one go,
+        scoped by the same TSIG-derived pool_id, and finds the containing
+        zone (example.org.) there. The recordset lookup is then scoped to
+        that zone's zone_id, never falling back to an unscoped, cross-pool
+        lookup.
         """
         pool_id = 'c4f6ea1c-a1af-4401-a849-000000000001'
         zone_id = 'e2bed4dc-9d01-11e4-89d3-123b93f75cba'
@@ -649,11 +970,7 @@ class HandleRecordQueryTest(oslotest.base.BaseTestCase):
             ])
         )
 
-        # First find_zone (name='www.example.org.') fails;
-        # second find_zone (id=zone_id) succeeds.
-        self.storage.find_zone.side_effect = [
-            exceptions.ZoneNotFound, zone
-        ]
+        self.storage.find_closest_zones.return_value = [zone]
         self.storage.find_recordset.return_value = recordset
 
         tsigkey = mock.Mock(scope='POOL', resource_id=pool_id)
@@ -666,9 +983,12 @@ class HandleRecordQueryTest(oslotest.base.BaseTestCase):
         self.assertEqual(1, len(response))
         self.assertEqual(dns.rcode.NOERROR, response[0].rcode())
 
-        self.assertEqual(2, self.storage.find_zone.call_count)
-        # Recordset found scoped to the zone found by walking up to the
-        # parent name (example.org.)
+        self.storage.find_closest_zones.assert_called_once_with(
+            self.context, 'www.example.org.', {'pool_id': pool_id},
+            unique=True
+        )
+        self.storage.find_zone.assert_not_called()
+        # Recordset found scoped to the closest zone (example.org.)
         self.storage.find_recordset.assert_called_once_with(
             self.context,
             {'zone_id': zone_id, 'name': 'www.example.org.', 'type': 'A'}
@@ -681,7 +1001,7 @@ class HandleRecordQueryTest(oslotest.base.BaseTestCase):
             id='e2bed4dc-9d01-11e4-89d3-123b93f75cba',
             name='example.org.', pool_id=pool_id, ttl=3600,
         )
-        self.storage.find_zone.return_value = zone
+        self.storage.find_closest_zones.return_value = [zone]
         self.storage.find_recordset.side_effect = exceptions.NotFound
 
         tsigkey = mock.Mock(scope='POOL', resource_id=pool_id)
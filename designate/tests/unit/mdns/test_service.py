@@ -15,13 +15,16 @@
 # under the License.
 
 
+import os
 from unittest import mock
 
+from oslo_config import fixture as cfg_fixture
 import oslotest.base
 
 import designate.conf
 from designate import dnsmiddleware
 from designate import heartbeat_emitter
+from designate.mdns import cache
 from designate.mdns import service
 from designate import policy
 from designate import rpc
@@ -43,6 +46,7 @@ class MdnsServiceTest(oslotest.base.BaseTestCase):
     def setUp(self, mock_rpc_initialized, mock_rpc_init, mock_policy_init,
               mock_heartbeat):
         super().setUp()
+        self.useFixture(cfg_fixture.Config(CONF))
         self.stdlog = base_fixtures.StandardLogging()
         self.useFixture(self.stdlog)
 
@@ -56,9 +60,24 @@ class MdnsServiceTest(oslotest.base.BaseTestCase):
 
     @mock.patch.object(designate.service.DNSService, 'start')
     def test_service_start(self, mock_dns_start):
+        self.service.tg = mock.Mock()
+
         self.service.start()
 
         mock_dns_start.assert_called()
+        self.service.tg.add_timer_args.assert_called_once_with(
+            10, self.service.tsigkey_cache.check_versions,
+            stop_on_exception=False
+        )
+
+    @mock.patch.object(designate.service.DNSService, 'start')
+    def test_service_start_tsigkey_cache_disabled(self, mock_dns_start):
+        CONF.set_override('tsigkey_cache_size', 0, 'service:mdns')
+        self.service.tg = mock.Mock()
+
+        self.service.start()
+
+        self.service.tg.add_timer_args.assert_not_called()
 
     def test_service_stop(self):
         self.service.dns_service.stop = mock.Mock()
@@ -69,9 +88,58 @@ class MdnsServiceTest(oslotest.base.BaseTestCase):
 
         self.assertIn('Stopping mdns service', self.stdlog.logger.output)
 
+    @mock.patch.object(heartbeat_emitter, 'get_heartbeat_emitter', mock.Mock())
+    @mock.patch.object(storage, 'get_storage', mock.Mock())
+    @mock.patch.object(policy, 'init', mock.Mock())
+    @mock.patch.object(rpc, 'initialized', mock.Mock(return_value=True))
+    def test_service_asyncio_frontend(self):
+        CONF.set_override('dns_frontend', 'asyncio', 'service:mdns')
+        CONF.set_override('dns_worker_threads', 8, 'service:mdns')
+
+        mdns_service = service.Service()
+
+        self.assertIsInstance(
+            mdns_service.dns_service, designate.service.AsyncDNSService
+        )
+        self.assertEqual(8, mdns_service.dns_service.worker_threads)
+
+    @mock.patch.object(heartbeat_emitter, 'get_heartbeat_emitter', mock.Mock())
+    @mock.patch.object(storage, 'get_storage', mock.Mock())
+    @mock.patch.object(policy, 'init', mock.Mock())
+    @mock.patch.object(rpc, 'initialized', mock.Mock(return_value=True))
+    @mock.patch.object(designate.service.DNSService, 'start', mock.Mock())
+    def test_service_workers(self):
+        CONF.set_override('workers', 4, 'service:mdns')
+        CONF.set_override('worker_stats_interval', 30, 'service:mdns')
+
+        mdns_service = service.Service()
+        mdns_service.tg = mock.Mock()
+        mdns_service.start()
+
+        self.assertEqual(4, mdns_service.worker_stats.workers)
+        mdns_service.tg.add_timer_args.assert_any_call(
+            30, mdns_service._publish_worker_stats, stop_on_exception=False
+        )
+
+        mdns_service.dns_service.packets['udp'] = 5
+        mdns_service._publish_worker_stats()
+
+        self.assertEqual(
+            [(os.getpid(), 5, 0)], mdns_service.worker_stats.get()
+        )
+
+    def test_service_single_worker(self):
+        self.assertIsNone(self.service.worker_stats)
+
     def test_service_name(self):
         self.assertEqual('mdns', self.service.service_name)
 
     def test_dns_application(self):
         app = self.service.dns_application
         self.assertIsInstance(app, dnsmiddleware.DNSMiddleware)
+
+    def test_dns_application_tsigkey_cache(self):
+        app = self.service.dns_application
+
+        self.assertIsInstance(app.tsig_keyring.storage, cache.TsigKeyCache)
+        self.assertIs(app.tsig_keyring.storage, app.application.storage)
@@ -0,0 +1,130 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import os
+from unittest import mock
+
+from oslo_config import fixture as cfg_fixture
+import oslotest.base
+
+import designate.conf
+from designate.mdns import supervisor
+from designate import policy
+from designate import rpc
+from designate.tests import base_fixtures
+
+
+CONF = designate.conf.CONF
+
+
+class WorkerStatsTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.worker_stats = supervisor.WorkerStats(2)
+
+    def test_claim(self):
+        self.assertEqual(0, self.worker_stats.claim())
+        self.assertEqual(0, self.worker_stats.claim())
+        self.assertEqual([(os.getpid(), 0, 0)], self.worker_stats.get())
+
+    @mock.patch.object(supervisor, '_is_running', mock.Mock())
+    @mock.patch('os.getpid')
+    def test_claim_full(self, mock_getpid):
+        for pid, slot in ((100, 0), (101, 1), (102, None)):
+            mock_getpid.return_value = pid
+            self.assertEqual(slot, self.worker_stats.claim())
+
+    @mock.patch.object(supervisor, '_is_running')
+    @mock.patch('os.getpid')
+    def test_claim_reuses_stopped_worker_slot(self, mock_getpid,
+                                              mock_is_running):
+        stopped = set()
+        mock_is_running.side_effect = lambda pid: pid not in stopped
+
+        mock_getpid.return_value = 100
+        self.assertEqual(0, self.worker_stats.claim())
+        self.worker_stats.publish(0, {'udp': 10, 'tcp': 2})
+        mock_getpid.return_value = 101
+        self.assertEqual(1, self.worker_stats.claim())
+
+        stopped.add(100)
+        mock_getpid.return_value = 102
+        self.assertEqual(0, self.worker_stats.claim())
+
+        self.assertEqual(
+            [(102, 0, 0), (101, 0, 0)], self.worker_stats.get()
+        )
+
+    def test_publish(self):
+        slot = self.worker_stats.claim()
+
+        self.worker_stats.publish(slot, {'udp': 10, 'tcp': 2})
+
+        self.assertEqual([(os.getpid(), 10, 2)], self.worker_stats.get())
+
+
+@mock.patch.object(policy, 'init', mock.Mock())
+@mock.patch.object(rpc, 'initialized', mock.Mock(return_value=True))
+class SupervisorTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(cfg_fixture.Config(CONF))
+        self.stdlog = base_fixtures.StandardLogging()
+        self.useFixture(self.stdlog)
+
+        self.worker_stats = mock.Mock()
+        self.supervisor = supervisor.Supervisor(self.worker_stats)
+
+    def test_start(self):
+        CONF.set_override('worker_stats_interval', 30, 'service:mdns')
+        self.supervisor.tg = mock.Mock()
+
+        self.supervisor.start()
+
+        self.supervisor.tg.add_timer_args.assert_called_once_with(
+            30, self.supervisor.report, stop_on_exception=False
+        )
+
+    @mock.patch('time.monotonic')
+    def test_report(self, mock_monotonic):
+        self.supervisor._last_time = 100
+        self.worker_stats.get.return_value = [(10, 100, 10), (11, 50, 0)]
+        mock_monotonic.return_value = 110
+
+        self.supervisor.report()
+
+        self.assertIn(
+            'mdns worker 10: 10.0 UDP packets/s, 1.0 TCP queries/s',
+            self.stdlog.logger.output
+        )
+        self.assertIn(
+            'mdns worker 11: 5.0 UDP packets/s, 0.0 TCP queries/s',
+            self.stdlog.logger.output
+        )
+        self.assertIn(
+            'mdns workers: 15.0 UDP packets/s, 1.0 TCP queries/s',
+            self.stdlog.logger.output
+        )
+
+        # Worker 11 was replaced by worker 12.
+        self.worker_stats.get.return_value = [(10, 300, 30), (12, 20, 20)]
+        mock_monotonic.return_value = 120
+
+        self.supervisor.report()
+
+        self.assertIn(
+            'mdns worker 10: 20.0 UDP packets/s, 2.0 TCP queries/s',
+            self.stdlog.logger.output
+        )
+        self.assertIn(
+            'mdns worker 12: 2.0 UDP packets/s, 2.0 TCP queries/s',
+            self.stdlog.logger.output
+        )
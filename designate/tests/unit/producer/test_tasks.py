@@ -31,6 +31,7 @@ from designate.common import constants
 import designate.conf
 from designate import context
 from designate import exceptions
+from designate import objects
 from designate.producer import tasks
 from designate import rpc
 from designate.tests import base_fixtures
@@ -284,69 +285,125 @@ class PeriodicIncrementSerialTest(oslotest.base.BaseTestCase):
                           return_value=self.central_api).start()
         mock.patch.object(context.DesignateContext, 'get_admin_context',
                           return_value=self.context).start()
-        self.central_api.increment_zone_serial.return_value = 123
+        self.central_api.increment_zone_serials.side_effect = (
+            lambda ctxt, zone_ids: {zone_id: 123 for zone_id in zone_ids}
+        )
         self.task = tasks.PeriodicIncrementSerialTask()
         self.task.my_partitions = 0, 9
 
     def test_increment_zone(self):
-        zone = RoObject(
+        zone = objects.Zone(
             id=uuidutils.generate_uuid(),
             action='CREATE',
             increment_serial=True,
+            serial=1,
             delayed_notify=False,
         )
         self.central_api.find_zones.return_value = [zone]
 
         self.task()
 
-        self.central_api.increment_zone_serial.assert_called()
-        self.worker_api.update_zone.assert_called()
+        self.central_api.increment_zone_serials.assert_called_once_with(
+            self.context, [zone.id]
+        )
+        self.worker_api.update_zones.assert_called_once_with(
+            self.context, mock.ANY
+        )
+        self.assertEqual(
+            [zone], list(self.worker_api.update_zones.call_args[0][1])
+        )
+        self.assertEqual(123, zone.serial)
+
+    def test_increment_zones(self):
+        zones = [
+            objects.Zone(
+                id=uuidutils.generate_uuid(),
+                action='CREATE',
+                increment_serial=True,
+                serial=1,
+                delayed_notify=delayed_notify,
+            )
+            for delayed_notify in (False, True, False)
+        ]
+        self.central_api.find_zones.return_value = zones
+
+        self.task()
+
+        self.central_api.increment_zone_serials.assert_called_once_with(
+            self.context, [zone.id for zone in zones]
+        )
+        self.worker_api.update_zones.assert_called_once_with(
+            self.context, mock.ANY
+        )
+        self.assertEqual(
+            [zones[0], zones[2]],
+            list(self.worker_api.update_zones.call_args[0][1])
+        )
 
     def test_increment_zone_with_action_none(self):
-        zone = RwObject(
+        zone = objects.Zone(
             id=uuidutils.generate_uuid(),
             action='NONE',
             status='ACTIVE',
             increment_serial=True,
+            serial=1,
             delayed_notify=False,
         )
         self.central_api.find_zones.return_value = [zone]
 
         self.task()
 
-        self.central_api.increment_zone_serial.assert_called()
-        self.worker_api.update_zone.assert_called()
+        self.central_api.increment_zone_serials.assert_called()
+        self.worker_api.update_zones.assert_called()
 
         self.assertEqual('UPDATE', zone.action)
         self.assertEqual('PENDING', zone.status)
 
     def test_increment_zone_with_delayed_notify(self):
-        zone = RoObject(
+        zone = objects.Zone(
             id=uuidutils.generate_uuid(),
             action='CREATE',
             increment_serial=True,
+            serial=1,
             delayed_notify=True,
         )
         self.central_api.find_zones.return_value = [zone]
 
         self.task()
 
-        self.central_api.increment_zone_serial.assert_called()
-        self.worker_api.update_zone.assert_not_called()
+        self.central_api.increment_zone_serials.assert_called()
+        self.worker_api.update_zones.assert_not_called()
+
+    def test_increment_zone_already_incremented(self):
+        zone = objects.Zone(
+            id=uuidutils.generate_uuid(),
+            action='CREATE',
+            increment_serial=True,
+            serial=1,
+            delayed_notify=False,
+        )
+        self.central_api.find_zones.return_value = [zone]
+        self.central_api.increment_zone_serials.side_effect = None
+        self.central_api.increment_zone_serials.return_value = {}
+
+        self.task()
+
+        self.worker_api.update_zones.assert_not_called()
 
     def test_increment_zone_skip_deleted(self):
         zone = RoObject(
             id=uuidutils.generate_uuid(),
             action='DELETE',
             increment_serial=True,
+            serial=1,
             delayed_notify=False,
         )
         self.central_api.find_zones.return_value = [zone]
 
         self.task()
 
-        self.central_api.increment_zone_serial.assert_not_called()
-        self.worker_api.update_zone.assert_not_called()
+        self.central_api.increment_zone_serials.assert_not_called()
+        self.worker_api.update_zones.assert_not_called()
 
 
 class PeriodicGenerateDelayedNotifyTaskTest(oslotest.base.BaseTestCase):
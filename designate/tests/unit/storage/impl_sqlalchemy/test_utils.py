@@ -0,0 +1,79 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from unittest import mock
+
+import oslotest.base
+from sqlalchemy.dialects import mysql
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import select
+
+from designate.storage.sqlalchemy import tables
+from designate.storage.sqlalchemy import utils
+
+
+class EstimateRowsTestCase(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.query = select(tables.zones.c.id).where(
+            tables.zones.c.deleted == '0'
+        )
+        self.session = mock.Mock()
+
+    def test_explain_mysql(self):
+        self.assertTrue(
+            str(utils.Explain(self.query).compile(
+                dialect=mysql.dialect())).startswith('EXPLAIN SELECT')
+        )
+
+    def test_explain_postgresql(self):
+        self.assertTrue(
+            str(utils.Explain(self.query).compile(
+                dialect=postgresql.dialect())).startswith(
+                'EXPLAIN (FORMAT JSON) SELECT')
+        )
+
+    def test_estimate_rows_mysql(self):
+        self.session.get_bind.return_value.dialect.name = 'mysql'
+        self.session.execute.return_value.mappings.return_value = [
+            {'rows': 1000, 'filtered': 50.0},
+            {'rows': 2, 'filtered': None},
+        ]
+
+        self.assertEqual(
+            1000, utils.estimate_rows(self.session, self.query)
+        )
+
+    def test_estimate_rows_postgresql(self):
+        self.session.get_bind.return_value.dialect.name = 'postgresql'
+        self.session.execute.return_value.scalar.return_value = [
+            {'Plan': {'Node Type': 'Seq Scan', 'Plan Rows': 1234}}
+        ]
+
+        self.assertEqual(
+            1234, utils.estimate_rows(self.session, self.query)
+        )
+
+    def test_estimate_rows_postgresql_text(self):
+        self.session.get_bind.return_value.dialect.name = 'postgresql'
+        self.session.execute.return_value.scalar.return_value = (
+            '[{"Plan": {"Node Type": "Seq Scan", "Plan Rows": 1234}}]'
+        )
+
+        self.assertEqual(
+            1234, utils.estimate_rows(self.session, self.query)
+        )
+
+    def test_estimate_rows_sqlite(self):
+        self.session.get_bind.return_value.dialect.name = 'sqlite'
+
+        self.assertIsNone(utils.estimate_rows(self.session, self.query))
+        self.session.execute.assert_not_called()
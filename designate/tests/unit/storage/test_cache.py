@@ -0,0 +1,389 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from unittest import mock
+
+from oslo_config import fixture as cfg_fixture
+import oslotest.base
+from sqlalchemy import func
+from sqlalchemy import select
+
+import designate.conf
+from designate import objects
+from designate.storage import cache
+from designate.storage.sqlalchemy import tables
+
+
+CONF = designate.conf.CONF
+
+ZONE_ID = '0e6cf7b0-1a42-4b8b-bd8b-a7c2de2f0d7b'
+POOL_ID = '794ccc2c-d751-44fe-b57f-8894c9f5c842'
+
+
+class MemoryBackendTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.backend = cache.MemoryBackend(max_size=2)
+
+    def test_get_missing(self):
+        self.assertIsNone(self.backend.get('key1'))
+
+    def test_set_evicts_least_recently_used(self):
+        self.backend.set('key1', 1)
+        self.backend.set('key2', 2)
+        self.backend.get('key1')
+        self.backend.set('key3', 3)
+
+        self.assertEqual(2, len(self.backend))
+        self.assertEqual(1, self.backend.get('key1'))
+        self.assertIsNone(self.backend.get('key2'))
+        self.assertEqual(3, self.backend.get('key3'))
+
+    def test_delete(self):
+        self.backend.set('key1', 1)
+        self.backend.delete('key1')
+        self.backend.delete('key2')
+
+        self.assertEqual(0, len(self.backend))
+
+
+class StorageCacheTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(cfg_fixture.Config(CONF))
+        CONF.set_override('pool_ttl', 30, 'storage:cache')
+        CONF.set_override('zone_ttl', 0, 'storage:cache')
+        CONF.set_override('stats_interval', 0, 'storage:cache')
+
+        self.cache = cache.StorageCache(cache.MemoryBackend(max_size=10))
+        self.pool = objects.Pool(id=POOL_ID, name='default', version=1)
+        self.pool.obj_reset_changes()
+
+    def test_get_missing(self):
+        get_version = mock.Mock()
+
+        self.assertIsNone(self.cache.get('pool', 'pool:1', get_version))
+        get_version.assert_not_called()
+
+    def test_get_within_ttl(self):
+        get_version = mock.Mock()
+        self.cache.set('pool:1', 1, self.pool)
+
+        pool = self.cache.get('pool', 'pool:1', get_version)
+
+        self.assertIsInstance(pool, objects.Pool)
+        self.assertEqual(POOL_ID, pool.id)
+        self.assertEqual({}, pool.obj_get_changes())
+        get_version.assert_not_called()
+
+    @mock.patch('time.time')
+    def test_get_expired_same_version(self, mock_time):
+        get_version = mock.Mock(return_value=1)
+        mock_time.return_value = 1000
+        self.cache.set('pool:1', 1, self.pool)
+
+        mock_time.return_value = 1030
+        self.assertEqual(
+            POOL_ID, self.cache.get('pool', 'pool:1', get_version).id
+        )
+        self.assertEqual(
+            POOL_ID, self.cache.get('pool', 'pool:1', get_version).id
+        )
+
+        # The check is only made again once the TTL passed again.
+        get_version.assert_called_once_with()
+
+    @mock.patch('time.time')
+    def test_get_expired_new_version(self, mock_time):
+        get_version = mock.Mock(return_value=2)
+        mock_time.return_value = 1000
+        self.cache.set('pool:1', 1, self.pool)
+
+        mock_time.return_value = 1030
+        self.assertIsNone(self.cache.get('pool', 'pool:1', get_version))
+
+    def test_get_zero_ttl(self):
+        get_version = mock.Mock(return_value=1)
+        self.cache.set('zone:1', 1, self.pool)
+
+        self.cache.get('zone', 'zone:1', get_version)
+        self.cache.get('zone', 'zone:1', get_version)
+
+        self.assertEqual(2, get_version.call_count)
+
+    def test_delete(self):
+        self.cache.set('pool:1', 1, self.pool)
+        self.cache.set('pool:2', 1, self.pool)
+        self.cache.delete('pool:1', 'pool:2')
+
+        self.assertEqual(0, len(self.cache.backend))
+
+    @mock.patch.object(cache.LOG, 'info')
+    def test_count(self, mock_log_info):
+        self.cache.count('zone', True)
+        self.cache.count('zone', True)
+        self.cache.count('zone', False)
+
+        self.assertEqual({'hits': 2, 'misses': 1}, self.cache.stats['zone'])
+        mock_log_info.assert_not_called()
+
+    @mock.patch.object(cache.LOG, 'info')
+    def test_count_logs_stats(self, mock_log_info):
+        CONF.set_override('stats_interval', 1, 'storage:cache')
+        self.cache._last_report -= 1
+
+        self.cache.count('pool', True)
+
+        self.assertEqual(len(cache.ENTITIES), mock_log_info.call_count)
+
+
+class CachingStorageTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(cfg_fixture.Config(CONF))
+        CONF.set_override('stats_interval', 0, 'storage:cache')
+
+        self.admin_context = mock.Mock(all_tenants=True, show_deleted=False)
+        self.context = mock.Mock(all_tenants=False, show_deleted=False)
+
+        self.zone = objects.Zone(
+            id=ZONE_ID, name='example.com.', pool_id=POOL_ID, version=1
+        )
+        self.zone.obj_reset_changes()
+
+        self.storage = mock.Mock()
+        self.storage.get_zone.return_value = self.zone
+        self.storage.find_zone.return_value = self.zone
+        self.storage.get_version.return_value = 1
+
+        self.cache = cache.StorageCache(cache.MemoryBackend(max_size=10))
+        self.caching_storage = cache.CachingStorage(self.storage, self.cache)
+
+    def test_passthrough(self):
+        self.caching_storage.find_records(self.admin_context, {})
+
+        self.storage.find_records.assert_called_once_with(
+            self.admin_context, {}
+        )
+
+    def test_get_zone(self):
+        for _ in range(3):
+            zone = self.caching_storage.get_zone(self.admin_context, ZONE_ID)
+            self.assertEqual('example.com.', zone.name)
+
+        self.storage.get_zone.assert_called_once_with(
+            self.admin_context, ZONE_ID, apply_tenant_criteria=False
+        )
+        self.storage.get_version.assert_called_with(
+            self.admin_context, 'zones', ZONE_ID
+        )
+        self.assertEqual({'hits': 2, 'misses': 1}, self.cache.stats['zone'])
+
+    def test_get_zone_new_version(self):
+        self.caching_storage.get_zone(self.admin_context, ZONE_ID)
+        self.storage.get_version.return_value = 2
+        self.caching_storage.get_zone(self.admin_context, ZONE_ID)
+
+        self.assertEqual(2, self.storage.get_zone.call_count)
+
+    def test_get_zone_without_tenant_criteria(self):
+        self.caching_storage.get_zone(
+            self.context, ZONE_ID, apply_tenant_criteria=False
+        )
+        self.caching_storage.get_zone(
+            self.context, ZONE_ID, apply_tenant_criteria=False
+        )
+
+        self.storage.get_zone.assert_called_once()
+
+    def test_get_zone_tenant_scoped(self):
+        self.caching_storage.get_zone(self.context, ZONE_ID)
+        self.caching_storage.get_zone(self.context, ZONE_ID)
+
+        self.assertEqual(2, self.storage.get_zone.call_count)
+        self.storage.get_version.assert_not_called()
+
+    def test_find_zone_by_pool_and_name(self):
+        criterion = {'name': 'example.com.', 'pool_id': POOL_ID}
+        self.caching_storage.find_zone(self.admin_context, criterion)
+        zone = self.caching_storage.find_zone(self.admin_context, criterion)
+
+        self.assertEqual(ZONE_ID, zone.id)
+        self.storage.find_zone.assert_called_once_with(
+            self.admin_context, criterion
+        )
+
+        # The zone is shared with get_zone.
+        self.caching_storage.get_zone(self.admin_context, ZONE_ID)
+        self.storage.get_zone.assert_not_called()
+
+    def test_find_zone_renamed(self):
+        criterion = {'name': 'example.com.', 'pool_id': POOL_ID}
+        self.caching_storage.find_zone(self.admin_context, criterion)
+
+        renamed_zone = objects.Zone(
+            id=ZONE_ID, name='example.net.', pool_id=POOL_ID, version=2
+        )
+        self.cache.set(
+            self.caching_storage._zone_key(ZONE_ID, False), 2, renamed_zone
+        )
+        self.caching_storage.find_zone(self.admin_context, criterion)
+
+        self.assertEqual(2, self.storage.find_zone.call_count)
+
+    def test_find_zone_other_criterion(self):
+        criterion = {'name': 'example.com.'}
+        self.caching_storage.find_zone(self.admin_context, criterion)
+        self.caching_storage.find_zone(self.admin_context, criterion)
+
+        self.assertEqual(2, self.storage.find_zone.call_count)
+
+    def test_update_zone_drops_entry(self):
+        self.caching_storage.get_zone(self.admin_context, ZONE_ID)
+        self.caching_storage.update_zone(self.admin_context, self.zone)
+        self.caching_storage.get_zone(self.admin_context, ZONE_ID)
+
+        self.storage.update_zone.assert_called_once_with(
+            self.admin_context, self.zone
+        )
+        self.assertEqual(2, self.storage.get_zone.call_count)
+
+    def test_increment_serial_drops_entry(self):
+        self.caching_storage.get_zone(self.admin_context, ZONE_ID)
+        self.caching_storage.increment_serial(self.admin_context, ZONE_ID)
+        self.caching_storage.get_zone(self.admin_context, ZONE_ID)
+
+        self.assertEqual(2, self.storage.get_zone.call_count)
+
+    def test_increment_serials_drops_entries(self):
+        self.caching_storage.get_zone(self.admin_context, ZONE_ID)
+        self.caching_storage.increment_serials(self.admin_context, [ZONE_ID])
+        self.caching_storage.get_zone(self.admin_context, ZONE_ID)
+
+        self.assertEqual(2, self.storage.get_zone.call_count)
+
+    def test_get_pool(self):
+        pool = objects.Pool(id=POOL_ID, name='default', version=1)
+        self.storage.get_pool.return_value = pool
+
+        self.caching_storage.get_pool(self.admin_context, POOL_ID)
+        self.caching_storage.get_pool(self.admin_context, POOL_ID)
+        self.storage.get_pool.assert_called_once()
+
+        self.caching_storage.update_pool(self.admin_context, pool)
+        self.caching_storage.get_pool(self.admin_context, POOL_ID)
+        self.assertEqual(2, self.storage.get_pool.call_count)
+
+    def test_find_tlds(self):
+        self.storage.find_tlds.return_value = objects.TldList(
+            objects=[objects.Tld(name='com')]
+        )
+        self.storage.get_table_version.return_value = [1, 1, 'a', 'b']
+
+        for _ in range(2):
+            tlds = self.caching_storage.find_tlds(self.admin_context)
+            self.assertEqual(['com'], [tld.name for tld in tlds])
+
+        self.storage.find_tlds.assert_called_once_with(self.admin_context)
+
+        self.caching_storage.create_tld(self.admin_context, mock.Mock())
+        self.caching_storage.find_tlds(self.admin_context)
+        self.assertEqual(2, self.storage.find_tlds.call_count)
+
+    def test_find_tlds_with_criterion(self):
+        self.caching_storage.find_tlds(self.admin_context, {'name': 'com'})
+        self.caching_storage.find_tlds(self.admin_context, {'name': 'com'})
+
+        self.assertEqual(2, self.storage.find_tlds.call_count)
+        self.storage.get_table_version.assert_not_called()
+
+
+class CountCacheTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.count_cache = cache.CountCache(cache.MemoryBackend(10), 10)
+
+    def _count_query(self, zone_id):
+        return select(func.count(tables.recordsets.c.id)).where(
+            tables.recordsets.c.zone_id == zone_id
+        )
+
+    def test_key(self):
+        self.assertEqual(
+            self.count_cache.key('recordsets', self._count_query(ZONE_ID)),
+            self.count_cache.key('recordsets', self._count_query(ZONE_ID))
+        )
+        self.assertNotEqual(
+            self.count_cache.key('recordsets', self._count_query(ZONE_ID)),
+            self.count_cache.key('recordsets', self._count_query(POOL_ID))
+        )
+
+    @mock.patch('time.time')
+    def test_get(self, mock_time):
+        mock_time.return_value = 100
+        self.count_cache.set('key', 5)
+
+        mock_time.return_value = 109
+        self.assertEqual(5, self.count_cache.get('key'))
+
+    @mock.patch('time.time')
+    def test_get_expired(self, mock_time):
+        mock_time.return_value = 100
+        self.count_cache.set('key', 5)
+
+        mock_time.return_value = 110
+        self.assertIsNone(self.count_cache.get('key'))
+
+    def test_get_missing(self):
+        self.assertIsNone(self.count_cache.get('key'))
+
+
+class GetCacheTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(cfg_fixture.Config(CONF))
+        patcher = mock.patch.object(cache, '_cache', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(cache, '_count_cache', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_disabled(self):
+        self.assertIsNone(cache.get_cache())
+
+    def test_memory(self):
+        CONF.set_override('backend', 'memory', 'storage:cache')
+
+        storage_cache = cache.get_cache()
+
+        self.assertIsInstance(storage_cache.backend, cache.MemoryBackend)
+        self.assertIs(storage_cache, cache.get_cache())
+
+    def test_count_cache_disabled(self):
+        self.assertIsNone(cache.get_count_cache())
+
+    def test_count_cache_memory(self):
+        CONF.set_override('cache_ttl', 10, 'storage:count')
+
+        count_cache = cache.get_count_cache()
+
+        self.assertIsInstance(count_cache.backend, cache.MemoryBackend)
+        self.assertEqual(10, count_cache.ttl)
+        self.assertIs(count_cache, cache.get_count_cache())
+
+    def test_count_cache_shares_storage_cache_backend(self):
+        CONF.set_override('backend', 'memory', 'storage:cache')
+        CONF.set_override('cache_ttl', 10, 'storage:count')
+
+        self.assertIs(
+            cache.get_cache().backend, cache.get_count_cache().backend
+        )
@@ -0,0 +1,199 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from unittest import mock
+
+from oslo_db import exception as db_exception
+import oslotest.base
+
+from designate import context
+from designate import exceptions
+from designate import objects
+from designate import storage
+
+
+class FakeService:
+    def __init__(self, fail=0, exc=db_exception.DBDeadlock):
+        self.fail = fail
+        self.exc = exc
+        self.calls = []
+
+    @storage.retry(cb=storage._retry_on_deadlock, delay=0)
+    def update_recordset(self, admin_context, recordset, options=None):
+        self.calls.append(
+            (recordset.ttl, len(recordset.records), dict(options or {}))
+        )
+        recordset.ttl = 600
+        recordset.records.append(objects.Record(data='192.0.2.2'))
+        recordset.records[0].data = '192.0.2.3'
+        if options is not None:
+            options['seen'] = True
+        if len(self.calls) <= self.fail:
+            raise self.exc()
+        return recordset
+
+    @storage.retry(cb=storage._retry_on_deadlock, delay=0)
+    def outer(self, admin_context, recordset):
+        return self.update_recordset(admin_context, recordset)
+
+    @storage.retry(cb=storage._retry_on_deadlock, delay=0)
+    def outer_catching(self, admin_context, recordset, options):
+        recordset.description = 'outer'
+        try:
+            self.update_recordset(admin_context, recordset, options=options)
+        except exceptions.BadRequest:
+            pass
+        return recordset
+
+
+class RetryTestCase(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin_context = context.DesignateContext.get_admin_context()
+        self.recordset = objects.RecordSet(
+            name='www.example.org.', type='A', ttl=300,
+            records=objects.RecordList(objects=[
+                objects.Record(data='192.0.2.1'),
+            ]),
+        )
+        self.recordset.obj_reset_changes(recursive=True)
+
+    def test_no_retry(self):
+        service = FakeService()
+
+        result = service.update_recordset(self.admin_context, self.recordset)
+
+        # The arguments are not copied when the call succeeds.
+        self.assertIs(self.recordset, result)
+        self.assertEqual(600, self.recordset.ttl)
+        self.assertEqual(2, len(self.recordset.records))
+        self.assertEqual([(300, 1, {})], service.calls)
+
+    @mock.patch.object(storage, 'ArgumentsSnapshot')
+    def test_no_snapshot_when_shallow_copy(self, mock_snapshot):
+        @storage.retry(cb=storage._retry_on_deadlock, deep_copy=False)
+        def update(service, recordset):
+            return recordset
+
+        self.assertIs(self.recordset, update(None, self.recordset))
+        mock_snapshot.assert_not_called()
+
+    def test_retry_restores_arguments(self):
+        service = FakeService(fail=2)
+        options = {'increment_serial': True}
+
+        result = service.update_recordset(
+            self.admin_context, self.recordset, options=options
+        )
+
+        self.assertEqual(
+            [(300, 1, {'increment_serial': True})] * 3, service.calls
+        )
+        self.assertEqual(600, result.ttl)
+        self.assertEqual(2, len(result.records))
+        self.assertEqual('192.0.2.3', result.records[0].data)
+        self.assertEqual(
+            {'ttl', 'records'}, set(result.obj_what_changed())
+        )
+
+    def test_failure_restores_arguments(self):
+        service = FakeService(fail=1, exc=exceptions.BadRequest)
+        options = {}
+        changed = self.recordset.obj_what_changed()
+
+        self.assertRaises(
+            exceptions.BadRequest,
+            service.update_recordset, self.admin_context, self.recordset,
+            options=options
+        )
+
+        self.assertEqual(1, len(service.calls))
+        self.assertEqual(300, self.recordset.ttl)
+        self.assertEqual(1, len(self.recordset.records))
+        self.assertEqual('192.0.2.1', self.recordset.records[0].data)
+        self.assertEqual(changed, self.recordset.obj_what_changed())
+        self.assertEqual({}, options)
+
+    def test_retries_exceeded_restores_arguments(self):
+        service = FakeService(fail=200)
+
+        self.assertRaises(
+            db_exception.DBDeadlock,
+            service.update_recordset, self.admin_context, self.recordset
+        )
+
+        self.assertEqual(150, len(service.calls))
+        self.assertEqual(300, self.recordset.ttl)
+        self.assertEqual(1, len(self.recordset.records))
+
+    def test_nested_retry(self):
+        service = FakeService(fail=1)
+
+        result = service.outer(self.admin_context, self.recordset)
+
+        self.assertEqual([(300, 1, {}), (300, 1, {})], service.calls)
+        self.assertEqual(600, result.ttl)
+        self.assertEqual(2, len(result.records))
+
+    def test_nested_failure_caught(self):
+        service = FakeService(fail=1, exc=exceptions.BadRequest)
+        options = {'increment_serial': True}
+        changed = self.recordset.obj_what_changed() | {'description'}
+
+        result = service.outer_catching(
+            self.admin_context, self.recordset, options
+        )
+
+        # The failed inner call left the arguments as the outer call had
+        # them, with its own change
+        self.assertIs(self.recordset, result)
+        self.assertEqual(1, len(service.calls))
+        self.assertEqual('outer', self.recordset.description)
+        self.assertEqual(300, self.recordset.ttl)
+        self.assertEqual(1, len(self.recordset.records))
+        self.assertEqual('192.0.2.1', self.recordset.records[0].data)
+        self.assertEqual(changed, self.recordset.obj_what_changed())
+        self.assertEqual({'increment_serial': True}, options)
+
+    def test_nested_failure_caught_then_succeeds(self):
+        service = FakeService(fail=1, exc=exceptions.BadRequest)
+
+        service.outer_catching(self.admin_context, self.recordset, {})
+        result = service.update_recordset(self.admin_context, self.recordset)
+
+        # A successful call changes the objects it was given
+        self.assertIs(self.recordset, result)
+        self.assertEqual([(300, 1, {}), (300, 1, {})], service.calls)
+        self.assertEqual(600, self.recordset.ttl)
+        self.assertEqual(2, len(self.recordset.records))
+
+    def test_snapshot_restore_twice(self):
+        names = ['a']
+        snapshot = storage.ArgumentsSnapshot(
+            (self.admin_context, self.recordset), {'names': names}
+        )
+
+        for _ in range(2):
+            args, kwargs = snapshot.arguments()
+            self.assertIsNot(self.admin_context, args[0])
+            self.assertEqual(
+                self.admin_context.to_dict(), args[0].to_dict()
+            )
+            self.assertIs(self.recordset, args[1])
+            self.assertIs(names, kwargs['names'])
+            names.append('b')
+            self.recordset.records = objects.RecordList()
+            self.recordset.description = 'changed'
+            snapshot.restore()
+
+        self.assertEqual(['a'], names)
+        self.assertEqual(1, len(self.recordset.records))
+        self.assertFalse(self.recordset.obj_attr_is_set('description'))
@@ -20,6 +20,7 @@ import dns
 import dns.exception
 import dns.message
 import dns.name
+import dns.opcode
 import dns.rcode
 import dns.rdatatype
 import dns.zone
@@ -94,6 +95,17 @@ class TestDNSUtils(oslotest.base.BaseTestCase):
         CONF.set_override('xfr_timeout', 40, 'service:worker')
         self.assertEqual(40, dnsutils.xfr_timeout())
 
+    def test_serial_gt(self):
+        self.assertTrue(dnsutils.serial_gt(2, 1))
+        self.assertFalse(dnsutils.serial_gt(1, 2))
+        self.assertFalse(dnsutils.serial_gt(1, 1))
+
+        # Across the wrap around at 2**32
+        self.assertTrue(dnsutils.serial_gt(1, 4294967295))
+        self.assertFalse(dnsutils.serial_gt(4294967295, 1))
+        self.assertTrue(dnsutils.serial_gt(2 ** 31 - 1, 0))
+        self.assertFalse(dnsutils.serial_gt(2 ** 31 + 1, 0))
+
     def test__soa_to_normal(self):
         # Normal cases.
         self.assertEqual("a@b.c.d", dnsutils._soa_to_normal("a.b.c.d"))
@@ -293,6 +305,27 @@ class TestDNSMessages(oslotest.base.BaseTestCase):
             ';ADDITIONAL'
         ], txt)
 
+    def test_prepare_soa_query_with_message_id(self):
+        tsig_key = mock.Mock()
+        tsig_key.name = 'test-key'
+        tsig_key.algorithm = 'hmac-sha256'
+        tsig_key.secret = 'c2VjcmV0'
+
+        query = dnsutils.prepare_soa_query(
+            'soa.test.', tsig_key=tsig_key, message_id=1234
+        )
+
+        self.assertEqual(1234, query.id)
+        self.assertEqual(1234, query.tsig[0].original_id)
+        self.assertEqual('soa.test.', query.question[0].name.to_text())
+
+    def test_prepare_notify_with_message_id(self):
+        notify = dnsutils.prepare_notify('notify.test.', message_id=1234)
+
+        self.assertEqual(1234, notify.id)
+        self.assertEqual(dns.opcode.NOTIFY, notify.opcode())
+        self.assertEqual('notify.test.', notify.question[0].name.to_text())
+
     @mock.patch.object(dnsutils, 'send_dns_message')
     def test_get_serial(self, mock_send_dns_message):
         mock_rdataset = mock.Mock(serial=5)
@@ -81,6 +81,26 @@ class HeartbeatEmitterTest(oslotest.base.BaseTestCase):
 
         self.assertEqual(({}, {},), noop_emitter.get_stats_and_capabilities())
 
+    def test_get_status_with_stats(self):
+        stats = {}
+        noop_emitter = heartbeat_emitter.get_heartbeat_emitter(
+            'svc', stats=stats
+        )
+        stats['counter'] = 1
+
+        self.assertEqual(
+            ({'counter': 1}, {},), noop_emitter.get_stats_and_capabilities()
+        )
+
+    def test_get_status_with_stats_function(self):
+        noop_emitter = heartbeat_emitter.get_heartbeat_emitter(
+            'svc', stats=lambda: {'counter': 2}
+        )
+
+        self.assertEqual(
+            ({'counter': 2}, {},), noop_emitter.get_stats_and_capabilities()
+        )
+
     def test_emit(self):
         noop_emitter = heartbeat_emitter.get_heartbeat_emitter('svc')
 
@@ -14,6 +14,8 @@
 import errno
 import socket
 import struct
+import threading
+import time
 from unittest import mock
 
 from oslo_config import fixture as cfg_fixture
@@ -409,6 +411,16 @@ class TestDNSService(oslotest.base.BaseTestCase):
 
         mock_sock_udp.recvfrom.assert_called()
 
+    def test_handle_udp_counts_packets(self):
+        self.service._running.is_set.side_effect = [True, True, False]
+
+        mock_sock_udp = mock.Mock()
+        mock_sock_udp.recvfrom.return_value = (b'query', ('192.0.2.1', 5353))
+
+        self.service._dns_handle_udp(mock_sock_udp)
+
+        self.assertEqual({'tcp': 0, 'udp': 2}, self.service.packets)
+
     def test_handle_udp_handle_errors(self):
         self.service._running.is_set.side_effect = [True, True, True, False]
 
@@ -484,3 +496,176 @@ class TestDNSService(oslotest.base.BaseTestCase):
             'Invalid packet from: 192.0.2.1:53',
             self.stdlog.logger.output
         )
+
+
+class TestAsyncDNSService(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(cfg_fixture.Config(CONF))
+        self.stdlog = base_fixtures.StandardLogging()
+        self.useFixture(self.stdlog)
+
+        self.threads = []
+        self.tg = mock.Mock()
+        self.tg.add_thread.side_effect = self._add_thread
+
+        self.events = {}
+        self.service = designate_service.AsyncDNSService(
+            self._application, self.tg, ['127.0.0.1:0'], 10, None, 0.5,
+            worker_threads=4, max_pending=4,
+        )
+        self.service.start()
+        self.addCleanup(self._stop)
+
+        self.tcp_addr = self.service._dns_socks_tcp[0].getsockname()
+        self.udp_addr = self.service._dns_socks_udp[0].getsockname()
+
+    def _add_thread(self, callback, *args):
+        thread = threading.Thread(target=callback, args=args, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def _stop(self):
+        for event in self.events.values():
+            event.set()
+        self.service.stop()
+        for thread in self.threads:
+            thread.join(5)
+
+    def _application(self, request):
+        # Echo the query back, twice for queries starting with 'x', after
+        # waiting for the event named after the query when there is one.
+        payload = request['payload']
+        event = self.events.get(payload)
+        if event is not None:
+            event.wait(5)
+        if payload == b'large':
+            # More than the socket buffers hold
+            for _ in range(1000):
+                yield b'x' * 60000
+            return
+        yield payload
+        if payload.startswith(b'x'):
+            yield payload
+
+    @staticmethod
+    def _wait_for(condition):
+        for _ in range(500):
+            if condition():
+                return
+            time.sleep(0.01)
+
+    def _tcp_connect(self):
+        client = socket.create_connection(self.tcp_addr, timeout=5)
+        self.addCleanup(client.close)
+        return client
+
+    @staticmethod
+    def _tcp_send(client, payload):
+        client.sendall(struct.pack('!H', len(payload)) + payload)
+
+    @staticmethod
+    def _tcp_recv(client):
+        (length,) = struct.unpack('!H', client.recv(2, socket.MSG_WAITALL))
+        return client.recv(length, socket.MSG_WAITALL)
+
+    def test_udp(self):
+        client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(client.close)
+        client.settimeout(5)
+
+        client.sendto(b'query', self.udp_addr)
+
+        self.assertEqual(b'query', client.recv(512))
+
+    def test_tcp(self):
+        client = self._tcp_connect()
+
+        self._tcp_send(client, b'xquery')
+
+        self.assertEqual(b'xquery', self._tcp_recv(client))
+        self.assertEqual(b'xquery', self._tcp_recv(client))
+
+    def test_packets(self):
+        udp_client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(udp_client.close)
+        udp_client.settimeout(5)
+        udp_client.sendto(b'query', self.udp_addr)
+        udp_client.recv(512)
+
+        tcp_client = self._tcp_connect()
+        self._tcp_send(tcp_client, b'query')
+        self._tcp_send(tcp_client, b'query')
+        self._tcp_recv(tcp_client)
+        self._tcp_recv(tcp_client)
+
+        self.assertEqual({'tcp': 2, 'udp': 1}, self.service.packets)
+
+    def test_tcp_pipelined_out_of_order(self):
+        self.events[b'slow'] = threading.Event()
+        client = self._tcp_connect()
+
+        self._tcp_send(client, b'slow')
+        self._tcp_send(client, b'fast')
+
+        # The second query is answered while the first one is still being
+        # handled.
+        self.assertEqual(b'fast', self._tcp_recv(client))
+        self.events[b'slow'].set()
+        self.assertEqual(b'slow', self._tcp_recv(client))
+
+    def test_tcp_timeout(self):
+        client = self._tcp_connect()
+
+        self._tcp_send(client, b'query')
+
+        self.assertEqual(b'query', self._tcp_recv(client))
+        self.assertEqual(b'', client.recv(2))
+
+    def test_tcp_write_timeout(self):
+        client = self._tcp_connect()
+
+        # The client never reads the response
+        self._tcp_send(client, b'large')
+        self._wait_for(
+            lambda: 'TCP write timeout' in self.stdlog.logger.output
+        )
+        self._wait_for(lambda: self.service._pending == 0)
+
+        self.assertIn(
+            'TCP write timeout to: 127.0.0.1', self.stdlog.logger.output
+        )
+        self.assertEqual(0, self.service._pending)
+
+    def test_udp_too_many_pending(self):
+        client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(client.close)
+        client.settimeout(5)
+
+        payloads = [b'query%d' % i for i in range(5)]
+        for payload in payloads[:4]:
+            self.events[payload] = threading.Event()
+            client.sendto(payload, self.udp_addr)
+        self._wait_for(lambda: self.service._pending == 4)
+
+        # All the worker slots are taken, this one is dropped.
+        client.sendto(payloads[4], self.udp_addr)
+        self._wait_for(
+            lambda: 'Too many pending' in self.stdlog.logger.output
+        )
+        for payload in payloads[:4]:
+            self.events[payload].set()
+
+        responses = {client.recv(512) for _ in range(4)}
+
+        self.assertEqual(set(payloads[:4]), responses)
+        self.assertIn('Too many pending requests', self.stdlog.logger.output)
+
+    def test_stop(self):
+        self.service.stop()
+        for thread in self.threads:
+            thread.join(5)
+
+        self.assertTrue(self.service._loop.is_closed())
+        self.assertEqual(-1, self.service._dns_socks_tcp[0].fileno())
+        self.assertEqual(-1, self.service._dns_socks_udp[0].fileno())
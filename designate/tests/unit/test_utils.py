@@ -381,6 +381,27 @@ class TestUtils(oslotest.base.BaseTestCase):
             ['asc', 'desc']
         )
 
+    def test_get_page_token(self):
+        params = {'page_token': 'token', 'limit': '10'}
+
+        self.assertEqual('token', utils.get_page_token(params))
+        self.assertEqual({'limit': '10'}, params)
+
+        self.assertIsNone(utils.get_page_token({}))
+
+    def test_get_page_token_with_marker(self):
+        self.assertRaisesRegex(
+            exceptions.BadRequest,
+            'marker and page_token can not be used together',
+            utils.get_page_token, {'page_token': ''}, 'marker'
+        )
+
+    def test_get_page_token_duplicate(self):
+        self.assertRaises(
+            exceptions.InvalidPageToken,
+            utils.get_page_token, {'page_token': ['one', 'two']}
+        )
+
     @mock.patch('socket.socket')
     def test_bind_tcp(self, mock_sock_impl):
         mock_sock = mock.MagicMock()
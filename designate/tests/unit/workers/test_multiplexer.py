@@ -0,0 +1,226 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import socket
+import threading
+
+import dns.exception
+import dns.message
+import dns.opcode
+import dns.rcode
+import dns.rrset
+import oslotest.base
+
+from designate import dnsutils
+from designate.worker import multiplexer
+
+
+class FakeNameserver:
+    """UDP nameserver answering SOA queries for the zones it has"""
+
+    def __init__(self, serials):
+        self.serials = serials
+        self.queries = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.port = self.sock.getsockname()[1]
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                wire, address = self.sock.recvfrom(65535)
+            except OSError:
+                return
+            query = dns.message.from_wire(wire)
+            zone_name = query.question[0].name.to_text()
+            self.queries.append(query)
+            if zone_name not in self.serials:
+                continue
+            response = dns.message.make_response(query)
+            response.answer.append(dns.rrset.from_text(
+                zone_name, 3600, 'IN', 'SOA',
+                'ns1.example.org. admin.example.org. %d 3600 600 86400 '
+                '3600' % self.serials[zone_name]
+            ))
+            self.sock.sendto(response.to_wire(), address)
+
+    def close(self):
+        self.sock.close()
+
+
+class FakeTCPNameserver:
+    """
+    TCP nameserver acknowledging NOTIFYs, once it got a number of them, in
+    the reverse order
+    """
+
+    def __init__(self, count):
+        self.count = count
+        self.connections = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _recv(self, connection, length):
+        data = b''
+        while len(data) < length:
+            data += connection.recv(length - len(data))
+        return data
+
+    def _run(self):
+        connection, _ = self.sock.accept()
+        self.connections += 1
+        queries = []
+        for _ in range(self.count):
+            length = int.from_bytes(self._recv(connection, 2), 'big')
+            queries.append(dns.message.from_wire(
+                self._recv(connection, length)
+            ))
+        for query in reversed(queries):
+            wire = dns.message.make_response(query).to_wire()
+            connection.sendall(len(wire).to_bytes(2, 'big') + wire)
+        connection.close()
+
+    def close(self):
+        self.sock.close()
+
+
+class TestQueryMultiplexer(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.multiplexer = multiplexer.QueryMultiplexer(sockets=2)
+        self.addCleanup(self.multiplexer.close)
+
+    def nameserver(self, serials):
+        nameserver = FakeNameserver(serials)
+        self.addCleanup(nameserver.close)
+        return nameserver
+
+    def get_serials(self, zone_names, port, timeout=5):
+        done = threading.Event()
+        results = {}
+
+        def callback(zone_name, serial, error):
+            results[zone_name] = (serial, error)
+            if len(results) == len(zone_names):
+                done.set()
+
+        for zone_name in zone_names:
+            self.multiplexer.get_serial(
+                zone_name, '127.0.0.1',
+                lambda serial, error, zone_name=zone_name: callback(
+                    zone_name, serial, error
+                ),
+                port=port, timeout=timeout
+            )
+
+        self.assertTrue(done.wait(10))
+        return results
+
+    def test_get_serial(self):
+        nameserver = self.nameserver({'example.com.': 42})
+
+        results = self.get_serials(['example.com.'], nameserver.port)
+
+        self.assertEqual({'example.com.': (42, None)}, results)
+
+    def test_get_serials_matched_to_their_query(self):
+        serials = {'zone%d.example.com.' % i: i for i in range(100)}
+        nameserver = self.nameserver(serials)
+
+        results = self.get_serials(list(serials), nameserver.port)
+
+        self.assertEqual(
+            {zone_name: (serial, None)
+             for zone_name, serial in serials.items()},
+            results
+        )
+        # Every query got its own response
+        self.assertEqual(100, len(nameserver.queries))
+
+    def test_get_serial_timeout(self):
+        nameserver = self.nameserver({'example.com.': 42})
+
+        results = self.get_serials(
+            ['example.com.', 'missing.example.com.'], nameserver.port,
+            timeout=0.2
+        )
+
+        self.assertEqual((42, None), results['example.com.'])
+        serial, error = results['missing.example.com.']
+        self.assertIsNone(serial)
+        self.assertIsInstance(error, dns.exception.Timeout)
+        self.assertEqual({}, self.multiplexer._queries)
+
+    def test_query_tcp_pipelined(self):
+        nameserver = FakeTCPNameserver(10)
+        self.addCleanup(nameserver.close)
+        done = threading.Event()
+        results = {}
+
+        def callback(zone_name, response, error):
+            results[zone_name] = (response, error)
+            if len(results) == 10:
+                done.set()
+
+        zone_names = ['zone%d.example.com.' % i for i in range(10)]
+        for zone_name in zone_names:
+            self.multiplexer.query(
+                lambda message_id, zone_name=zone_name: (
+                    dnsutils.prepare_notify(zone_name, message_id=message_id)
+                ),
+                '127.0.0.1',
+                lambda response, error, zone_name=zone_name: callback(
+                    zone_name, response, error
+                ),
+                port=nameserver.port, tcp=True
+            )
+
+        self.assertTrue(done.wait(10))
+        self.assertEqual(1, nameserver.connections)
+        for zone_name in zone_names:
+            response, error = results[zone_name]
+            self.assertIsNone(error)
+            self.assertEqual(dns.opcode.NOTIFY, response.opcode())
+            self.assertEqual(dns.rcode.NOERROR, response.rcode())
+            self.assertEqual(
+                zone_name, response.question[0].name.to_text()
+            )
+
+    def test_query_tcp_connection_refused(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        done = threading.Event()
+        results = []
+
+        def callback(response, error):
+            results.append((response, error))
+            done.set()
+
+        self.multiplexer.query(
+            lambda message_id: dnsutils.prepare_notify(
+                'example.com.', message_id=message_id
+            ),
+            '127.0.0.1', callback, port=port, tcp=True
+        )
+
+        self.assertTrue(done.wait(10))
+        response, error = results[0]
+        self.assertIsNone(response)
+        self.assertIsInstance(error, OSError)
+        self.assertEqual({}, self.multiplexer._connections)
@@ -0,0 +1,195 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from unittest import mock
+
+import dns.exception
+import dns.opcode
+import oslotest.base
+
+from designate.worker import notifier
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.calls = []
+
+    def call_later(self, delay, func, *args):
+        self.calls.append((delay, func, args))
+
+    def run_next(self):
+        _, func, args = self.calls.pop(0)
+        func(*args)
+
+
+class TestNotifyDispatcher(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.multiplexer = mock.Mock()
+        self.scheduler = FakeScheduler()
+        self.dispatcher = notifier.NotifyDispatcher(
+            self.multiplexer, scheduler=self.scheduler, rate=10.0, burst=2,
+            timeout=5, max_retries=2, retry_interval=1.0
+        )
+        self.results = []
+
+        # Freeze the clock, so that the token buckets do not refill
+        patcher = mock.patch.object(
+            notifier.time, 'monotonic', return_value=1000.0
+        )
+        self.mock_monotonic = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _respond(self, index, response=None, error=None):
+        callback = self.multiplexer.query.call_args_list[index][0][2]
+        callback(response, error)
+
+    def test_notify(self):
+        self.dispatcher.notify(
+            'example.com.', '192.0.2.1', self.results.append, port=5354
+        )
+
+        self.assertEqual(1, self.multiplexer.query.call_count)
+        make_message, host, _ = self.multiplexer.query.call_args[0]
+        self.assertEqual('192.0.2.1', host)
+        self.assertEqual(
+            {'port': 5354, 'timeout': 5, 'tcp': False},
+            self.multiplexer.query.call_args[1]
+        )
+
+        dns_message = make_message(1234)
+        self.assertEqual(1234, dns_message.id)
+        self.assertEqual(dns.opcode.NOTIFY, dns_message.opcode())
+        self.assertEqual(
+            'example.com.', dns_message.question[0].name.to_text()
+        )
+
+        self._respond(0, response=mock.Mock())
+        self.assertEqual([True], self.results)
+
+    def test_notify_rate_limited(self):
+        for i in range(5):
+            self.dispatcher.notify(
+                'zone%d.example.com.' % i, '192.0.2.1', self.results.append
+            )
+
+        # Only the burst is sent, the others wait for a token
+        self.assertEqual(2, self.multiplexer.query.call_count)
+        self.assertEqual(1, len(self.scheduler.calls))
+        self.assertAlmostEqual(0.1, self.scheduler.calls[0][0])
+
+        self.mock_monotonic.return_value = 1000.1
+        self.scheduler.run_next()
+        self.assertEqual(3, self.multiplexer.query.call_count)
+        self.assertEqual(1, len(self.scheduler.calls))
+
+        self.mock_monotonic.return_value = 1000.5
+        self.scheduler.run_next()
+        self.assertEqual(5, self.multiplexer.query.call_count)
+        self.assertEqual([], self.scheduler.calls)
+
+    def test_notify_rate_limited_per_target(self):
+        self.dispatcher.notify('a.example.com.', '192.0.2.1', mock.Mock())
+        self.dispatcher.notify('b.example.com.', '192.0.2.1', mock.Mock())
+        self.dispatcher.notify('c.example.com.', '192.0.2.2', mock.Mock())
+
+        self.assertEqual(3, self.multiplexer.query.call_count)
+        self.assertEqual([], self.scheduler.calls)
+
+    def test_notify_retried(self):
+        self.dispatcher.notify(
+            'example.com.', '192.0.2.1', self.results.append
+        )
+
+        self._respond(0, error=dns.exception.Timeout())
+        self.assertEqual(1, len(self.scheduler.calls))
+        self.assertEqual(1.0, self.scheduler.calls[0][0])
+        self.assertEqual([], self.results)
+
+        self.mock_monotonic.return_value = 1001.0
+        self.scheduler.run_next()
+        self.assertEqual(2, self.multiplexer.query.call_count)
+
+        self._respond(1, response=mock.Mock())
+        self.assertEqual([True], self.results)
+
+    def test_notify_failed(self):
+        self.dispatcher.notify(
+            'example.com.', '192.0.2.1', self.results.append
+        )
+
+        intervals = []
+        for i in range(2):
+            self._respond(i, error=dns.exception.Timeout())
+            intervals.append(self.scheduler.calls[0][0])
+            self.mock_monotonic.return_value += intervals[-1]
+            self.scheduler.run_next()
+
+        # The interval is doubled on every retry
+        self.assertEqual([1.0, 2.0], intervals)
+
+        self._respond(2, error=dns.exception.Timeout())
+        self.assertEqual([], self.scheduler.calls)
+        self.assertEqual([False], self.results)
+        self.assertEqual(3, self.multiplexer.query.call_count)
+
+    def test_notify_query_raised(self):
+        self.multiplexer.query.side_effect = OSError()
+        dispatcher = notifier.NotifyDispatcher(
+            self.multiplexer, scheduler=self.scheduler, max_retries=0
+        )
+
+        dispatcher.notify('example.com.', '192.0.2.1', self.results.append)
+
+        self.assertEqual([False], self.results)
+
+    def test_notify_tcp(self):
+        dispatcher = notifier.NotifyDispatcher(
+            self.multiplexer, scheduler=self.scheduler, tcp=True
+        )
+
+        dispatcher.notify('example.com.', '192.0.2.1', self.results.append)
+
+        self.assertTrue(self.multiplexer.query.call_args[1]['tcp'])
+
+    def test_get_stats(self):
+        for i in range(3):
+            self.dispatcher.notify(
+                'zone%d.example.com.' % i, '192.0.2.1', mock.Mock()
+            )
+        self._respond(0, response=mock.Mock())
+        self._respond(1, error=dns.exception.Timeout())
+
+        self.mock_monotonic.return_value = 1002.0
+        self.assertEqual(
+            {
+                '192.0.2.1:53': {
+                    'sent': 2,
+                    'acked': 1,
+                    'retried': 1,
+                    'failed': 0,
+                    'queued': 1,
+                    'send_rate': 1.0,
+                    'ack_rate': 0.5,
+                },
+            },
+            self.dispatcher.get_stats()
+        )
+
+        # The rates are since the previous call
+        self.mock_monotonic.return_value = 1004.0
+        stats = self.dispatcher.get_stats()['192.0.2.1:53']
+        self.assertEqual(0.0, stats['send_rate'])
+        self.assertEqual(0.0, stats['ack_rate'])
+
+    @mock.patch.object(notifier, '_DISPATCHER', None)
+    def test_get_stats_without_dispatcher(self):
+        self.assertEqual({}, notifier.get_stats())
@@ -13,8 +13,11 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.mport threading
+import threading
+import time
 from unittest import mock
 
+import futurist
 from oslo_config import fixture as cfg_fixture
 import oslotest.base
 
@@ -91,3 +94,92 @@ class TestProcessingExecutor(oslotest.base.BaseTestCase):
         exe = processing.Executor()
 
         self.assertEqual('func_name', exe.task_name(mock_task))
+
+
+class StepsTask:
+    def __init__(self, *requests, result=None):
+        self.requests = requests
+        self.result = result
+        self.values = []
+
+    def steps(self):
+        for request in self.requests:
+            self.values.append((yield request))
+        return self.result
+
+
+class TestProcessingExecutorStart(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stdlog = base_fixtures.StandardLogging()
+        self.useFixture(self.stdlog)
+        self.pool = futurist.ThreadPoolExecutor(1)
+        self.addCleanup(self.pool.shutdown, wait=False)
+        self.exe = processing.Executor(self.pool)
+
+    def start(self, task):
+        done = threading.Event()
+        results = []
+
+        def callback(result):
+            results.append(result)
+            done.set()
+
+        self.exe.start(task, callback)
+        self.assertTrue(done.wait(5))
+        return results[0]
+
+    def test_start_task(self):
+        self.assertEqual(1, self.start(lambda: 1))
+
+    def test_start_failed_task(self):
+        def failed_task():
+            raise Exception('Not Great')
+
+        self.assertIsNone(self.start(failed_task))
+        self.assertIn('Not Great', self.stdlog.logger.output)
+
+    def test_start_steps(self):
+        nested = StepsTask(processing.Sleep(0), result='nested')
+        task = StepsTask(
+            [lambda: 1, lambda: 2],
+            processing.Sleep(0),
+            [nested],
+            [],
+            result='done',
+        )
+
+        self.assertEqual('done', self.start(task))
+        self.assertEqual([[1, 2], None, ['nested'], []], task.values)
+
+    def test_start_failed_steps(self):
+        class FailedTask:
+            def steps(self):
+                yield processing.Sleep(0)
+                raise Exception('Not Great')
+
+        self.assertIsNone(self.start(FailedTask()))
+        self.assertIn('Not Great', self.stdlog.logger.output)
+
+    def test_sleeps_do_not_hold_a_thread(self):
+        # Both tasks wait at the same time on the single thread of the pool
+        tasks = [StepsTask(processing.Sleep(0.5)) for _ in range(2)]
+
+        start_time = time.monotonic()
+        self.start(StepsTask(tasks))
+
+        self.assertLess(time.monotonic() - start_time, 1)
+
+
+class TestProcessingScheduler(oslotest.base.BaseTestCase):
+    def test_call_later_in_order(self):
+        scheduler = processing.Scheduler()
+        done = threading.Event()
+        calls = []
+
+        scheduler.call_later(0.2, calls.append, 'last')
+        scheduler.call_later(0.2, done.set)
+        scheduler.call_later(0, calls.append, 'first')
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(['first', 'last'], calls)
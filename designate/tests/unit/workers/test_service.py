@@ -231,6 +231,18 @@ class WorkerServiceTest(oslotest.base.BaseTestCase):
             self.context, self.zone
         )
 
+    def test_update_zones(self):
+        zones = [mock.Mock(), mock.Mock(), mock.Mock()]
+        self.service._do_zone_action = mock.Mock(
+            side_effect=[None, Exception('failed'), None]
+        )
+
+        self.service.update_zones(self.context, zones)
+
+        self.service._do_zone_action.assert_has_calls([
+            mock.call(self.context, zone) for zone in zones
+        ])
+
     @mock.patch.object(service.zonetasks, 'ZoneAction')
     def test_do_zone_action(self, mock_zone_action):
         self.service._executor = mock.Mock()
@@ -254,7 +266,10 @@ class WorkerServiceTest(oslotest.base.BaseTestCase):
             self.zone_params
         )
 
-        self.service._executor.run.assert_has_calls(mock_zone_action(), list())
+        self.service._executor.start.assert_called_once_with(
+            mock_zone_action(), mock.ANY
+        )
+        self.service._executor.run.assert_not_called()
 
     @mock.patch.object(service.zonetasks, 'ZoneAction')
     @mock.patch.object(service.zonetasks, 'SendNotify')
@@ -283,8 +298,104 @@ class WorkerServiceTest(oslotest.base.BaseTestCase):
             self.zone_params
         )
 
-        self.service._executor.run.assert_has_calls(
-            mock_zone_action(), [mock_send_notify()]
+        self.service._executor.start.assert_called_once_with(
+            mock_zone_action(), mock.ANY
+        )
+
+        # The also-notifies are sent once the zone action is done
+        zone_action_done = self.service._executor.start.call_args[0][1]
+        zone_action_done(True)
+
+        self.service._executor.start.assert_called_with(mock_send_notify())
+
+    def _zone(self, action, serial):
+        return objects.Zone(
+            id='a3e7b5a4-39b6-4d97-8b35-63c4a5b3b3c1', name='example.com.',
+            action=action, serial=serial,
+        )
+
+    def test_do_zone_action_coalesced(self):
+        self.service._start_zone_action = mock.Mock()
+        zones = [self._zone('UPDATE', serial) for serial in (1, 2, 3)]
+
+        for zone in zones:
+            self.service._do_zone_action(self.context, zone)
+
+        # Only the first update is started, the others are merged
+        self.service._start_zone_action.assert_called_once_with(
+            self.context, zones[0], None
+        )
+        self.assertEqual(1, self.service.stats['zone_actions_coalesced'])
+
+        self.service._next_zone_action(zones[0].id)
+
+        self.service._start_zone_action.assert_called_with(
+            self.context, zones[2], None
+        )
+
+        self.service._next_zone_action(zones[0].id)
+
+        self.assertEqual(2, self.service._start_zone_action.call_count)
+        self.assertEqual({}, self.service._zone_actions)
+
+    def test_do_zone_action_update_coalesced_into_create(self):
+        self.service._start_zone_action = mock.Mock()
+        in_progress = self._zone('CREATE', 1)
+        create = self._zone('CREATE', 2)
+        update = self._zone('UPDATE', 3)
+
+        for zone in (in_progress, create, update):
+            self.service._do_zone_action(self.context, zone)
+
+        queued = list(self.service._zone_actions[in_progress.id])
+        self.assertEqual([(self.context, update, None)], queued)
+        self.assertEqual('CREATE', update.action)
+
+    def test_do_zone_action_delete_not_coalesced(self):
+        self.service._start_zone_action = mock.Mock()
+        in_progress = self._zone('UPDATE', 1)
+        update = self._zone('UPDATE', 2)
+        delete = self._zone('DELETE', 2)
+        create = self._zone('CREATE', 3)
+
+        self.service._do_zone_action(self.context, in_progress)
+        self.service._do_zone_action(self.context, update)
+        self.service._do_zone_action(
+            self.context, delete, {'hard_delete': True}
+        )
+        self.service._do_zone_action(self.context, create)
+
+        queued = list(self.service._zone_actions[in_progress.id])
+        self.assertEqual([
+            (self.context, update, None),
+            (self.context, delete, {'hard_delete': True}),
+            (self.context, create, None),
+        ], queued)
+        self.assertEqual(0, self.service.stats['zone_actions_coalesced'])
+
+    def test_do_zone_action_start_failure(self):
+        self.service._start_zone_action = mock.Mock(
+            side_effect=exceptions.PoolNotFound('failed')
+        )
+        zone = self._zone('UPDATE', 1)
+
+        self.assertRaises(
+            exceptions.PoolNotFound,
+            self.service._do_zone_action, self.context, zone
+        )
+
+        self.assertEqual({}, self.service._zone_actions)
+
+    @mock.patch.object(service.notifier, 'get_stats')
+    def test_get_stats(self, mock_get_stats):
+        mock_get_stats.return_value = {'192.0.2.1:53': {'sent': 1}}
+        self.service.stats['zone_actions_coalesced'] = 2
+
+        stats = self.service.get_stats()
+
+        self.assertEqual(2, stats['zone_actions_coalesced'])
+        self.assertEqual(
+            {'192.0.2.1:53': {'sent': 1}}, stats['notify_targets']
         )
 
     def test_get_pool(self):
@@ -13,6 +13,7 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.mport threading
+import threading
 from unittest import mock
 
 import dns.exception
@@ -25,12 +26,38 @@ from designate import dnsutils
 from designate import exceptions
 from designate import objects
 from designate.tests.unit import utils
+from designate.worker import notifier
 from designate.worker import processing
 from designate.worker.tasks import zone
 
 
 CONF = designate.conf.CONF
 
+
+def steps_returning(value):
+    """Mock the steps of a task, returning the value without waiting"""
+    def steps(*args, **kwargs):
+        return value
+        yield
+    return mock.Mock(side_effect=steps)
+
+
+def run_steps(steps, executor):
+    """Run steps in the test thread, returning their result and sleeps"""
+    sleeps = []
+    value = None
+    while True:
+        try:
+            request = steps.send(value)
+        except StopIteration as e:
+            return e.value, sleeps
+        if isinstance(request, processing.Sleep):
+            sleeps.append(request.seconds)
+            value = None
+        else:
+            value = executor.run(request)
+
+
 QUERY_RESULTS = {
     'delete_success_all': {
         'case': {
@@ -106,14 +133,14 @@ class TestZoneAction(oslotest.base.BaseTestCase):
         self.task = zone.ZoneAction(
             self.executor, self.context, self.pool, mock.Mock(), 'CREATE'
         )
-        self.task._wait_for_nameservers = mock.Mock()
+        self.task._wait_for_nameservers = steps_returning(None)
 
     def test_constructor(self):
         self.assertTrue(self.task)
 
     def test_call(self):
-        self.task._zone_action_on_targets = mock.Mock(return_value=True)
-        self.task._poll_for_zone = mock.Mock(return_value=True)
+        self.task._zone_action_on_targets = steps_returning(True)
+        self.task._poll_for_zone = steps_returning(True)
 
         self.assertTrue(self.task())
 
@@ -125,54 +152,54 @@ class TestZoneAction(oslotest.base.BaseTestCase):
     @mock.patch.object(zone, 'ZonePoller')
     def test_call_action_on_targets_false(self, mock_zone_poller,
                                           mock_zone_actor):
-        mock_zone_poller().return_value = True
-        mock_zone_actor().return_value = False
+        mock_zone_poller().steps = steps_returning(True)
+        mock_zone_actor().steps = steps_returning(False)
 
         self.assertFalse(self.task())
 
-        mock_zone_actor().assert_called_with()
-        mock_zone_poller().assert_not_called()
+        mock_zone_actor().steps.assert_called_with()
+        mock_zone_poller().steps.assert_not_called()
 
     @mock.patch.object(zone, 'ZoneActor')
     @mock.patch.object(zone, 'ZonePoller')
     def test_call_poll_for_zone_false(self, mock_zone_poller, mock_zone_actor):
-        mock_zone_poller().return_value = False
-        mock_zone_actor().return_value = True
+        mock_zone_poller().steps = steps_returning(False)
+        mock_zone_actor().steps = steps_returning(True)
 
         self.assertFalse(self.task())
 
-        mock_zone_actor().assert_called_with()
-        mock_zone_poller().assert_called_with()
+        mock_zone_actor().steps.assert_called_with()
+        mock_zone_poller().steps.assert_called_with()
 
     def test_call_on_delete(self):
         mock_zone = mock.Mock()
         task = zone.ZoneAction(
             self.executor, self.context, self.pool, mock_zone, 'DELETE'
         )
-        task._zone_action_on_targets = mock.Mock(return_value=True)
-        task._poll_for_zone = mock.Mock(return_value=True)
-        task._wait_for_nameservers = mock.Mock()
+        task._zone_action_on_targets = steps_returning(True)
+        task._poll_for_zone = steps_returning(True)
+        task._wait_for_nameservers = steps_returning(None)
 
         self.assertTrue(task())
 
         self.assertEqual(0, mock_zone.serial)
 
     def test_call_fails_on_zone_targets(self):
-        self.task._zone_action_on_targets = mock.Mock(return_value=False)
+        self.task._zone_action_on_targets = steps_returning(False)
         self.assertFalse(self.task())
 
     def test_call_fails_on_poll_for_zone(self):
-        self.task._zone_action_on_targets = mock.Mock(return_value=False)
+        self.task._zone_action_on_targets = steps_returning(False)
         self.assertFalse(self.task())
 
-    @mock.patch.object(zone, 'time')
-    def test_wait_for_nameservers(self, mock_time):
-        # It is just a time.sleep :(
+    def test_wait_for_nameservers(self):
         task = zone.ZoneAction(
             self.executor, self.context, self.pool, mock.Mock(), 'CREATE'
         )
-        task._wait_for_nameservers()
-        mock_time.sleep.assert_called_with(task.delay)
+        sleep = next(task._wait_for_nameservers())
+
+        self.assertIsInstance(sleep, processing.Sleep)
+        self.assertEqual(task.delay, sleep.seconds)
 
 
 class TestZoneActionOnTarget(oslotest.base.BaseTestCase):
@@ -190,7 +217,7 @@ class TestZoneActionOnTarget(oslotest.base.BaseTestCase):
         })
 
         self.context = mock.Mock()
-        self.executor = mock.Mock()
+        self.executor = processing.Executor()
         self.zone_params = mock.Mock()
 
     @mock.patch.object(dnsutils, 'notify')
@@ -320,6 +347,72 @@ class TestZoneActionOnTarget(oslotest.base.BaseTestCase):
 
         mock_notify.assert_not_called()
 
+    @mock.patch.object(dnsutils, 'notify')
+    @mock.patch('time.sleep', mock.Mock())
+    def test_call_notify_failed(self, mock_notify):
+        mock_notify.side_effect = dns.exception.Timeout()
+        self.zone = objects.Zone(name='example.org.', action='UPDATE')
+        self.actor = zone.ZoneActionOnTarget(
+            self.executor,
+            self.context,
+            self.zone,
+            self.target,
+            self.zone_params
+        )
+        self.actor._max_retries = 2
+        self.actor.storage.find_pool = mock.Mock()
+        self.actor.storage.get_catalog_zone = mock.Mock(
+            side_effect=exceptions.ZoneNotFound)
+
+        self.assertFalse(self.actor())
+
+        # The update is not retried when its NOTIFY failed
+        self.assertEqual(1, self.backend.update_zone.call_count)
+        self.assertEqual(1, mock_notify.call_count)
+
+    @mock.patch.object(zone.notifier, 'get_dispatcher')
+    def test_start_notify_unreachable_target(self, mock_get_dispatcher):
+        delays = []
+
+        def call_later(delay, func, *args):
+            delays.append(delay)
+            func(*args)
+
+        def query(make_message, host, callback, **kwargs):
+            callback(None, dns.exception.Timeout())
+
+        multiplexer = mock.Mock()
+        multiplexer.query.side_effect = query
+        mock_get_dispatcher.return_value = notifier.NotifyDispatcher(
+            multiplexer, scheduler=mock.Mock(call_later=call_later),
+            max_retries=2, retry_interval=1.0
+        )
+        self.zone = objects.Zone(name='example.org.', action='UPDATE')
+        self.actor = zone.ZoneActionOnTarget(
+            self.executor,
+            self.context,
+            self.zone,
+            self.target,
+            self.zone_params
+        )
+        self.actor._max_retries = 3
+        self.actor.storage.find_pool = mock.Mock()
+        self.actor.storage.get_catalog_zone = mock.Mock(
+            side_effect=exceptions.ZoneNotFound)
+        results = []
+        done = threading.Event()
+
+        self.executor.start(
+            self.actor, lambda result: (results.append(result), done.set())
+        )
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual([False], results)
+        # Only the dispatcher retries the NOTIFY, the update is done once
+        self.assertEqual(1, self.backend.update_zone.call_count)
+        self.assertEqual(3, multiplexer.query.call_count)
+        self.assertEqual([1.0, 2.0], delays)
+
 
 class TestSendNotify(oslotest.base.BaseTestCase):
     def setUp(self):
@@ -385,9 +478,37 @@ class TestSendNotify(oslotest.base.BaseTestCase):
             self.target,
         )
 
-        self.assertRaises(
-            dns.exception.Timeout,
-            self.actor
+        self.assertFalse(self.actor())
+
+    @mock.patch.object(dnsutils, 'notify')
+    def test_call_notify_exception_raised(self, mock_notify):
+        mock_notify.side_effect = OSError()
+        self.zone = objects.Zone(name='example.org.')
+        self.actor = zone.SendNotify(
+            self.executor,
+            self.zone,
+            self.target,
+        )
+
+        self.assertFalse(self.actor())
+
+    @mock.patch.object(zone.notifier, 'get_dispatcher')
+    def test_start(self, mock_get_dispatcher):
+        self.zone = objects.Zone(name='example.org.')
+        tsig_key = mock.Mock()
+        callback = mock.Mock()
+        self.actor = zone.SendNotify(
+            self.executor,
+            self.zone,
+            self.target,
+            tsig_key=tsig_key,
+        )
+
+        self.actor.start(callback)
+
+        mock_get_dispatcher.return_value.notify.assert_called_once_with(
+            'example.org.', '203.0.113.1', callback, port=53,
+            tsig_key=tsig_key
         )
 
 
@@ -422,9 +543,13 @@ class TestZoneActor(oslotest.base.BaseTestCase):
         self.pool.targets = ['target 1']
         self.actor.executor.run.return_value = ['foo']
 
-        results = self.actor._execute()
+        results, sleeps = run_steps(self.actor._execute(), self.executor)
 
         self.assertEqual(['foo'], results)
+        self.assertEqual([], sleeps)
+        tasks = self.executor.run.call_args[0][0]
+        self.assertEqual(1, len(tasks))
+        self.assertIsInstance(tasks[0], zone.ZoneActionOnTarget)
 
     def test_call(self):
         self.actor.pool.targets = ['target 1']
@@ -511,7 +636,7 @@ class TestZonePoller(oslotest.base.BaseTestCase):
         )
         self.task.zone.action = 'UPDATE'
         self.task.zone.serial = 2
-        self.task._do_poll = mock.Mock(return_value=result)
+        self.task._do_poll = steps_returning(result)
         self.task._on_success = mock.Mock(return_value=True)
 
         self.assertTrue(self.task())
@@ -531,7 +656,7 @@ class TestZonePoller(oslotest.base.BaseTestCase):
         )
         self.task.zone.action = 'UPDATE'
         self.task.zone.serial = 2
-        self.task._do_poll = mock.Mock(return_value=result)
+        self.task._do_poll = steps_returning(result)
         self.task._on_failure = mock.Mock(return_value=True)
 
         self.assertTrue(self.task())
@@ -679,7 +804,7 @@ class TestZonePollerPolling(oslotest.base.BaseTestCase):
     @mock.patch.object(zone, 'PollForZone')
     def test_do_poll(self, mock_poll_for_zone):
         mock_poll_for_zone.return_value = mock.Mock(return_value=10)
-        result = self.poller._do_poll()
+        result, sleeps = run_steps(self.poller._do_poll(), self.executor)
 
         self.assertTrue(result)
 
@@ -687,7 +812,6 @@ class TestZonePollerPolling(oslotest.base.BaseTestCase):
         self.assertEqual(0, result.no_zones)
         self.assertEqual([10, 10], result.results)
 
-    @mock.patch.object(zone, 'time', mock.Mock())
     def test_do_poll_with_retry(self):
         exe = mock.Mock()
         exe.run.side_effect = [
@@ -695,25 +819,22 @@ class TestZonePollerPolling(oslotest.base.BaseTestCase):
         ]
         self.poller.executor = exe
 
-        result = self.poller._do_poll()
+        result, sleeps = run_steps(self.poller._do_poll(), exe)
 
         self.assertTrue(result)
 
-        zone.time.sleep.assert_called_with(self.retry_interval)
-
         # retried once
-        self.assertEqual(1, len(zone.time.sleep.mock_calls))
+        self.assertEqual([self.retry_interval], sleeps)
 
-    @mock.patch.object(zone, 'time', mock.Mock())
     def test_do_poll_with_retry_until_fail(self):
         exe = mock.Mock()
         exe.run.return_value = [0, 0]
 
         self.poller.executor = exe
 
-        self.poller._do_poll()
+        result, sleeps = run_steps(self.poller._do_poll(), exe)
 
-        self.assertEqual(self.max_retries, len(zone.time.sleep.mock_calls))
+        self.assertEqual(self.max_retries, len(sleeps))
 
     @mock.patch.object(zone, 'PollForZone')
     def test_do_poll_with_tsig_keys(self, mock_poll_for_zone):
@@ -731,7 +852,7 @@ class TestZonePollerPolling(oslotest.base.BaseTestCase):
             return_value=mock_tsig_key
         )
 
-        result = self.poller._do_poll()
+        result, sleeps = run_steps(self.poller._do_poll(), self.executor)
 
         self.assertTrue(result)
 
@@ -758,7 +879,7 @@ class TestZonePollerPolling(oslotest.base.BaseTestCase):
         )
 
         self.assertRaises(
-            exceptions.TsigKeyNotFound, self.poller._do_poll
+            exceptions.TsigKeyNotFound, next, self.poller._do_poll()
         )
 
     @mock.patch.object(central_api.CentralAPI, 'get_instance')
@@ -916,6 +1037,59 @@ class TestPollForZone(oslotest.base.BaseTestCase):
 
         self.assertIsNone(result)
 
+    @mock.patch.object(zone.multiplexer, 'get_multiplexer')
+    def test_start(self, mock_get_multiplexer):
+        poller = mock_get_multiplexer.return_value
+        callback = mock.Mock()
+
+        self.task.start(callback)
+
+        poller.get_serial.assert_called_once_with(
+            'example.org.', 'ns.example.org', mock.ANY, port=53,
+            tsig_key=None
+        )
+        callback.assert_not_called()
+
+        done = poller.get_serial.call_args[0][2]
+        done(10, None)
+
+        callback.assert_called_once_with(10)
+
+    @mock.patch.object(zone.multiplexer, 'get_multiplexer')
+    def test_start_timeout(self, mock_get_multiplexer):
+        poller = mock_get_multiplexer.return_value
+        callback = mock.Mock()
+
+        self.task.start(callback)
+        done = poller.get_serial.call_args[0][2]
+        done(None, dns.exception.Timeout())
+
+        callback.assert_called_once_with(None)
+
+    @mock.patch.object(zone.multiplexer, 'get_multiplexer')
+    def test_start_exception_raised(self, mock_get_multiplexer):
+        poller = mock_get_multiplexer.return_value
+        poller.get_serial.side_effect = OSError
+        callback = mock.Mock()
+
+        self.task.start(callback)
+
+        callback.assert_called_once_with(None)
+
+    @mock.patch.object(zone.multiplexer, 'get_multiplexer')
+    def test_start_all_tcp(self, mock_get_multiplexer):
+        self.useFixture(cfg_fixture.Config(CONF))
+        CONF.set_override('all_tcp', True, 'service:worker')
+        self.task.executor = mock.Mock()
+        callback = mock.Mock()
+
+        self.task.start(callback)
+
+        self.task.executor.start.assert_called_once_with(
+            self.task.__call__, callback
+        )
+        mock_get_multiplexer.assert_not_called()
+
 
 class TestExportZone(oslotest.base.BaseTestCase):
     def setUp(self):
@@ -277,6 +277,24 @@ def get_paging_params(context, params, sort_keys):
     return marker, limit, sort_key, sort_dir
 
 
+def get_page_token(params, marker=None):
+    """
+    Extract the page token, which pages after the sort key values of the last
+    item of the previous page instead of after a marker
+    """
+    page_token = params.pop('page_token', None)
+
+    if page_token is None:
+        return None
+    elif not isinstance(page_token, str):
+        raise exceptions.InvalidPageToken('Only one page_token can be given')
+    elif marker is not None:
+        raise exceptions.BadRequest(
+            'marker and page_token can not be used together')
+
+    return page_token
+
+
 def bind_tcp(host, port, tcp_backlog, tcp_keepidle=None):
     """Bind to a TCP port and listen.
     Use reuseaddr, reuseport if available, keepalive if specified
@@ -0,0 +1,413 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import collections
+import errno
+import functools
+import heapq
+import itertools
+import os
+import selectors
+import socket
+import threading
+import time
+
+import dns.entropy
+import dns.exception
+import dns.message
+from oslo_log import log as logging
+
+import designate.conf
+from designate import dnsutils
+
+
+LOG = logging.getLogger(__name__)
+CONF = designate.conf.CONF
+
+_MULTIPLEXER = None
+_MULTIPLEXER_LOCK = threading.Lock()
+
+
+def get_multiplexer():
+    global _MULTIPLEXER
+    with _MULTIPLEXER_LOCK:
+        if _MULTIPLEXER is None:
+            _MULTIPLEXER = QueryMultiplexer(
+                CONF['service:worker'].poll_udp_sockets
+            )
+        return _MULTIPLEXER
+
+
+class _Query:
+    def __init__(self, key, dns_message, deadline, callback):
+        self.key = key
+        self.dns_message = dns_message
+        self.deadline = deadline
+        self.callback = callback
+        self.connection = None
+
+
+class _Connection:
+    """
+    TCP connection to a nameserver, the queries to it are pipelined over it
+    """
+
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.connected = False
+        self.output = bytearray()
+        self.input = bytearray()
+        self.queries = set()
+
+
+class QueryMultiplexer:
+    """
+    Send DNS queries to nameservers without a thread per query.
+
+    Over UDP, the queries are sent from a few sockets shared by all the
+    queries. Over TCP, the queries to a nameserver are pipelined over a
+    single connection to it. A single thread receives the responses, and
+    matches them to their query by socket or connection, address and message
+    id. Every query has its own timeout.
+    """
+
+    def __init__(self, sockets=4):
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._queries = {}
+        self._timeouts = []
+        self._thread = None
+        self._closed = False
+        # Functions to run in the thread, which owns the TCP connections
+        self._calls = collections.deque()
+        self._connections = {}
+
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+
+        # The UDP sockets are all created upfront, so that they are never
+        # registered while the thread is waiting on them
+        self._sockets = {}
+        for family in (socket.AF_INET, socket.AF_INET6):
+            try:
+                self._sockets[family] = [
+                    self._open_socket(family) for _ in range(sockets)
+                ]
+            except OSError as e:
+                LOG.warning(
+                    'Unable to open UDP sockets for %(family)s, queries over '
+                    'it will fail. Error=%(error)s',
+                    {
+                        'family': family.name,
+                        'error': str(e),
+                    }
+                )
+
+    def _open_socket(self, family):
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        sock.bind(('::' if family == socket.AF_INET6 else '0.0.0.0', 0))
+        self._selector.register(sock, selectors.EVENT_READ)
+        return sock
+
+    def query(self, make_message, host, callback, port=53, timeout=10,
+              tcp=False):
+        """
+        Send a query to a nameserver, without waiting for the response.
+
+        :param make_message: called with the id of the message, returns the
+                             dns.message.Message to send
+        :param callback: called from the multiplexer's thread with the
+                         response and None, or None and the error when the
+                         query failed, e.g. with dns.exception.Timeout
+        :param tcp: send the query over the TCP connection to the nameserver
+        """
+        ip_address = dnsutils.get_ip_address(host)
+        family = socket.AF_INET6 if ':' in ip_address else socket.AF_INET
+        address = (ip_address, port)
+
+        with self._lock:
+            count = next(self._counter)
+            if tcp:
+                channel = 'tcp'
+            else:
+                sockets = self._sockets.get(family)
+                if not sockets:
+                    raise OSError('No UDP socket for %s' % family.name)
+                channel = sockets[count % len(sockets)]
+            while True:
+                key = (channel, address, dns.entropy.random_16())
+                if key not in self._queries:
+                    break
+            query = _Query(
+                key, make_message(key[2]), time.monotonic() + timeout,
+                callback
+            )
+            self._queries[key] = query
+            heapq.heappush(self._timeouts, (query.deadline, count, key))
+            if tcp:
+                self._calls.append(
+                    functools.partial(self._send_tcp, family, query)
+                )
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='worker-query-multiplexer',
+                    daemon=True
+                )
+                self._thread.start()
+
+        if not tcp:
+            try:
+                channel.sendto(query.dns_message.to_wire(), address)
+            except OSError as e:
+                if self._pop(query):
+                    self._call(query, None, e)
+                return
+
+        # Have the thread wait for the timeout of the query
+        self._wakeup()
+
+    def get_serial(self, zone_name, host, callback, port=53, tsig_key=None,
+                   timeout=10):
+        """
+        Send a SOA query for the zone to a nameserver over UDP, without
+        waiting for the response.
+
+        :param callback: called from the multiplexer's thread with the serial
+                         and None, or None and the error when the query
+                         failed
+        """
+        def done(response, error):
+            if error is not None:
+                callback(None, error)
+            else:
+                callback(dnsutils.get_serial_from_response(response), None)
+
+        self.query(
+            lambda message_id: dnsutils.prepare_soa_query(
+                zone_name, tsig_key=tsig_key, message_id=message_id
+            ),
+            host, done, port=port, timeout=timeout
+        )
+
+    def close(self):
+        """
+        Stop the thread and close the sockets, the pending queries are lost
+        """
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        self._wakeup()
+        if thread is not None:
+            thread.join()
+        for connection in list(self._connections.values()):
+            connection.sock.close()
+        for sock in itertools.chain(*self._sockets.values()):
+            sock.close()
+        self._wakeup_r.close()
+        self._wakeup_w.close()
+        self._selector.close()
+
+    def _wakeup(self):
+        try:
+            self._wakeup_w.send(b'\0')
+        except BlockingIOError:
+            # The thread is already to be woken up
+            pass
+
+    def _pop(self, query):
+        with self._lock:
+            if self._queries.get(query.key) is not query:
+                return False
+            del self._queries[query.key]
+        if query.connection is not None:
+            query.connection.queries.discard(query)
+        return True
+
+    @staticmethod
+    def _call(query, response, error):
+        try:
+            query.callback(response, error)
+        except Exception:
+            LOG.exception('Query callback failed')
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                calls = list(self._calls)
+                self._calls.clear()
+                timeout = None
+                if self._timeouts:
+                    timeout = max(0, self._timeouts[0][0] - time.monotonic())
+
+            for call in calls:
+                call()
+
+            for key, events in self._selector.select(timeout):
+                if key.fileobj is self._wakeup_r:
+                    try:
+                        while self._wakeup_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                elif isinstance(key.data, _Connection):
+                    self._on_connection(key.data, events)
+                else:
+                    self._receive(key.fileobj)
+
+            self._expire()
+
+    def _receive(self, sock):
+        while True:
+            try:
+                wire, address = sock.recvfrom(65535)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                # e.g. ICMP port unreachable, the query will time out
+                LOG.debug('Error receiving a DNS response: %s', e)
+                continue
+
+            self._on_response(sock, address[:2], wire)
+
+    def _on_response(self, channel, address, wire):
+        if len(wire) < 2:
+            return
+        key = (channel, address, int.from_bytes(wire[:2], 'big'))
+        with self._lock:
+            query = self._queries.get(key)
+        if query is None:
+            # Late response, after the timeout of its query
+            return
+
+        try:
+            response = dns.message.from_wire(
+                wire,
+                keyring=query.dns_message.keyring,
+                request_mac=query.dns_message.mac,
+            )
+        except Exception as e:
+            if self._pop(query):
+                self._call(query, None, e)
+            return
+
+        if not query.dns_message.is_response(response):
+            return
+        if self._pop(query):
+            self._call(query, response, None)
+
+    def _send_tcp(self, family, query):
+        with self._lock:
+            if self._queries.get(query.key) is not query:
+                # Timed out before it was sent
+                return
+
+        address = query.key[1]
+        connection = self._connections.get(address)
+        try:
+            wire = query.dns_message.to_wire()
+            if connection is None:
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                sock.setblocking(False)
+                error = sock.connect_ex(address)
+                if error not in (0, errno.EINPROGRESS):
+                    sock.close()
+                    raise OSError(error, os.strerror(error))
+                connection = _Connection(sock, address)
+                self._connections[address] = connection
+                self._selector.register(
+                    sock, selectors.EVENT_READ | selectors.EVENT_WRITE,
+                    connection
+                )
+        except Exception as e:
+            if self._pop(query):
+                self._call(query, None, e)
+            return
+
+        query.connection = connection
+        connection.queries.add(query)
+        connection.output += len(wire).to_bytes(2, 'big') + wire
+        self._selector.modify(
+            connection.sock, selectors.EVENT_READ | selectors.EVENT_WRITE,
+            connection
+        )
+
+    def _on_connection(self, connection, events):
+        try:
+            if events & selectors.EVENT_WRITE:
+                if not connection.connected:
+                    error = connection.sock.getsockopt(
+                        socket.SOL_SOCKET, socket.SO_ERROR
+                    )
+                    if error:
+                        raise OSError(error, os.strerror(error))
+                    connection.connected = True
+                sent = connection.sock.send(connection.output)
+                del connection.output[:sent]
+                if not connection.output:
+                    self._selector.modify(
+                        connection.sock, selectors.EVENT_READ, connection
+                    )
+
+            if events & selectors.EVENT_READ:
+                data = connection.sock.recv(65535)
+                if not data:
+                    raise ConnectionError(
+                        'Connection closed by %s:%s' % connection.address
+                    )
+                connection.input += data
+                while len(connection.input) >= 2:
+                    length = int.from_bytes(connection.input[:2], 'big')
+                    if len(connection.input) < length + 2:
+                        break
+                    wire = bytes(connection.input[2:length + 2])
+                    del connection.input[:length + 2]
+                    self._on_response('tcp', connection.address, wire)
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            self._close_connection(connection, e)
+
+    def _close_connection(self, connection, error):
+        LOG.debug(
+            'Closing the connection to %(host)s:%(port)s Error=%(error)s',
+            {
+                'host': connection.address[0],
+                'port': connection.address[1],
+                'error': str(error),
+            }
+        )
+        del self._connections[connection.address]
+        self._selector.unregister(connection.sock)
+        connection.sock.close()
+        for query in list(connection.queries):
+            if self._pop(query):
+                self._call(query, None, error)
+
+    def _expire(self):
+        expired = []
+        now = time.monotonic()
+        with self._lock:
+            while self._timeouts and self._timeouts[0][0] <= now:
+                _, _, key = heapq.heappop(self._timeouts)
+                query = self._queries.get(key)
+                if query is not None and query.deadline <= now:
+                    expired.append(query)
+
+        for query in expired:
+            if self._pop(query):
+                self._call(query, None, dns.exception.Timeout())
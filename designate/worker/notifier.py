@@ -0,0 +1,257 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import collections
+import functools
+import threading
+import time
+
+from oslo_log import log as logging
+
+import designate.conf
+from designate import dnsutils
+from designate.worker import multiplexer
+from designate.worker import processing
+
+
+LOG = logging.getLogger(__name__)
+CONF = designate.conf.CONF
+
+_DISPATCHER = None
+_DISPATCHER_LOCK = threading.Lock()
+
+
+def get_dispatcher():
+    global _DISPATCHER
+    with _DISPATCHER_LOCK:
+        if _DISPATCHER is None:
+            config = CONF['service:worker']
+            _DISPATCHER = NotifyDispatcher(
+                multiplexer.get_multiplexer(),
+                rate=config.notify_rate,
+                burst=config.notify_burst,
+                timeout=config.notify_timeout,
+                max_retries=config.notify_max_retries,
+                retry_interval=config.notify_retry_interval,
+                tcp=dnsutils.use_all_tcp(),
+            )
+        return _DISPATCHER
+
+
+def get_stats():
+    """
+    Stats of the NOTIFYs per target, if any were sent by the dispatcher
+    """
+    with _DISPATCHER_LOCK:
+        dispatcher = _DISPATCHER
+    if dispatcher is None:
+        return {}
+    return dispatcher.get_stats()
+
+
+class _Notify:
+    def __init__(self, zone_name, host, port, tsig_key, callback):
+        self.zone_name = zone_name
+        self.host = host
+        self.port = port
+        self.tsig_key = tsig_key
+        self.callback = callback
+        self.attempt = 0
+
+
+class _Target:
+    def __init__(self, burst):
+        self.tokens = burst
+        self.refilled_at = time.monotonic()
+        self.queue = collections.deque()
+        self.waiting = False
+        self.sent = 0
+        self.acked = 0
+        self.retried = 0
+        self.failed = 0
+        self.reported = (self.refilled_at, 0, 0)
+
+
+class NotifyDispatcher:
+    """
+    Send the NOTIFYs of the worker, through the query multiplexer.
+
+    The NOTIFYs to each target are rate limited by a token bucket, the ones
+    over the limit are queued until the bucket refills. The NOTIFYs which
+    are not acknowledged are sent again, after an interval doubled on every
+    retry.
+    """
+
+    def __init__(self, multiplexer, scheduler=None, rate=100.0, burst=100,
+                 timeout=10, max_retries=3, retry_interval=1.0, tcp=False):
+        self._multiplexer = multiplexer
+        self._scheduler = scheduler or processing.Scheduler()
+        self._rate = rate
+        self._burst = burst
+        self._timeout = timeout
+        self._max_retries = max_retries
+        self._retry_interval = retry_interval
+        self._tcp = tcp
+        self._lock = threading.Lock()
+        self._targets = {}
+
+    def notify(self, zone_name, host, callback, port=53, tsig_key=None):
+        """
+        Send a NOTIFY for the zone to a target, without waiting for it.
+
+        :param callback: called with whether the NOTIFY was acknowledged
+                         (bool)
+        """
+        notify = _Notify(zone_name, host, port, tsig_key, callback)
+        with self._lock:
+            target = self._targets.get((host, port))
+            if target is None:
+                target = self._targets[(host, port)] = _Target(self._burst)
+            target.queue.append(notify)
+            ready = self._take_ready(target)
+        self._send(target, ready)
+
+    def _take_ready(self, target):
+        """
+        Take the NOTIFYs the target has tokens for, and schedule sending the
+        others once it will have. Called with the lock held.
+        """
+        now = time.monotonic()
+        target.tokens = min(
+            self._burst,
+            target.tokens + (now - target.refilled_at) * self._rate
+        )
+        target.refilled_at = now
+
+        ready = []
+        while target.queue and target.tokens >= 1:
+            target.tokens -= 1
+            ready.append(target.queue.popleft())
+
+        if target.queue and not target.waiting:
+            target.waiting = True
+            self._scheduler.call_later(
+                (1 - target.tokens) / self._rate, self._wake, target
+            )
+        return ready
+
+    def _wake(self, target):
+        with self._lock:
+            target.waiting = False
+            ready = self._take_ready(target)
+        self._send(target, ready)
+
+    def _send(self, target, notifies):
+        for notify in notifies:
+            with self._lock:
+                target.sent += 1
+            try:
+                self._multiplexer.query(
+                    functools.partial(
+                        self._make_message, notify.zone_name, notify.tsig_key
+                    ),
+                    notify.host,
+                    functools.partial(self._on_response, target, notify),
+                    port=notify.port,
+                    timeout=self._timeout,
+                    tcp=self._tcp,
+                )
+            except Exception as e:
+                self._on_response(target, notify, None, e)
+
+    @staticmethod
+    def _make_message(zone_name, tsig_key, message_id):
+        return dnsutils.prepare_notify(
+            zone_name, tsig_key=tsig_key, message_id=message_id
+        )
+
+    def _on_response(self, target, notify, response, error):
+        if error is None:
+            with self._lock:
+                target.acked += 1
+            LOG.debug(
+                'Sent NOTIFY to host=%(host)s:%(port)s for '
+                'zone_name=%(zone_name)s',
+                {
+                    'host': notify.host,
+                    'port': notify.port,
+                    'zone_name': notify.zone_name,
+                }
+            )
+            notify.callback(True)
+            return
+
+        if notify.attempt < self._max_retries:
+            interval = self._retry_interval * 2 ** notify.attempt
+            notify.attempt += 1
+            with self._lock:
+                target.retried += 1
+            LOG.debug(
+                'Failed NOTIFY to host=%(host)s:%(port)s for '
+                'zone_name=%(zone_name)s on attempt=%(attempt)d, retrying '
+                'in %(interval)ss Error=%(error)r',
+                {
+                    'host': notify.host,
+                    'port': notify.port,
+                    'zone_name': notify.zone_name,
+                    'attempt': notify.attempt,
+                    'interval': interval,
+                    'error': error,
+                }
+            )
+            self._scheduler.call_later(interval, self._retry, target, notify)
+            return
+
+        with self._lock:
+            target.failed += 1
+        LOG.info(
+            'Failed NOTIFY to host=%(host)s:%(port)s for '
+            'zone_name=%(zone_name)s after attempts=%(attempts)d '
+            'Error=%(error)r',
+            {
+                'host': notify.host,
+                'port': notify.port,
+                'zone_name': notify.zone_name,
+                'attempts': notify.attempt + 1,
+                'error': error,
+            }
+        )
+        notify.callback(False)
+
+    def _retry(self, target, notify):
+        # Retries are rate limited like the first attempts
+        with self._lock:
+            target.queue.append(notify)
+            ready = self._take_ready(target)
+        self._send(target, ready)
+
+    def get_stats(self):
+        """
+        Counts of the NOTIFYs per target, with their send and acknowledgement
+        rates since the previous call.
+        """
+        stats = {}
+        now = time.monotonic()
+        with self._lock:
+            for (host, port), target in self._targets.items():
+                reported_at, sent, acked = target.reported
+                elapsed = max(now - reported_at, 0.001)
+                stats['%s:%s' % (host, port)] = {
+                    'sent': target.sent,
+                    'acked': target.acked,
+                    'retried': target.retried,
+                    'failed': target.failed,
+                    'queued': len(target.queue),
+                    'send_rate': round((target.sent - sent) / elapsed, 2),
+                    'ack_rate': round((target.acked - acked) / elapsed, 2),
+                }
+                target.reported = (now, target.sent, target.acked)
+        return stats
@@ -13,6 +13,9 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import heapq
+import itertools
+import threading
 import time
 
 import futurist
@@ -30,15 +33,74 @@ def default_executor():
     return futurist.ThreadPoolExecutor(CONF['service:worker'].threads)
 
 
+class Sleep:
+    """
+    Yielded by the steps of a task to wait for a number of seconds
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+
+class Scheduler:
+    """
+    Timer calling functions after a delay, from a single thread for all the
+    pending calls. The functions are expected to return quickly, e.g. by
+    submitting their work to a thread pool.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._counter = itertools.count()
+        self._timers = []
+        self._thread = None
+
+    def call_later(self, delay, func, *args):
+        with self._condition:
+            heapq.heappush(
+                self._timers,
+                (time.monotonic() + delay, next(self._counter), func, args)
+            )
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='worker-scheduler', daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    now = time.monotonic()
+                    if self._timers and self._timers[0][0] <= now:
+                        _, _, func, args = heapq.heappop(self._timers)
+                        break
+                    timeout = None
+                    if self._timers:
+                        timeout = self._timers[0][0] - now
+                    self._condition.wait(timeout)
+            try:
+                func(*args)
+            except Exception:
+                LOG.exception('Scheduled call failed')
+
+
 class Executor:
     """
     Object to facilitate the running of a task, or a set of tasks on an
     executor that can map multiple tasks across a configurable number of
     threads
+
+    Tasks with steps can also be started without waiting for them. The waits
+    of their steps are then scheduled on a timer instead of sleeping in one of
+    the threads, which are only used to run the steps themselves. Tasks with
+    a start method run themselves, and call back when they finish.
     """
 
-    def __init__(self, executor=None):
+    def __init__(self, executor=None, scheduler=None):
         self._executor = executor or default_executor()
+        self._scheduler = scheduler or Scheduler()
 
     @staticmethod
     def do(task):
@@ -81,3 +143,85 @@ class Executor:
         )
 
         return results
+
+    def start(self, task, callback=None):
+        """
+        Start a task without waiting for it to finish
+
+        :param task: the task to start, a task with steps is run step by step
+        :param callback: called with the result of the task when it finishes,
+                         or None if it failed
+        """
+        if hasattr(task, 'steps'):
+            self._executor.submit(self._step, task.steps(), None, callback)
+            return
+
+        if hasattr(task, 'start'):
+            task.start(callback or (lambda result: None))
+            return
+
+        future = self._executor.submit(self.do, task)
+        future.add_done_callback(
+            lambda future: self._done(task, future, callback)
+        )
+
+    def _done(self, task, future, callback):
+        try:
+            result = future.result()
+        except Exception:
+            LOG.exception('Task %s failed', self.task_name(task))
+            result = None
+        if callback is not None:
+            callback(result)
+
+    def _step(self, steps, value, callback):
+        try:
+            request = steps.send(value)
+        except StopIteration as e:
+            if callback is not None:
+                callback(e.value)
+            return
+        except Exception:
+            LOG.exception('Task steps failed')
+            if callback is not None:
+                callback(None)
+            return
+
+        if isinstance(request, Sleep):
+            self._scheduler.call_later(
+                request.seconds, self._executor.submit,
+                self._step, steps, None, callback
+            )
+            return
+
+        self._gather(
+            list(request),
+            lambda results: self._executor.submit(
+                self._step, steps, results, callback
+            )
+        )
+
+    def _gather(self, tasks, callback):
+        """
+        Start tasks and call back with their results once they all finished
+        """
+        if not tasks:
+            callback([])
+            return
+
+        lock = threading.Lock()
+        results = [None] * len(tasks)
+        pending = [len(tasks)]
+
+        def task_done(index, result):
+            results[index] = result
+            with lock:
+                pending[0] -= 1
+                if pending[0]:
+                    return
+            callback(results)
+
+        for index, task in enumerate(tasks):
+            self.start(task, lambda result, index=index: task_done(
+                index, result
+            ))
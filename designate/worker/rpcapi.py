@@ -39,15 +39,16 @@ class WorkerAPI:
         1.0 - Initial version
         1.1 - Added perform_zone_xfr and get_serial_number
         1.2 - Added hard_delete to delete_zone
+        1.3 - Added update_zones
     """
-    RPC_API_VERSION = '1.2'
+    RPC_API_VERSION = '1.3'
 
     def __init__(self, topic=None):
         self.topic = topic if topic else CONF['service:worker'].topic
 
         target = messaging.Target(topic=self.topic,
                                   version=self.RPC_API_VERSION)
-        self.client = rpc.get_client(target, version_cap='1.2')
+        self.client = rpc.get_client(target, version_cap='1.3')
 
     @classmethod
     def get_instance(cls):
@@ -71,6 +72,10 @@ class WorkerAPI:
         return self.client.cast(
             context, 'update_zone', zone=zone)
 
+    def update_zones(self, context, zones):
+        return self.client.cast(
+            context, 'update_zones', zones=zones)
+
     def delete_zone(self, context, zone, hard_delete=False):
         return self.client.cast(
             context, 'delete_zone', zone=zone, hard_delete=hard_delete)
@@ -13,6 +13,8 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import collections
+import threading
 import time
 
 from oslo_log import log as logging
@@ -27,6 +29,7 @@ from designate import exceptions
 from designate import heartbeat_emitter
 from designate import service
 from designate import storage
+from designate.worker import notifier
 from designate.worker import processing
 from designate.worker.tasks import zone as zonetasks
 
@@ -43,7 +46,7 @@ class AlsoNotifyTask:
 
 
 class Service(service.RPCService):
-    RPC_API_VERSION = '1.2'
+    RPC_API_VERSION = '1.3'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -54,12 +57,20 @@ class Service(service.RPCService):
         self._executor = None
         self._pools_map = None
 
+        # Zone actions waiting for the one in progress on their zone, by
+        # zone id. A zone is in the table while it has an action in progress.
+        self._zone_actions = {}
+        self._zone_actions_lock = threading.Lock()
+        self.stats = {
+            'zone_actions_coalesced': 0,
+        }
+
         super().__init__(
             self.service_name, CONF['service:worker'].topic,
             threads=CONF['service:worker'].threads,
         )
         self.heartbeat = heartbeat_emitter.get_heartbeat_emitter(
-            self.service_name)
+            self.service_name, stats=self.get_stats)
 
     @property
     def central_api(self):
@@ -136,6 +147,11 @@ class Service(service.RPCService):
             self.pools_map[pool_id] = self.load_pool(pool_id)
         return self.pools_map[pool_id]
 
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['notify_targets'] = notifier.get_stats()
+        return stats
+
     def start(self):
         super().start()
         self.heartbeat.start()
@@ -145,11 +161,96 @@ class Service(service.RPCService):
         self.heartbeat.stop()
         super().stop(graceful)
 
+    @staticmethod
+    def _coalesce_zone_action(queued, action):
+        """
+        Merge a CREATE or UPDATE of a zone into the action queued before it,
+        as only the latest serial needs to be pushed. A DELETE is never
+        merged, nor is anything merged into it.
+
+        :return: The merged action, or None if they can not be merged
+        """
+        queued_zone = queued[1]
+        zone = action[1]
+        if (queued_zone.action not in ('CREATE', 'UPDATE') or
+                zone.action not in ('CREATE', 'UPDATE')):
+            return None
+
+        merged = action
+        if queued_zone.serial > zone.serial:
+            merged = queued
+        if queued_zone.action == 'CREATE':
+            # The zone was not created on the targets yet
+            merged[1].action = 'CREATE'
+        return merged
+
     def _do_zone_action(self, context, zone, zone_params=None):
+        """
+        Start an action on a zone, or queue it if the zone already has one
+        in progress. The queued CREATE and UPDATE of a zone are coalesced.
+        """
+        action = (context, zone, zone_params)
+        with self._zone_actions_lock:
+            queued = self._zone_actions.get(zone.id)
+            if queued is None:
+                self._zone_actions[zone.id] = collections.deque()
+            else:
+                merged = None
+                if queued:
+                    merged = self._coalesce_zone_action(queued[-1], action)
+                if merged is None:
+                    queued.append(action)
+                else:
+                    queued[-1] = merged
+                    self.stats['zone_actions_coalesced'] += 1
+                    LOG.debug(
+                        'Coalesced %(action)s of zone_name=%(zone_name)s '
+                        'zone_id=%(zone_id)s serial=%(serial)d',
+                        {
+                            'action': zone.action,
+                            'zone_name': zone.name,
+                            'zone_id': zone.id,
+                            'serial': zone.serial,
+                        }
+                    )
+                return
+
+        try:
+            self._start_zone_action(context, zone, zone_params)
+        except Exception:
+            self._next_zone_action(zone.id)
+            raise
+
+    def _next_zone_action(self, zone_id):
+        """
+        Start the next action queued for a zone, once its previous one is done
+        """
+        while True:
+            with self._zone_actions_lock:
+                queued = self._zone_actions[zone_id]
+                if not queued:
+                    del self._zone_actions[zone_id]
+                    return
+                context, zone, zone_params = queued.popleft()
+
+            try:
+                self._start_zone_action(context, zone, zone_params)
+                return
+            except Exception:
+                LOG.exception(
+                    'Failed to %(action)s zone_name=%(zone_name)s '
+                    'zone_id=%(zone_id)s',
+                    {
+                        'action': zone.action,
+                        'zone_name': zone.name,
+                        'zone_id': zone.id,
+                    }
+                )
+
+    def _start_zone_action(self, context, zone, zone_params=None):
         pool = self.get_pool(zone.pool_id)
         zone_action = zonetasks.ZoneAction(
             self.executor, context, pool, zone, zone.action, zone_params)
-        all_tasks_result = self.executor.run(zone_action)
         # Send a NOTIFY to each also-notifies
         also_notifies_tasks = list()
         for also_notify in pool.also_notifies:
@@ -159,8 +260,14 @@ class Service(service.RPCService):
             also_notifies_tasks.append(zonetasks.SendNotify(self.executor,
                                                   zone,
                                                   notify_target))
-        all_tasks_result.extend(self.executor.run(also_notifies_tasks))
-        return all_tasks_result
+
+        def zone_action_done(result):
+            for task in also_notifies_tasks:
+                self.executor.start(task)
+            self._next_zone_action(zone.id)
+
+        # The action runs in the background, its waits do not hold a thread
+        self.executor.start(zone_action, zone_action_done)
 
     @rpc.expected_exceptions()
     def create_zone(self, context, zone):
@@ -180,6 +287,26 @@ class Service(service.RPCService):
         """
         self._do_zone_action(context, zone)
 
+    @rpc.expected_exceptions()
+    def update_zones(self, context, zones):
+        """
+        :param context: Security context information.
+        :param zones: Zones to be updated
+        :return: None
+        """
+        for zone in zones:
+            try:
+                self._do_zone_action(context, zone)
+            except Exception:
+                LOG.exception(
+                    'Failed to update zone_name=%(zone_name)s '
+                    'zone_id=%(zone_id)s',
+                    {
+                        'zone_name': zone.name,
+                        'zone_id': zone.id,
+                    }
+                )
+
     @rpc.expected_exceptions()
     def delete_zone(self, context, zone, hard_delete=False):
         """
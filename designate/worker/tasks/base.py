@@ -13,6 +13,8 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.mport threading
+import time
+
 from oslo_log import log as logging
 
 from designate.central import rpcapi as central_rpcapi
@@ -21,6 +23,7 @@ from designate import exceptions
 from designate import quota
 from designate import storage
 from designate import utils
+from designate.worker import processing
 from designate.worker import rpcapi as worker_rpcapi
 
 
@@ -203,3 +206,30 @@ class Task(TaskConfig):
 
     def __call__(self):
         raise NotImplementedError
+
+
+class SteppedTask(Task):
+    """
+    Task made of steps, which yields what it waits for instead of blocking:
+        - a processing.Sleep, to be resumed after the delay
+        - a list of tasks, to be resumed with their results (list)
+
+    Calling the task runs all its steps in the calling thread. When started by
+    the executor, no thread is held while the task waits.
+    """
+    def steps(self):
+        raise NotImplementedError
+
+    def __call__(self):
+        steps = self.steps()
+        value = None
+        while True:
+            try:
+                request = steps.send(value)
+            except StopIteration as e:
+                return e.value
+            if isinstance(request, processing.Sleep):
+                time.sleep(request.seconds)
+                value = None
+            else:
+                value = self.executor.run(list(request))
@@ -26,6 +26,9 @@ import designate.conf
 from designate import dnsutils
 from designate import exceptions
 from designate import objects
+from designate.worker import multiplexer
+from designate.worker import notifier
+from designate.worker import processing
 from designate.worker.tasks import base
 
 
@@ -37,7 +40,7 @@ CONF = designate.conf.CONF
 ######################
 
 
-class ZoneActionOnTarget(base.Task):
+class ZoneActionOnTarget(base.SteppedTask):
     """
     Perform a Create/Update/Delete of the zone on a pool target
 
@@ -59,7 +62,34 @@ class ZoneActionOnTarget(base.Task):
             return None
         return self.storage.get_tsigkey(self.context, tsigkey_id)
 
-    def __call__(self):
+    def _perform_action(self, catalog_zone):
+        """
+        Perform the action on the backend of the target
+
+        :return: The zone to send a NOTIFY for, if any
+        """
+        if catalog_zone is None:
+            if self.action == 'CREATE':
+                self.target.backend.create_zone(self.context, self.zone)
+                return self.zone
+            elif self.action == 'DELETE':
+                self.target.backend.delete_zone(
+                    self.context, self.zone, self.zone_params)
+                return None
+            self.target.backend.update_zone(self.context, self.zone)
+            return self.zone
+
+        if (
+            self.action == 'CREATE' or self.action == 'DELETE' or
+            self.zone.type == constants.ZONE_CATALOG
+        ):
+            # Member zone created or deleted, or catalog zone
+            # itself modified, NOTIFY via catalog
+            return catalog_zone
+        # Member zone updated
+        return self.zone
+
+    def steps(self):
         LOG.debug(
             'Attempting to %(action)s zone_name=%(zone_name)s '
             'zone_id=%(zone_id)s on target=%(target)s',
@@ -99,79 +129,67 @@ class ZoneActionOnTarget(base.Task):
 
         for retry in range(0, self.max_retries):
             try:
-                if catalog_zone is None:
-                    if self.action == 'CREATE':
-                        self.target.backend.create_zone(
-                            self.context, self.zone)
-                        SendNotify(
-                            self.executor, self.zone, self.target,
-                            tsig_key=tsig_key
-                        )()
-                    elif self.action == 'DELETE' and catalog_zone is None:
-                        self.target.backend.delete_zone(
-                            self.context, self.zone, self.zone_params)
-                    else:
-                        self.target.backend.update_zone(
-                            self.context, self.zone)
-                        SendNotify(
-                            self.executor, self.zone, self.target,
-                            tsig_key=tsig_key
-                        )()
-                else:
-                    if (
-                        self.action == 'CREATE' or self.action == 'DELETE' or
-                        self.zone.type == constants.ZONE_CATALOG
-                    ):
-                        # Member zone created or deleted, or catalog zone
-                        # itself modified, NOTIFY via catalog
-                        SendNotify(
-                            self.executor, catalog_zone, self.target,
-                            tsig_key=tsig_key
-                        )()
-                    else:
-                        # Member zone updated
-                        SendNotify(
-                            self.executor, self.zone, self.target,
-                            tsig_key=tsig_key
-                        )()
-
-                LOG.debug(
-                    'Successfully performed %(action)s for '
-                    'zone_name=%(zone_name)s zone_id=%(zone_id)s '
-                    'on target=%(target)s',
+                notify_zone = self._perform_action(catalog_zone)
+                break
+            except Exception as e:
+                LOG.info(
+                    'Failed to %(action)s zone_name=%(zone_name)s '
+                    'zone_id=%(zone_id)s on target=%(target)s on '
+                    'attempt=%(attempt)d Error=%(error)s',
                     {
                         'action': self.action,
                         'zone_name': self.zone.name,
                         'zone_id': self.zone.id,
                         'target': self.target,
+                        'attempt': retry + 1,
+                        'error': str(e),
                     }
                 )
-                return True
-            except Exception as e:
+
+            yield processing.Sleep(self.retry_interval)
+        else:
+            return False
+
+        # The NOTIFY is sent once, the dispatcher retries it
+        if notify_zone is not None:
+            notified = yield [
+                SendNotify(
+                    self.executor, notify_zone, self.target,
+                    tsig_key=tsig_key
+                )
+            ]
+            if not notified[0]:
                 LOG.info(
                     'Failed to %(action)s zone_name=%(zone_name)s '
-                    'zone_id=%(zone_id)s on target=%(target)s on '
-                    'attempt=%(attempt)d Error=%(error)s',
+                    'zone_id=%(zone_id)s on target=%(target)s '
+                    'Error=NOTIFY failed',
                     {
                         'action': self.action,
                         'zone_name': self.zone.name,
                         'zone_id': self.zone.id,
                         'target': self.target,
-                        'attempt': retry + 1,
-                        'error': str(e),
                     }
                 )
+                return False
 
-            time.sleep(self.retry_interval)
-
-        return False
+        LOG.debug(
+            'Successfully performed %(action)s for '
+            'zone_name=%(zone_name)s zone_id=%(zone_id)s '
+            'on target=%(target)s',
+            {
+                'action': self.action,
+                'zone_name': self.zone.name,
+                'zone_id': self.zone.id,
+                'target': self.target,
+            }
+        )
+        return True
 
 
 class SendNotify(base.Task):
     """
-    Send a NOTIFY packet and retry on failure to receive
+    Send a NOTIFY packet
 
-    :raises: Various exceptions from dnspython
     :return: Success/Failure delivering the notify (bool)
     """
 
@@ -181,9 +199,23 @@ class SendNotify(base.Task):
         self.target = target
         self.tsig_key = tsig_key
 
-    def __call__(self):
+    def _host_and_port(self):
         host = self.target.options.get('host', '127.0.0.1')
         port = int(self.target.options.get('port', '53'))
+        return host, port
+
+    def start(self, callback):
+        """
+        Send the NOTIFY through the worker's dispatcher, which rate limits
+        and retries the NOTIFYs to every target, without holding a thread
+        """
+        host, port = self._host_and_port()
+        notifier.get_dispatcher().notify(
+            self.zone.name, host, callback, port=port, tsig_key=self.tsig_key
+        )
+
+    def __call__(self):
+        host, port = self._host_and_port()
 
         try:
             dnsutils.notify(
@@ -201,7 +233,7 @@ class SendNotify(base.Task):
             )
 
             return True
-        except dns.exception.Timeout as e:
+        except dns.exception.Timeout:
             LOG.info(
                 'Timeout on NOTIFY to host=%(host)s:%(port)s for '
                 'zone_name=%(zone_name)s zone_id=%(zone_id)s',
@@ -212,7 +244,19 @@ class SendNotify(base.Task):
                     'zone_id': self.zone.id,
                 }
             )
-            raise e
+        except Exception as e:
+            LOG.warning(
+                'Failed NOTIFY to host=%(host)s:%(port)s for '
+                'zone_name=%(zone_name)s zone_id=%(zone_id)s '
+                'Error=%(error)s',
+                {
+                    'host': host,
+                    'port': port,
+                    'zone_name': self.zone.name,
+                    'zone_id': self.zone.id,
+                    'error': str(e),
+                }
+            )
 
         return False
 
@@ -250,7 +294,7 @@ class ZoneXfr(base.Task):
         )
 
 
-class ZoneActor(base.Task):
+class ZoneActor(base.SteppedTask):
     """
     Orchestrate the Create/Update/Delete action on targets and update status
     if it fails. We would only update status here on an error to perform the
@@ -269,11 +313,11 @@ class ZoneActor(base.Task):
         self.zone_params = zone_params
 
     def _execute(self):
-        results = self.executor.run([
+        results = yield [
             ZoneActionOnTarget(self.executor, self.context, self.zone, target,
                                self.zone_params)
             for target in self.pool.targets
-        ])
+        ]
         return results
 
     def _update_status(self):
@@ -304,12 +348,12 @@ class ZoneActor(base.Task):
             return False
         return True
 
-    def __call__(self):
-        results = self._execute()
+    def steps(self):
+        results = yield from self._execute()
         return self._threshold_met(results)
 
 
-class ZoneAction(base.Task):
+class ZoneAction(base.SteppedTask):
     """
     Orchestrate a complete Create/Update/Delete of the specified zone on the
     pool and the polling for the change
@@ -332,19 +376,19 @@ class ZoneAction(base.Task):
         """
         Pause to give the nameservers a chance to update
         """
-        time.sleep(self.delay)
+        yield processing.Sleep(self.delay)
 
     def _zone_action_on_targets(self):
         actor = ZoneActor(
             self.executor, self.context, self.pool, self.zone, self.zone_params
         )
-        return actor()
+        return (yield from actor.steps())
 
     def _poll_for_zone(self):
         poller = ZonePoller(self.executor, self.context, self.pool, self.zone)
-        return poller()
+        return (yield from poller.steps())
 
-    def __call__(self):
+    def steps(self):
         LOG.info(
             'Attempting to %(action)s zone_name=%(zone_name)s '
             'zone_id=%(zone_id)s',
@@ -355,15 +399,15 @@ class ZoneAction(base.Task):
             }
         )
 
-        if not self._zone_action_on_targets():
+        if not (yield from self._zone_action_on_targets()):
             return False
 
-        self._wait_for_nameservers()
+        yield from self._wait_for_nameservers()
 
         if self.action == 'DELETE':
             self.zone.serial = 0
 
-        if not self._poll_for_zone():
+        if not (yield from self._poll_for_zone()):
             return False
 
         return True
@@ -450,7 +494,7 @@ class PollForZone(base.Task):
             tsig_key=self.tsig_key
         )
 
-    def __call__(self):
+    def _log_poll(self):
         LOG.debug(
             'Polling serial=%(serial)d for zone_name=%(zone_name)s '
             'zone_id=%(zone_id)s action=%(action)s on ns=%(ns)s',
@@ -463,23 +507,23 @@ class PollForZone(base.Task):
             }
         )
 
-        try:
-            serial = self._get_serial()
+    def _on_serial(self, serial):
+        LOG.debug(
+            'Found serial=%(serial)d for zone_name=%(zone_name)s '
+            'zone_id=%(zone_id)s action=%(action)s on ns=%(ns)s',
+            {
+                'serial': serial,
+                'zone_name': self.zone.name,
+                'zone_id': self.zone.id,
+                'action': self.zone.action,
+                'ns': self.ns,
+            }
+        )
+        return serial
+        # TODO(timsim): cache if it's higher than cache
 
-            LOG.debug(
-                'Found serial=%(serial)d for zone_name=%(zone_name)s '
-                'zone_id=%(zone_id)s action=%(action)s on ns=%(ns)s',
-                {
-                    'serial': serial,
-                    'zone_name': self.zone.name,
-                    'zone_id': self.zone.id,
-                    'action': self.zone.action,
-                    'ns': self.ns,
-                }
-            )
-            return serial
-            # TODO(timsim): cache if it's higher than cache
-        except dns.exception.Timeout:
+    def _on_error(self, error):
+        if isinstance(error, dns.exception.Timeout):
             LOG.info(
                 'Timeout polling serial=%(serial)d for '
                 'zone_name=%(zone_name)s zone_id=%(zone_id)s '
@@ -492,8 +536,7 @@ class PollForZone(base.Task):
                     'ns': self.ns,
                 }
             )
-
-        except Exception as e:
+        else:
             LOG.warning(
                 'Unexpected failure polling serial=%(serial)d for '
                 'zone_name=%(zone_name)s zone_id=%(zone_id)s '
@@ -504,14 +547,48 @@ class PollForZone(base.Task):
                     'zone_id': self.zone.id,
                     'action': self.zone.action,
                     'ns': self.ns,
-                    'error': str(e),
+                    'error': str(error),
                 }
             )
-
         return None
 
+    def __call__(self):
+        self._log_poll()
+        try:
+            serial = self._get_serial()
+        except Exception as e:
+            return self._on_error(e)
+        return self._on_serial(serial)
+
+    def start(self, callback):
+        """
+        Poll without holding a thread, the query is sent over the UDP sockets
+        shared by all the polls. Over TCP, the poll runs in the executor.
+        """
+        if dnsutils.use_all_tcp():
+            self.executor.start(self.__call__, callback)
+            return
+
+        def done(serial, error):
+            if error is not None:
+                callback(self._on_error(error))
+            else:
+                callback(self._on_serial(serial))
+
+        self._log_poll()
+        try:
+            multiplexer.get_multiplexer().get_serial(
+                self.zone.name,
+                self.ns.host,
+                done,
+                port=self.ns.port,
+                tsig_key=self.tsig_key
+            )
+        except Exception as e:
+            callback(self._on_error(e))
+
 
-class ZonePoller(base.Task):
+class ZonePoller(base.SteppedTask):
     """
     Orchestrate polling for a change across the nameservers in a pool
     and compute the proper zone status, and update it.
@@ -554,13 +631,13 @@ class ZonePoller(base.Task):
         retry_interval = self.retry_interval
         query_result = DNSQueryResult(0, 0, 0, 0)
         for retry in range(0, self.max_retries):
-            results = self.executor.run([
+            results = yield [
                 PollForZone(
                     self.executor, self.zone, ns,
                     tsig_key=tsig_keys.get(ns.id)
                 )
                 for ns in nameservers
-            ])
+            ]
 
             query_result = parse_query_results(results, self.zone)
 
@@ -586,7 +663,7 @@ class ZonePoller(base.Task):
                 }
             )
 
-            time.sleep(retry_interval)
+            yield processing.Sleep(retry_interval)
 
             if not self.is_current_action_valid(self.context, self.zone.action,
                                                 self.zone):
@@ -665,9 +742,9 @@ class ZonePoller(base.Task):
         # nameservers have the zone to call this a success.
         return True, 'SUCCESS'
 
-    def __call__(self):
+    def steps(self):
         try:
-            query_result = self._do_poll()
+            query_result = yield from self._do_poll()
         except exceptions.TsigKeyNotFound:
             LOG.error(
                 'TSIG key not found for a nameserver in pool, '